@@ -0,0 +1,67 @@
+"""
+Microbenchmark: batch colour conversion throughput.
+
+Converts 1, 100 and 10,000 random colours (and colour temperatures) with:
+
+  scalar   one rgb_to_xy / mirek_to_xy call per colour, cache bypassed;
+  python   rgb_to_xy_batch / mirek_to_xy_batch with NumPy disabled;
+  numpy    rgb_to_xy_batch / mirek_to_xy_batch vectorised (skipped if NumPy
+           is not installed; batches under NUMPY_MIN_BATCH use the Python loop);
+  ndarray  the same, given an (N, 3) uint8 array instead of a list of tuples,
+           as an effect engine that keeps its frames in NumPy would.
+
+Run from the repository root:
+
+    python -m benchmarks.colour_batch
+"""
+import random
+import time
+
+import tests.conftest  # noqa: F401  (installs the OctoPrint/requests stand-ins)
+from octoprint_octohue import colour
+
+
+def best_of(fn, arg, budget=0.3):
+    """Best time per call over repeated runs for about budget seconds."""
+    best, spent = float("inf"), 0.0
+    while spent < budget:
+        start = time.perf_counter()
+        fn(arg)
+        elapsed = time.perf_counter() - start
+        best, spent = min(best, elapsed), spent + elapsed
+    return best
+
+
+def main():
+    rng = random.Random(1)
+    numpy = colour.np
+    sizes = (1, 100, 10000)
+
+    rows = []
+    for n in sizes:
+        rgb = [(rng.randrange(256), rng.randrange(256), rng.randrange(256)) for _ in range(n)]
+        mirek = [rng.randrange(153, 501) for _ in range(n)]
+        timings = {
+            "rgb scalar": best_of(lambda cs: [colour.rgb_to_xy.__wrapped__(*c) for c in cs], rgb),
+            "mirek scalar": best_of(lambda ms: [colour.mirek_to_xy.__wrapped__(m) for m in ms], mirek),
+        }
+        colour.np = None
+        timings["rgb python"] = best_of(colour.rgb_to_xy_batch, rgb)
+        timings["mirek python"] = best_of(colour.mirek_to_xy_batch, mirek)
+        colour.np = numpy
+        if numpy is not None:
+            timings["rgb numpy"] = best_of(colour.rgb_to_xy_batch, rgb)
+            timings["rgb ndarray"] = best_of(colour.rgb_to_xy_batch, numpy.array(rgb, dtype=numpy.uint8))
+            timings["mirek numpy"] = best_of(colour.mirek_to_xy_batch, mirek)
+        rows.append((n, timings))
+
+    print(f"NumPy: {numpy.__version__ if numpy is not None else 'not installed'}"
+          f" (vectorised from {colour.NUMPY_MIN_BATCH} colours)")
+    print(f"{'':14}" + "".join(f"{n:>16,}" for n in sizes) + "   colours/s at 10k")
+    for name in rows[0][1]:
+        cells = "".join(f"{timings[name] * 1e6:14.1f}µs" for _, timings in rows)
+        print(f"{name:14}{cells}{10000 / rows[-1][1][name]:>16,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Microbenchmark: rgb_to_xy before and after the table-driven, memoised path.
+
+Samples the 16.7M-colour sRGB cube and converts every sample with:
+
+  legacy   the original per-call implementation (three ** 2.4 powers, float
+           scaling and a debug log call per conversion);
+  table    colour.rgb_to_xy with its cache bypassed (256-entry linearisation
+           table, no logging);
+  cached   colour.rgb_to_xy as the plugin calls it, on a statusDict-sized
+           working set of colours that repeat on every event.
+
+It also reports the largest difference between legacy and table results over
+the sample, which must stay at floating-point noise.
+
+Run from the repository root:
+
+    python -m benchmarks.colour_conversion [--stride N] [--random N]
+"""
+import argparse
+import logging
+import random
+import time
+
+import tests.conftest  # noqa: F401  (installs the OctoPrint/requests stand-ins)
+from octoprint_octohue.colour import rgb_to_xy
+
+
+def legacy_rgb_to_xy(red, green, blue, logger=logging.getLogger("octohue.bench")):
+    logger.debug(f"RGB Split Input - R:{red} G:{green} B:{blue}")
+    scales = []
+    for value in (red, green, blue):
+        scale = float(value) / 255.0
+        if scale <= 0.04045:
+            scale = scale / 12.92
+        else:
+            scale = ((scale + 0.055) / 1.055) ** 2.4
+        scales.append(scale)
+    r, g, b = scales
+    x = 0.4124 * r + 0.3576 * g + 0.1805 * b
+    y = 0.2126 * r + 0.7152 * g + 0.0722 * b
+    z = 0.0193 * r + 0.1192 * g + 0.9505 * b
+    if x + y + z == 0:
+        return None
+    return [x / (x + y + z), y / (x + y + z)]
+
+
+def sample(stride, extra, seed=1):
+    """Every stride-th value per channel (always including 255), plus random colours."""
+    levels = list(range(0, 256, stride))
+    if levels[-1] != 255:
+        levels.append(255)
+    colours = [(r, g, b) for r in levels for g in levels for b in levels]
+    rng = random.Random(seed)
+    colours += [(rng.randrange(256), rng.randrange(256), rng.randrange(256)) for _ in range(extra)]
+    return colours
+
+
+def run(fn, colours, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for r, g, b in colours:
+            fn(r, g, b)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--stride", type=int, default=5, help="channel step for the grid sample (default 5)")
+    parser.add_argument("--random", type=int, default=100000, help="extra random colours (default 100000)")
+    args = parser.parse_args()
+
+    colours = sample(args.stride, args.random)
+    uncached = rgb_to_xy.__wrapped__
+
+    worst = 0.0
+    for rgb in colours:
+        old, new = legacy_rgb_to_xy(*rgb), uncached(*rgb)
+        if old is None or new is None:
+            assert old is new is None, rgb
+            continue
+        worst = max(worst, abs(old[0] - new[0]), abs(old[1] - new[1]))
+
+    n = len(colours)
+    legacy = run(legacy_rgb_to_xy, colours)
+    table = run(uncached, colours)
+
+    palette = [(255, 255, 255), (0, 0, 255), (0, 255, 0), (255, 0, 0), (255, 165, 0), (128, 0, 128)]
+    events = palette * (n // len(palette))
+    rgb_to_xy.cache_clear()
+    legacy_events = run(legacy_rgb_to_xy, events)
+    cached_events = run(rgb_to_xy, events)
+
+    print(f"sample: {n} colours of 16,777,216 (stride {args.stride} grid + {args.random} random)")
+    print(f"max |legacy - table| over sample: {worst:.3g}")
+    print(f"{'':24}{'total':>10}{'per call':>12}")
+    print(f"{'legacy, full sample':24}{legacy * 1e3:8.1f}ms{legacy / n * 1e9:10.0f}ns")
+    print(f"{'table, full sample':24}{table * 1e3:8.1f}ms{table / n * 1e9:10.0f}ns")
+    print(f"{'legacy, event palette':24}{legacy_events * 1e3:8.1f}ms{legacy_events / len(events) * 1e9:10.0f}ns")
+    print(f"{'cached, event palette':24}{cached_events * 1e3:8.1f}ms{cached_events / len(events) * 1e9:10.0f}ns")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+"""
+Benchmark: end-to-end event-to-light latency.
+
+Fires OctoPrint events into OctohuePlugin.on_event and measures the time until
+the fake bridge (tests/fakebridge.py, HTTPS) has acknowledged the PUT that
+carries the event's light change.  Everything between runs for real: rule
+lookup, dispatcher thread, coalescer, rate limiter, retry policy, circuit
+breaker and the TLS round trip.  The REST session is tests.fakebridge's
+urllib session (requests is not a test dependency), so every PUT opens a new
+connection, resuming the TLS session.
+
+Scenarios:
+
+  steady      one event every 110 ms (under the 10/s light limit), window 0
+  window      the default 200 ms coalescing window
+  burst       bursts of 20 back-to-back events; each supersedes the actions
+              the previous ones still have queued, so a burst costs one PUT
+  lights-50   events round-robin across 50 lights at 20/s, queueing on the
+              shared 10/s light limit
+  slow-bridge bridge answers after 40-120 ms
+
+For each: p50/p95/p99 event-to-ack latency, throughput (events over the time
+from the first event to the last acknowledgement), PUTs sent and the peak
+number of plugin-side threads (fake bridge threads excluded).
+
+The committed baseline (benchmarks/baselines/e2e_latency.json) was recorded
+on a developer laptop; re-record it with --save on the machine that compares.
+
+Run from the repository root:
+
+    python -m benchmarks.e2e_latency                  # run and compare with the baseline
+    python -m benchmarks.e2e_latency --save           # run and write a new baseline
+    python -m benchmarks.e2e_latency --quick          # fewer events (CI smoke run)
+
+The comparison fails (exit status 1) if any scenario's p95 exceeds the
+baseline's by more than --tolerance (default 1.5x) plus --slack-ms (5 ms), or
+its throughput falls below the baseline's divided by --tolerance, or it needs
+more threads than the baseline did.
+"""
+import argparse
+import bisect
+import json
+import logging
+import os
+import platform
+import sys
+import threading
+import time
+
+import tests.conftest  # noqa: F401  (installs the OctoPrint/requests stand-ins)
+from tests.fakebridge import FakeBridge, UrllibSession
+
+from octoprint_octohue import OctohuePlugin
+
+
+BASELINE = os.path.join(os.path.dirname(__file__), "baselines", "e2e_latency.json")
+
+# PrintFailed is critical by default, which would skip the coalescing window
+# and the rate limiter; these scenarios measure the normal lane.
+STATUS = [
+    {"event": "PrintFailed", "colour": "#FF0000", "brightness": 100, "delay": 0, "turnoff": False, "flash": False, "ct": 0,
+     "priority": "normal"},
+    {"event": "PrintStarted", "colour": "#FFFFFF", "brightness": 80, "delay": 0, "turnoff": False, "flash": False, "ct": 0},
+]
+
+# name: (fake bridge kwargs, coalescewindow ms, lights used, events, interval s, burst size)
+SCENARIOS = {
+    "steady": ({}, 0, 1, 50, 0.11, 1),
+    "window": ({}, 200, 1, 15, 0.3, 1),
+    "burst": ({}, 0, 1, 100, 1.2, 20),
+    "lights-50": ({"lights": 50}, 0, 50, 60, 0.05, 1),
+    "slow-bridge": ({"latency": (0.04, 0.12)}, 0, 1, 30, 0.15, 1),
+}
+
+
+class Settings:
+    def __init__(self, values):
+        self.values = values
+
+    def get(self, path):
+        return self.values.get(path[0])
+
+    def set(self, path, value):
+        self.values[path[0]] = value
+
+
+def make_plugin(bridge, window):
+    p = OctohuePlugin.__new__(OctohuePlugin)
+    p._logger = logging.getLogger("octohue.bench")
+    p._logger.setLevel(logging.CRITICAL)
+    p._plugin_version = "bench"
+    p._settings = Settings({
+        "lampid": bridge.ids("light")[0], "plugid": "", "lampisgroup": False, "defaultbri": 100,
+        "togglebri": 100, "togglecolour": "#FFFFFF", "togglect": 0, "autopoweroff": False,
+        "nightmode_enabled": False, "coalescewindow": window, "statusDict": STATUS,
+    })
+    p.pbridge = {"addr": bridge.addr, "key": bridge.app_key}
+    p._session = UrllibSession()
+    return p
+
+
+class Recorder:
+    """Wraps _bridge_call to record (path, start, end) of every acknowledged PUT."""
+
+    def __init__(self, plugin):
+        self.puts = {}
+        self._lock = threading.Lock()
+        call = plugin._bridge_call
+
+        def recording_call(method, path, payload=None):
+            start = time.perf_counter()
+            result = call(method, path, payload)
+            end = time.perf_counter()
+            if method == 'PUT' and not result[1]:
+                with self._lock:
+                    self.puts.setdefault(path, []).append((start, end))
+            return result
+
+        plugin._bridge_call = recording_call
+
+    def ack_after(self, path, t0):
+        """End time of the first PUT to path that started after t0."""
+        puts = self.puts.get(path, [])
+        i = bisect.bisect_left(puts, (t0,))
+        return puts[i][1] if i < len(puts) else None
+
+
+class ThreadSampler:
+    def __init__(self):
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="ThreadSampler", daemon=True)
+
+    def _count(self):
+        return sum(
+            1 for t in threading.enumerate()
+            if t is not self._thread and t.name != "FakeBridge" and "process_request_thread" not in t.name
+        )
+
+    def _run(self):
+        while not self._stop.wait(0.005):
+            self.peak = max(self.peak, self._count())
+
+    def __enter__(self):
+        self.peak = self._count()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * p / 100.0
+    lo, hi = int(k), min(int(k) + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+def run_scenario(name, quick=False):
+    bridge_kwargs, window, light_count, events, interval, burst = SCENARIOS[name]
+    if quick:
+        events = max(burst, events // 3)
+    with FakeBridge(**dict({"lights": 1, "plugs": 0}, **bridge_kwargs)) as bridge:
+        bridge._thread.name = "FakeBridge"
+        lights = bridge.ids("light")[:light_count]
+        plugin = make_plugin(bridge, window)
+        recorder = Recorder(plugin)
+        plugin.on_event("PrintStarted", {})  # warm up: rules, snapshot, dispatcher, TLS session
+        time.sleep(0.5 + window / 1000.0)
+        recorder.puts.clear()
+
+        fired = []
+        with ThreadSampler() as sampler:
+            start = time.perf_counter()
+            for i in range(events):
+                lamp = lights[i % len(lights)]
+                if light_count > 1:
+                    plugin._settings.set(["lampid"], lamp)
+                    plugin._reload_config()
+                t0 = time.perf_counter()
+                plugin.on_event(STATUS[i % 2]["event"], {})
+                fired.append((f"light/{lamp}", t0))
+                if (i + 1) % burst == 0:
+                    time.sleep(interval)
+            deadline = time.perf_counter() + 15.0
+            while time.perf_counter() < deadline:
+                if all(recorder.ack_after(path, t0) is not None for path, t0 in fired[-len(lights):]):
+                    break
+                time.sleep(0.01)
+            finished = max((end for puts in recorder.puts.values() for _, end in puts), default=start)
+        if plugin._dispatcher is not None:
+            plugin._dispatcher.stop()
+
+    latencies = [(ack - t0) * 1e3 for path, t0 in fired if (ack := recorder.ack_after(path, t0)) is not None]
+    return {
+        "events": events,
+        "acked": len(latencies),
+        "puts": sum(len(p) for p in recorder.puts.values()),
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "throughput_eps": round(events / max(finished - start, 1e-9), 1),
+        "threads_peak": sampler.peak,
+    }
+
+
+def compare(results, baseline, tolerance, slack_ms):
+    failures = []
+    for name, result in results.items():
+        base = baseline.get("scenarios", {}).get(name)
+        if base is None:
+            continue
+        limit = base["p95_ms"] * tolerance + slack_ms
+        if result["p95_ms"] > limit:
+            failures.append(f"{name}: p95 {result['p95_ms']} ms > {limit:.1f} ms (baseline {base['p95_ms']} ms)")
+        floor = base["throughput_eps"] / tolerance
+        if result["throughput_eps"] < floor:
+            failures.append(f"{name}: throughput {result['throughput_eps']}/s < {floor:.1f}/s "
+                            f"(baseline {base['throughput_eps']}/s)")
+        if result["threads_peak"] > base["threads_peak"]:
+            failures.append(f"{name}: {result['threads_peak']} threads > baseline {base['threads_peak']}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end event-to-light latency benchmark.")
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS), help="run only these")
+    parser.add_argument("--quick", action="store_true", help="a third of the events per scenario")
+    parser.add_argument("--save", action="store_true", help=f"write results to {os.path.relpath(BASELINE)}")
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--tolerance", type=float, default=1.5)
+    parser.add_argument("--slack-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    results = {}
+    print(f"{'scenario':12}{'events':>7}{'acked':>7}{'PUTs':>6}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'ev/s':>8}{'threads':>9}")
+    for name in args.scenario or SCENARIOS:
+        r = results[name] = run_scenario(name, quick=args.quick)
+        print(f"{name:12}{r['events']:7}{r['acked']:7}{r['puts']:6}{r['p50_ms']:9.2f}{r['p95_ms']:9.2f}"
+              f"{r['p99_ms']:9.2f}{r['throughput_eps']:8.1f}{r['threads_peak']:9}")
+
+    if args.save:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump({"python": platform.python_version(), "quick": args.quick, "scenarios": results}, f, indent=2)
+            f.write("\n")
+        print(f"baseline written to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("no baseline to compare with; run with --save to create one")
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if baseline.get("quick", False) != args.quick:
+        print("baseline was recorded with{} --quick; not comparing".format("" if baseline.get("quick") else "out"))
+        return 0
+    failures = compare(results, baseline, args.tolerance, args.slack_ms)
+    for failure in failures:
+        print(f"REGRESSION {failure}")
+    if not failures:
+        print(f"within {args.tolerance}x + {args.slack_ms} ms of baseline")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,150 @@
+"""
+Benchmark: time-to-light for critical events under synthetic load.
+
+Floods OctohuePlugin.on_event with routine PrintStarted events spread over
+a set of background lights, faster than the bridge's 10/s light limit, with
+the default 200 ms coalescing window.  Every --interval seconds a PrintFailed
+fires for a separate alarm light.  The time from that on_event call until
+the fake bridge (tests/fakebridge.py, HTTPS) acknowledges the alarm light's
+PUT is its time-to-light.
+
+Modes:
+
+  lanes       PrintFailed is critical (its default): it runs ahead of the
+              dispatcher backlog, skips the coalescing window and is never
+              queued or dropped by the rate limiter
+  no-lanes    the same rule with priority "normal", i.e. the old behaviour
+
+For each mode: critical events fired and acknowledged, p50/p95/max
+time-to-light, the routine events' p50 event-to-ack latency (for context)
+and the number of routine events whose PUT never arrived (dropped by the
+rate limiter or not acknowledged by the end of the run).
+
+Run from the repository root:
+
+    python -m benchmarks.priority_latency
+    python -m benchmarks.priority_latency --quick     # shorter load (CI smoke run)
+
+Exits with status 1 if any critical event in the lanes mode was never
+acknowledged.
+"""
+import argparse
+import sys
+import time
+
+import tests.conftest  # noqa: F401  (installs the OctoPrint/requests stand-ins)
+from tests.fakebridge import FakeBridge
+
+from benchmarks.e2e_latency import Recorder, make_plugin, percentile
+
+
+def status(priority):
+    return [
+        {"event": "PrintFailed", "colour": "#FF0000", "brightness": 100, "delay": 0, "turnoff": False,
+         "flash": False, "ct": 0, "priority": priority},
+        {"event": "PrintStarted", "colour": "#FFFFFF", "brightness": 80, "delay": 0, "turnoff": False,
+         "flash": False, "ct": 0},
+    ]
+
+
+# mode: priority of the PrintFailed rule
+MODES = {
+    "lanes": "",
+    "no-lanes": "normal",
+}
+
+
+def target(plugin, lamp):
+    plugin._settings.set(["lampid"], lamp)
+    plugin._reload_config()
+
+
+def run_mode(name, duration, rate, interval, lights):
+    with FakeBridge(lights=lights + 1, plugs=0, latency=(0.02, 0.05)) as bridge:
+        alarm, *background = bridge.ids("light")
+        plugin = make_plugin(bridge, 200)
+        plugin._settings.set(["statusDict"], status(MODES[name]))
+        plugin._rules = None
+        recorder = Recorder(plugin)
+        target(plugin, alarm)
+        plugin.on_event("PrintStarted", {})  # warm up: rules, snapshot, dispatcher, TLS session
+        time.sleep(0.5)
+        recorder.puts.clear()
+
+        routine, critical = [], []
+        start = time.perf_counter()
+        next_alarm = start + interval / 2
+        i = 0
+        while time.perf_counter() - start < duration:
+            now = time.perf_counter()
+            if now >= next_alarm:
+                target(plugin, alarm)
+                t0 = time.perf_counter()
+                plugin.on_event("PrintFailed", {})
+                critical.append((f"light/{alarm}", t0))
+                next_alarm += interval
+            lamp = background[i % len(background)]
+            i += 1
+            target(plugin, lamp)
+            t0 = time.perf_counter()
+            plugin.on_event("PrintStarted", {})
+            routine.append((f"light/{lamp}", t0))
+            time.sleep(max(0.0, start + i / rate - time.perf_counter()))
+
+        # Give queued routine traffic time to drain (up to the limiter's 10 s queue).
+        deadline = time.perf_counter() + 12.0
+        while time.perf_counter() < deadline:
+            if all(recorder.ack_after(path, t0) is not None for path, t0 in critical + routine[-len(background):]):
+                break
+            time.sleep(0.05)
+        stats = plugin.get_stats()
+        if plugin._dispatcher is not None:
+            plugin._dispatcher.stop()
+
+    def latencies(fired):
+        return [(ack - t0) * 1e3 for path, t0 in fired if (ack := recorder.ack_after(path, t0)) is not None]
+
+    crit, normal = latencies(critical), latencies(routine)
+    return {
+        "critical": len(critical),
+        "acked": len(crit),
+        "p50_ms": round(percentile(crit, 50), 1) if crit else None,
+        "p95_ms": round(percentile(crit, 95), 1) if crit else None,
+        "max_ms": round(max(crit), 1) if crit else None,
+        "routine": len(routine),
+        "routine_p50_ms": round(percentile(normal, 50), 1) if normal else None,
+        "routine_lost": stats["coalescer"]["dropped"],
+        "preempted": stats["dispatcher"]["preempted"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Critical event time-to-light under load.")
+    parser.add_argument("--mode", action="append", choices=sorted(MODES), help="run only these")
+    parser.add_argument("--quick", action="store_true", help="3 s of load instead of 8 s")
+    parser.add_argument("--rate", type=float, default=40.0, help="routine events per second (default 40)")
+    parser.add_argument("--interval", type=float, default=0.5, help="seconds between critical events")
+    parser.add_argument("--lights", type=int, default=20, help="background lights (default 20)")
+    args = parser.parse_args()
+    duration = 3.0 if args.quick else 8.0
+
+    def fmt(value):
+        return f"{value:10.1f}" if value is not None else f"{'-':>10}"
+
+    print(f"{'mode':10}{'critical':>9}{'acked':>7}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}"
+          f"{'routine':>9}{'p50 ms':>10}{'dropped':>9}{'preempted':>11}")
+    results = {}
+    for name in args.mode or MODES:
+        r = results[name] = run_mode(name, duration, args.rate, args.interval, args.lights)
+        print(f"{name:10}{r['critical']:9}{r['acked']:7}{fmt(r['p50_ms'])}{fmt(r['p95_ms'])}{fmt(r['max_ms'])}"
+              f"{r['routine']:9}{fmt(r['routine_p50_ms'])}{r['routine_lost']:9}{r['preempted']:11}")
+
+    lanes = results.get("lanes")
+    if lanes is not None and lanes["acked"] < lanes["critical"]:
+        print(f"FAIL {lanes['critical'] - lanes['acked']} critical event(s) never reached the bridge")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
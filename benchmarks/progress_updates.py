@@ -0,0 +1,79 @@
+"""
+Benchmark: light updates sent per print in progress mode.
+
+Replays a print's progress ticks (one per whole percent, as OctoPrint's
+progress hook delivers them) through ProgressLight on a simulated clock, for
+several print lengths and ramps:
+
+  red-green   colour mode, #FF0000 to #00FF00 (a large colour change)
+  amber       colour mode, #FF8000 to #FFB000 (a subtle colour change)
+  brightness  brightness mode, #FFFFFF from 5% to 100%
+
+Each run reports ticks, updates sent, and ticks skipped as imperceptible or
+throttled (min interval or rate budget), against the naive 101 updates of
+sending every tick.  With --load, other traffic takes that many light tokens
+per second from the same bridge rate limiter, so progress updates also give
+way to it rather than queueing behind it.
+
+Run from the repository root:
+
+    python -m benchmarks.progress_updates
+    python -m benchmarks.progress_updates --load 9.5   # bridge nearly saturated
+"""
+import argparse
+
+import tests.conftest  # noqa: F401  (installs the OctoPrint/requests stand-ins)
+from octoprint_octohue.progress import ProgressLight, build_ramp
+from octoprint_octohue.ratelimit import BridgeRateLimiter
+
+
+RAMPS = {
+    "red-green": ("colour", "#FF0000", "#00FF00"),
+    "amber": ("colour", "#FF8000", "#FFB000"),
+    "brightness": ("brightness", "#FFFFFF", "#FFFFFF"),
+}
+
+# Print lengths in seconds.
+PRINTS = {
+    "3 min": 180,
+    "1 h": 3600,
+    "6 h": 6 * 3600,
+}
+
+
+def run(ramp, seconds, load):
+    clock = [0.0]
+    limiter = BridgeRateLimiter(clock=lambda: clock[0])
+    sent = []
+    light = ProgressLight(ramp, sent.append, budget=lambda: limiter.available("light"), clock=lambda: clock[0])
+    background = 0.0
+    for percent in range(101):
+        tick = seconds * percent / 100
+        # Other traffic since the last tick takes its tokens at its own times.
+        while load and background <= tick:
+            clock[0] = background
+            limiter.admit("light")
+            background += 1.0 / load
+        clock[0] = tick
+        if light.update(percent) == "sent":
+            limiter.admit("light")
+    return light.stats(), sent
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Progress-mode light updates per print.")
+    parser.add_argument("--load", type=float, default=0.0, help="other light commands per second (default 0)")
+    args = parser.parse_args()
+
+    print(f"{'ramp':12}{'print':>8}{'ticks':>7}{'naive':>7}{'sent':>6}{'imperc.':>9}{'throttled':>11}{'last %':>8}")
+    for name, (mode, start, end) in RAMPS.items():
+        ramp = build_ramp(mode, start, end, 100)
+        for label, seconds in PRINTS.items():
+            stats, sent = run(ramp, seconds, args.load)
+            last = sent[-1].percent if sent else "-"
+            print(f"{name:12}{label:>8}{stats['ticks']:7}{101:7}{stats['sent']:6}{stats['imperceptible']:9}"
+                  f"{stats['throttled']:11}{last:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Microbenchmark: settings reads per configured OctoPrint event.
+
+Drives one configured event through on_event -> build_state -> set_state with
+the PUT stubbed out, against a stand-in for OctoPrint's layered settings
+(plugin overrides on top of plugin defaults on top of the global tree, each
+lookup walking the path through every layer).  Compares the ConfigSnapshot
+hot path with the same path when the snapshot has to be re-read from settings
+on every event, which is what each event cost before the snapshot existed.
+
+Run from the repository root:
+
+    python -m benchmarks.settings_snapshot
+"""
+import logging
+import timeit
+
+import tests.conftest  # noqa: F401  (installs the OctoPrint/requests stand-ins)
+from octoprint_octohue import OctohuePlugin
+
+
+class LayeredSettings:
+    """Path lookup through several dict layers, counting calls."""
+
+    def __init__(self, values, depth=3):
+        root = {"plugins": {"octohue": dict(values)}}
+        self._layers = [root] + [{"plugins": {"octohue": {}}} for _ in range(depth - 1)]
+        self.calls = 0
+
+    def get(self, path):
+        self.calls += 1
+        full = ["plugins", "octohue"] + list(path)
+        for layer in reversed(self._layers):
+            node = layer
+            for key in full:
+                if not isinstance(node, dict) or key not in node:
+                    break
+                node = node[key]
+            else:
+                return node
+        return None
+
+
+SETTINGS = {
+    "lampid": "lamp-uuid", "plugid": "plug-uuid", "lampisgroup": False,
+    "defaultbri": 100, "togglebri": 100, "togglecolour": "#FFFFFF", "togglect": 0,
+    "autopoweroff": False, "nightmode_enabled": True, "nightmode_start": "03:00",
+    "nightmode_end": "03:01", "nightmode_action": "dim", "nightmode_maxbri": 25,
+    "statusDict": [{"event": "PrintStarted", "colour": "#33FF36", "brightness": 80,
+                    "delay": 0, "turnoff": False, "flash": False, "ct": 0}],
+}
+
+
+def make_plugin():
+    p = OctohuePlugin.__new__(OctohuePlugin)
+    p._logger = logging.getLogger("octohue.bench")
+    p._logger.setLevel(logging.WARNING)
+    p._settings = LayeredSettings(SETTINGS)
+    p.pbridge = {"addr": "127.0.0.1", "key": "k"}
+    p._put = lambda path, payload, critical=False: "sent"
+    # Run scheduled jobs inline so one call covers the whole hot path.
+    p._schedule = lambda delay, deviceid, payload=None, **options: p._run_scheduled(deviceid, payload)
+    return p
+
+
+def run(number=20000):
+    results = {}
+    for label, reset in (("snapshot", False), ("re-read per event", True)):
+        plugin = make_plugin()
+        plugin.on_event("PrintStarted", {})  # compile rules, take snapshot
+
+        def fire():
+            if reset:
+                plugin._config = None
+            plugin.on_event("PrintStarted", {})
+
+        plugin._settings.calls = 0
+        seconds = min(timeit.repeat(fire, number=number, repeat=3))
+        results[label] = (seconds / number * 1e6, plugin._settings.calls / (3 * number))
+    return results
+
+
+if __name__ == "__main__":
+    for label, (usec, gets) in run().items():
+        print(f"{label:>18}: {usec:7.2f} us/event, {gets:4.1f} settings.get calls/event")
@@ -0,0 +1,55 @@
+"""
+Benchmark: bridge TLS connection setup, per-connection context vs the shared
+session-resuming context.
+
+"per-connection context" is what every new session/pool used to do: build a
+context with ssl.create_default_context(cafile=...) (re-reading the PEM) and
+run a full handshake.  "shared + resumption" uses tls.build_bridge_context
+once and resumes the TLS session on every reconnect.
+
+Both connect to a local TLS echo server (tests/test_tls.TLSStandIn) that
+presents a certificate from the throwaway CA in tests/certs/.
+
+Run from the repository root:
+
+    python -m benchmarks.tls_handshake
+"""
+import ssl
+import time
+
+import tests.conftest  # noqa: F401  (installs the OctoPrint/requests stand-ins)
+from tests.test_tls import TEST_CA, TLSStandIn
+
+from octoprint_octohue.tls import build_bridge_context
+
+
+def per_connection_context():
+    ctx = ssl.create_default_context(cafile=TEST_CA)
+    ctx.check_hostname = False
+    return ctx
+
+
+def run(connections=200, max_version=None):
+    standin = TLSStandIn(max_version=max_version)
+    try:
+        results = {}
+        start = time.perf_counter()
+        for _ in range(connections):
+            standin.roundtrip(per_connection_context())
+        results["per-connection context"] = (time.perf_counter() - start) / connections * 1e3, 0
+
+        shared = build_bridge_context(TEST_CA)
+        start = time.perf_counter()
+        for _ in range(connections):
+            standin.roundtrip(shared)
+        results["shared + resumption"] = (time.perf_counter() - start) / connections * 1e3, shared.resumed
+        return results
+    finally:
+        standin.close()
+
+
+if __name__ == "__main__":
+    for label, version in (("TLS 1.3", None), ("TLS 1.2", ssl.TLSVersion.TLSv1_2)):
+        print(label)
+        for name, (ms, resumed) in run(max_version=version).items():
+            print(f"  {name:>22}: {ms:6.3f} ms/connection, {resumed} resumed")
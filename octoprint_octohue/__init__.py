@@ -1,15 +1,33 @@
 from __future__ import annotations
 
 import octoprint.plugin
+import octoprint.printer
 from datetime import datetime
-import os
-import ssl
 import flask
+import logging
+import time
 import requests
 from requests.adapters import HTTPAdapter
-from octoprint.util import ResettableTimer
 from octoprint.access.permissions import Permissions
 
+from .coalescer import CommandCoalescer
+from .colour import clamp_to_gamut, gamut_of, hex_to_rgb, rgb_to_xy as colour_rgb_to_xy
+from .config import ConfigSnapshot
+from .delta import DeltaFilter
+from .diagnostics import RequestLog
+from .dispatcher import CommandDispatcher
+from .eventstream import EventStreamClient, LightStateMirror
+from .inventory import ResourceInventory
+from .metrics import PROMETHEUS_CONTENT_TYPE, MetricsRegistry
+from .powerdown import PowerDownManager
+from .progress import ProgressLight, build_ramp
+from .ratelimit import BridgeRateLimiter
+from .resilience import BRIDGE_TIMEOUT, DISCOVERY_TIMEOUT, CircuitBreaker, RetryPolicy
+from .rules import CRITICAL_EVENTS, compile_rules
+from .tls import bridge_context, bridge_context_stats
+from .throttle import EventThrottle
+from .tracing import TraceBuffer, current_trace, trace_in
+
 # ---------------------------------------------------------------------------
 # Custom HTTPS adapter that verifies the Hue bridge certificate chain against
 # the bundled Signify root CA, but skips hostname verification.
@@ -18,39 +36,93 @@ from octoprint.access.permissions import Permissions
 # the bridge serial number as its CN/SAN, not the IP address.  Verifying the
 # chain is still a meaningful improvement over verify=False: it confirms the
 # certificate was issued by Signify rather than by an arbitrary attacker.
+#
+# Every adapter shares one SSLContext (tls.bridge_context), so the CA bundle is
+# parsed once per process and TLS sessions are resumed across reconnects.
 # ---------------------------------------------------------------------------
-_CA_BUNDLE = os.path.join(os.path.dirname(__file__), "signify-root-ca.pem")
+
+# (connect, read) timeout for the eventstream. The read timeout only bounds how
+# long a silent stream is trusted before it is reopened.
+_EVENTSTREAM_TIMEOUT = (5, 300)
+
+# How long a replaced bridge session is kept open so requests already in
+# flight on it can finish before it is closed.
+_SESSION_GRACE = 30.0
+
+# Events that mean the printer is wanted again: a pending power-off is cancelled.
+_POWER_DOWN_CANCEL_EVENTS = frozenset(("PrintStarted", "Connected"))
+
+# Events that start or end a print: the progress light forgets the last one.
+_PROGRESS_RESET_EVENTS = frozenset(("PrintStarted", "PrintFailed", "PrintCancelled"))
+
+# Circuit breaker states as numbers for the octohue_circuit_state gauge.
+_CIRCUIT_STATES = {"closed": 0, "half_open": 1, "open": 2}
 
 
 class _SignifyAdapter(HTTPAdapter):
-    """Mounts a custom SSLContext that checks the Signify CA chain."""
+    """Mounts the shared SSLContext that checks the Signify CA chain."""
+
+    def __init__(self, pool_maxsize=4):
+        # Only one host (the bridge) is ever contacted, so a single pool
+        # of pool_maxsize keep-alive connections is enough.
+        super().__init__(pool_connections=1, pool_maxsize=pool_maxsize)
 
     def init_poolmanager(self, *args, **kwargs):
-        ctx = ssl.create_default_context(cafile=_CA_BUNDLE)
-        ctx.check_hostname = False
-        kwargs["ssl_context"] = ctx
+        kwargs["ssl_context"] = bridge_context()
         kwargs["assert_hostname"] = False
         super().init_poolmanager(*args, **kwargs)
 
     def proxy_manager_for(self, proxy, **proxy_kwargs):
-        ctx = ssl.create_default_context(cafile=_CA_BUNDLE)
-        ctx.check_hostname = False
-        proxy_kwargs["ssl_context"] = ctx
+        proxy_kwargs["ssl_context"] = bridge_context()
         proxy_kwargs["assert_hostname"] = False
         return super().proxy_manager_for(proxy, **proxy_kwargs)
 
 
+class _TemperatureListener(octoprint.printer.PrinterCallback):
+    """Forwards OctoPrint's temperature reports to a plain callable."""
+
+    def __init__(self, listener):
+        self._listener = listener
+
+    def on_printer_add_temperature(self, data):
+        self._listener(data)
+
+
 class OctohuePlugin(octoprint.plugin.StartupPlugin,
 					octoprint.plugin.ShutdownPlugin,
 					octoprint.plugin.SettingsPlugin,
 					octoprint.plugin.SimpleApiPlugin,
 					octoprint.plugin.AssetPlugin,
 					octoprint.plugin.TemplatePlugin,
-					octoprint.plugin.EventHandlerPlugin):
+					octoprint.plugin.EventHandlerPlugin,
+					octoprint.plugin.ProgressPlugin,
+					octoprint.plugin.BlueprintPlugin):
 
 
 	pbridge: dict | None = None
 	_session: requests.Session | None = None
+	_dispatcher: CommandDispatcher | None = None
+	_coalescer: CommandCoalescer | None = None
+	_limiter: BridgeRateLimiter | None = None
+	_mirror: LightStateMirror | None = None
+	_delta: DeltaFilter | None = None
+	_eventstream: EventStreamClient | None = None
+	_inventory: ResourceInventory | None = None
+	_rules = None
+	_config: ConfigSnapshot | None = None
+	_pool_size: int | None = None
+	_last_request = 0.0
+	_keepalive_generation = 0
+	_keepalive_probes = 0
+	_session_rebuilds = 0
+	_breaker: CircuitBreaker | None = None
+	_retry: RetryPolicy | None = None
+	_metrics: MetricsRegistry | None = None
+	_request_log: RequestLog | None = None
+	_traces: TraceBuffer | None = None
+	_powerdown: PowerDownManager | None = None
+	_throttle: EventThrottle | None = None
+	_progress: ProgressLight | None = None
 	discoveryurl = 'https://discovery.meethue.com/'
 
 	def _is_night_mode_active(self):
@@ -59,19 +131,35 @@ class OctohuePlugin(octoprint.plugin.StartupPlugin,
 		configured window. Handles overnight spans (e.g. 22:00–07:00). Returns False
 		if night mode is disabled or if the configured times cannot be parsed.
 		'''
-		if not self._settings.get(['nightmode_enabled']):
+		config = self._get_config()
+		if not config.nightmode_enabled:
 			return False
-		try:
-			now = datetime.now().time()
-			start = datetime.strptime(self._settings.get(['nightmode_start']), '%H:%M').time()
-			end = datetime.strptime(self._settings.get(['nightmode_end']), '%H:%M').time()
-			if start <= end:
-				return start <= now < end
-			else:  # overnight span e.g. 22:00 - 07:00
-				return now >= start or now < end
-		except (ValueError, TypeError):
+		start, end = config.nightmode_start, config.nightmode_end
+		if start is None or end is None:
 			self._logger.warning("Night mode times could not be parsed — night mode skipped.")
 			return False
+		now = datetime.now().time()
+		if start <= end:
+			return start <= now < end
+		else:  # overnight span e.g. 22:00 - 07:00
+			return now >= start or now < end
+
+	def _get_config(self):
+		'''
+		Returns the settings snapshot used by the light-command hot paths,
+		taking it on first use. Rebuilt by _reload_config whenever settings change.
+		'''
+		config = self._config
+		if config is None:
+			config = self._reload_config()
+		return config
+
+	def _reload_config(self):
+		'''
+		Takes a fresh settings snapshot and swaps it in.
+		'''
+		self._config = ConfigSnapshot.from_settings(self._settings)
+		return self._config
 
 	def _bridge_ready(self):
 		'''
@@ -83,6 +171,248 @@ class OctohuePlugin(octoprint.plugin.StartupPlugin,
 			return False
 		return True
 
+	def _get_breaker(self):
+		'''
+		Returns the bridge circuit breaker, creating it on first use.
+		'''
+		if self._breaker is None:
+			self._breaker = CircuitBreaker()
+		return self._breaker
+
+	def _get_retry(self):
+		'''
+		Returns the retry policy shared by every bridge request, creating it on
+		first use. One policy means one retry budget for the whole bridge.
+		'''
+		if self._retry is None:
+			self._retry = RetryPolicy()
+		return self._retry
+
+	def _get_request_log(self):
+		'''
+		Returns the sampled bridge request log and its ring buffer, creating it
+		on first use.
+		'''
+		if self._request_log is None:
+			self._request_log = RequestLog(self._logger)
+		return self._request_log
+
+	def _get_traces(self):
+		'''
+		Returns the event trace buffer, creating it on first use.
+		'''
+		if self._traces is None:
+			self._traces = TraceBuffer()
+		return self._traces
+
+	def _get_metrics(self):
+		'''
+		Returns the metrics registry, creating it on first use. Request and
+		event counters are recorded as they happen; queue depth, circuit state
+		and retry budget are gauges read from the subsystems at collection time.
+		'''
+		if self._metrics is None:
+			metrics = MetricsRegistry()
+			metrics.histogram("octohue_bridge_request_seconds",
+							  "Bridge REST request latency.", ("method", "rtype"))
+			metrics.counter("octohue_bridge_responses_total",
+							"Bridge REST responses by HTTP status.", ("method", "rtype", "status"))
+			metrics.counter("octohue_bridge_errors_total",
+							"Bridge REST requests that got no usable response.", ("method", "rtype", "kind"))
+			metrics.counter("octohue_events_total",
+							"OctoPrint events received.", ("event",))
+			metrics.counter("octohue_events_dropped_total",
+							"Configured events held back by their debounce or min_interval.", ("event",))
+			metrics.gauge("octohue_dispatcher_queue_depth",
+						  "Light commands waiting on the dispatcher.",
+						  lambda: self._dispatcher.stats()["depth"] if self._dispatcher is not None else None)
+			metrics.gauge("octohue_dispatcher_lag_seconds",
+						  "Delay between the last dispatcher job falling due and starting.",
+						  lambda: self._dispatcher.stats()["lag"] if self._dispatcher is not None else None)
+			metrics.gauge("octohue_coalescer_pending",
+						  "Resources with a PUT waiting in the coalescer.",
+						  lambda: self._coalescer.stats()["pending"] if self._coalescer is not None else None)
+			metrics.gauge("octohue_circuit_state",
+						  "Bridge circuit breaker state: 0 closed, 1 half-open, 2 open.",
+						  lambda: _CIRCUIT_STATES[self._breaker.state] if self._breaker is not None else None)
+			metrics.gauge("octohue_retry_budget_left",
+						  "Retries left in the current retry budget window.",
+						  lambda: self._retry.stats()["budget_left"] if self._retry is not None else None)
+			self._metrics = metrics
+		return self._metrics
+
+	def _get_dispatcher(self):
+		'''
+		Returns the shared command dispatcher, creating and starting it on first use
+		(events can arrive before on_after_startup).
+		'''
+		if self._dispatcher is None:
+			self._dispatcher = CommandDispatcher(self._run_scheduled, logger=self._logger)
+			self._dispatcher.start()
+		return self._dispatcher
+
+	def _get_coalescer(self):
+		'''
+		Returns the PUT pipeline entry point: a per-resource coalescer whose flushes
+		are admitted by the bridge rate limiter and run on the dispatcher. Created
+		on first use.
+		'''
+		if self._coalescer is None:
+			if self._limiter is None:
+				self._limiter = BridgeRateLimiter()
+			self._coalescer = CommandCoalescer(
+				lambda path, payload: self._send_put(path, payload),
+				lambda delay, callback: self._schedule(delay, None, callback=callback),
+				window=self._coalesce_window(),
+				limiter=self._limiter,
+				retry=self._get_retry(),
+				failed=self._put_failed
+			)
+		return self._coalescer
+
+	def _schedule(self, delay, deviceid, payload=None, callback=None, slot=None, critical=False):
+		'''
+		Queues a light command on the shared dispatcher.
+
+			Parameters:
+				delay (float): Seconds to wait before the command runs.
+				deviceid (str): UUID of the device or group the command targets.
+				payload (dict, optional): build_state keyword arguments (without deviceid),
+				                          or keyword arguments for callback.
+				callback (callable, optional): Run instead of build_state.
+				slot (hashable, optional): Dispatcher slot; see _supersede_actions.
+				critical (bool): Run ahead of normal commands once due.
+		'''
+		return self._get_dispatcher().submit(delay, deviceid, payload, callback=callback, slot=slot, critical=critical)
+
+	def _supersede_actions(self, deviceid, trace=None):
+		'''
+		Cancels the event actions still queued for deviceid (a delayed rule, the
+		off half of a flash-then-off) so a newer event's actions replace them
+		rather than being overridden by them when they fire later.
+
+			Returns:
+				int: Number of queued actions cancelled.
+		'''
+		if self._dispatcher is None:
+			return 0
+		cancelled = self._dispatcher.supersede(("event", deviceid))
+		for job in cancelled:
+			older = trace_in(job.context)
+			if older is not None:
+				older.mark("superseded", {"by": trace.id if trace is not None else None})
+		if cancelled:
+			self._logger.debug("Superseded %d queued action(s) for %s", len(cancelled), deviceid)
+		return len(cancelled)
+
+	def _run_scheduled(self, deviceid, payload):
+		'''
+		Default dispatcher handler: applies a scheduled build_state payload to deviceid.
+		'''
+		trace = current_trace()
+		if trace is not None:
+			trace.mark("dequeued")
+		self.build_state(deviceid=deviceid, **payload)
+
+	def _coalesce_window(self):
+		'''
+		Returns the configured coalescing window in seconds (0 if unset or invalid).
+		'''
+		try:
+			return max(float(self._settings.get(['coalescewindow']) or 0), 0.0) / 1000.0
+		except (ValueError, TypeError):
+			return 0.0
+
+	def _put(self, path, payload, critical=False):
+		'''
+		Routes a PUT through the coalescer and rate limiter. Every PUT the plugin
+		makes goes through here.
+
+			Parameters:
+				path (str): Resource path relative to /clip/v2/resource/.
+				payload (dict): Hue v2 PUT body.
+				critical (bool): Send now, skipping the coalescing window and the
+				                 rate limit (see CommandCoalescer).
+
+			Returns:
+				str: 'sent', 'pending', 'coalesced', 'queued' or 'dropped'
+				     (see CommandCoalescer.submit).
+
+		Within an event trace, the trace waits on path until the PUT carrying
+		this payload is sent, which may be a later, coalesced one.
+		'''
+		trace = current_trace()
+		if trace is None:
+			return self._get_coalescer().submit(path, payload, critical=critical)
+		traces = self._get_traces()
+		traces.attach(path, trace)
+		outcome = self._get_coalescer().submit(path, payload, critical=critical)
+		if outcome == 'dropped':
+			traces.detach(path, trace)
+		if outcome != 'sent':
+			trace.mark(outcome, {"path": path})
+		return outcome
+
+	def _get_delta(self):
+		'''
+		Returns the delta filter over the eventstream mirror, or None if the
+		eventstream has never been started (there is no known state to diff).
+		'''
+		if self._delta is None and self._mirror is not None:
+			self._delta = DeltaFilter(self._mirror)
+		return self._delta
+
+	def _send_put(self, path, payload):
+		'''
+		Coalescer send callback: PUTs payload once. While the eventstream mirror
+		is live, fields the light already has are stripped first and a PUT that
+		would change nothing is skipped.
+
+			Returns:
+				bool: False if the PUT hit a transient error and should be retried
+				      (the coalescer re-submits it after a backoff), True otherwise.
+		'''
+		traces = self._traces.take(path) if self._traces is not None else ()
+		delta = self._get_delta()
+		if delta is not None:
+			payload = delta.filter(path, payload)
+			if payload is None:
+				self._logger.debug("Hue API PUT %s skipped: light already in that state", path)
+				for trace in traces:
+					trace.mark("suppressed", {"path": path})
+				return True
+		for trace in traces:
+			trace.mark("sent", {"path": path})
+		body, retryable = self._bridge_call('PUT', path, payload)
+		ok = bool(body) and not body.get('errors')
+		if delta is not None and ok:
+			delta.confirm(path, payload)
+		if retryable:
+			# Marked once the coalescer has decided whether to retry (_put_failed).
+			if traces:
+				self._traces.hold(path, traces)
+			return False
+		for trace in traces:
+			if ok:
+				trace.mark("acked", {"path": path})
+			else:
+				trace.mark("failed", {"path": path, "retrying": False})
+		return True
+
+	def _put_failed(self, path, retrying):
+		'''
+		Coalescer failed callback: marks the traces of the failed PUT to path.
+		If a retry has been scheduled they wait on path for it; otherwise
+		(retry budget spent, circuit open) their trace ends here, so a later,
+		unrelated PUT to the same light cannot mark them sent.
+		'''
+		if self._traces is None:
+			return
+		for trace in self._traces.release(path):
+			trace.mark("failed", {"path": path, "retrying": retrying})
+			if retrying:
+				self._traces.attach(path, trace)
+
 	def _hue_request(self, method, path, payload=None):
 		'''
 		Sends an HTTPS request to the Hue v2 CLIP API using a session that
@@ -91,29 +421,88 @@ class OctohuePlugin(octoprint.plugin.StartupPlugin,
 			Parameters:
 				method (str): HTTP method ('GET', 'PUT', etc.)
 				path (str): Resource path relative to /clip/v2/resource/ (e.g. 'light/uuid').
+				            An empty path addresses /clip/v2/resource itself (all resources).
 				payload (dict, optional): JSON body for PUT requests.
 
 			Returns:
-				dict: Parsed JSON response, or an empty dict on error.
+				dict: Parsed JSON response, or an empty dict on error or while the
+				      circuit breaker is open.
+
+		Requests time out after BRIDGE_TIMEOUT. Connection errors and timeouts
+		count towards the circuit breaker; once it opens, requests fail fast
+		without touching the network until the cooldown has passed. Any HTTP
+		response, even an error status, proves the bridge is reachable.
+
+		GETs that hit a transient error (429/503, connection reset) are retried
+		inline with backoff and jitter from the shared retry policy. PUTs go
+		through _put instead, where retries re-enter the coalescer.
 		'''
-		if self.pbridge is None or self._session is None:
-			return {}
-		url = f"https://{self.pbridge['addr']}/clip/v2/resource/{path}"
-		headers = {"hue-application-key": self.pbridge['key']}
-		self._logger.info(f"Hue API {method} {url}" + (f" payload={payload}" if payload else ""))
+		body, retryable = self._bridge_call(method, path, payload)
+		attempt = 0
+		while retryable and method == 'GET':
+			delay = self._get_retry().backoff(attempt)
+			if delay is None:
+				break
+			self._logger.debug("Retrying Hue API %s %s in %.2fs", method, path, delay)
+			time.sleep(delay)
+			attempt += 1
+			body, retryable = self._bridge_call(method, path, payload)
+		return body
+
+	def _bridge_call(self, method, path, payload=None):
+		'''
+		Makes a single bridge request (see _hue_request).
+
+			Returns:
+				tuple: (parsed JSON body or {}, True if the failure is transient and
+				       the request may be retried).
+		'''
+		# Read both once: establishBridge may swap them while this request runs.
+		bridge, session = self.pbridge, self._session
+		if bridge is None or session is None:
+			return {}, False
+		url = f"https://{bridge['addr']}/clip/v2/resource" + (f"/{path}" if path else "")
+		headers = {"hue-application-key": bridge['key']}
+		metrics, log = self._get_metrics(), self._get_request_log()
+		rtype = path.partition('/')[0] or 'resource'
+		breaker = self._get_breaker()
+		if not breaker.allow():
+			self._logger.debug("Hue bridge unreachable (circuit open) — skipping %s %s", method, path)
+			metrics.get("octohue_bridge_errors_total").inc(method, rtype, "circuit_open")
+			log.record(method, path, error="circuit open", payload=payload)
+			return {}, False
+		start = self._last_request = time.monotonic()
+		try:
+			r = session.request(method, url, headers=headers, json=payload, timeout=BRIDGE_TIMEOUT)
+		except Exception as e:
+			elapsed = time.monotonic() - start
+			breaker.record_failure()
+			metrics.get("octohue_bridge_request_seconds").observe(elapsed, method, rtype)
+			metrics.get("octohue_bridge_errors_total").inc(method, rtype, "connection")
+			log.record(method, path, seconds=elapsed, error=str(e), payload=payload)
+			self._logger.error("Hue API error (%s %s): %s", method, path, e)
+			return {}, RetryPolicy.retryable(method, error=e)
+		elapsed = time.monotonic() - start
+		breaker.record_success()
+		metrics.get("octohue_bridge_request_seconds").observe(elapsed, method, rtype)
+		metrics.get("octohue_bridge_responses_total").inc(method, rtype, str(r.status_code))
+		retryable = RetryPolicy.retryable(method, status=r.status_code)
 		try:
-			r = self._session.request(method, url, headers=headers, json=payload)
 			body = r.json()
-			if r.status_code not in (200, 207):
-				self._logger.warning(f"Hue API {method} {path} returned HTTP {r.status_code}: {body}")
-			else:
-				errors = body.get('errors', [])
-				if errors:
-					self._logger.warning(f"Hue API {method} {path} returned errors: {errors}")
-			return body
 		except Exception as e:
-			self._logger.error(f"Hue API error ({method} {path}): {e}")
-			return {}
+			metrics.get("octohue_bridge_errors_total").inc(method, rtype, "decode")
+			log.record(method, path, r.status_code, elapsed, error=f"undecodable body: {e}", payload=payload)
+			self._logger.error("Hue API error (%s %s): %s", method, path, e)
+			return {}, retryable
+		if r.status_code not in (200, 207):
+			log.record(method, path, r.status_code, elapsed, error=f"HTTP {r.status_code}", payload=payload)
+			self._logger.warning("Hue API %s %s returned HTTP %s: %s", method, path, r.status_code, body)
+		elif isinstance(body, dict) and body.get('errors'):
+			log.record(method, path, r.status_code, elapsed, error="bridge returned errors", payload=payload)
+			self._logger.warning("Hue API %s %s returned errors: %s", method, path, body['errors'])
+		else:
+			log.record(method, path, r.status_code, elapsed, payload=payload)
+		return body, retryable
 
 	def establishBridge(self, bridgeaddr, husername):
 		'''
@@ -121,21 +510,214 @@ class OctohuePlugin(octoprint.plugin.StartupPlugin,
 		pbridge is set to a dict with 'addr' and 'key'; otherwise pbridge is set to None.
 		Called on startup and whenever settings are saved with updated credentials.
 
+		The pooled session is only rebuilt when the address, key or pool size
+		changes, so saving unrelated settings keeps warm connections. A replaced
+		session is closed after a grace period rather than immediately, so
+		requests already in flight on it complete.
+
 			Parameters:
 				bridgeaddr (str): IP address or hostname of the Hue bridge.
 				husername (str): Hue API key (application key) for authentication.
 		'''
-		self._logger.debug(f"Bridge Address is {bridgeaddr if bridgeaddr else 'Please set Bridge Address in settings'}")
-		self._logger.debug(f"Hue Username is {husername if husername else 'Please set Hue Username in settings'}")
-		if bridgeaddr and husername:
-			self.pbridge = {'addr': bridgeaddr, 'key': husername}
+		self._logger.debug("Bridge Address is %s", bridgeaddr or 'Please set Bridge Address in settings')
+		self._logger.debug("Hue Username is %s", husername or 'Please set Hue Username in settings')
+		bridge = {'addr': bridgeaddr, 'key': husername} if bridgeaddr and husername else None
+		pool_size = self._pool_size_setting()
+		changed = bridge != self.pbridge or (bridge is not None and self._session is None)
+		if not changed and (bridge is None or pool_size == self._pool_size):
+			self._logger.debug("Bridge settings unchanged — keeping the existing session.")
+			if (self._eventstream is not None) != bool(self._settings.get(['eventstream'])):
+				self._restart_eventstream()
+			self._restart_keepalive()
+			return
+
+		old_session = self._session
+		if bridge is not None:
 			session = requests.Session()
-			session.mount("https://", _SignifyAdapter())
+			session.mount("https://", _SignifyAdapter(pool_maxsize=pool_size))
 			self._session = session
-			self._logger.debug(f"Bridge established at: {bridgeaddr}")
+			self.pbridge = bridge
+			self._pool_size = pool_size
+			self._session_rebuilds += 1
+			self._logger.debug("Bridge established at: %s", bridgeaddr)
 		else:
 			self.pbridge = None
 			self._session = None
+			self._pool_size = None
+		if old_session is not None:
+			self._schedule(_SESSION_GRACE, None, callback=old_session.close)
+		if changed:
+			self._get_breaker().reset()
+			if self._inventory is not None:
+				self._inventory.invalidate()
+			self._restart_eventstream()
+		self._restart_keepalive()
+
+	def _pool_size_setting(self):
+		'''
+		Returns the configured number of pooled bridge connections (at least 1).
+		'''
+		try:
+			return max(1, int(self._settings.get(['poolsize'])))
+		except (TypeError, ValueError):
+			return 4
+
+	def _keepalive_interval(self):
+		'''
+		Returns the keepalive probe interval in seconds, or 0 if disabled.
+		'''
+		try:
+			return max(0.0, float(self._settings.get(['keepalive']) or 0))
+		except (TypeError, ValueError):
+			return 0.0
+
+	def _restart_keepalive(self):
+		'''
+		Cancels any running keepalive chain and, if keepalive is enabled and a
+		bridge is configured, schedules the first probe.
+		'''
+		self._keepalive_generation += 1
+		interval = self._keepalive_interval()
+		if interval and self.pbridge is not None:
+			self._schedule(interval, None, {'generation': self._keepalive_generation}, callback=self._keepalive)
+
+	def _keepalive(self, generation):
+		'''
+		Dispatcher job that keeps a pooled bridge connection open. Sends a cheap
+		GET on the bridge resource only if nothing else used the pool during the
+		last interval, then reschedules itself. A stale generation means the
+		chain was restarted and this job just exits.
+		'''
+		if generation != self._keepalive_generation:
+			return
+		interval = self._keepalive_interval()
+		bridge, session = self.pbridge, self._session
+		if not interval or bridge is None or session is None:
+			return
+		idle = time.monotonic() - self._last_request
+		breaker = self._get_breaker()
+		if idle >= interval and breaker.allow():
+			self._last_request = time.monotonic()
+			self._keepalive_probes += 1
+			try:
+				session.request(
+					'GET', f"https://{bridge['addr']}/clip/v2/resource/bridge",
+					headers={"hue-application-key": bridge['key']}, timeout=BRIDGE_TIMEOUT
+				).close()
+				breaker.record_success()
+			except Exception as e:
+				breaker.record_failure()
+				self._logger.debug("Bridge keepalive probe failed: %s", e)
+			idle = 0.0
+		self._schedule(interval - idle, None, {'generation': generation}, callback=self._keepalive)
+
+	def _get_inventory(self):
+		'''
+		Returns the cached resource inventory, creating it on first use.
+		'''
+		if self._inventory is None:
+			self._inventory = ResourceInventory(self._fetch_all_resources, logger=self._logger)
+		return self._inventory
+
+	def _fetch_all_resources(self):
+		'''
+		Fetches every bridge resource with a single GET /clip/v2/resource.
+
+			Returns:
+				list[dict]: The response 'data' list.
+
+			Raises:
+				RuntimeError: If the request failed, so the failure is not cached.
+		'''
+		body = self._hue_request('GET', '')
+		if 'data' not in body:
+			raise RuntimeError("no resource data returned by the bridge")
+		return body['data']
+
+	def _restart_eventstream(self):
+		'''
+		(Re)starts the eventstream subscriber for the current bridge, or stops it if
+		the bridge is unconfigured or the eventstream setting is off. While the
+		stream is down the light-state mirror is not trusted and get_state falls
+		back to REST.
+		'''
+		if self._eventstream is not None:
+			self._eventstream.stop()
+			self._eventstream = None
+		if self._mirror is not None:
+			self._mirror.live = False
+		if self.pbridge is None or not self._settings.get(['eventstream']):
+			return
+		if self._mirror is None:
+			self._mirror = LightStateMirror()
+		self._eventstream = EventStreamClient(
+			self._open_eventstream,
+			self._on_hue_events,
+			on_connect=self._seed_mirror,
+			on_disconnect=self._on_eventstream_down,
+			logger=self._logger
+		)
+		self._eventstream.start()
+
+	def _open_eventstream(self, last_event_id=None):
+		'''
+		Opens the bridge eventstream, resuming after last_event_id if given.
+
+			Returns:
+				requests.Response: The streaming response.
+		'''
+		if self.pbridge is None or self._session is None:
+			raise RuntimeError("Hue bridge not configured")
+		headers = {"hue-application-key": self.pbridge['key'], "Accept": "text/event-stream"}
+		if last_event_id:
+			headers["Last-Event-ID"] = last_event_id
+		r = self._session.get(
+			f"https://{self.pbridge['addr']}/eventstream/clip/v2",
+			headers=headers, stream=True, timeout=_EVENTSTREAM_TIMEOUT
+		)
+		r.raise_for_status()
+		return r
+
+	def _seed_mirror(self):
+		'''
+		Loads the full light and grouped_light state into the mirror after the
+		eventstream connects, then marks the mirror live. Uses the same bulk
+		fetch that refreshes the resource inventory, so one GET does both.
+		'''
+		if self._mirror is None:
+			return
+		inventory = self._get_inventory()
+		inventory.refresh()
+		for rtype in ('light', 'grouped_light'):
+			self._mirror.seed(inventory.by_type(rtype))
+		self._mirror.live = True
+
+	def _on_eventstream_down(self):
+		if self._mirror is not None:
+			self._mirror.live = False
+
+	def _on_hue_events(self, events):
+		'''
+		Applies a batch of eventstream events to the light-state mirror, and lets
+		the resource inventory invalidate itself on add/delete/rename.
+
+			Parameters:
+				events (list[dict]): Bridge events, each with a 'type' (update, add,
+				                     delete) and a 'data' list of resource items.
+		'''
+		if self._inventory is not None:
+			self._inventory.apply_events(events)
+		if self._mirror is None:
+			return
+		for event in events:
+			etype = event.get('type')
+			for item in event.get('data', []):
+				if item.get('type') not in ('light', 'grouped_light'):
+					continue
+				if etype == 'delete':
+					self._mirror.remove(item.get('id'))
+				else:
+					self._mirror.apply(item)
 
 	def rgb_to_xy(self, red: int | str, green: int | None = None, blue: int | None = None):
 		'''
@@ -152,56 +734,19 @@ class OctohuePlugin(octoprint.plugin.StartupPlugin,
 				             since black has no chromaticity and the caller should skip the
 				             colour change entirely.
 
+		Conversions are memoised and use a precomputed sRGB linearisation table
+		(see colour.py).
+
 			Raises:
 				ValueError: If red is a string that is not a valid '#RRGGBB' hex value.
 		'''
 		if isinstance(red, str):
-			try:
-				red, green, blue = int(red[1:3], 16), int(red[3:5], 16), int(red[5:], 16)
-			except ValueError:
-				raise ValueError("Invalid hex string format")
+			red, green, blue = hex_to_rgb(red)
 		elif green is None or blue is None:
 			raise ValueError("green and blue are required when red is an integer")
 
-		self._logger.debug(f"RGB Split Input - R:{red} G:{green} B:{blue}")
-
-		# We need to convert the RGB value to Yxz.
-		redScale = float(red) / 255.0
-		greenScale = float(green) / 255.0
-		blueScale = float(blue) / 255.0
-
-		# Apply gamma correction (sRGB standard)
-		if redScale <= 0.04045:
-			redScale = redScale / 12.92
-		else:
-			redScale = ((redScale + 0.055) / 1.055) ** 2.4
-
-		if greenScale <= 0.04045:
-			greenScale = greenScale / 12.92
-		else:
-			greenScale = ((greenScale + 0.055) / 1.055) ** 2.4
-
-		if blueScale <= 0.04045:
-			blueScale = blueScale / 12.92
-		else:
-			blueScale = ((blueScale + 0.055) / 1.055) ** 2.4
-
-		# Transformation matrix (sRGB to XYZ) - Manual matrix multiplication
-		x = 0.4124 * redScale + 0.3576 * greenScale + 0.1805 * blueScale
-		y = 0.2126 * redScale + 0.7152 * greenScale + 0.0722 * blueScale
-		z = 0.0193 * redScale + 0.1192 * greenScale + 0.9505 * blueScale
-
-		#To use only X and Y, we need to noralize using Z i.e value = value / ( X + Y + Z)
-		if x + y + z == 0:
-			# Black has no chromaticity; caller should treat None as "no colour change"
-			return None
-
-		normx = x / ( x + y + z)
-		normy = y / ( x + y + z)
-
-		xy = [normx, normy]
-
-		return xy
+		xy = colour_rgb_to_xy(red, green, blue)
+		return list(xy) if xy is not None else None
 
 	def build_state(self, **kwargs):
 		'''
@@ -219,6 +764,7 @@ class OctohuePlugin(octoprint.plugin.StartupPlugin,
 				deviceid (str): UUID of the Hue device or group to target.
 				alert (str): Hue alert effect. 'lselect' is mapped to the v2 'breathe' action.
 				transitiontime (int): Transition duration in units of 100 ms.
+				critical (bool): Send ahead of normal traffic (see set_state).
 
 		Night mode:
 			If night mode is active and the action is 'pause', returns immediately without
@@ -226,26 +772,28 @@ class OctohuePlugin(octoprint.plugin.StartupPlugin,
 			nightmode_maxbri before the state is sent.
 
 		Note:
-			'deviceid' and 'colour' are consumed internally and not forwarded to the Hue
-			API. All other kwargs (including alert, transitiontime, etc.) pass through
+			'deviceid', 'colour' and 'critical' are consumed internally and not forwarded
+			to the Hue API. All other kwargs (including alert, transitiontime, etc.) pass through
 			to set_state() unchanged.
 		'''
 
-		self._logger.debug(f"Build_state Called with: {kwargs}")
+		debug = self._logger.isEnabledFor(logging.DEBUG)
+		if debug:
+			self._logger.debug("Build_state Called with: %s", kwargs)
 
 		if self._is_night_mode_active():
-			action = self._settings.get(['nightmode_action'])
+			config = self._get_config()
+			action = config.nightmode_action
 			if action == 'pause':
 				self._logger.info("Night mode active — skipping light change.")
 				return
 			elif action == 'dim' and 'bri' in kwargs:
-				maxbri = int(self._settings.get(['nightmode_maxbri']) or 64)
+				maxbri = config.nightmode_maxbri
 				kwargs['bri'] = min(kwargs['bri'], maxbri)
-				self._logger.debug(f"Night mode active — brightness capped at {maxbri}.")
+				self._logger.debug("Night mode active — brightness capped at %s.", maxbri)
 
-		exclude_keys = {"deviceid", "colour"}
+		exclude_keys = {"deviceid", "colour", "critical"}
 		state = {key: value for key, value in kwargs.items() if key not in exclude_keys}
-		self._logger.debug(f"Initial state: {state}")
 		if kwargs['on']:
 			if "colour" in kwargs and kwargs['colour'] is not None:
 				colour = kwargs['colour']
@@ -253,12 +801,14 @@ class OctohuePlugin(octoprint.plugin.StartupPlugin,
 				if xy is not None:
 					state['xy'] = xy
 
-		self._logger.debug(f"Final State: {state}")
-		return self.set_state(state, kwargs['deviceid'])
+		if debug:
+			self._logger.debug("Final State: %s", state)
+		return self.set_state(state, kwargs['deviceid'], critical=kwargs.get('critical', False))
 
 	def get_state(self, deviceid=None):
 		'''
-		Queries the on/off state of a Hue device or group via the v2 API.
+		Returns the on/off state of a Hue device or group. Answered from the
+		eventstream-fed mirror when it is live, otherwise queried via the v2 API.
 
 			Parameters:
 				deviceid (str, optional): UUID of the device to query.
@@ -271,11 +821,17 @@ class OctohuePlugin(octoprint.plugin.StartupPlugin,
 		if not self._bridge_ready():
 			return None
 
+		config = self._get_config()
 		if deviceid is None:
-			deviceid = self._settings.get(['lampid'])
+			deviceid = config.lampid
 
-		self._logger.debug(f"Getting state of {deviceid}")
-		if self._settings.get(['lampisgroup']):
+		if self._mirror is not None:
+			mirrored = self._mirror.is_on(deviceid)
+			if mirrored is not None:
+				return mirrored
+
+		self._logger.debug("Getting state of %s", deviceid)
+		if config.lampisgroup:
 			response = self._hue_request('GET', f"grouped_light/{deviceid}")
 		else:
 			response = self._hue_request('GET', f"light/{deviceid}")
@@ -285,13 +841,18 @@ class OctohuePlugin(octoprint.plugin.StartupPlugin,
 			return data[0]['on']['on']
 		return None
 
-	def set_state(self, state, deviceid=None):
+	def set_state(self, state, deviceid=None, critical=False):
 		'''
 		Converts a v1-style state dict to a Hue v2 CLIP API payload and PUTs it to
-		the appropriate light or grouped_light resource.
+		the appropriate light or grouped_light resource. PUTs pass through the
+		coalescer, so commands for the same resource within coalescewindow ms are
+		merged into one, and through the bridge rate limiter (about 10/s for
+		lights, 1/s for groups). A critical state skips both and is sent at once.
 
 		Brightness is converted from the 1–254 scale to the v2 0–100% scale.
-		xy colour coordinates are wrapped in the v2 {"x": ..., "y": ...} object.
+		xy colour coordinates are wrapped in the v2 {"x": ..., "y": ...} object,
+		after clamping them into the light's colour gamut (A/B/C or the exact
+		triangle the bridge reports) when the resource inventory knows it.
 		CT is wrapped in color_temperature.mirek.
 		The v1 "lselect" alert value is mapped to the v2 "breathe" action.
 
@@ -300,14 +861,23 @@ class OctohuePlugin(octoprint.plugin.StartupPlugin,
 				              on, bri (1-254), xy ([x, y]), ct, alert, transitiontime.
 				deviceid (str, optional): UUID of the device or group to target.
 				                          Defaults to the configured lampid.
+				critical (bool): Critical event traffic (see EventRule.critical).
+
+			Returns:
+				str | None: Backpressure outcome ('sent', 'pending', 'coalesced',
+				            'queued' or 'dropped'), or None if the bridge is not ready.
 		'''
 		if not self._bridge_ready():
 			return
 
+		config = self._get_config()
 		if deviceid is None:
-			deviceid = self._settings.get(['lampid'])
+			deviceid = config.lampid
+
+		if self._logger.isEnabledFor(logging.DEBUG):
+			self._logger.debug("Setting lampid: %s Is Group: %s with State: %s", deviceid, config.lampisgroup, state)
 
-		self._logger.debug(f"Setting lampid: {deviceid} Is Group: {self._settings.get(['lampisgroup'])} with State: {state}")
+		is_group = config.lampisgroup and config.plugid != deviceid
 
 		# Build v2 nested payload
 		payload = {}
@@ -316,7 +886,10 @@ class OctohuePlugin(octoprint.plugin.StartupPlugin,
 		if 'bri' in state:
 			payload['dimming'] = {'brightness': min(float(state['bri']), 100.0)}
 		if 'xy' in state:
-			payload['color'] = {'xy': {'x': state['xy'][0], 'y': state['xy'][1]}}
+			xy = state['xy']
+			if not is_group:
+				xy = clamp_to_gamut(xy, self._light_gamut(deviceid))
+			payload['color'] = {'xy': {'x': xy[0], 'y': xy[1]}}
 		if 'ct' in state:
 			payload['color_temperature'] = {'mirek': state['ct']}
 		if 'alert' in state:
@@ -325,37 +898,70 @@ class OctohuePlugin(octoprint.plugin.StartupPlugin,
 		if 'transitiontime' in state:
 			payload['dynamics'] = {'duration': state['transitiontime'] * 100}
 
-		if self._settings.get(['lampisgroup']) and self._settings.get(['plugid']) != deviceid:
-			self._hue_request('PUT', f"grouped_light/{deviceid}", payload)
+		if is_group:
+			return self._put(f"grouped_light/{deviceid}", payload, critical)
 		else:
-			self._hue_request('PUT', f"light/{deviceid}", payload)
+			return self._put(f"light/{deviceid}", payload, critical)
+
+	def _light_gamut(self, deviceid):
+		'''
+		Returns the colour gamut the bridge reports for a light, from the cached
+		inventory only (never fetched on the command path), or None if unknown.
+		'''
+		if self._inventory is None:
+			return None
+		return gamut_of(self._inventory.peek(deviceid))
 
 	def toggle_state(self, deviceid=None):
 		'''
-		Flips the on/off state of a device. When turning on, lamps use the configured
-		default brightness; plugs (plugid) are switched on without a brightness argument.
+		Flips the on/off state of a device. The current state comes from get_state,
+		so it is read from memory while the eventstream mirror is live. When turning
+		on, lamps use the configured default brightness; plugs (plugid) are switched
+		on without a brightness argument.
 
 			Parameters:
 				deviceid (str, optional): UUID of the device to toggle.
 				                          Defaults to the configured lampid.
 		'''
+		config = self._get_config()
 		if deviceid is None:
-			deviceid = self._settings.get(['lampid'])
+			deviceid = config.lampid
 
 		if self.get_state(deviceid):
 			self.build_state(on=False, deviceid=deviceid)
 		else:
-			if deviceid != self._settings.get(['plugid']):
-				ct = int(self._settings.get(['togglect']) or 0)
-				bri = int(self._settings.get(['togglebri']) or self._settings.get(['defaultbri']))
-				if ct:
-					self.build_state(on=True, ct=ct, bri=bri, deviceid=deviceid)
+			if deviceid != config.plugid:
+				if config.togglect:
+					self.build_state(on=True, ct=config.togglect, bri=config.togglebri, deviceid=deviceid)
 				else:
-					colour = self._settings.get(['togglecolour']) or None
-					self.build_state(on=True, colour=colour, bri=bri, deviceid=deviceid)
+					self.build_state(on=True, colour=config.togglecolour, bri=config.togglebri, deviceid=deviceid)
 			else:
 				self.build_state(on=True, deviceid=deviceid)
 
+	def _get_rules(self):
+		'''
+		Returns the compiled statusDict rule table, compiling it on first use.
+		Reset to None whenever statusDict may have changed.
+		'''
+		if self._rules is None:
+			if self._throttle is not None:
+				self._throttle.reset()
+			self._rules = compile_rules(self._settings.get(['statusDict']), self.rgb_to_xy, logger=self._logger)
+		return self._rules
+
+	def _get_throttle(self):
+		'''
+		Returns the debounce/min_interval gate for chatty events, creating it on
+		first use. Trailing firings run as dispatcher jobs.
+		'''
+		if self._throttle is None:
+			self._throttle = EventThrottle(
+				lambda delay, callback: self._schedule(delay, None, callback=callback),
+				lambda job: self._get_dispatcher().cancel(job),
+				self._fire_rule
+			)
+		return self._throttle
+
 	def get_configured_events(self):
 		'''
 		Returns a list of OctoPrint event names that have an entry in statusDict.
@@ -373,15 +979,15 @@ class OctohuePlugin(octoprint.plugin.StartupPlugin,
 		light state.
 		'''
 		self._logger.info("Octohue is alive!")
+		self._get_dispatcher().start()
+		self._get_coalescer().window = self._coalesce_window()
 		self.establishBridge(self._settings.get(['bridgeaddr']), self._settings.get(['husername']))
+		self._rules = None
+		self._reload_config()
 		if self._settings.get(['ononstartup']):
-			my_statusEvent = next((statusEvent for statusEvent in self._settings.get(['statusDict']) if statusEvent['event'] == self._settings.get(['ononstartupevent'])), None)
-			if my_statusEvent:
-				ct = int(my_statusEvent.get('ct') or 0)
-				if ct:
-					self.build_state(on=True, ct=ct, bri=int(my_statusEvent['brightness']), deviceid=self._settings.get(['lampid']))
-				else:
-					self.build_state(on=True, colour=my_statusEvent['colour'], bri=int(my_statusEvent['brightness']), deviceid=self._settings.get(['lampid']))
+			rule = self._get_rules().get(self._settings.get(['ononstartupevent']))
+			if rule is not None and rule.light is not None:
+				self.build_state(deviceid=self._settings.get(['lampid']), **rule.light)
 
 	def on_shutdown(self):
 		'''
@@ -390,39 +996,115 @@ class OctohuePlugin(octoprint.plugin.StartupPlugin,
 		self._logger.info("Ladies and Gentlemen, thank you and goodnight!")
 		if self._settings.get(['offonshutdown']):
 			self.set_state({"on": False})
+		if self._coalescer is not None:
+			self._coalescer.flush_all()
+		if self._eventstream is not None:
+			self._eventstream.stop()
+		if self._dispatcher is not None:
+			self._dispatcher.stop()
+
+	def _get_powerdown(self):
+		'''
+		Returns the power-down manager, creating it on first use. It switches
+		off whatever plugid is configured when the hotends have cooled; its
+		delay and safety timeout run as (cancellable) dispatcher jobs.
+		'''
+		if self._powerdown is None:
+			self._powerdown = PowerDownManager(
+				lambda delay, callback: self._schedule(delay, None, callback=callback),
+				lambda job: self._get_dispatcher().cancel(job),
+				self._subscribe_temperatures,
+				self._printer.get_current_temperatures,
+				lambda: self.build_state(on=False, deviceid=self._settings.get(['plugid'])),
+				logger=self._logger
+			)
+		return self._powerdown
 
-	def printer_start_power_down(self):
+	def _subscribe_temperatures(self, listener):
 		'''
-		Begins the temperature-monitored power-down sequence. Schedules
-		printer_check_temp_power_down to run after the configured powerofftime delay.
+		Registers listener for OctoPrint's temperature reports.
+
+			Returns:
+				callable: Unregisters it again.
 		'''
-		delay = self._settings.get(['powerofftime']) or 0
-		delayedtask = ResettableTimer(delay, self.printer_check_temp_power_down)
+		callback = _TemperatureListener(listener)
+		self._printer.register_callback(callback)
+		return lambda: self._printer.unregister_callback(callback)
 
-		delayedtask.start()
+	def _power_down(self, delay):
+		'''
+		Starts the temperature-monitored power-down after delay seconds, unless
+		one is already in progress.
+		'''
+		threshold = int(self._settings.get(['powerofftemp']) or 0)
+		if not self._get_powerdown().start(delay, threshold):
+			self._logger.debug("Power-down already in progress — ignoring request.")
+
+	def printer_start_power_down(self):
+		'''
+		Begins the temperature-monitored power-down sequence after the configured
+		powerofftime delay (see _get_powerdown). A second request while one is
+		in progress does nothing.
+		'''
+		self._power_down(self._settings.get(['powerofftime']) or 0)
 
 	def printer_check_temp_power_down(self):
 		'''
-		Check if minimum temperature for shutdown is reached if defined.
-		Shutdown if below temp or not defined.  Reschedules itself every 30 s
-		until the temperature condition is met rather than blocking in a loop.
+		Begins the temperature-monitored power-down sequence without the
+		powerofftime delay. The plug is switched off as soon as OctoPrint
+		reports every tool at or below powerofftemp (40°C at the latest) on two
+		consecutive readings; there is no polling. A second request while one
+		is in progress does nothing.
 		'''
-		deviceid = self._settings.get(['plugid'])
-		target_temp = int(self._settings.get(['powerofftemp']) or 0)
-		temps = self._printer.get_current_temperatures()
-		tool_temps = [int(v['actual']) for k, v in temps.items() if k.startswith('tool')]
-		if not tool_temps:
-			self._logger.warning("No extruder temperatures available — skipping cooldown check.")
-			return
-		current_temp = max(tool_temps)
-		self._logger.debug(f"Safe Shutdown Requested! Tool Temp: {current_temp}, Looking for Safe Cooldown Temp: {target_temp}")
-		# Check if current_temp is below shutdowntemp OR below 40 (whichever happens first)
-		if current_temp <= target_temp or current_temp <= 40:
-			self._logger.debug(f"Safe Cooldown reached {current_temp}, shutting down.")
-			self.build_state(on=False, deviceid=deviceid)
-		else:
-			self._logger.debug(f"Current temperature: {current_temp}, waiting 30 seconds...")
-			ResettableTimer(30.0, self.printer_check_temp_power_down).start()
+		self._power_down(0)
+
+	def get_stats(self):
+		'''
+		Returns runtime statistics for the plugin's background subsystems.
+
+			Returns:
+				dict: 'dispatcher' holds queue depth, lag and processed job counts;
+				      'coalescer' holds pending, coalesced and sent PUT counts;
+				      'ratelimit' holds sent/queued/dropped counts per resource type;
+				      'eventstream' holds connection state and mirror size;
+				      'inventory' holds cached resource count and fetches;
+				      'tls' holds TLS handshakes and how many resumed a session;
+				      'session' holds pool size, session rebuilds and keepalive probes;
+				      'circuit' holds the bridge circuit-breaker state;
+				      'retry' holds retries made and the retry budget left;
+				      'delta' holds PUTs skipped or trimmed as already applied;
+				      'requestlog' holds bridge requests seen, sampled and buffered;
+				      'traces' holds event traces started, buffered and waiting;
+				      'powerdown' holds the power-down state and counters;
+				      'throttle' holds events seen, fired and dropped per gated event;
+				      'progress' holds progress ticks and updates sent or skipped.
+				      Each is None if that subsystem has not been started.
+		'''
+		eventstream = None
+		if self._eventstream is not None:
+			eventstream = dict(self._eventstream.stats(), mirror_live=self._mirror.live, mirrored=len(self._mirror))
+		return {
+			"dispatcher": self._dispatcher.stats() if self._dispatcher is not None else None,
+			"coalescer": self._coalescer.stats() if self._coalescer is not None else None,
+			"ratelimit": self._limiter.stats() if self._limiter is not None else None,
+			"eventstream": eventstream,
+			"inventory": self._inventory.stats() if self._inventory is not None else None,
+			"tls": bridge_context_stats(),
+			"session": {
+				"pool_size": self._pool_size,
+				"rebuilds": self._session_rebuilds,
+				"keepalive": self._keepalive_interval(),
+				"keepalive_probes": self._keepalive_probes,
+			} if self._session is not None else None,
+			"circuit": self._breaker.stats() if self._breaker is not None else None,
+			"retry": self._retry.stats() if self._retry is not None else None,
+			"delta": self._delta.stats() if self._delta is not None else None,
+			"requestlog": self._request_log.stats() if self._request_log is not None else None,
+			"traces": self._traces.stats() if self._traces is not None else None,
+			"powerdown": self._powerdown.stats() if self._powerdown is not None else None,
+			"throttle": self._throttle.stats() if self._throttle is not None else None,
+			"progress": self._progress.stats() if self._progress is not None else None,
+		}
 
 	def is_api_protected(self):
 		# Commands that need admin access perform their own Permissions.ADMIN.can()
@@ -444,7 +1126,13 @@ class OctohuePlugin(octoprint.plugin.StartupPlugin,
 			getstate=[],
 			turnon=[],
 			turnoff=[],
-			cooldown=[]
+			cooldown=[],
+			getstats=[],
+			getmetrics=[],
+			getrequestlog=[],
+			gettraces=[],
+			getpowerdown=[],
+			cancelpowerdown=[]
 		)
 
 	def on_api_command(self, command, data):
@@ -453,15 +1141,32 @@ class OctohuePlugin(octoprint.plugin.StartupPlugin,
 
 			Commands:
 				bridge     (admin) getstatus / discover / pair sub-commands for bridge management.
+				           getstatus reports 'unreachable' while the circuit breaker is open.
 				getdevices (admin) Returns Hue lights, optionally filtered by archetype.
 				getgroups  (admin) Returns Hue rooms and zones as named group entries.
-				getstate   (admin) Returns the current on/off state of the configured lamp.
+				           Both are served from the cached resource inventory; pass
+				           refresh=true to force a refetch.
+				getstate   (admin) Returns the current on/off state of the configured lamp
+				           (from the eventstream mirror when it is live).
 				togglehue  Toggles the lamp (or a specific device) between on and off.
 				turnon     Turns a device on, optionally applying a colour hex value.
 				turnoff    Turns a device off.
 				cooldown   Triggers the temperature-monitored power-down sequence immediately.
+				getpowerdown (admin) Returns the power-down state (idle, waiting, cooling,
+				           off), the threshold and last tool temperature while cooling.
+				cancelpowerdown Cancels a waiting or cooling power-down; the plug stays on.
+				getstats   (admin) Returns dispatcher queue depth and lag, coalescer counters
+				           and rate-limiter backpressure counters.
+				getmetrics (admin) Returns the metrics registry: bridge request latency
+				           histograms, response and error counters, event counts and
+				           queue/circuit gauges.
+				getrequestlog (admin) Returns the most recent bridge requests (method, path,
+				           status, round-trip ms, error, payload) from the in-memory ring buffer.
+				gettraces  (admin) Returns recent event traces: when each configured event was
+				           received, scheduled, dequeued, sent and acked. Pass id to get one
+				           trace, or min_ms to keep only traces that took at least that long.
 		'''
-		self._logger.debug(f"Recieved API Command: {command}")
+		self._logger.debug("Recieved API Command: %s", command)
 		if command == 'bridge':
 			if not Permissions.ADMIN.can():
 				return flask.make_response(flask.jsonify(error="Forbidden"), 403)
@@ -469,15 +1174,22 @@ class OctohuePlugin(octoprint.plugin.StartupPlugin,
 				bridge = self._settings.get(['bridgeaddr'])
 				apikey = self._settings.get(['husername'])
 				if bridge and apikey:
-					return flask.jsonify(bridgestatus="configured")
+					# An open circuit means recent requests could not reach the bridge
+					circuit = self._get_breaker().state
+					status = "unreachable" if circuit == "open" else "configured"
+					return flask.jsonify(bridgestatus=status, circuit=circuit)
 				elif bridge and not apikey:
 					return flask.jsonify(bridgestatus="unauthed")
 				else:
 					return flask.jsonify(bridgestatus="unconfigured")
 
 			elif "discover" in data:
-				r = requests.get(self.discoveryurl)
-				discoveredbridge = r.json()
+				try:
+					r = requests.get(self.discoveryurl, timeout=DISCOVERY_TIMEOUT)
+					discoveredbridge = r.json()
+				except Exception as e:
+					self._logger.warning("Hue bridge discovery failed: %s", e)
+					return flask.make_response(flask.jsonify(error="Bridge discovery failed"), 504)
 				self._logger.debug(discoveredbridge)
 				return flask.jsonify(discoveredbridge)
 
@@ -487,8 +1199,12 @@ class OctohuePlugin(octoprint.plugin.StartupPlugin,
 				# Pairing still uses the v1 endpoint — this is correct and unchanged in v2
 				pair_session = requests.Session()
 				pair_session.mount("https://", _SignifyAdapter())
-				r = pair_session.post("https://{}/api".format(bridgeaddr), json={"devicetype":"octoprint#octohue"})
-				result = r.json()[0]
+				try:
+					r = pair_session.post("https://{}/api".format(bridgeaddr), json={"devicetype":"octoprint#octohue"}, timeout=BRIDGE_TIMEOUT)
+					result = r.json()[0]
+				except Exception as e:
+					self._logger.warning("Hue bridge pairing request failed: %s", e)
+					result = {"error": str(e)}
 				if "error" in result:
 					response = [{
 						'response': 'error'
@@ -501,7 +1217,7 @@ class OctohuePlugin(octoprint.plugin.StartupPlugin,
 						'bridgeaddr': bridgeaddr,
 						'husername': token
 					}]
-					self._logger.debug(f"New Huesername {token}")
+					self._logger.debug("New Huesername %s", token)
 					self._settings.set(['husername'], token)
 					self._settings.set(['bridgeaddr'], bridgeaddr)
 					self._settings.save()
@@ -517,20 +1233,14 @@ class OctohuePlugin(octoprint.plugin.StartupPlugin,
 			if not self._bridge_ready():
 				return flask.jsonify(devices=[])
 			self._logger.debug("Getting Devices")
-			response = self._hue_request('GET', 'light')
-			devices = response.get('data', [])
+			inventory = self._get_inventory()
+			if data.get('refresh'):
+				inventory.invalidate()
 			if 'archetype' in data:
-				self._logger.debug(f"Archetype: {data['archetype']}")
-				device_elements = [
-					{"id": d['id'], "name": d['metadata']['name'], "archetype": d['metadata']['archetype']}
-					for d in devices
-					if d.get('metadata', {}).get('archetype') == data['archetype']
-				]
+				self._logger.debug("Archetype: %s", data['archetype'])
+				device_elements = inventory.lights(data['archetype'])
 			else:
-				device_elements = [
-					{"id": d['id'], "name": d['metadata']['name'], "archetype": d.get('metadata', {}).get('archetype', '')}
-					for d in devices
-				]
+				device_elements = inventory.lights()
 			return flask.jsonify(devices=device_elements)
 
 		elif command == 'getgroups':
@@ -539,25 +1249,17 @@ class OctohuePlugin(octoprint.plugin.StartupPlugin,
 			if not self._bridge_ready():
 				return flask.jsonify(groups=[])
 			self._logger.debug("Getting Groups")
-			groups = []
-			for resource_type in ('room', 'zone'):
-				response = self._hue_request('GET', resource_type)
-				for item in response.get('data', []):
-					name = item.get('metadata', {}).get('name', '')
-					grouped_light_id = next(
-						(s['rid'] for s in item.get('services', []) if s.get('rtype') == 'grouped_light'),
-						None
-					)
-					if grouped_light_id and name:
-						groups.append({'id': grouped_light_id, 'name': name})
-			return flask.jsonify(groups=groups)
+			inventory = self._get_inventory()
+			if data.get('refresh'):
+				inventory.invalidate()
+			return flask.jsonify(groups=inventory.groups())
 
 		elif command == 'togglehue':
-			self._logger.debug(f"Toggling Hue for {data}")
+			self._logger.debug("Toggling Hue for %s", data)
 			if 'deviceid' in data:
 				self.toggle_state(data['deviceid'])
 			else:
-				self.toggle_state(self._settings.get(['lampid']))
+				self.toggle_state(self._get_config().lampid)
 
 		elif command == 'getstate':
 			if not Permissions.ADMIN.can():
@@ -568,69 +1270,172 @@ class OctohuePlugin(octoprint.plugin.StartupPlugin,
 				return flask.jsonify(on="false")
 
 		elif command == 'turnon':
-			deviceid = data.get('deviceid') or self._settings.get(['lampid'])
+			config = self._get_config()
+			deviceid = data.get('deviceid') or config.lampid
 
 			if "colour" in data:
-				self.build_state(on=True, colour=data['colour'], bri=int(self._settings.get(['defaultbri'])), deviceid=deviceid)
+				self.build_state(on=True, colour=data['colour'], bri=config.defaultbri, deviceid=deviceid)
 			else:
-				self.build_state(on=True, bri=int(self._settings.get(['defaultbri'])), deviceid=deviceid)
+				self.build_state(on=True, bri=config.defaultbri, deviceid=deviceid)
 
 		elif command == 'turnoff':
-			deviceid = data.get('deviceid') or self._settings.get(['lampid'])
+			deviceid = data.get('deviceid') or self._get_config().lampid
 
 			self.build_state(on=False, deviceid=deviceid)
 
 		elif command == 'cooldown':
 			self.printer_check_temp_power_down()
 
+		elif command == 'getpowerdown':
+			if not Permissions.ADMIN.can():
+				return flask.make_response(flask.jsonify(error="Forbidden"), 403)
+			return flask.jsonify(**self._get_powerdown().stats())
+
+		elif command == 'cancelpowerdown':
+			cancelled = self._powerdown is not None and self._powerdown.cancel("cancelled from the API")
+			return flask.jsonify(cancelled=cancelled)
+
+		elif command == 'getstats':
+			if not Permissions.ADMIN.can():
+				return flask.make_response(flask.jsonify(error="Forbidden"), 403)
+			return flask.jsonify(**self.get_stats())
+
+		elif command == 'getmetrics':
+			if not Permissions.ADMIN.can():
+				return flask.make_response(flask.jsonify(error="Forbidden"), 403)
+			return flask.jsonify(**self._get_metrics().snapshot())
+
+		elif command == 'getrequestlog':
+			if not Permissions.ADMIN.can():
+				return flask.make_response(flask.jsonify(error="Forbidden"), 403)
+			log = self._get_request_log()
+			return flask.jsonify(requests=log.dump(), **log.stats())
+
+		elif command == 'gettraces':
+			if not Permissions.ADMIN.can():
+				return flask.make_response(flask.jsonify(error="Forbidden"), 403)
+			traces = self._get_traces()
+			if 'id' in data:
+				trace = traces.get(str(data['id']))
+				if trace is None:
+					return flask.make_response(flask.jsonify(error="Unknown trace"), 404)
+				return flask.jsonify(trace.as_dict())
+			try:
+				min_ms = float(data.get('min_ms') or 0)
+			except (TypeError, ValueError):
+				return flask.make_response(flask.jsonify(error="min_ms must be a number"), 400)
+			return flask.jsonify(traces=traces.dump(min_ms), **traces.stats())
+
+	@octoprint.plugin.BlueprintPlugin.route("/metrics", methods=["GET"])
+	def prometheus_metrics(self):
+		'''
+		Serves the metrics registry in the Prometheus text format at
+		/plugin/octohue/metrics. Off unless the prometheus setting is enabled;
+		scrapers authenticate with an admin API key (X-Api-Key header).
+		'''
+		if not self._settings.get(['prometheus']):
+			return flask.make_response(flask.jsonify(error="Not Found"), 404)
+		if not Permissions.ADMIN.can():
+			return flask.make_response(flask.jsonify(error="Forbidden"), 403)
+		return flask.make_response((self._get_metrics().prometheus(), 200, {"Content-Type": PROMETHEUS_CONTENT_TYPE}))
+
+	def is_blueprint_csrf_protected(self):
+		return True
+
 	def on_event(self, event, payload):
 		'''
 		OctoPrint event hook. If the event matches a configured statusDict entry,
-		schedules the appropriate light change (on/off/flash) after the configured delay.
-		Also triggers auto power-off if enabled and the event is PrintDone.
-		'''
-		self._logger.debug(f"Recieved Status: {event} from Printer")
-		my_statusEvent = next((statusEvent for statusEvent in self._settings.get(['statusDict']) if statusEvent['event'] == event), None)
-		if my_statusEvent:
-			self._logger.info(f"Received Configured Status Event: {event}")
-			delay = my_statusEvent.get('delay') or 0
-			deviceid = self._settings.get(['lampid'])
-
-			flash = my_statusEvent.get('flash', False)
-			turnoff = my_statusEvent['turnoff']
-
-			ct = int(my_statusEvent.get('ct') or 0)
-
-			if turnoff and flash:
-				# Flash first, then switch off after the alert cycle completes
-				flash_kwargs = {'on': True, 'bri': int(my_statusEvent['brightness']), 'alert': 'lselect', 'deviceid': deviceid}
-				if ct:
-					flash_kwargs['ct'] = ct
-				else:
-					flash_kwargs['colour'] = my_statusEvent['colour']
-				delayedtask = ResettableTimer(delay, self.build_state, kwargs=flash_kwargs)
-				ResettableTimer(delay + 15, self.build_state, kwargs={'on': False, 'deviceid': deviceid}).start()
-			elif not turnoff:
-				brightness = my_statusEvent['brightness']
-				build_kwargs = {'on': True, 'bri': int(brightness), 'deviceid': deviceid}
-				if ct:
-					build_kwargs['ct'] = ct
-				else:
-					build_kwargs['colour'] = my_statusEvent['colour']
-				if flash:
-					build_kwargs['alert'] = 'lselect'
-				delayedtask = ResettableTimer(delay, self.build_state, kwargs=build_kwargs)
-			else:
-				delayedtask = ResettableTimer(delay, self.build_state, kwargs={'on': False, 'deviceid': deviceid})
+		fires its rule (see _fire_rule); a rule with debounce or min_interval
+		set fires through the event throttle, which may hold the event back.
+		Unconfigured events cost one dict lookup.
+		Also triggers auto power-off if enabled and the event is PrintDone,
+		cancels a pending power-off when a new print starts or the printer
+		reconnects, and resets the progress light when a print starts or stops.
+		'''
+		self._logger.debug("Recieved Status: %s from Printer", event)
+		self._get_metrics().get("octohue_events_total").inc(event)
+		rule = self._get_rules().get(event)
+		if rule is not None:
+			if not rule.gated:
+				self._fire_rule(rule)
+			elif self._get_throttle().submit(rule) == 'dropped':
+				self._get_metrics().get("octohue_events_dropped_total").inc(event)
+				self._logger.debug("Dropped %s: held back by its debounce/min_interval", event)
+
+		if event in _PROGRESS_RESET_EVENTS and self._progress is not None:
+			self._progress.reset()
+
+		if event in _POWER_DOWN_CANCEL_EVENTS and self._powerdown is not None:
+			self._powerdown.cancel(event)
+		elif event == 'PrintDone' and self._get_config().autopoweroff:
+			self.printer_start_power_down()
 
+	def _fire_rule(self, rule):
+		'''
+		Queues a rule's precompiled light changes (on/off/flash) on the
+		dispatcher to run after the configured delay. Each firing starts a trace
+		that follows its commands to the bridge (see the gettraces API command),
+		and cancels the actions of earlier events still queued for the same light.
+		'''
+		deviceid = self._get_config().lampid
+		trace = self._get_traces().start(rule.event, deviceid)
+		self._logger.info("Received Configured Status Event: %s (trace %s)", rule.event, trace.id)
+		self._supersede_actions(deviceid, trace)
+		token = trace.activate()
+		try:
+			for delay, payload in rule.jobs:
+				self._schedule(delay, deviceid, payload, slot=("event", deviceid), critical=rule.critical)
+				trace.mark("scheduled", {"delay": delay})
+		finally:
+			trace.deactivate(token)
+
+	def _get_progress(self):
+		'''
+		Returns the progress light, building its ramp from the progress settings
+		on first use, or None if the settings are invalid. Reset to None
+		whenever they may have changed.
+		'''
+		if self._progress is None:
 			try:
-				delayedtask.start()
-			except Exception as e:
-				self._logger.error(f"Error starting delayed task: {e}")
+				ramp = build_ramp(self._settings.get(['progress_mode']), self._settings.get(['progress_from']),
+								  self._settings.get(['progress_to']), self._get_config().defaultbri)
+			except ValueError as e:
+				self._logger.warning("Progress light disabled: %s", e)
+				return None
+			self._progress = ProgressLight(ramp, self._send_progress, budget=self._progress_budget)
+		return self._progress
+
+	def _send_progress(self, step):
+		'''
+		ProgressLight send callback: queues a ramp step for the lamp like an
+		event action, without superseding the event actions queued for it.
+		'''
+		payload = {'on': True, 'bri': step.bri}
+		if step.xy is not None:
+			payload['xy'] = step.xy
+		self._schedule(0, self._get_config().lampid, payload)
 
+	def _progress_budget(self):
+		'''
+		True while the rate limiter can take the lamp's next command without
+		queueing it; progress updates are skipped rather than queued.
+		'''
+		if self._limiter is None:
+			return True
+		return self._limiter.available('grouped_light' if self._get_config().lampisgroup else 'light')
 
-		if self._settings.get(['autopoweroff']) and event == 'PrintDone':
-			self.printer_start_power_down()
+	def on_print_progress(self, storage, path, progress):
+		'''
+		OctoPrint progress hook, called on every whole percent of a print. With
+		progress mode on, moves the lamp along the configured ramp, skipping
+		ticks the eye would not notice or the bridge budget cannot spare (see
+		ProgressLight). Costs one attribute read when progress mode is off.
+		'''
+		if not self._get_config().progress_enabled:
+			return
+		light = self._get_progress()
+		if light is not None:
+			light.update(progress)
 
 	def get_settings_defaults(self):
 		'''
@@ -662,6 +1467,15 @@ class OctohuePlugin(octoprint.plugin.StartupPlugin,
 			nightmode_end="07:00",
 			nightmode_action="pause",
 			nightmode_maxbri=25,
+			coalescewindow=200,
+			eventstream=True,
+			poolsize=4,
+			keepalive=0,
+			prometheus=False,
+			progress_enabled=False,
+			progress_mode="colour",
+			progress_from="#FF0000",
+			progress_to="#00FF00",
 			statusDict=[]
 		)
 
@@ -677,7 +1491,7 @@ class OctohuePlugin(octoprint.plugin.StartupPlugin,
 		Returns the current settings schema version. OctoPrint uses this to detect
 		when on_settings_migrate needs to be called.
 		'''
-		return 4
+		return 9
 
 	def on_settings_migrate(self, target, current=None):
 		'''
@@ -687,6 +1501,12 @@ class OctohuePlugin(octoprint.plugin.StartupPlugin,
 		current<2  (v1→v2): clears lampid/plugid — Hue v2 uses UUIDs, not integer IDs.
 		current<3  (v2→v3): converts all brightness values from 1–255 scale to
 		                     0–100 percentage scale used by the Hue v2 API.
+		current<4  (v3→v4): adds toggle colour/brightness settings.
+		current<5  (v4→v5): adds the PUT coalescing window.
+		current<6  (v5→v6): enables the eventstream light-state mirror.
+		current<7  (v6→v7): adds the bridge connection pool size and keepalive.
+		current<8  (v7→v8): adds the opt-in Prometheus metrics endpoint.
+		current<9  (v8→v9): adds the print progress light mode (off).
 
 		Cascading if-blocks (not elif) ensure users upgrading across multiple
 		versions in one step receive all intermediate migrations.
@@ -759,12 +1579,40 @@ class OctohuePlugin(octoprint.plugin.StartupPlugin,
 			self._settings.set(['togglecolour'], '#FFFFFF')
 			self._settings.set(['togglect'], 0)
 
+		if current < 5:
+			self._logger.info("Migrating Settings v4→v5: adding command coalescing window")
+			self._settings.set(['coalescewindow'], 200)
+
+		if current < 6:
+			self._logger.info("Migrating Settings v5→v6: enabling the eventstream light-state mirror")
+			self._settings.set(['eventstream'], True)
+
+		if current < 7:
+			self._logger.info("Migrating Settings v6→v7: adding bridge connection pool size and keepalive")
+			self._settings.set(['poolsize'], 4)
+			self._settings.set(['keepalive'], 0)
+
+		if current < 8:
+			self._logger.info("Migrating Settings v7→v8: adding Prometheus metrics endpoint (off)")
+			self._settings.set(['prometheus'], False)
+
+		if current < 9:
+			self._logger.info("Migrating Settings v8→v9: adding print progress light mode (off)")
+			self._settings.set(['progress_enabled'], False)
+			self._settings.set(['progress_mode'], "colour")
+			self._settings.set(['progress_from'], "#FF0000")
+			self._settings.set(['progress_to'], "#00FF00")
+
 		self._settings.save()
+		self._rules = None
+		self._progress = None
+		self._reload_config()
 
 	def on_settings_load(self):
 		'''
 		Returns all plugin settings to the frontend, supplemented with the list of
-		available OctoPrint events and the pre-computed list of configured event names.
+		available OctoPrint events, the pre-computed list of configured event names
+		and the events whose entries are critical unless they set a priority.
 		'''
 		my_settings = {
 			"availableEvents": octoprint.events.all_events(),
@@ -780,6 +1628,7 @@ class OctohuePlugin(octoprint.plugin.StartupPlugin,
 			"togglect": self._settings.get(["togglect"]),
 			"ononstartup": self._settings.get(["ononstartup"]),
 			"configuredEvents": self.get_configured_events(),
+			"criticalEvents": sorted(CRITICAL_EVENTS),
 			"ononstartupevent": self._settings.get(["ononstartupevent"]),
 			"offonshutdown": self._settings.get(["offonshutdown"]),
 			"showhuetoggle": self._settings.get(["showhuetoggle"]),
@@ -792,18 +1641,36 @@ class OctohuePlugin(octoprint.plugin.StartupPlugin,
 			"nightmode_end": self._settings.get(["nightmode_end"]),
 			"nightmode_action": self._settings.get(["nightmode_action"]),
 			"nightmode_maxbri": self._settings.get(["nightmode_maxbri"]),
+			"coalescewindow": self._settings.get(["coalescewindow"]),
+			"eventstream": self._settings.get(["eventstream"]),
+			"poolsize": self._settings.get(["poolsize"]),
+			"keepalive": self._settings.get(["keepalive"]),
+			"prometheus": self._settings.get(["prometheus"]),
+			"progress_enabled": self._settings.get(["progress_enabled"]),
+			"progress_mode": self._settings.get(["progress_mode"]),
+			"progress_from": self._settings.get(["progress_from"]),
+			"progress_to": self._settings.get(["progress_to"]),
 		}
 		return my_settings
 
 	def on_settings_save(self, data):
 		'''
-		Persists settings and re-establishes the bridge connection with any updated
-		credentials. Strips availableEvents (frontend-only) before passing to the base class.
+		Persists settings, re-establishes the bridge connection with any updated
+		credentials, refreshes the settings snapshot, recompiles the statusDict rule table (logging any invalid
+		entries) and applies the new coalescing window. Strips availableEvents and
+		criticalEvents (frontend-only) before passing to the base class.
 		'''
 		data.pop("availableEvents", None)
-		self._logger.debug(f"Saving: {data} to settings")
+		data.pop("criticalEvents", None)
+		self._logger.debug("Saving: %s to settings", data)
 		octoprint.plugin.SettingsPlugin.on_settings_save(self, data)
+		self._reload_config()
 		self.establishBridge(self._settings.get(['bridgeaddr']), self._settings.get(['husername']))
+		self._rules = None
+		self._progress = None
+		self._get_rules()
+		if self._coalescer is not None:
+			self._coalescer.window = self._coalesce_window()
 
 	def get_template_vars(self):
 		'''
@@ -0,0 +1,263 @@
+from __future__ import annotations
+
+import threading
+
+
+# Fields that describe how to reach a state rather than the state itself.
+# They belong to the command that carried them and are not inherited by a
+# newer command that replaces it.
+_TRANSIENT_FIELDS = ("dynamics",)
+
+
+def merge_payloads(older, newer):
+	'''
+	Merges two Hue v2 PUT payloads for the same resource, newest fields winning.
+
+	Merging is field-wise where that is safe:
+	  - A newer "off" command discards everything pending before it.
+	  - color and color_temperature are mutually exclusive; whichever the newer
+	    payload sets replaces the other.
+	  - dynamics (transition duration) only ever comes from the newer payload.
+	  - A pending alert is kept unless the newer payload sets its own, so a
+	    flash is not lost when a colour change lands in the same window.
+
+		Parameters:
+			older (dict): The pending payload.
+			newer (dict): The payload that arrived after it.
+
+		Returns:
+			dict: A single payload equivalent to applying older then newer.
+	'''
+	if newer.get('on', {}).get('on') is False:
+		return dict(newer)
+	merged = {key: value for key, value in older.items() if key not in _TRANSIENT_FIELDS}
+	if 'color' in newer:
+		merged.pop('color_temperature', None)
+	if 'color_temperature' in newer:
+		merged.pop('color', None)
+	merged.update(newer)
+	return merged
+
+
+class CommandCoalescer:
+	'''
+	Holds only the newest pending PUT payload per Hue resource and sends one PUT
+	per coalescing window, so a burst of events for the same light collapses into
+	its final state instead of walking the lamp through every intermediate colour.
+
+	When a rate limiter is attached, every PUT must be admitted by it first. A
+	PUT that has to wait for a token stays pending, so commands arriving while it
+	waits are still merged into it rather than queued behind it.
+
+	When a retry policy is attached, send may return False to report a
+	transient failure. The payload is then re-submitted after the policy's
+	backoff, unless a newer PUT for the same resource went out in the meantime
+	(it supersedes the retry). A retry that finds a newer payload pending is
+	merged underneath it, so retries never hold back newer commands. Once
+	the retry is scheduled, or given up on, failed is told which.
+
+	A critical command is not held for the window or a rate-limit slot: it is
+	merged over whatever is pending for its resource (it wins field by field)
+	and sent at once, taking the pending payload with it.
+
+		Parameters:
+			send (callable): Called as send(path, payload) to PUT a payload; returns
+			                 False if the PUT failed and may be retried.
+			schedule (callable): Called as schedule(delay, callback) to run callback
+			                     after delay seconds.
+			window (float): Coalescing window in seconds. 0 sends immediately.
+			limiter (BridgeRateLimiter, optional): Admission control keyed by rtype.
+			retry (RetryPolicy, optional): Backoff and budget for failed PUTs.
+			failed (callable, optional): Called as failed(path, retrying) after send
+			                             returned False; retrying is True if a retry
+			                             has been scheduled.
+	'''
+
+	def __init__(self, send, schedule, window=0.0, limiter=None, retry=None, failed=None):
+		self._send = send
+		self._schedule = schedule
+		self.window = window
+		self.limiter = limiter
+		self.retry = retry
+		self._failed_callback = failed
+		self._lock = threading.Lock()
+		self._pending: dict[str, dict] = {}
+		self._admitted: set[str] = set()
+		# Retries already made for the pending payload, and a per-path count of
+		# PUTs sent; a retry is stale once the count has moved past it.
+		self._attempts: dict[str, int] = {}
+		self._generation: dict[str, int] = {}
+		self._coalesced = 0
+		self._sent = 0
+		self._dropped = 0
+		self._retried = 0
+		self._superseded = 0
+		self._failed = 0
+		self._critical = 0
+		self._preempted = 0
+
+	def submit(self, path, payload, critical=False):
+		'''
+		Queues a payload for path, merging it into any payload already pending.
+
+			Parameters:
+				path (str): Resource path, e.g. 'light/<uuid>'.
+				payload (dict): Hue v2 PUT body.
+				critical (bool): Send now, bypassing the window and the rate limit.
+
+			Returns:
+				str: 'sent' if the payload was PUT immediately, 'coalesced' if it was
+				     merged into a pending payload, 'pending' if it opened a new window,
+				     'queued' if it is waiting for a rate-limit slot, or 'dropped' if
+				     the rate limiter refused it. A critical payload is always 'sent'.
+		'''
+		if critical:
+			return self._submit_critical(path, payload)
+		with self._lock:
+			if path in self._pending:
+				self._pending[path] = merge_payloads(self._pending[path], payload)
+				self._coalesced += 1
+				return 'coalesced'
+			self._pending[path] = dict(payload)
+			if self.window > 0:
+				outcome, delay = 'pending', self.window
+			else:
+				outcome, delay = self._admit(path)
+				if outcome == 'sent':
+					taken = self._take(path)
+		if outcome == 'sent':
+			self._deliver(path, *taken)
+		elif delay is not None:
+			self._schedule(delay, lambda: self.flush(path))
+		return outcome
+
+	def _submit_critical(self, path, payload):
+		with self._lock:
+			pending = self._pending.get(path)
+			if pending is None:
+				self._pending[path] = dict(payload)
+			else:
+				# The window or rate-limit slot the pending payload waits for is
+				# abandoned; its scheduled flush will find nothing to send.
+				self._pending[path] = merge_payloads(pending, payload)
+				self._preempted += 1
+			self._critical += 1
+			# A pending payload already queued by the limiter has its token
+			# reserved; this PUT uses that one rather than taking a second.
+			if self.limiter is not None and path not in self._admitted:
+				self.limiter.admit(path.split('/', 1)[0], critical=True)
+			taken = self._take(path)
+		self._deliver(path, *taken)
+		return 'sent'
+
+	def flush(self, path, force=False):
+		'''
+		Sends the pending payload for path, if any and if the rate limiter admits it.
+		A payload that must wait for a slot stays pending and is retried when due.
+
+			Parameters:
+				path (str): Resource path whose window has closed.
+				force (bool): Bypass the rate limiter (used when shutting down).
+		'''
+		with self._lock:
+			if path not in self._pending:
+				return
+			if force or path in self._admitted:
+				outcome, delay = 'sent', None
+			else:
+				outcome, delay = self._admit(path)
+			taken = self._take(path) if outcome == 'sent' else None
+		if taken is not None:
+			self._deliver(path, *taken)
+		elif delay is not None:
+			self._schedule(delay, lambda: self.flush(path))
+
+	def flush_all(self):
+		'''Sends every pending payload immediately, e.g. before shutdown.'''
+		with self._lock:
+			paths = list(self._pending)
+		for path in paths:
+			self.flush(path, force=True)
+
+	def stats(self):
+		'''
+		Returns:
+			dict: window (seconds), pending (resources awaiting a PUT),
+			      coalesced (commands merged away), sent (PUTs issued),
+			      dropped (PUTs refused by the rate limiter), retried (failed
+			      PUTs scheduled again), superseded (retries dropped because a
+			      newer PUT went out), failed (PUTs given up on), critical
+			      (critical commands sent at once) and preempted (pending
+			      payloads sent early with a critical command).
+		'''
+		with self._lock:
+			return {
+				"window": self.window,
+				"pending": len(self._pending),
+				"coalesced": self._coalesced,
+				"sent": self._sent,
+				"dropped": self._dropped,
+				"retried": self._retried,
+				"superseded": self._superseded,
+				"failed": self._failed,
+				"critical": self._critical,
+				"preempted": self._preempted,
+			}
+
+	def _deliver(self, path, payload, generation, attempt):
+		# Sends outside the lock; on a retryable failure schedules a retry.
+		if self._send(path, payload) is not False:
+			return
+		delay = self.retry.backoff(attempt) if self.retry is not None else None
+		if delay is not None:
+			with self._lock:
+				self._retried += 1
+			self._schedule(delay, lambda: self._retry(path, payload, generation, attempt + 1))
+		elif self.retry is not None:
+			with self._lock:
+				self._failed += 1
+		if self._failed_callback is not None:
+			self._failed_callback(path, delay is not None)
+
+	def _retry(self, path, payload, generation, attempt):
+		with self._lock:
+			if self._generation.get(path) != generation:
+				self._superseded += 1
+				return
+			if path in self._pending:
+				# A newer command is waiting for its window; it wins field by field.
+				self._pending[path] = merge_payloads(payload, self._pending[path])
+				self._attempts[path] = max(attempt, self._attempts.get(path, 0))
+				return
+			self._pending[path] = payload
+			self._attempts[path] = attempt
+			outcome, delay = self._admit(path)
+			taken = self._take(path) if outcome == 'sent' else None
+		if taken is not None:
+			self._deliver(path, *taken)
+		elif delay is not None:
+			self._schedule(delay, lambda: self.flush(path))
+
+	def _admit(self, path):
+		# Caller holds self._lock and has already stored the pending payload.
+		# Returns (outcome, delay-until-flush); delay is None when nothing is scheduled.
+		if self.limiter is None:
+			return 'sent', None
+		outcome, wait = self.limiter.admit(path.split('/', 1)[0])
+		if outcome == 'queued':
+			self._admitted.add(path)
+			return 'queued', wait
+		if outcome == 'dropped':
+			self._pending.pop(path, None)
+			self._attempts.pop(path, None)
+			self._dropped += 1
+			return 'dropped', None
+		return 'sent', None
+
+	def _take(self, path):
+		# Caller holds self._lock. Returns (payload, generation, attempt).
+		self._admitted.discard(path)
+		self._sent += 1
+		generation = self._generation.get(path, 0) + 1
+		self._generation[path] = generation
+		return self._pending.pop(path), generation, self._attempts.pop(path, 0)
@@ -0,0 +1,308 @@
+from __future__ import annotations
+
+from functools import lru_cache
+from itertools import chain
+
+try:
+	import numpy as np
+except ImportError:  # optional: pip install "OctoHue[numpy]"
+	np = None
+
+
+def _linearise(scale):
+	# sRGB transfer function: 0–1 encoded value to linear light.
+	if scale <= 0.04045:
+		return scale / 12.92
+	return ((scale + 0.055) / 1.055) ** 2.4
+
+
+# Linear-light value of every 8-bit sRGB channel value, so a conversion is
+# three lookups instead of three powers.
+SRGB_LINEAR = tuple(_linearise(value / 255.0) for value in range(256))
+
+# sRGB (D65) to CIE XYZ.
+SRGB_TO_XYZ = (
+	(0.4124, 0.3576, 0.1805),
+	(0.2126, 0.7152, 0.0722),
+	(0.0193, 0.1192, 0.9505),
+)
+
+# CIE XYZ of the D65 white point (Y = 1), the reference white for CIELAB.
+D65_WHITE = (0.95047, 1.0, 1.08883)
+
+# Batches smaller than this are converted in pure Python even when NumPy is
+# available; below it array setup costs more than the loop it replaces.
+NUMPY_MIN_BATCH = 32
+
+# Colour gamuts of Hue lamps as (red, green, blue) corners in CIE xy.
+# A: early LivingColors, B: first-generation Hue bulbs, C: current lamps.
+GAMUTS = {
+	"A": ((0.704, 0.296), (0.2151, 0.7106), (0.138, 0.08)),
+	"B": ((0.675, 0.322), (0.409, 0.518), (0.167, 0.04)),
+	"C": ((0.6915, 0.3083), (0.17, 0.7), (0.1532, 0.0475)),
+}
+
+
+def hex_to_rgb(value):
+	'''
+	Splits a '#RRGGBB' hex string into 8-bit channels.
+
+		Raises:
+			ValueError: If value is not a valid '#RRGGBB' hex string.
+	'''
+	try:
+		return int(value[1:3], 16), int(value[3:5], 16), int(value[5:], 16)
+	except (ValueError, TypeError):
+		raise ValueError("Invalid hex string format")
+
+
+def _channel(value):
+	if type(value) is int and 0 <= value <= 255:
+		return SRGB_LINEAR[value]
+	return _linearise(float(value) / 255.0)
+
+
+def _xy(red, green, blue):
+	r, g, b = _channel(red), _channel(green), _channel(blue)
+	(m00, m01, m02), (m10, m11, m12), (m20, m21, m22) = SRGB_TO_XYZ
+	x = m00 * r + m01 * g + m02 * b
+	y = m10 * r + m11 * g + m12 * b
+	z = m20 * r + m21 * g + m22 * b
+	total = x + y + z
+	if total == 0:
+		return None
+	return x / total, y / total
+
+
+@lru_cache(maxsize=1024)
+def rgb_to_xy(red, green, blue):
+	'''
+	Converts an sRGB colour to CIE 1931 xy chromaticity. Memoised: event
+	colours come from a short, fixed list, so almost every call is a cache hit.
+	Use rgb_to_xy_batch for effects, which would only churn the cache.
+
+		Parameters:
+			red, green, blue (int): Channel values, 0–255.
+
+		Returns:
+			tuple | None: (x, y), or None for black, which has no chromaticity.
+	'''
+	return _xy(red, green, blue)
+
+
+def _mirek_xy(mirek):
+	# Planckian locus approximation (Kim et al., 2002), valid 1667–25000 K.
+	kelvin = 1e6 / min(max(float(mirek), 40.0), 599.0)
+	t1, t2, t3 = 1e3 / kelvin, 1e6 / kelvin ** 2, 1e9 / kelvin ** 3
+	if kelvin <= 4000:
+		x = -0.2661239 * t3 - 0.2343589 * t2 + 0.8776956 * t1 + 0.179910
+	else:
+		x = -3.0258469 * t3 + 2.1070379 * t2 + 0.2226347 * t1 + 0.240390
+	if kelvin <= 2222:
+		y = -1.1063814 * x ** 3 - 1.34811020 * x ** 2 + 2.18555832 * x - 0.20219683
+	elif kelvin <= 4000:
+		y = -0.9549476 * x ** 3 - 1.37418593 * x ** 2 + 2.09137015 * x - 0.16748867
+	else:
+		y = 3.0817580 * x ** 3 - 5.87338670 * x ** 2 + 3.75112997 * x - 0.37001483
+	return x, y
+
+
+@lru_cache(maxsize=512)
+def mirek_to_xy(mirek):
+	'''
+	Converts a colour temperature to the xy of the matching white on the
+	Planckian locus, e.g. to fade between a white and a colour.
+
+		Parameters:
+			mirek (int | float): Colour temperature in mirek (153–500 on Hue lamps).
+
+		Returns:
+			tuple: (x, y).
+	'''
+	return _mirek_xy(mirek)
+
+
+def _rgb_triples(colours):
+	return [hex_to_rgb(c) if isinstance(c, str) else c for c in colours]
+
+
+def rgb_to_xy_batch(colours):
+	'''
+	Converts many colours in one call. With NumPy installed, batches of
+	NUMPY_MIN_BATCH or more are converted as one vectorised array operation;
+	otherwise (or for small batches) a table-driven Python loop is used. Both
+	give the same results as rgb_to_xy. Nothing is cached.
+
+		Parameters:
+			colours: (r, g, b) triples or '#RRGGBB' strings, or an (N, 3) array.
+
+		Returns:
+			list: (x, y) tuple per colour, None for black.
+
+		Raises:
+			ValueError: If a hex string is malformed.
+	'''
+	if np is not None and len(colours) >= NUMPY_MIN_BATCH:
+		return _rgb_to_xy_numpy(colours)
+	return [_xy(r, g, b) for r, g, b in _rgb_triples(colours)]
+
+
+def mirek_to_xy_batch(values):
+	'''
+	Converts many colour temperatures in one call, vectorised when NumPy is
+	installed (see rgb_to_xy_batch).
+
+		Parameters:
+			values: Colour temperatures in mirek.
+
+		Returns:
+			list: (x, y) tuple per value.
+	'''
+	if np is not None and len(values) >= NUMPY_MIN_BATCH:
+		return _mirek_to_xy_numpy(values)
+	return [_mirek_xy(m) for m in values]
+
+
+def _rgb_to_xy_numpy(colours):
+	if not isinstance(colours, np.ndarray):
+		# fromiter over a flat stream is several times faster than asarray on
+		# a list of tuples, which dominates the cost of a large batch.
+		triples = _rgb_triples(colours)
+		colours = np.fromiter(chain.from_iterable(triples), dtype=float, count=3 * len(triples)).reshape(-1, 3)
+	if colours.size and colours.min() >= 0 and colours.max() <= 255 and (
+			colours.dtype.kind in "iu" or np.array_equal(colours, np.floor(colours))):
+		linear = _srgb_linear_array()[colours.astype(np.intp)]
+	else:
+		scale = colours.astype(float) / 255.0
+		linear = np.where(scale <= 0.04045, scale / 12.92, ((scale + 0.055) / 1.055) ** 2.4)
+	xyz = linear @ _srgb_to_xyz_array().T
+	total = xyz.sum(axis=1)
+	with np.errstate(invalid="ignore", divide="ignore"):
+		xy = xyz[:, :2] / total[:, None]
+	result = list(map(tuple, xy.tolist()))
+	for i in np.flatnonzero(total == 0).tolist():
+		result[i] = None
+	return result
+
+
+def _mirek_to_xy_numpy(values):
+	kelvin = 1e6 / np.clip(np.asarray(values, dtype=float), 40.0, 599.0)
+	t1, t2, t3 = 1e3 / kelvin, 1e6 / kelvin ** 2, 1e9 / kelvin ** 3
+	x = np.where(
+		kelvin <= 4000,
+		-0.2661239 * t3 - 0.2343589 * t2 + 0.8776956 * t1 + 0.179910,
+		-3.0258469 * t3 + 2.1070379 * t2 + 0.2226347 * t1 + 0.240390,
+	)
+	x2, x3 = x ** 2, x ** 3
+	y = np.select(
+		[kelvin <= 2222, kelvin <= 4000],
+		[
+			-1.1063814 * x3 - 1.34811020 * x2 + 2.18555832 * x - 0.20219683,
+			-0.9549476 * x3 - 1.37418593 * x2 + 2.09137015 * x - 0.16748867,
+		],
+		3.0817580 * x3 - 5.87338670 * x2 + 3.75112997 * x - 0.37001483,
+	)
+	return list(zip(x.tolist(), y.tolist()))
+
+
+@lru_cache(maxsize=1)
+def _srgb_linear_array():
+	return np.array(SRGB_LINEAR)
+
+
+@lru_cache(maxsize=1)
+def _srgb_to_xyz_array():
+	return np.array(SRGB_TO_XYZ)
+
+
+def _lab_f(t):
+	return t ** (1.0 / 3.0) if t > 216.0 / 24389.0 else (24389.0 / 27.0 * t + 16.0) / 116.0
+
+
+def xy_to_lab(xy, luminance=1.0):
+	'''
+	Converts a chromaticity at a given relative luminance to CIELAB (D65).
+	A lamp's colour (xy) and brightness are set separately, so a colour change
+	is compared at equal luminance.
+
+		Parameters:
+			xy (tuple): (x, y) chromaticity; y must be above 0.
+			luminance (float): Relative luminance Y, 0–1.
+
+		Returns:
+			tuple: (L*, a*, b*).
+	'''
+	x, y = xy
+	big_x = x / y * luminance
+	big_z = (1.0 - x - y) / y * luminance
+	fx, fy, fz = (_lab_f(v / w) for v, w in zip((big_x, luminance, big_z), D65_WHITE))
+	return 116.0 * fy - 16.0, 500.0 * (fx - fy), 200.0 * (fy - fz)
+
+
+def delta_e(lab1, lab2):
+	'''
+	CIE76 colour difference: Euclidean distance in CIELAB. About 2.3 is the
+	smallest difference most people notice side by side.
+	'''
+	return ((lab1[0] - lab2[0]) ** 2 + (lab1[1] - lab2[1]) ** 2 + (lab1[2] - lab2[2]) ** 2) ** 0.5
+
+
+def gamut_of(resource):
+	'''
+	Reads a light's colour gamut from its v2 resource.
+
+		Parameters:
+			resource (dict | None): A light resource as returned by the bridge.
+
+		Returns:
+			tuple | None: (red, green, blue) corners as (x, y) pairs, or None if
+			              the light reports no usable gamut (e.g. white-only lamps).
+	'''
+	color = (resource or {}).get("color")
+	if not isinstance(color, dict):
+		return None
+	gamut = color.get("gamut")
+	if isinstance(gamut, dict):
+		try:
+			return tuple((float(gamut[c]["x"]), float(gamut[c]["y"])) for c in ("red", "green", "blue"))
+		except (KeyError, TypeError, ValueError):
+			pass
+	return GAMUTS.get(color.get("gamut_type"))
+
+
+def _cross(o, a, b):
+	return (a[0] - o[0]) * (b[1] - o[1]) - (a[1] - o[1]) * (b[0] - o[0])
+
+
+def _closest_on_segment(p, a, b):
+	dx, dy = b[0] - a[0], b[1] - a[1]
+	length = dx * dx + dy * dy
+	t = 0.0 if length == 0 else max(0.0, min(1.0, ((p[0] - a[0]) * dx + (p[1] - a[1]) * dy) / length))
+	return a[0] + t * dx, a[1] + t * dy
+
+
+def clamp_to_gamut(xy, gamut):
+	'''
+	Moves an xy point that a lamp cannot show to the nearest colour it can:
+	the closest point on the edge of its gamut triangle.
+
+		Parameters:
+			xy (tuple | list): (x, y) chromaticity.
+			gamut (tuple | None): (red, green, blue) corners, e.g. from gamut_of.
+
+		Returns:
+			tuple: (x, y), unchanged if it is inside the gamut or gamut is None.
+	'''
+	if gamut is None:
+		return tuple(xy)
+	red, green, blue = gamut
+	p = (xy[0], xy[1])
+	d1, d2, d3 = _cross(red, green, p), _cross(green, blue, p), _cross(blue, red, p)
+	if (d1 >= 0 and d2 >= 0 and d3 >= 0) or (d1 <= 0 and d2 <= 0 and d3 <= 0):
+		return p
+	candidates = (
+		_closest_on_segment(p, red, green),
+		_closest_on_segment(p, green, blue),
+		_closest_on_segment(p, blue, red),
+	)
+	return min(candidates, key=lambda c: (c[0] - p[0]) ** 2 + (c[1] - p[1]) ** 2)
@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+from datetime import datetime, time as dtime
+
+
+def _parse_hhmm(value):
+	try:
+		return datetime.strptime(value, '%H:%M').time()
+	except (ValueError, TypeError):
+		return None
+
+
+def _int(value, default=0):
+	try:
+		return int(value)
+	except (ValueError, TypeError):
+		return default
+
+
+class ConfigSnapshot:
+	'''
+	Immutable copy of the settings read on every light command, taken once per
+	settings change so the hot paths (on_event, build_state, set_state,
+	toggle_state, night mode) never walk OctoPrint's layered settings tree.
+
+	Rebuilt and swapped in as a whole; a single attribute assignment is atomic,
+	so readers always see one consistent version.
+
+	Night-mode times are pre-parsed; nightmode_start/nightmode_end are None if
+	the stored value could not be parsed.
+	'''
+
+	__slots__ = (
+		"lampid",
+		"plugid",
+		"lampisgroup",
+		"defaultbri",
+		"togglebri",
+		"togglecolour",
+		"togglect",
+		"autopoweroff",
+		"nightmode_enabled",
+		"nightmode_start",
+		"nightmode_end",
+		"nightmode_action",
+		"nightmode_maxbri",
+		"progress_enabled",
+	)
+
+	lampid: str
+	plugid: str
+	lampisgroup: bool
+	defaultbri: int
+	togglebri: int
+	togglecolour: str | None
+	togglect: int
+	autopoweroff: bool
+	nightmode_enabled: bool
+	nightmode_start: dtime | None
+	nightmode_end: dtime | None
+	nightmode_action: str
+	nightmode_maxbri: int
+	progress_enabled: bool
+
+	def __init__(self, **values):
+		for name in self.__slots__:
+			object.__setattr__(self, name, values[name])
+
+	def __setattr__(self, name, value):
+		raise AttributeError(f"{type(self).__name__} is immutable")
+
+	def __repr__(self):
+		fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+		return f"{type(self).__name__}({fields})"
+
+	@classmethod
+	def from_settings(cls, settings):
+		'''
+		Reads every snapshot field from the plugin settings.
+
+			Parameters:
+				settings: The plugin's settings object (anything with get([key])).
+
+			Returns:
+				ConfigSnapshot: The new snapshot.
+		'''
+		def get(key):
+			return settings.get([key])
+
+		defaultbri = _int(get('defaultbri'), 100)
+		return cls(
+			lampid=get('lampid'),
+			plugid=get('plugid'),
+			lampisgroup=bool(get('lampisgroup')),
+			defaultbri=defaultbri,
+			togglebri=_int(get('togglebri')) or defaultbri,
+			togglecolour=get('togglecolour') or None,
+			togglect=_int(get('togglect')),
+			autopoweroff=bool(get('autopoweroff')),
+			nightmode_enabled=bool(get('nightmode_enabled')),
+			nightmode_start=_parse_hhmm(get('nightmode_start')),
+			nightmode_end=_parse_hhmm(get('nightmode_end')),
+			nightmode_action=get('nightmode_action'),
+			nightmode_maxbri=_int(get('nightmode_maxbri')) or 64,
+			progress_enabled=bool(get('progress_enabled')),
+		)
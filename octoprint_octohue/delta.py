@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+import threading
+
+from .eventstream import MIRRORED_FIELDS
+
+
+# Differences smaller than these are below what the bridge reports back
+# (brightness in 0.39% steps, xy to four decimals), so they are not changes.
+BRIGHTNESS_TOLERANCE = 0.5
+XY_TOLERANCE = 0.001
+
+# Fields that describe how to reach a state rather than the state itself; a
+# payload left with only these would change nothing.
+_TRANSIENT_FIELDS = ("dynamics",)
+
+
+def _ct_active(known):
+	ct = known.get("color_temperature") or {}
+	if ct.get("mirek") is None:
+		return False
+	return ct.get("mirek_valid", True)
+
+
+def _field_matches(field, value, known):
+	current = known.get(field)
+	if not isinstance(current, dict) or not isinstance(value, dict):
+		return False
+	if field == "on":
+		return set(value) == {"on"} and current.get("on") == value["on"]
+	if field == "dimming":
+		brightness = current.get("brightness")
+		return (set(value) == {"brightness"} and brightness is not None
+				and abs(brightness - value["brightness"]) < BRIGHTNESS_TOLERANCE)
+	if field == "color":
+		xy, want = current.get("xy") or {}, value.get("xy") or {}
+		if set(value) != {"xy"} or _ct_active(known) or "x" not in xy or "x" not in want:
+			return False
+		return abs(xy["x"] - want["x"]) < XY_TOLERANCE and abs(xy["y"] - want["y"]) < XY_TOLERANCE
+	if field == "color_temperature":
+		return set(value) == {"mirek"} and _ct_active(known) and current.get("mirek") == value["mirek"]
+	return False
+
+
+def diff_payload(known, payload):
+	'''
+	Removes the fields of a Hue v2 PUT payload that would not change the light.
+
+	on, dimming, color and color_temperature are dropped when the known state
+	already matches (colour only while the lamp is in xy mode, colour
+	temperature only while it is in ct mode). Everything else, alert
+	included, is always kept.
+
+		Parameters:
+			known (dict | None): Current state from the mirror, or None if unknown.
+			payload (dict): The PUT body about to be sent.
+
+		Returns:
+			dict | None: The fields still worth sending, or None if the PUT would
+			             change nothing and can be skipped.
+	'''
+	if not known:
+		return dict(payload)
+	trimmed = {
+		field: value for field, value in payload.items()
+		if field not in MIRRORED_FIELDS or not _field_matches(field, value, known)
+	}
+	if all(field in _TRANSIENT_FIELDS for field in trimmed):
+		return None
+	return trimmed
+
+
+def expected_update(rid, payload):
+	'''
+	Builds the mirror update a successful PUT of payload implies, so the
+	mirror is current before the bridge's own event arrives.
+
+		Parameters:
+			rid (str): Resource id the payload was sent to.
+			payload (dict): The PUT body that was sent.
+
+		Returns:
+			dict: An eventstream-style update item for LightStateMirror.apply.
+	'''
+	update = {"id": rid}
+	for field in MIRRORED_FIELDS:
+		if isinstance(payload.get(field), dict):
+			update[field] = dict(payload[field])
+	if "color" in payload:
+		update["color_temperature"] = {"mirek": None, "mirek_valid": False}
+	elif "color_temperature" in payload:
+		update["color_temperature"]["mirek_valid"] = True
+	return update
+
+
+class DeltaFilter:
+	'''
+	Compares each outgoing light PUT with the state held in the eventstream
+	mirror and sends only what differs. A PUT that would change nothing is
+	suppressed; one that partly matches is trimmed.
+
+	Only light resources are filtered. A grouped_light reports "on" if any
+	member is on and an average brightness, so matching it does not prove
+	every member already has the state.
+
+		Parameters:
+			mirror (LightStateMirror): Known light state; only used while live.
+	'''
+
+	def __init__(self, mirror):
+		self.mirror = mirror
+		self._lock = threading.Lock()
+		self.suppressed = 0
+		self.trimmed = 0
+
+	def filter(self, path, payload):
+		'''
+		Returns the payload to send for path.
+
+			Parameters:
+				path (str): Resource path, e.g. 'light/<uuid>'.
+				payload (dict): The PUT body the coalescer released.
+
+			Returns:
+				dict | None: payload unchanged, a trimmed copy, or None to skip the PUT.
+		'''
+		rtype, _, rid = path.partition('/')
+		if rtype != 'light' or not self.mirror.live:
+			return payload
+		delta = diff_payload(self.mirror.get(rid), payload)
+		with self._lock:
+			if delta is None:
+				self.suppressed += 1
+			elif len(delta) < len(payload):
+				self.trimmed += 1
+		return delta
+
+	def confirm(self, path, payload):
+		'''
+		Records a PUT the bridge accepted in the mirror, so a command sent
+		before the bridge's event arrives is compared with the new state.
+		'''
+		rtype, _, rid = path.partition('/')
+		if rtype in ('light', 'grouped_light') and rid:
+			self.mirror.apply(expected_update(rid, payload))
+
+	def stats(self):
+		'''
+		Returns:
+			dict: suppressed (PUTs skipped as no-ops) and trimmed (PUTs sent
+			      with unchanged fields removed).
+		'''
+		with self._lock:
+			return {"suppressed": self.suppressed, "trimmed": self.trimmed}
@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import deque
+
+
+# One successful bridge request in this many is written to octoprint.log at
+# INFO; with DEBUG enabled every one is. Failures are always logged, by the
+# caller, which has the response body or exception to hand.
+REQUEST_LOG_SAMPLE = 50
+
+# Bridge requests kept in memory for the getrequestlog API command.
+REQUEST_LOG_SIZE = 200
+
+
+class RequestLog:
+	'''
+	Sampled log of bridge REST requests with an in-memory ring buffer of the
+	most recent ones.
+
+	Recording a request appends a tuple to a bounded deque; nothing is
+	formatted unless a log line is actually written or the buffer is dumped.
+	Failed requests are buffered but not logged here (see REQUEST_LOG_SAMPLE).
+
+		Parameters:
+			logger (logging.Logger): Where sampled requests are logged.
+			sample (int): Log one successful request in this many at INFO (0 never).
+			size (int): Requests kept in the ring buffer.
+			clock (callable): Wall-clock time source for the buffered timestamps.
+	'''
+
+	def __init__(self, logger, sample=REQUEST_LOG_SAMPLE, size=REQUEST_LOG_SIZE, clock=time.time):
+		self._logger = logger
+		self.sample = sample
+		self._clock = clock
+		self._lock = threading.Lock()
+		self._ring: deque[tuple] = deque(maxlen=size)
+		self.seen = 0
+		self.logged = 0
+
+	def record(self, method, path, status=None, seconds=None, error=None, payload=None):
+		'''
+		Records one bridge request.
+
+			Parameters:
+				method (str): HTTP method.
+				path (str): Resource path relative to /clip/v2/resource/.
+				status (int, optional): HTTP status, None if no response arrived.
+				seconds (float, optional): Round-trip time, None if not sent.
+				error (str, optional): Why the request failed (connection error, HTTP
+				                       error status, bridge errors); None on success.
+				payload (dict, optional): Request body; kept by reference, not copied.
+		'''
+		with self._lock:
+			self.seen += 1
+			self._ring.append((self._clock(), method, path, status, seconds, error, payload))
+			if error is not None or status is None:
+				return
+			sampled = self.sample > 0 and self.seen % self.sample == 0
+			if sampled:
+				self.logged += 1
+		if self._logger.isEnabledFor(logging.DEBUG):
+			self._logger.debug("Hue API %s %s -> %s in %.1f ms payload=%s",
+							   method, path, status, seconds * 1e3, payload)
+		elif sampled:
+			self._logger.info("Hue API %s %s -> %s in %.1f ms (1 in %d requests logged)",
+							  method, path, status, seconds * 1e3, self.sample)
+
+	def dump(self):
+		'''
+		Returns:
+			list: Buffered requests, oldest first, each a dict with time (epoch
+			      seconds), method, path, status, ms, error and payload.
+		'''
+		with self._lock:
+			entries = list(self._ring)
+		return [
+			{
+				"time": round(when, 3),
+				"method": method,
+				"path": path,
+				"status": status,
+				"ms": round(seconds * 1e3, 2) if seconds is not None else None,
+				"error": error,
+				"payload": payload,
+			}
+			for when, method, path, status, seconds, error, payload in entries
+		]
+
+	def stats(self):
+		'''
+		Returns:
+			dict: requests seen, sampled lines written at INFO and requests buffered.
+		'''
+		with self._lock:
+			return {"seen": self.seen, "logged": self.logged, "buffered": len(self._ring)}
@@ -0,0 +1,272 @@
+from __future__ import annotations
+
+import contextvars
+import heapq
+import itertools
+import threading
+import time
+
+
+class _Job:
+	'''A single scheduled command. Ordered by due time, then submission order.'''
+
+	__slots__ = ("due", "seq", "device", "payload", "callback", "context", "slot", "critical")
+
+	def __init__(self, due, seq, device, payload, callback, context=None, slot=None, critical=False):
+		self.due = due
+		self.seq = seq
+		self.device = device
+		self.payload = payload
+		self.callback = callback
+		self.context = context
+		self.slot = slot
+		self.critical = critical
+
+	def __lt__(self, other):
+		return (self.due, self.seq) < (other.due, other.seq)
+
+
+class CommandDispatcher:
+	'''
+	Runs delayed light commands on one long-lived worker thread.
+
+	Jobs are (due_time, device, payload) entries kept in a heap ordered by due
+	time, so event delays, flash-then-off sequences and cooldown polling all
+	share a single thread instead of spawning a timer thread per action.
+
+	A job runs in a copy of the contextvars context it was submitted from, so
+	context such as the current event trace follows it onto the worker thread.
+
+	Jobs may be submitted into a slot (e.g. one per device). supersede(slot)
+	cancels everything still queued in it, so a newer event can replace the
+	delayed actions of an older one instead of racing them.
+
+	Critical jobs (e.g. a PrintFailed light change) have a heap of their own.
+	Once due, a critical job runs before every due normal job, however long
+	those have been waiting; a job already running is not interrupted.
+
+		Parameters:
+			handler (callable): Called as handler(device, payload) for jobs
+			                    submitted without an explicit callback.
+			logger (logging.Logger, optional): Receives errors raised by jobs.
+			clock (callable, optional): Monotonic time source, injectable for tests.
+	'''
+
+	def __init__(self, handler, logger=None, clock=time.monotonic):
+		self._handler = handler
+		self._logger = logger
+		self._clock = clock
+		self._heap: list[_Job] = []
+		self._critical: list[_Job] = []
+		self._slots: dict[object, list[_Job]] = {}
+		self._seq = itertools.count()
+		self._cond = threading.Condition()
+		self._thread: threading.Thread | None = None
+		self._running = False
+		self._processed = 0
+		self._last_lag = 0.0
+		self._max_lag = 0.0
+		self._superseded = 0
+		self._preempted = 0
+
+	def start(self):
+		'''Starts the worker thread. Calling start() on a running dispatcher is a no-op.'''
+		with self._cond:
+			if self._running:
+				return
+			self._running = True
+			self._thread = threading.Thread(target=self._run, name="OctoHueDispatcher", daemon=True)
+			self._thread.start()
+
+	def stop(self, timeout=2.0):
+		'''
+		Stops the worker thread. Jobs that have not yet fallen due are discarded.
+
+			Parameters:
+				timeout (float): Seconds to wait for the worker to exit.
+		'''
+		with self._cond:
+			self._running = False
+			self._heap.clear()
+			self._critical.clear()
+			self._slots.clear()
+			self._cond.notify_all()
+		thread = self._thread
+		if thread is not None and thread is not threading.current_thread():
+			thread.join(timeout)
+		self._thread = None
+
+	def submit(self, delay, device, payload=None, callback=None, slot=None, critical=False):
+		'''
+		Queues a job to run after delay seconds.
+
+			Parameters:
+				delay (float): Seconds from now until the job falls due.
+				device (str): UUID of the device the job targets (may be None).
+				payload (dict, optional): Keyword arguments for the job.
+				callback (callable, optional): Run as callback(**payload) instead of
+				                               the dispatcher's default handler.
+				slot (hashable, optional): Groups the job with others that a later
+				                           supersede(slot) cancels together.
+				critical (bool): Queue on the critical lane, ahead of normal jobs.
+
+			Returns:
+				_Job: The queued job.
+		'''
+		job = _Job(self._clock() + max(float(delay or 0), 0.0), next(self._seq), device, payload, callback,
+				   contextvars.copy_context(), slot, critical)
+		with self._cond:
+			heap = self._lane(job)
+			heapq.heappush(heap, job)
+			if slot is not None:
+				self._slots.setdefault(slot, []).append(job)
+			if heap[0] is job:
+				self._cond.notify()
+		return job
+
+	def cancel(self, job):
+		'''
+		Removes a queued job so it never runs.
+
+			Parameters:
+				job (_Job): A job returned by submit.
+
+			Returns:
+				bool: True if the job was still queued, False if it had already run
+				      (or was cancelled before).
+		'''
+		with self._cond:
+			heap = self._lane(job)
+			try:
+				heap.remove(job)
+			except ValueError:
+				return False
+			heapq.heapify(heap)
+			self._leave_slot(job)
+			self._cond.notify()
+		return True
+
+	def supersede(self, slot):
+		'''
+		Cancels every job still queued in slot. A job already running is not
+		interrupted.
+
+			Parameters:
+				slot (hashable): The slot given to submit.
+
+			Returns:
+				list[_Job]: The cancelled jobs, in due order.
+		'''
+		with self._cond:
+			jobs = self._slots.pop(slot, None)
+			if not jobs:
+				return []
+			cancelled = set(map(id, jobs))
+			self._heap = [job for job in self._heap if id(job) not in cancelled]
+			self._critical = [job for job in self._critical if id(job) not in cancelled]
+			heapq.heapify(self._heap)
+			heapq.heapify(self._critical)
+			self._superseded += len(jobs)
+			self._cond.notify()
+		return sorted(jobs)
+
+	def run_due(self, now=None):
+		'''
+		Runs every job whose due time has passed on the calling thread: due
+		critical jobs first, then the rest, each lane in due order.
+
+			Parameters:
+				now (float, optional): Current clock value. Defaults to the dispatcher clock.
+
+			Returns:
+				int: Number of jobs run.
+		'''
+		ran = 0
+		while True:
+			with self._cond:
+				current = self._clock() if now is None else now
+				normal_due = bool(self._heap) and self._heap[0].due <= current
+				if self._critical and self._critical[0].due <= current:
+					job = heapq.heappop(self._critical)
+					if normal_due and self._heap[0] < job:
+						self._preempted += 1
+				elif normal_due:
+					job = heapq.heappop(self._heap)
+				else:
+					return ran
+				self._leave_slot(job)
+				lag = current - job.due
+				self._last_lag = lag
+				self._max_lag = max(self._max_lag, lag)
+			self._execute(job)
+			ran += 1
+
+	def stats(self):
+		'''
+		Returns a snapshot of dispatcher health.
+
+			Returns:
+				dict: depth (queued jobs), critical (of which on the critical lane),
+				      lag and max_lag (seconds between a job falling due and
+				      starting), processed (jobs run), superseded (jobs cancelled by
+				      a newer submission to their slot), preempted (critical jobs run
+				      ahead of an earlier-due normal job) and running.
+		'''
+		with self._cond:
+			return {
+				"depth": len(self._heap) + len(self._critical),
+				"critical": len(self._critical),
+				"lag": self._last_lag,
+				"max_lag": self._max_lag,
+				"processed": self._processed,
+				"superseded": self._superseded,
+				"preempted": self._preempted,
+				"running": self._running,
+			}
+
+	def _lane(self, job):
+		return self._critical if job.critical else self._heap
+
+	def _leave_slot(self, job):
+		# Caller holds self._cond.
+		if job.slot is None:
+			return
+		jobs = self._slots.get(job.slot)
+		if jobs is not None:
+			jobs.remove(job)
+			if not jobs:
+				del self._slots[job.slot]
+
+	def _execute(self, job):
+		try:
+			if job.context is not None:
+				job.context.run(self._call, job)
+			else:
+				self._call(job)
+		except Exception as e:
+			if self._logger is not None:
+				self._logger.error("Dispatcher job for %s failed: %s", job.device, e)
+		finally:
+			with self._cond:
+				self._processed += 1
+
+	def _call(self, job):
+		if job.callback is not None:
+			job.callback(**(job.payload or {}))
+		else:
+			self._handler(job.device, job.payload or {})
+
+	def _run(self):
+		while True:
+			with self._cond:
+				if not self._running:
+					return
+				heads = [heap[0].due for heap in (self._critical, self._heap) if heap]
+				if not heads:
+					self._cond.wait()
+					continue
+				wait = min(heads) - self._clock()
+				if wait > 0:
+					self._cond.wait(wait)
+					continue
+			self.run_due()
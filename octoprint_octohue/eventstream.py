@@ -0,0 +1,241 @@
+from __future__ import annotations
+
+import json
+import threading
+
+
+# Resource fields mirrored from the bridge. Everything else in a light or
+# grouped_light resource is either static metadata or irrelevant to OctoHue.
+MIRRORED_FIELDS = ("on", "dimming", "color", "color_temperature")
+
+
+def parse_sse(lines):
+	'''
+	Parses a Server-Sent Events line stream into (event_id, data) pairs.
+
+	Handles multi-line data fields, comment lines (": hi") and both bytes and
+	str input with or without trailing newlines.
+
+		Parameters:
+			lines (iterable): Raw lines from the HTTP response body.
+
+		Yields:
+			tuple[str | None, str]: The event id (None if the event carried none)
+			                        and the joined data payload.
+	'''
+	event_id = None
+	data = []
+	for line in lines:
+		if isinstance(line, bytes):
+			line = line.decode("utf-8", errors="replace")
+		line = line.rstrip("\r\n")
+		if not line:
+			if data:
+				yield event_id, "\n".join(data)
+			event_id = None
+			data = []
+			continue
+		if line.startswith(":"):
+			continue
+		field, _, value = line.partition(":")
+		if value.startswith(" "):
+			value = value[1:]
+		if field == "data":
+			data.append(value)
+		elif field == "id":
+			event_id = value
+	if data:
+		yield event_id, "\n".join(data)
+
+
+class LightStateMirror:
+	'''
+	Thread-safe in-memory copy of the on/dimming/color state of every light and
+	grouped_light resource, kept current by the bridge eventstream.
+
+	The mirror is only trusted while live is True, i.e. while the eventstream is
+	connected and the mirror has been seeded from a full REST read.
+	'''
+
+	def __init__(self):
+		self._lock = threading.Lock()
+		self._resources: dict[str, dict] = {}
+		self.live = False
+
+	def seed(self, resources):
+		'''
+		Replaces or adds resources from a REST response.
+
+			Parameters:
+				resources (list[dict]): 'data' entries from a GET on light or grouped_light.
+		'''
+		with self._lock:
+			for resource in resources:
+				rid = resource.get("id")
+				if rid:
+					self._resources[rid] = {
+						field: dict(resource[field]) for field in MIRRORED_FIELDS if isinstance(resource.get(field), dict)
+					}
+
+	def apply(self, update):
+		'''
+		Merges a partial resource update (an eventstream 'update' data item).
+
+			Parameters:
+				update (dict): Must contain 'id'; any mirrored field present is merged.
+		'''
+		rid = update.get("id")
+		if not rid:
+			return
+		with self._lock:
+			state = self._resources.setdefault(rid, {})
+			for field in MIRRORED_FIELDS:
+				value = update.get(field)
+				if isinstance(value, dict):
+					state.setdefault(field, {}).update(value)
+
+	def remove(self, rid):
+		'''Forgets a deleted resource.'''
+		with self._lock:
+			self._resources.pop(rid, None)
+
+	def get(self, rid):
+		'''
+		Returns:
+			dict | None: A copy of the mirrored state for rid, or None if unknown.
+		'''
+		with self._lock:
+			state = self._resources.get(rid)
+			return {field: dict(value) for field, value in state.items()} if state is not None else None
+
+	def is_on(self, rid):
+		'''
+		Returns:
+			bool | None: The mirrored on/off state, or None if unknown or not live.
+		'''
+		if not self.live:
+			return None
+		with self._lock:
+			return self._resources.get(rid, {}).get("on", {}).get("on")
+
+	def __len__(self):
+		with self._lock:
+			return len(self._resources)
+
+
+class EventStreamClient:
+	'''
+	Background subscriber to the Hue v2 eventstream (/eventstream/clip/v2).
+
+	Reconnects with exponential backoff, sending the last seen event id as
+	Last-Event-ID so the bridge can resume where the previous connection ended.
+
+		Parameters:
+			connect (callable): Called as connect(last_event_id) and returns the
+			                    open stream: an iterable of lines, or an object with
+			                    iter_lines(). close() is called on it when done.
+			on_events (callable): Called with each decoded list of bridge events.
+			on_connect (callable, optional): Called after each successful connect,
+			                                 before any event is read.
+			on_disconnect (callable, optional): Called whenever the stream ends.
+			logger (logging.Logger, optional): Receives connection errors.
+			backoff (tuple[float, float]): Initial and maximum reconnect delay (s).
+	'''
+
+	def __init__(self, connect, on_events, on_connect=None, on_disconnect=None, logger=None, backoff=(1.0, 30.0)):
+		self._connect = connect
+		self._on_events = on_events
+		self._on_connect = on_connect
+		self._on_disconnect = on_disconnect
+		self._logger = logger
+		self._backoff = backoff
+		self._stop = threading.Event()
+		self._thread: threading.Thread | None = None
+		self._stream = None
+		self.connected = False
+		self.last_event_id: str | None = None
+		self.connects = 0
+		self.events = 0
+
+	def start(self):
+		'''Starts the subscriber thread. A no-op if it is already running.'''
+		if self._thread is not None and self._thread.is_alive():
+			return
+		self._stop.clear()
+		self._thread = threading.Thread(target=self._run, name="OctoHueEventStream", daemon=True)
+		self._thread.start()
+
+	def stop(self, timeout=2.0):
+		'''
+		Stops the subscriber and closes the open stream.
+
+			Parameters:
+				timeout (float): Seconds to wait for the thread to exit.
+		'''
+		self._stop.set()
+		self._close()
+		thread = self._thread
+		if thread is not None and thread is not threading.current_thread():
+			thread.join(timeout)
+		self._thread = None
+
+	def stats(self):
+		'''
+		Returns:
+			dict: connected, connects (successful connections), events received
+			      and the last event id.
+		'''
+		return {
+			"connected": self.connected,
+			"connects": self.connects,
+			"events": self.events,
+			"last_event_id": self.last_event_id,
+		}
+
+	def _close(self):
+		stream, self._stream = self._stream, None
+		close = getattr(stream, "close", None)
+		if close is not None:
+			try:
+				close()
+			except Exception:
+				pass
+
+	def _run(self):
+		delay = self._backoff[0]
+		while not self._stop.is_set():
+			received = False
+			try:
+				self._stream = self._connect(self.last_event_id)
+				self.connected = True
+				self.connects += 1
+				if self._on_connect is not None:
+					self._on_connect()
+				stream = self._stream
+				lines = stream.iter_lines() if hasattr(stream, "iter_lines") else stream
+				for event_id, data in parse_sse(lines):
+					if self._stop.is_set():
+						break
+					if event_id:
+						self.last_event_id = event_id
+					try:
+						events = json.loads(data)
+					except ValueError:
+						continue
+					received = True
+					self.events += 1
+					self._on_events(events if isinstance(events, list) else [events])
+			except Exception as e:
+				if self._logger is not None and not self._stop.is_set():
+					self._logger.warning("Hue eventstream disconnected: %s", e)
+			finally:
+				was_connected = self.connected
+				self.connected = False
+				self._close()
+				if was_connected and self._on_disconnect is not None:
+					self._on_disconnect()
+			if received:
+				delay = self._backoff[0]
+			if self._stop.wait(delay):
+				return
+			delay = min(delay * 2, self._backoff[1])
@@ -0,0 +1,210 @@
+from __future__ import annotations
+
+import threading
+import time
+
+
+# Resource types whose addition, removal or renaming changes what the
+# settings panel lists. Events for anything else leave the cache valid.
+_INDEXED_TYPES = frozenset(("light", "grouped_light", "room", "zone"))
+
+
+class ResourceInventory:
+	'''
+	Cached index of the bridge's resources, built from a single bulk
+	GET /clip/v2/resource instead of one request per resource type.
+
+	Indexes are rebuilt together and swapped in atomically:
+	  - by rtype (light, room, zone, grouped_light, ...)
+	  - lights by archetype (plug, tableShade, ...)
+	  - room/zone id -> grouped_light id
+
+	The cache is invalidated by eventstream add/delete (and metadata rename)
+	notifications, by an explicit refresh, or when it is older than max_age.
+
+		Parameters:
+			fetch (callable): Returns the 'data' list of GET /clip/v2/resource.
+			                  Must raise on failure so errors are not cached.
+			max_age (float | None): Seconds before a cached inventory is refetched.
+			                        None keeps it until invalidated.
+			logger (logging.Logger, optional): Receives refresh errors.
+			clock (callable): Monotonic time source.
+	'''
+
+	def __init__(self, fetch, max_age=300.0, logger=None, clock=time.monotonic):
+		self._fetch = fetch
+		self.max_age = max_age
+		self._logger = logger
+		self._clock = clock
+		self._refresh_lock = threading.Lock()
+		self._loaded_at: float | None = None
+		self._stale = True
+		self._by_id: dict[str, dict] = {}
+		self._by_type: dict[str, list[dict]] = {}
+		self._by_archetype: dict[str, list[dict]] = {}
+		self._group_light: dict[str, str] = {}
+		self.fetches = 0
+
+	def refresh(self):
+		'''
+		Fetches every resource and rebuilds the indexes.
+
+			Raises:
+				Exception: Whatever fetch raised; the previous indexes are kept.
+		'''
+		with self._refresh_lock:
+			self._load()
+
+	def ensure(self):
+		'''
+		Refreshes the inventory if it is stale, expired or was never loaded. On a
+		failed refresh the previous (possibly stale) indexes keep being served.
+		'''
+		if not self._needs_refresh():
+			return
+		with self._refresh_lock:
+			# A concurrent caller may have refreshed while we waited for the lock.
+			if not self._needs_refresh():
+				return
+			try:
+				self._load()
+			except Exception as e:
+				if self._logger is not None:
+					self._logger.warning("Hue resource inventory refresh failed: %s", e)
+
+	def invalidate(self):
+		'''Marks the inventory stale so the next read refetches it.'''
+		self._stale = True
+
+	def apply_events(self, events):
+		'''
+		Invalidates the cache when eventstream events add, delete or rename an
+		indexed resource. Plain state updates (on/off, colour) are ignored.
+
+			Parameters:
+				events (list[dict]): Bridge events with 'type' and 'data'.
+		'''
+		for event in events:
+			etype = event.get('type')
+			for item in event.get('data', []):
+				if item.get('type') not in _INDEXED_TYPES:
+					continue
+				if etype in ('add', 'delete') or 'metadata' in item or 'services' in item:
+					self.invalidate()
+					return
+
+	def by_type(self, rtype):
+		'''
+		Returns:
+			list[dict]: Every cached resource of rtype (raw bridge objects).
+		'''
+		self.ensure()
+		return list(self._by_type.get(rtype, []))
+
+	def get(self, rid):
+		'''
+		Returns:
+			dict | None: The cached resource with id rid.
+		'''
+		self.ensure()
+		return self._by_id.get(rid)
+
+	def peek(self, rid):
+		'''
+		Like get, but never refreshes: for hot paths that must not block on the
+		bridge. Whatever is cached, however stale, is returned.
+
+			Returns:
+				dict | None: The cached resource with id rid.
+		'''
+		return self._by_id.get(rid)
+
+	def lights(self, archetype=None):
+		'''
+		Lists lights in the shape the settings panel expects.
+
+			Parameters:
+				archetype (str, optional): Only return lights of this archetype.
+
+			Returns:
+				list[dict]: {'id', 'name', 'archetype'} per light.
+		'''
+		self.ensure()
+		source = self._by_type.get('light', []) if archetype is None else self._by_archetype.get(archetype, [])
+		return [
+			{"id": d['id'], "name": d.get('metadata', {}).get('name', ''), "archetype": d.get('metadata', {}).get('archetype', '')}
+			for d in source
+		]
+
+	def groups(self):
+		'''
+		Lists rooms and zones that have a grouped_light service.
+
+			Returns:
+				list[dict]: {'id': grouped_light id, 'name': room/zone name}.
+		'''
+		self.ensure()
+		groups = []
+		for rtype in ('room', 'zone'):
+			for item in self._by_type.get(rtype, []):
+				name = item.get('metadata', {}).get('name', '')
+				grouped_light_id = self._group_light.get(item.get('id'))
+				if grouped_light_id and name:
+					groups.append({'id': grouped_light_id, 'name': name})
+		return groups
+
+	def stats(self):
+		'''
+		Returns:
+			dict: resources cached, fetches made, whether the cache is stale and
+			      its age in seconds (None if never loaded).
+		'''
+		return {
+			"resources": len(self._by_id),
+			"fetches": self.fetches,
+			"stale": self._stale,
+			"age": None if self._loaded_at is None else self._clock() - self._loaded_at,
+		}
+
+	def _needs_refresh(self):
+		if self._stale or self._loaded_at is None:
+			return True
+		return self.max_age is not None and self._clock() - self._loaded_at > self.max_age
+
+	def _load(self):
+		# Caller holds self._refresh_lock. The stale flag is cleared before the
+		# fetch so an invalidation that arrives mid-fetch is not lost.
+		self._stale = False
+		try:
+			resources = self._fetch()
+		except Exception:
+			self._stale = True
+			raise
+		self._rebuild(resources)
+
+	def _rebuild(self, resources):
+		by_id = {}
+		by_type: dict[str, list[dict]] = {}
+		by_archetype: dict[str, list[dict]] = {}
+		group_light = {}
+		for resource in resources:
+			rid = resource.get('id')
+			rtype = resource.get('type')
+			if not rid or not rtype:
+				continue
+			by_id[rid] = resource
+			by_type.setdefault(rtype, []).append(resource)
+			if rtype == 'light':
+				archetype = resource.get('metadata', {}).get('archetype')
+				if archetype:
+					by_archetype.setdefault(archetype, []).append(resource)
+			elif rtype in ('room', 'zone'):
+				grouped_light_id = next(
+					(s['rid'] for s in resource.get('services', []) if s.get('rtype') == 'grouped_light'),
+					None
+				)
+				if grouped_light_id:
+					group_light[rid] = grouped_light_id
+		self._by_id, self._by_type, self._by_archetype, self._group_light = by_id, by_type, by_archetype, group_light
+		self._loaded_at = self._clock()
+		self.fetches += 1
@@ -0,0 +1,247 @@
+from __future__ import annotations
+
+import math
+import threading
+from bisect import bisect_left
+
+
+# Upper bounds (seconds) of the request latency buckets. A healthy bridge
+# answers on the LAN in 10–50 ms; the top buckets catch retries and timeouts.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Content type of the Prometheus text exposition format.
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value):
+	return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+	pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+	pairs.extend(f'{n}="{_escape(v)}"' for n, v in extra)
+	return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value):
+	if value == math.inf:
+		return "+Inf"
+	if isinstance(value, float) and value.is_integer():
+		return str(int(value))
+	return repr(value) if isinstance(value, float) else str(value)
+
+
+class Counter:
+	'''
+	A monotonically increasing count per label combination.
+
+	Each series is one dict entry keyed by its label values; inc() takes the
+	lock for a single dict update, so it is cheap enough for every request.
+
+		Parameters:
+			name (str): Metric name.
+			help (str): One-line description.
+			labels (tuple): Label names; inc() takes a value for each, in order.
+	'''
+
+	kind = "counter"
+
+	def __init__(self, name, help, labels=()):
+		self.name = name
+		self.help = help
+		self.labels = tuple(labels)
+		self._lock = threading.Lock()
+		self._values: dict[tuple, float] = {}
+
+	def inc(self, *labels, amount=1):
+		'''Adds amount to the series for labels.'''
+		with self._lock:
+			self._values[labels] = self._values.get(labels, 0) + amount
+
+	def value(self, *labels):
+		'''Returns the current count for labels (0 if never incremented).'''
+		with self._lock:
+			return self._values.get(labels, 0)
+
+	def snapshot(self):
+		'''
+		Returns:
+			list: {"labels": {...}, "value": n} per series.
+		'''
+		with self._lock:
+			items = list(self._values.items())
+		return [{"labels": dict(zip(self.labels, key)), "value": value} for key, value in sorted(items)]
+
+	def prometheus(self):
+		with self._lock:
+			items = sorted(self._values.items())
+		return [f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}" for key, value in items]
+
+
+class Histogram:
+	'''
+	Observations counted into fixed buckets per label combination, with their
+	sum and count, so percentiles can be estimated without keeping samples.
+
+	observe() is a bisect and three list updates under the lock; memory is
+	fixed per series no matter how many observations are made.
+
+		Parameters:
+			name (str): Metric name.
+			help (str): One-line description.
+			labels (tuple): Label names.
+			buckets (tuple): Sorted bucket upper bounds; +Inf is implied.
+	'''
+
+	kind = "histogram"
+
+	def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+		self.name = name
+		self.help = help
+		self.labels = tuple(labels)
+		self.buckets = tuple(sorted(buckets))
+		self._lock = threading.Lock()
+		# labels -> [count per bucket (last is +Inf), sum, count]
+		self._series: dict[tuple, list] = {}
+
+	def observe(self, value, *labels):
+		'''Records one observation (e.g. a latency in seconds) for labels.'''
+		index = bisect_left(self.buckets, value)
+		with self._lock:
+			series = self._series.get(labels)
+			if series is None:
+				series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+			series[0][index] += 1
+			series[1] += value
+			series[2] += 1
+
+	def _cumulative(self, counts):
+		total, result = 0, []
+		for count in counts:
+			total += count
+			result.append(total)
+		return result
+
+	def snapshot(self):
+		'''
+		Returns:
+			list: Per series its labels, cumulative bucket counts keyed by upper
+			      bound ('+Inf' last), sum and count.
+		'''
+		with self._lock:
+			items = [(key, list(s[0]), s[1], s[2]) for key, s in self._series.items()]
+		result = []
+		for key, counts, total, count in sorted(items):
+			bounds = [_format_value(b) for b in self.buckets] + ["+Inf"]
+			result.append({
+				"labels": dict(zip(self.labels, key)),
+				"buckets": dict(zip(bounds, self._cumulative(counts))),
+				"sum": round(total, 6),
+				"count": count,
+			})
+		return result
+
+	def prometheus(self):
+		with self._lock:
+			items = sorted((key, list(s[0]), s[1], s[2]) for key, s in self._series.items())
+		lines = []
+		for key, counts, total, count in items:
+			for bound, cumulative in zip(self.buckets + (math.inf,), self._cumulative(counts)):
+				labels = _format_labels(self.labels, key, (("le", _format_value(bound)),))
+				lines.append(f"{self.name}_bucket{labels} {cumulative}")
+			labels = _format_labels(self.labels, key)
+			lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+			lines.append(f"{self.name}_count{labels} {count}")
+		return lines
+
+
+class Gauge:
+	'''
+	A value read from a callback whenever metrics are collected, for state
+	that already lives elsewhere (queue depth, circuit state). Costs nothing
+	between collections.
+
+		Parameters:
+			name (str): Metric name.
+			help (str): One-line description.
+			read (callable): Returns a number, or None if there is nothing to report.
+	'''
+
+	kind = "gauge"
+
+	def __init__(self, name, help, read):
+		self.name = name
+		self.help = help
+		self._read = read
+
+	def value(self):
+		try:
+			return self._read()
+		except Exception:
+			return None
+
+	def snapshot(self):
+		return self.value()
+
+	def prometheus(self):
+		value = self.value()
+		return [] if value is None else [f"{self.name} {_format_value(value)}"]
+
+
+class MetricsRegistry:
+	'''
+	Holds the plugin's metrics and renders them as JSON (for the SimpleApi)
+	or in the Prometheus text exposition format.
+	'''
+
+	def __init__(self):
+		self._lock = threading.Lock()
+		self._metrics: dict[str, Counter | Histogram | Gauge] = {}
+
+	def _register(self, metric):
+		with self._lock:
+			if metric.name in self._metrics:
+				raise ValueError(f"Metric {metric.name} is already registered")
+			self._metrics[metric.name] = metric
+		return metric
+
+	def counter(self, name, help, labels=()):
+		'''Registers and returns a Counter.'''
+		return self._register(Counter(name, help, labels))
+
+	def histogram(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+		'''Registers and returns a Histogram.'''
+		return self._register(Histogram(name, help, labels, buckets))
+
+	def gauge(self, name, help, read):
+		'''Registers and returns a callback Gauge.'''
+		return self._register(Gauge(name, help, read))
+
+	def get(self, name):
+		'''Returns the metric registered as name, or None.'''
+		return self._metrics.get(name)
+
+	def snapshot(self):
+		'''
+		Returns:
+			dict: Metric name to its current value (gauges), series list
+			      (counters) or bucketed series list (histograms).
+		'''
+		with self._lock:
+			metrics = list(self._metrics.values())
+		return {metric.name: metric.snapshot() for metric in metrics}
+
+	def prometheus(self):
+		'''
+		Returns:
+			str: Every metric in the Prometheus text exposition format
+			     (PROMETHEUS_CONTENT_TYPE).
+		'''
+		with self._lock:
+			metrics = list(self._metrics.values())
+		lines = []
+		for metric in metrics:
+			lines.append(f"# HELP {metric.name} {metric.help}")
+			lines.append(f"# TYPE {metric.name} {metric.kind}")
+			lines.extend(metric.prometheus())
+		return "\n".join(lines) + "\n"
@@ -0,0 +1,267 @@
+from __future__ import annotations
+
+import threading
+import time
+
+
+# The plug may always be switched off once every hotend is this cool,
+# whatever powerofftemp says.
+COOLDOWN_FLOOR = 40
+
+# A reading this far above the threshold cancels the readings counted so far;
+# one between the threshold and threshold + HYSTERESIS neither counts nor
+# cancels, so sensor noise around the threshold cannot keep resetting it.
+HYSTERESIS = 2.0
+
+# Consecutive readings at or below the threshold needed before switching off,
+# so a single glitched reading (a loose thermistor reads cold) cannot cut
+# power to a hot printer.
+CONFIRM_READINGS = 2
+
+# Give up waiting after this many seconds of cooling and leave the plug on:
+# a hotend still hot after an hour is being heated on purpose.
+POWER_DOWN_TIMEOUT = 3600.0
+
+IDLE = "idle"
+WAITING = "waiting"
+COOLING = "cooling"
+OFF = "off"
+
+
+def max_tool_temp(temperatures):
+	'''
+	Returns the hottest tool's actual temperature from an OctoPrint temperature
+	dict ({"tool0": {"actual": ..., "target": ...}, "bed": {...}, ...}), or None
+	if it reports no tools.
+	'''
+	actual = [
+		value.get("actual") for key, value in (temperatures or {}).items()
+		if key.startswith("tool") and isinstance(value, dict)
+	]
+	actual = [float(a) for a in actual if a is not None]
+	return max(actual) if actual else None
+
+
+class PowerDownManager:
+	'''
+	Switches the printer plug off once the hotends have cooled, driven by
+	OctoPrint's temperature reports instead of polling.
+
+	States:
+	  idle:    nothing in progress.
+	  waiting: start() was called; the configured delay is running.
+	  cooling: subscribed to temperature reports; switches off once
+	           CONFIRM_READINGS consecutive reports are at or below the threshold.
+	           A report without tool temperatures counts as cool: there is no
+	           hotend to wait for.
+	  off:     the plug was switched off. Behaves like idle for start().
+
+	At most one power-down is in progress and it owns at most one scheduled
+	job (the delay while waiting, the safety timeout while cooling). start()
+	while waiting or cooling does nothing; cancel() returns to idle and removes
+	the job and the temperature subscription. A cooling power-down that times
+	out returns to idle with the plug left on.
+
+	Temperature reports arrive on OctoPrint's comm thread, so the reading is
+	only compared there; switching off is handed to schedule.
+
+		Parameters:
+			schedule (callable): schedule(delay, callback) runs callback later,
+			                     off the calling thread; returns a handle.
+			cancel_job (callable): cancel_job(handle) stops a scheduled callback.
+			subscribe (callable): subscribe(listener) starts calling
+			                      listener(temperatures) for every temperature
+			                      report; returns a callable that stops it.
+			read_temperatures (callable): Returns the current temperature dict.
+			switch_off (callable): Turns the plug off.
+			logger (logging.Logger, optional): Progress and warnings.
+			timeout (float): Seconds of cooling before giving up (plug left on).
+			clock (callable): Monotonic time source.
+	'''
+
+	def __init__(self, schedule, cancel_job, subscribe, read_temperatures, switch_off, logger=None,
+				 timeout=POWER_DOWN_TIMEOUT, clock=time.monotonic):
+		self._schedule = schedule
+		self._cancel_job = cancel_job
+		self._subscribe = subscribe
+		self._read_temperatures = read_temperatures
+		self._switch_off = switch_off
+		self._logger = logger
+		self.timeout = timeout
+		self._clock = clock
+		self._lock = threading.Lock()
+		self._state = IDLE
+		self._since = clock()
+		self._generation = 0
+		self._threshold = COOLDOWN_FLOOR
+		self._readings = 0
+		self._last_temp = None
+		self._job = None
+		self._unsubscribe = None
+		self.started = 0
+		self.duplicates = 0
+		self.cancelled = 0
+		self.switched_off = 0
+		self.timeouts = 0
+
+	@property
+	def state(self):
+		'''The current state: 'idle', 'waiting', 'cooling' or 'off'.'''
+		with self._lock:
+			return self._state
+
+	@property
+	def active(self):
+		'''True while a power-down is waiting or cooling.'''
+		with self._lock:
+			return self._state in (WAITING, COOLING)
+
+	def start(self, delay, threshold):
+		'''
+		Begins a power-down unless one is already in progress.
+
+			Parameters:
+				delay (float): Seconds to wait before watching temperatures.
+				threshold (float): Switch off once every tool is at or below this
+				                   (never lower than COOLDOWN_FLOOR).
+
+			Returns:
+				bool: True if a power-down was started, False if one was running.
+		'''
+		with self._lock:
+			if self._state in (WAITING, COOLING):
+				self.duplicates += 1
+				return False
+			self._enter(WAITING)
+			self._threshold = max(float(threshold or 0), COOLDOWN_FLOOR)
+			self._readings = 0
+			self._last_temp = None
+			self.started += 1
+			generation = self._generation
+			# Scheduled under the lock so cancel() always finds the job.
+			self._job = self._schedule(max(float(delay or 0), 0.0), lambda: self._begin_cooling(generation))
+		return True
+
+	def cancel(self, reason=None):
+		'''
+		Abandons a waiting or cooling power-down, leaving the plug on.
+
+			Parameters:
+				reason (str, optional): Logged, e.g. the event that cancelled it.
+
+			Returns:
+				bool: True if a power-down was in progress.
+		'''
+		with self._lock:
+			if self._state not in (WAITING, COOLING):
+				if self._state == OFF:
+					self._enter(IDLE)
+				return False
+			job, unsubscribe = self._finish(IDLE)
+			self.cancelled += 1
+		self._release(job, unsubscribe)
+		self._log("info", "Power-down cancelled%s", f" ({reason})" if reason else "")
+		return True
+
+	def _begin_cooling(self, generation):
+		with self._lock:
+			if self._state != WAITING or generation != self._generation:
+				return
+			self._enter(COOLING)
+			threshold = self._threshold
+			self._job = self._schedule(self.timeout, lambda: self._expire(generation))
+		self._log("debug", "Power-down: waiting for every tool to cool to %s°C", threshold)
+		unsubscribe = self._subscribe(self.on_temperatures)
+		with self._lock:
+			if self._state == COOLING and generation == self._generation:
+				self._unsubscribe = unsubscribe
+				unsubscribe = None
+		if unsubscribe is not None:
+			# Finished or cancelled while subscribing.
+			unsubscribe()
+			return
+		# Check the last known reading now rather than waiting for the next report.
+		self.on_temperatures(self._read_temperatures())
+
+	def on_temperatures(self, temperatures):
+		'''
+		Temperature report listener. Cheap: one comparison under the lock; the
+		switch-off itself is scheduled, not run on the reporting thread.
+		'''
+		temperature = max_tool_temp(temperatures)
+		with self._lock:
+			if self._state != COOLING:
+				return
+			self._last_temp = temperature
+			if temperature is None or temperature <= self._threshold:
+				self._readings += 1
+			elif temperature > self._threshold + HYSTERESIS:
+				self._readings = 0
+			if self._readings < CONFIRM_READINGS:
+				return
+			job, unsubscribe = self._finish(OFF)
+			self.switched_off += 1
+		self._release(job, unsubscribe)
+		if temperature is None:
+			self._log("info", "Power-down: no tool temperatures reported, switching the printer off")
+		else:
+			self._log("info", "Power-down: tools cooled to %s°C, switching the printer off", temperature)
+		self._schedule(0, self._switch_off)
+
+	def _expire(self, generation):
+		with self._lock:
+			if self._state != COOLING or generation != self._generation:
+				return
+			self._job = None  # this is the job; nothing to cancel
+			job, unsubscribe = self._finish(IDLE)
+			self.timeouts += 1
+			threshold = self._threshold
+		self._release(job, unsubscribe)
+		self._log("warning", "Power-down: tools did not cool to %s°C within %d s; leaving the printer on",
+				  threshold, self.timeout)
+
+	def _enter(self, state):
+		# Caller holds self._lock.
+		self._state = state
+		self._since = self._clock()
+
+	def _finish(self, state):
+		# Caller holds self._lock. Returns the job and unsubscribe callable to
+		# release once the lock is dropped.
+		self._enter(state)
+		self._generation += 1
+		job, self._job = self._job, None
+		unsubscribe, self._unsubscribe = self._unsubscribe, None
+		return job, unsubscribe
+
+	def _release(self, job, unsubscribe):
+		if job is not None:
+			self._cancel_job(job)
+		if unsubscribe is not None:
+			unsubscribe()
+
+	def _log(self, level, message, *args):
+		if self._logger is not None:
+			getattr(self._logger, level)(message, *args)
+
+	def stats(self):
+		'''
+		Returns:
+			dict: state, seconds spent in it, the threshold and last tool reading
+			      (while cooling), readings counted towards switching off, and
+			      power-downs started, duplicate requests ignored, cancellations,
+			      plugs switched off and timeouts.
+		'''
+		with self._lock:
+			return {
+				"state": self._state,
+				"for": round(self._clock() - self._since, 1),
+				"threshold": self._threshold if self._state in (WAITING, COOLING) else None,
+				"temperature": self._last_temp if self._state == COOLING else None,
+				"readings": self._readings if self._state == COOLING else 0,
+				"started": self.started,
+				"duplicates": self.duplicates,
+				"cancelled": self.cancelled,
+				"switched_off": self.switched_off,
+				"timeouts": self.timeouts,
+			}
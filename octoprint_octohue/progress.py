@@ -0,0 +1,187 @@
+from __future__ import annotations
+
+import threading
+import time
+
+from .colour import delta_e, hex_to_rgb, rgb_to_xy_batch, xy_to_lab
+
+
+MODE_COLOUR = "colour"
+MODE_BRIGHTNESS = "brightness"
+MODES = (MODE_COLOUR, MODE_BRIGHTNESS)
+
+# A progress update is only sent once the lamp would visibly change: the
+# colour by at least this CIE76 ΔE (2.3 is a just-noticeable difference side
+# by side; a lone lamp needs more) ...
+PROGRESS_DELTA_E = 5.0
+
+# ... or the brightness by at least this many percentage points.
+PROGRESS_BRI_STEP = 3.0
+
+# Least seconds between two progress updates, so a short print cannot spend
+# the bridge's command budget on its progress bar.
+PROGRESS_MIN_INTERVAL = 5.0
+
+# Brightness at 0% in brightness mode.
+PROGRESS_MIN_BRI = 5
+
+
+class RampStep:
+	'''One precomputed point of a progress ramp: what to send and how it looks.'''
+
+	__slots__ = ("percent", "xy", "bri", "lab")
+
+	def __init__(self, percent, xy, bri):
+		self.percent = percent
+		self.xy = xy
+		self.bri = bri
+		# None for black, which has no chromaticity to compare.
+		self.lab = xy_to_lab(xy) if xy is not None else None
+
+
+def build_ramp(mode, start, end, bri):
+	'''
+	Precomputes the lamp state for every whole percent, so a progress tick is
+	an index lookup.
+
+		Parameters:
+			mode (str): 'colour' fades from start to end at brightness bri;
+			            'brightness' shows end, dimmed from PROGRESS_MIN_BRI at 0%
+			            up to bri at 100%.
+			start (str): '#RRGGBB' colour at 0% (colour mode).
+			end (str): '#RRGGBB' colour at 100%.
+			bri (int): Brightness, 1–100%.
+
+		Returns:
+			tuple[RampStep, ...]: 101 steps, index = percent.
+
+		Raises:
+			ValueError: If mode is unknown or a colour is malformed.
+	'''
+	if mode not in MODES:
+		raise ValueError(f"progress mode {mode!r} is not one of {', '.join(MODES)}")
+	bri = min(max(int(bri), 1), 100)
+	if mode == MODE_COLOUR:
+		a, b = hex_to_rgb(start), hex_to_rgb(end)
+		colours = [
+			tuple(round(ca + (cb - ca) * percent / 100) for ca, cb in zip(a, b))
+			for percent in range(101)
+		]
+		return tuple(RampStep(p, xy, bri) for p, xy in enumerate(rgb_to_xy_batch(colours)))
+	[xy] = rgb_to_xy_batch([end])
+	low = min(PROGRESS_MIN_BRI, bri)
+	return tuple(RampStep(p, xy, round(low + (bri - low) * p / 100)) for p in range(101))
+
+
+class ProgressLight:
+	'''
+	Turns print progress ticks into lamp updates along a precomputed ramp,
+	sending one only when it is perceptible and affordable:
+	  - the colour moved by PROGRESS_DELTA_E or the brightness by
+	    PROGRESS_BRI_STEP since the last update sent, and
+	  - PROGRESS_MIN_INTERVAL has passed since then, and
+	  - budget() reports a rate-limit token free now, so progress never
+	    queues behind or delays event traffic.
+	100% is exempt from all three, so a print always ends on the end colour
+	(at worst queued behind event traffic, once per print). A skipped tick is
+	not queued; the next tick compares against the last update actually
+	sent, so nothing is lost. The plugin calls reset() when a print starts,
+	fails or is cancelled.
+
+		Parameters:
+			ramp (tuple[RampStep, ...]): From build_ramp.
+			send (callable): send(step) applies a ramp step to the lamp.
+			budget (callable, optional): Returns False while the bridge rate
+			                             limit has no token to spare.
+			clock (callable): Monotonic time source.
+			delta_e (float): Least perceptible colour change.
+			bri_step (float): Least perceptible brightness change.
+			min_interval (float): Least seconds between updates.
+	'''
+
+	def __init__(self, ramp, send, budget=None, clock=time.monotonic, delta_e=PROGRESS_DELTA_E,
+				 bri_step=PROGRESS_BRI_STEP, min_interval=PROGRESS_MIN_INTERVAL):
+		self.ramp = ramp
+		self._send = send
+		self._budget = budget
+		self._clock = clock
+		self.delta_e = delta_e
+		self.bri_step = bri_step
+		self.min_interval = min_interval
+		self._lock = threading.Lock()
+		self._last: RampStep | None = None
+		self._last_sent = float("-inf")
+		self._percent = -1
+		self.ticks = 0
+		self.sent = 0
+		self.imperceptible = 0
+		self.throttled = 0
+
+	def update(self, percent):
+		'''
+		Handles one progress tick.
+
+			Parameters:
+				percent (float): Print progress, 0–100.
+
+			Returns:
+				str: 'sent', 'imperceptible' (the lamp would not visibly change)
+				     or 'throttled' (too soon, or no rate budget).
+		'''
+		percent = min(max(int(percent), 0), 100)
+		with self._lock:
+			self.ticks += 1
+			if percent < self._percent:
+				# A new print (or a restart): show its start straight away.
+				self._last = None
+				self._last_sent = float("-inf")
+			self._percent = percent
+			step = self.ramp[percent]
+			if step is self._last or (percent < 100 and not self._perceptible(step)):
+				self.imperceptible += 1
+				return 'imperceptible'
+			now = self._clock()
+			if percent < 100 and now - self._last_sent < self.min_interval:
+				self.throttled += 1
+				return 'throttled'
+			if percent < 100 and self._budget is not None and not self._budget():
+				self.throttled += 1
+				return 'throttled'
+			self._last = step
+			self._last_sent = now
+			self.sent += 1
+		self._send(step)
+		return 'sent'
+
+	def reset(self):
+		'''Forgets the last update, so the next tick is sent (e.g. a new print).'''
+		with self._lock:
+			self._last = None
+			self._last_sent = float("-inf")
+			self._percent = -1
+
+	def _perceptible(self, step):
+		# Caller holds self._lock.
+		last = self._last
+		if last is None:
+			return True
+		if abs(step.bri - last.bri) >= self.bri_step:
+			return True
+		if step.lab is None or last.lab is None:
+			return (step.lab is None) != (last.lab is None)
+		return delta_e(step.lab, last.lab) >= self.delta_e
+
+	def stats(self):
+		'''
+		Returns:
+			dict: last percent seen, progress ticks, updates sent, ticks skipped
+			      as imperceptible and ticks skipped for time or rate budget.
+		'''
+		with self._lock:
+			return {
+				"percent": self._percent if self._percent >= 0 else None,
+				"ticks": self.ticks,
+				"sent": self.sent,
+				"imperceptible": self.imperceptible,
+				"throttled": self.throttled,
+			}
@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import threading
+import time
+
+
+# Documented Hue bridge command limits: roughly 10 commands/s to light
+# resources and 1 command/s to grouped_light resources. Anything beyond
+# that is answered with 429/503 or silently dropped by the bridge.
+BRIDGE_LIMITS = {
+	'light': (10.0, 10),
+	'grouped_light': (1.0, 1),
+}
+
+# How far into the future a command may be queued before it is dropped.
+DEFAULT_MAX_WAIT = 10.0
+
+
+class TokenBucket:
+	'''
+	Classic token bucket that hands out reservations: a caller that cannot be
+	admitted immediately takes a future slot and is told how long to wait.
+
+		Parameters:
+			rate (float): Tokens added per second.
+			burst (int): Bucket capacity.
+			clock (callable): Monotonic time source.
+	'''
+
+	__slots__ = ("rate", "burst", "tokens", "_stamp", "_clock")
+
+	def __init__(self, rate, burst, clock=time.monotonic):
+		self.rate = float(rate)
+		self.burst = float(burst)
+		self.tokens = float(burst)
+		self._clock = clock
+		self._stamp = clock()
+
+	def reserve(self, max_wait=None):
+		'''
+		Takes one token, borrowing against future refills if the bucket is empty.
+
+			Parameters:
+				max_wait (float, optional): Refuse the reservation if it would have
+				                            to wait longer than this many seconds.
+
+			Returns:
+				float | None: Seconds until the reserved slot, 0.0 if the token was
+				              available now, or None if max_wait would be exceeded.
+		'''
+		now = self._clock()
+		self.tokens = min(self.burst, self.tokens + (now - self._stamp) * self.rate)
+		self._stamp = now
+		wait = max(0.0, (1.0 - self.tokens) / self.rate)
+		if max_wait is not None and wait > max_wait:
+			return None
+		self.tokens -= 1.0
+		return wait
+
+	def level(self):
+		'''Returns the tokens available now, without taking one.'''
+		now = self._clock()
+		self.tokens = min(self.burst, self.tokens + (now - self._stamp) * self.rate)
+		self._stamp = now
+		return self.tokens
+
+
+class BridgeRateLimiter:
+	'''
+	Admission control for PUTs, with one token bucket per Hue resource type.
+
+		Parameters:
+			limits (dict, optional): rtype -> (rate, burst). Defaults to BRIDGE_LIMITS;
+			                         unknown rtypes use the 'light' limit.
+			max_wait (float): Longest a command may be queued before it is dropped.
+			clock (callable): Monotonic time source.
+	'''
+
+	def __init__(self, limits=None, max_wait=DEFAULT_MAX_WAIT, clock=time.monotonic):
+		self._limits = dict(limits or BRIDGE_LIMITS)
+		self.max_wait = max_wait
+		self._clock = clock
+		self._lock = threading.Lock()
+		self._buckets: dict[str, TokenBucket] = {}
+		self._counts: dict[str, dict[str, int]] = {}
+
+	def admit(self, rtype, critical=False):
+		'''
+		Decides whether a command for rtype may be sent now.
+
+		A critical command is always sent now. It still takes a token, borrowing
+		against future refills if need be, so the normal commands after it
+		wait correspondingly longer and the average rate stays within the limit.
+
+			Parameters:
+				rtype (str): Hue resource type, e.g. 'light' or 'grouped_light'.
+				critical (bool): Send now whatever the bucket holds.
+
+			Returns:
+				tuple[str, float]: ('sent', 0.0) if the command may go now,
+				                   ('queued', wait) if a slot was reserved wait seconds
+				                   from now, or ('dropped', 0.0) if the queue is too long.
+		'''
+		with self._lock:
+			bucket = self._buckets.get(rtype)
+			if bucket is None:
+				rate, burst = self._limits.get(rtype, self._limits['light'])
+				bucket = self._buckets[rtype] = TokenBucket(rate, burst, self._clock)
+				self._counts[rtype] = {'sent': 0, 'queued': 0, 'dropped': 0, 'critical': 0}
+			if critical:
+				bucket.reserve()
+				self._counts[rtype]['critical'] += 1
+				return 'sent', 0.0
+			wait = bucket.reserve(self.max_wait)
+			if wait is None:
+				outcome, wait = 'dropped', 0.0
+			elif wait > 0:
+				outcome = 'queued'
+			else:
+				outcome = 'sent'
+			self._counts[rtype][outcome] += 1
+			return outcome, wait
+
+	def available(self, rtype):
+		'''
+		Returns True if a command for rtype would be sent now rather than queued,
+		without reserving anything. For optional traffic (progress updates) that
+		should be skipped rather than wait.
+		'''
+		with self._lock:
+			bucket = self._buckets.get(rtype)
+			return bucket is None or bucket.level() >= 1.0
+
+	def stats(self):
+		'''
+		Returns:
+			dict: rtype -> sent/queued/dropped counters, critical commands sent
+			      regardless of the bucket, and the current token level.
+		'''
+		with self._lock:
+			return {
+				rtype: dict(counts, tokens=round(self._buckets[rtype].tokens, 3))
+				for rtype, counts in self._counts.items()
+			}
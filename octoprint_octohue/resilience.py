@@ -0,0 +1,223 @@
+from __future__ import annotations
+
+import random
+import threading
+import time
+from collections import deque
+
+
+# (connect, read) timeouts for bridge REST calls. The bridge answers on the
+# LAN within milliseconds; anything slower means it is gone or wedged.
+BRIDGE_TIMEOUT = (3.05, 10)
+
+# (connect, read) timeouts for the internet discovery endpoint.
+DISCOVERY_TIMEOUT = (5, 10)
+
+# HTTP methods that can be repeated without changing the outcome. Hue v2 PUTs
+# carry absolute state (on, brightness, colour), so sending one twice is safe.
+IDEMPOTENT_METHODS = frozenset(("GET", "HEAD", "PUT"))
+
+# Bridge answers worth retrying: overloaded (429/503) or a gateway hiccup.
+RETRYABLE_STATUS = frozenset((429, 502, 503, 504))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+	'''
+	Fails fast while the bridge is unreachable.
+
+	Closed: requests flow; consecutive failures are counted.
+	Open: after threshold consecutive failures, requests are refused without
+	      touching the network until cooldown seconds have passed.
+	Half-open: after the cooldown one probe request is let through. Success
+	           closes the circuit, failure re-opens it for another cooldown.
+
+		Parameters:
+			threshold (int): Consecutive failures that open the circuit.
+			cooldown (float): Seconds the circuit stays open before probing.
+			clock (callable): Monotonic time source.
+	'''
+
+	def __init__(self, threshold=5, cooldown=30.0, clock=time.monotonic):
+		self.threshold = threshold
+		self.cooldown = cooldown
+		self._clock = clock
+		self._lock = threading.Lock()
+		self._state = CLOSED
+		self._failures = 0
+		self._opened_at = 0.0
+		self._probing = False
+		self.rejected = 0
+		self.opens = 0
+
+	@property
+	def state(self):
+		'''The current state: 'closed', 'open' or 'half_open'.'''
+		with self._lock:
+			return self._current_state()
+
+	def allow(self):
+		'''
+		Decides whether a request may go to the bridge.
+
+			Returns:
+				bool: True if the request may proceed. In the half-open state only
+				      the first caller gets True; it must report its outcome.
+		'''
+		with self._lock:
+			state = self._current_state()
+			if state == CLOSED:
+				return True
+			if state == HALF_OPEN and not self._probing:
+				self._state = HALF_OPEN
+				self._probing = True
+				return True
+			self.rejected += 1
+			return False
+
+	def record_success(self):
+		'''Reports a request that reached the bridge; closes the circuit.'''
+		with self._lock:
+			self._state = CLOSED
+			self._failures = 0
+			self._probing = False
+
+	def record_failure(self):
+		'''Reports a request that could not reach the bridge.'''
+		with self._lock:
+			self._failures += 1
+			if self._probing or (self._state == CLOSED and self._failures >= self.threshold):
+				self._state = OPEN
+				self._opened_at = self._clock()
+				self.opens += 1
+			self._probing = False
+
+	def reset(self):
+		'''Closes the circuit and forgets past failures (e.g. on a new bridge).'''
+		self.record_success()
+
+	def stats(self):
+		'''
+		Returns:
+			dict: state, consecutive failures, seconds until the next probe
+			      (0 unless open), times opened and requests rejected.
+		'''
+		with self._lock:
+			state = self._current_state()
+			retry_in = max(0.0, self._opened_at + self.cooldown - self._clock()) if state == OPEN else 0.0
+			return {
+				"state": state,
+				"failures": self._failures,
+				"retry_in": round(retry_in, 3),
+				"opens": self.opens,
+				"rejected": self.rejected,
+			}
+
+	def _current_state(self):
+		# Caller holds self._lock. An open circuit becomes half-open once the
+		# cooldown has elapsed; the transition is recorded lazily here.
+		if self._state == OPEN and self._clock() - self._opened_at >= self.cooldown:
+			return HALF_OPEN
+		return self._state
+
+
+class RetryPolicy:
+	'''
+	Exponential backoff with jitter for transient bridge errors, capped by a
+	retry budget so a sick bridge is not hammered with retries.
+
+	The n-th retry (attempt n, counting from 0) waits between half and all of
+	min(cap, base * 2**n) seconds, picked at random so retries from several
+	resources do not line up.
+
+		Parameters:
+			max_retries (int): Retries allowed per request.
+			base (float): Delay of the first retry in seconds (before jitter).
+			cap (float): Largest delay in seconds (before jitter).
+			budget (int): Retries allowed in any budget_window seconds, across
+			              all requests.
+			budget_window (float): Sliding window for the budget, in seconds.
+			rng (callable): Returns a float in [0, 1).
+			clock (callable): Monotonic time source.
+	'''
+
+	def __init__(self, max_retries=3, base=0.25, cap=4.0, budget=20, budget_window=60.0,
+				 rng=random.random, clock=time.monotonic):
+		self.max_retries = max_retries
+		self.base = base
+		self.cap = cap
+		self.budget = budget
+		self.budget_window = budget_window
+		self._rng = rng
+		self._clock = clock
+		self._lock = threading.Lock()
+		self._spent: deque[float] = deque()
+		self.retries = 0
+		self.exhausted = 0
+		self.gave_up = 0
+
+	@staticmethod
+	def retryable(method, status=None, error=None):
+		'''
+		Decides whether a failed request may be repeated.
+
+			Parameters:
+				method (str): HTTP method of the request.
+				status (int, optional): HTTP status of the response, if one arrived.
+				error (Exception, optional): The exception raised instead.
+
+			Returns:
+				bool: True for an idempotent request that hit a connection error
+				      or a retryable status.
+		'''
+		if method.upper() not in IDEMPOTENT_METHODS:
+			return False
+		if error is not None:
+			return True
+		return status in RETRYABLE_STATUS
+
+	def backoff(self, attempt):
+		'''
+		Spends one retry from the budget and returns how long to wait first.
+
+			Parameters:
+				attempt (int): Retries already made for this request.
+
+			Returns:
+				float | None: Seconds to wait before retrying, or None if the
+				              request has used its retries or the budget is spent.
+		'''
+		with self._lock:
+			if attempt >= self.max_retries:
+				self.gave_up += 1
+				return None
+			now = self._clock()
+			while self._spent and now - self._spent[0] >= self.budget_window:
+				self._spent.popleft()
+			if len(self._spent) >= self.budget:
+				self.exhausted += 1
+				return None
+			self._spent.append(now)
+			self.retries += 1
+			delay = min(self.cap, self.base * (2 ** attempt))
+			return delay / 2 + self._rng() * delay / 2
+
+	def stats(self):
+		'''
+		Returns:
+			dict: retries made, retries refused because the budget was spent
+			      (exhausted) or the request ran out of attempts (gave_up), and
+			      the budget left in the current window.
+		'''
+		with self._lock:
+			now = self._clock()
+			spent = sum(1 for t in self._spent if now - t < self.budget_window)
+			return {
+				"retries": self.retries,
+				"exhausted": self.exhausted,
+				"gave_up": self.gave_up,
+				"budget_left": max(0, self.budget - spent),
+			}
@@ -0,0 +1,213 @@
+from __future__ import annotations
+
+import re
+from types import MappingProxyType
+
+
+# How long the bridge's breathe alert is left running before a
+# flash-then-off rule switches the light off.
+FLASH_OFF_DELAY = 15
+
+PRIORITY_NORMAL = "normal"
+PRIORITY_CRITICAL = "critical"
+PRIORITIES = (PRIORITY_NORMAL, PRIORITY_CRITICAL)
+
+# Events whose statusDict entry is critical unless it sets a priority: the
+# light change must not wait behind routine traffic (see EventRule.critical).
+CRITICAL_EVENTS = frozenset(("PrintFailed", "Error", "FilamentRunout"))
+
+_HEX_COLOUR = re.compile(r"^#[0-9A-Fa-f]{6}$")
+
+
+class EventRule:
+	'''
+	A statusDict entry compiled into ready-to-schedule build_state payloads.
+
+		Attributes:
+			event (str): OctoPrint event name.
+			jobs (tuple[tuple[float, Mapping], ...]): (delay, payload) pairs to
+			     hand to the dispatcher, in order.
+			light (Mapping | None): The rule's 'on' payload (colour or ct plus
+			     brightness, no alert), used by "Lights On at Startup". None when
+			     the rule only switches off and carries no usable light settings.
+			critical (bool): The rule's commands jump ahead of normal traffic in the
+			     dispatcher, skip the coalescing window and are never held back or
+			     dropped by the rate limiter. Its payloads carry critical=True for
+			     build_state.
+			debounce (float): Seconds the event must be quiet before the rule
+			     fires (0 = no debounce).
+			min_interval (float): Least seconds between two firings (0 = none).
+			leading (bool): Fire on the first event of a burst.
+			trailing (bool): Fire once more when a burst in which events were held
+			     back ends.
+	'''
+
+	__slots__ = ("event", "jobs", "light", "critical", "debounce", "min_interval", "leading", "trailing")
+
+	def __init__(self, event, jobs, light, critical=False, debounce=0, min_interval=0, leading=True, trailing=True):
+		self.event = event
+		self.jobs = jobs
+		self.light = light
+		self.critical = critical
+		self.debounce = debounce
+		self.min_interval = min_interval
+		self.leading = leading
+		self.trailing = trailing
+
+	@property
+	def gated(self):
+		'''True if the rule fires through EventThrottle. Critical rules never do.'''
+		return (self.debounce > 0 or self.min_interval > 0) and not self.critical
+
+	def __repr__(self):
+		return f"EventRule({self.event!r}, jobs={self.jobs!r}, critical={self.critical!r})"
+
+
+def _seconds(entry, key):
+	'''
+	Reads a non-negative number of seconds from a statusDict entry (0 if unset).
+	Whole numbers are returned as int.
+
+		Raises:
+			ValueError: If the value is not a number or is negative.
+	'''
+	try:
+		value = float(entry.get(key) or 0)
+	except (TypeError, ValueError):
+		raise ValueError(f"{key} {entry.get(key)!r} is not a number")
+	if value < 0:
+		raise ValueError(f"{key} {value} is negative")
+	return int(value) if value.is_integer() else value
+
+
+def _light_payload(entry, rgb_to_xy):
+	'''
+	Validates the colour/ct/brightness of a statusDict entry and builds the
+	build_state kwargs for switching the light on. The hex colour is converted
+	to xy here so the conversion does not run on every event.
+
+		Raises:
+			ValueError: If brightness (0–100%), ct (153–500 mirek) or colour is out
+			            of range or malformed.
+	'''
+	try:
+		bri = int(entry.get('brightness'))
+	except (TypeError, ValueError):
+		raise ValueError(f"brightness {entry.get('brightness')!r} is not a number")
+	if not 0 <= bri <= 100:
+		raise ValueError(f"brightness {bri} is outside 0-100%")
+
+	try:
+		ct = int(entry.get('ct') or 0)
+	except (TypeError, ValueError):
+		raise ValueError(f"ct {entry.get('ct')!r} is not a number")
+
+	payload = {'on': True, 'bri': bri}
+	if ct:
+		if not 153 <= ct <= 500:
+			raise ValueError(f"ct {ct} is outside 153-500 mirek")
+		payload['ct'] = ct
+		return payload
+
+	colour = entry.get('colour')
+	if colour:
+		if not isinstance(colour, str) or not _HEX_COLOUR.match(colour):
+			raise ValueError(f"colour {colour!r} is not a #RRGGBB hex value")
+		xy = rgb_to_xy(colour)
+		# Black has no chromaticity: keep the brightness change, skip the colour
+		if xy is not None:
+			payload['xy'] = xy
+	return payload
+
+
+def compile_rule(entry, rgb_to_xy):
+	'''
+	Compiles one statusDict entry.
+
+		Parameters:
+			entry (dict): statusDict entry (event, colour, brightness, ct, delay,
+			              turnoff, flash, priority, debounce, min_interval,
+			              leading, trailing). A missing or empty priority is
+			              critical for CRITICAL_EVENTS and normal otherwise.
+			              leading defaults to True unless debounce is set;
+			              trailing defaults to True.
+			rgb_to_xy (callable): Hex colour to [x, y] converter.
+
+		Returns:
+			EventRule: The compiled rule.
+
+		Raises:
+			ValueError: If the entry is malformed.
+	'''
+	event = entry.get('event')
+	if not event or not isinstance(event, str):
+		raise ValueError("entry has no event name")
+
+	delay = _seconds(entry, 'delay')
+
+	debounce = _seconds(entry, 'debounce')
+	min_interval = _seconds(entry, 'min_interval')
+	leading = entry.get('leading')
+	leading = not debounce if leading is None else bool(leading)
+	trailing = entry.get('trailing')
+	trailing = True if trailing is None else bool(trailing)
+	if not (leading or trailing):
+		raise ValueError("leading and trailing are both off, so the rule would never fire")
+
+	priority = entry.get('priority') or (PRIORITY_CRITICAL if event in CRITICAL_EVENTS else PRIORITY_NORMAL)
+	if priority not in PRIORITIES:
+		raise ValueError(f"priority {priority!r} is not one of {', '.join(PRIORITIES)}")
+	critical = priority == PRIORITY_CRITICAL
+	lane = {'critical': True} if critical else {}
+	options = dict(critical=critical, debounce=debounce, min_interval=min_interval, leading=leading, trailing=trailing)
+
+	flash = bool(entry.get('flash', False))
+	turnoff = bool(entry.get('turnoff', False))
+	off = MappingProxyType({'on': False, **lane})
+
+	if turnoff and not flash:
+		# Colour settings are irrelevant to the event itself; only keep them
+		# for "Lights On at Startup" if they happen to be valid.
+		try:
+			light = MappingProxyType(_light_payload(entry, rgb_to_xy))
+		except ValueError:
+			light = None
+		return EventRule(event, ((delay, off),), light, **options)
+
+	on = _light_payload(entry, rgb_to_xy)
+	light = MappingProxyType(dict(on))
+	if flash:
+		on['alert'] = 'lselect'
+	on.update(lane)
+	jobs = ((delay, MappingProxyType(on)),)
+	if turnoff:
+		# Flash first, then switch off after the alert cycle completes
+		jobs += ((delay + FLASH_OFF_DELAY, off),)
+	return EventRule(event, jobs, light, **options)
+
+
+def compile_rules(status_dict, rgb_to_xy, logger=None):
+	'''
+	Compiles statusDict into an immutable event -> EventRule map, so on_event
+	is a single dict lookup. Entries that fail validation are skipped with a
+	warning rather than failing when the event fires. If an event is listed
+	more than once, the first entry wins, as it always has.
+
+		Parameters:
+			status_dict (list[dict] | None): The statusDict setting.
+			rgb_to_xy (callable): Hex colour to [x, y] converter.
+			logger (logging.Logger, optional): Receives validation warnings.
+
+		Returns:
+			Mapping[str, EventRule]: Read-only rule table.
+	'''
+	rules = {}
+	for index, entry in enumerate(status_dict or []):
+		try:
+			rule = compile_rule(entry, rgb_to_xy)
+		except (ValueError, AttributeError) as e:
+			if logger is not None:
+				logger.warning(f"Ignoring statusDict entry {index} ({entry.get('event') if isinstance(entry, dict) else entry!r}): {e}")
+			continue
+		rules.setdefault(rule.event, rule)
+	return MappingProxyType(rules)
@@ -41,7 +41,12 @@ $(function() {
                 delay: ko.observable('').extend({ defaultIfNull: "0" }),
                 turnoff: ko.observable(false),
                 flash: ko.observable(false),
-                ct: ko.observable(0)
+                ct: ko.observable(0),
+                priority: ko.observable(''),
+                debounce: ko.observable(0),
+                min_interval: ko.observable(0),
+                leading: ko.observable(null),
+                trailing: ko.observable(null)
             };
             self.ownSettings.statusDict.push(statusObj);
         };
@@ -128,6 +133,11 @@ $(function() {
                     document.getElementById("huebridgestatus").innerHTML = "Configured";
                     document.getElementById("huebridge_unconfigured").classList.add("inactiveconfig")
                     document.getElementById("huebridge_configured").classList.remove("inactiveconfig")
+                } else if (response.bridgestatus === "unreachable") {
+                    document.getElementById("huebridgestatus").style.backgroundColor = "red";
+                    document.getElementById("huebridgestatus").innerHTML = "Unreachable";
+                    document.getElementById("huebridge_unconfigured").classList.add("inactiveconfig")
+                    document.getElementById("huebridge_configured").classList.remove("inactiveconfig")
                 } else if (response.bridgestatus === "unconfigured") {
                     document.getElementById("huebridge_configured").classList.add("inactiveconfig")
                     document.getElementById("huebridge_unconfigured").classList.remove("inactiveconfig")
@@ -151,7 +161,8 @@ $(function() {
             self.ownSettings = self.settings.plugins.octohue;
             self.statusDict = self.ownSettings.statusDict;
 
-            // Ensure flash and ct are ko.observables on every loaded statusDict item
+            // Ensure flash, ct, priority and the throttle options are ko.observables
+            // on every loaded statusDict item
             // (items saved before these features were added won't have them)
             ko.utils.arrayForEach(self.statusDict(), function(item) {
                 if (!ko.isObservable(item.flash)) {
@@ -160,6 +171,21 @@ $(function() {
                 if (!ko.isObservable(item.ct)) {
                     item.ct = ko.observable(item.ct || 0);
                 }
+                if (!ko.isObservable(item.priority)) {
+                    item.priority = ko.observable(item.priority || '');
+                }
+                if (!ko.isObservable(item.debounce)) {
+                    item.debounce = ko.observable(item.debounce || 0);
+                }
+                if (!ko.isObservable(item.min_interval)) {
+                    item.min_interval = ko.observable(item.min_interval || 0);
+                }
+                if (!ko.isObservable(item.leading)) {
+                    item.leading = ko.observable(item.leading === undefined ? null : item.leading);
+                }
+                if (!ko.isObservable(item.trailing)) {
+                    item.trailing = ko.observable(item.trailing === undefined ? null : item.trailing);
+                }
             });
 
             // Auto-set lampisgroup when the user picks a device from the combined
@@ -192,6 +218,49 @@ $(function() {
             status.flash(!status.flash());
         };
 
+        // An entry without a priority is critical if its event is one of the
+        // backend's criticalEvents (PrintFailed, Error, FilamentRunout).
+        self.isCritical = function(status) {
+            var priority = status.priority();
+            if (priority) {
+                return priority === 'critical';
+            }
+            var critical = self.ownSettings.criticalEvents ? self.ownSettings.criticalEvents() : [];
+            return critical.indexOf(status.event()) !== -1;
+        };
+
+        self.setPriority = function(status) {
+            status.priority(self.isCritical(status) ? 'normal' : 'critical');
+        };
+
+        // Unset edges follow the backend defaults: leading unless a debounce
+        // is set, trailing always.
+        self.isLeading = function(status) {
+            var leading = status.leading();
+            return leading === null ? !Number(status.debounce()) : leading;
+        };
+
+        self.isTrailing = function(status) {
+            var trailing = status.trailing();
+            return trailing === null ? true : trailing;
+        };
+
+        // A rule needs at least one edge (the backend rejects it otherwise),
+        // so the last one left on cannot be switched off.
+        self.setLeading = function(status) {
+            if (self.isLeading(status) && !self.isTrailing(status)) {
+                return;
+            }
+            status.leading(!self.isLeading(status));
+        };
+
+        self.setTrailing = function(status) {
+            if (self.isTrailing(status) && !self.isLeading(status)) {
+                return;
+            }
+            status.trailing(!self.isTrailing(status));
+        };
+
         self.statusDetails = function (data) {
             if (data === false) {
                 return {
@@ -201,7 +270,12 @@ $(function() {
                     delay: ko.observable(""),
                     turnoff: ko.observable(false),
                     flash: ko.observable(false),
-                    ct: ko.observable(0)
+                    ct: ko.observable(0),
+                    priority: ko.observable(''),
+                    debounce: ko.observable(0),
+                    min_interval: ko.observable(0),
+                    leading: ko.observable(null),
+                    trailing: ko.observable(null)
                 };
 
             } else {
@@ -214,6 +288,21 @@ $(function() {
                 if (!data.hasOwnProperty("ct")) {
                     data["ct"] = ko.observable(0);
                 }
+                if (!data.hasOwnProperty("priority")) {
+                    data["priority"] = ko.observable('');
+                }
+                if (!data.hasOwnProperty("debounce")) {
+                    data["debounce"] = ko.observable(0);
+                }
+                if (!data.hasOwnProperty("min_interval")) {
+                    data["min_interval"] = ko.observable(0);
+                }
+                if (!data.hasOwnProperty("leading")) {
+                    data["leading"] = ko.observable(null);
+                }
+                if (!data.hasOwnProperty("trailing")) {
+                    data["trailing"] = ko.observable(null);
+                }
                 return data;
             }
         };
@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+import threading
+import time
+
+
+class _Gate:
+	'''Throttle state for one event: the open window, if any, and counters.'''
+
+	__slots__ = ("rule", "job", "burst_start", "last_call", "last_fire", "pending", "events", "fired", "dropped")
+
+	def __init__(self, rule):
+		self.rule = rule
+		self.job = None
+		self.burst_start = 0.0
+		self.last_call = 0.0
+		self.last_fire = float("-inf")
+		self.pending = False
+		self.events = 0
+		self.fired = 0
+		self.dropped = 0
+
+
+class EventThrottle:
+	'''
+	Enforces the statusDict debounce, min_interval, leading and trailing
+	options, so chatty events (ZChange, PositionUpdate, CaptureStart, ...)
+	fire their rule a bounded number of times instead of once per occurrence.
+
+	The first event of a burst opens a window for its rule. While the window
+	is open, further events are held back: the first one becomes the pending
+	trailing firing and the rest are dropped (they would fire the very same
+	rule). The window closes once both:
+	  - debounce seconds have passed since the latest event, and
+	  - min_interval seconds have passed since the rule last fired (or, if
+	    it has not fired in this burst, since the burst started).
+	If an event is pending and trailing is on, the rule fires then, and with
+	min_interval set a new window opens so the next firing is spaced again.
+
+	With leading on, the first event of a burst fires at once. So:
+	  min_interval only:  throttle, leading and trailing edge.
+	  debounce only:      fires once the event has gone quiet.
+	  both:               debounce, with firings at least min_interval apart.
+
+	Deciding costs a dict lookup and a few comparisons under a lock. Nothing
+	is scheduled for an event that is held back inside an open window.
+
+		Parameters:
+			schedule (callable): schedule(delay, callback) runs callback later;
+			                     returns a handle.
+			cancel_job (callable): cancel_job(handle) stops a scheduled callback.
+			fire (callable): fire(rule) runs a rule's actions.
+			clock (callable): Monotonic time source.
+	'''
+
+	def __init__(self, schedule, cancel_job, fire, clock=time.monotonic):
+		self._schedule = schedule
+		self._cancel_job = cancel_job
+		self._fire = fire
+		self._clock = clock
+		self._lock = threading.Lock()
+		self._gates: dict[str, _Gate] = {}
+
+	def submit(self, rule):
+		'''
+		Handles one occurrence of rule.event.
+
+			Parameters:
+				rule (EventRule): The event's compiled rule (rule.gated is True).
+
+			Returns:
+				str: 'fired' if the rule fired now, 'deferred' if it will fire when
+				     the window closes, or 'dropped' if the event was held back
+				     without a firing of its own.
+		'''
+		now = self._clock()
+		with self._lock:
+			gate = self._gates.get(rule.event)
+			if gate is None:
+				gate = self._gates[rule.event] = _Gate(rule)
+			gate.rule = rule
+			gate.events += 1
+			gate.last_call = now
+			if gate.job is None:
+				gate.burst_start = now
+				if rule.leading:
+					outcome = 'fired'
+					gate.last_fire = now
+					gate.fired += 1
+				else:
+					outcome = 'deferred'
+					gate.pending = True
+				gate.job = self._schedule(self._close_at(gate) - now, lambda: self._expire(gate))
+			elif rule.trailing and not gate.pending:
+				outcome = 'deferred'
+				gate.pending = True
+			else:
+				outcome = 'dropped'
+				gate.dropped += 1
+		if outcome == 'fired':
+			self._fire(rule)
+		return outcome
+
+	def reset(self):
+		'''Forgets every window and pending firing, e.g. after statusDict changed.'''
+		with self._lock:
+			jobs = [gate.job for gate in self._gates.values() if gate.job is not None]
+			self._gates.clear()
+		for job in jobs:
+			self._cancel_job(job)
+
+	def _close_at(self, gate):
+		# Caller holds self._lock.
+		rule = gate.rule
+		return max(gate.last_call + rule.debounce, max(gate.last_fire, gate.burst_start) + rule.min_interval)
+
+	def _expire(self, gate):
+		now = self._clock()
+		rule = None
+		with self._lock:
+			if self._gates.get(gate.rule.event) is not gate:
+				return
+			close_at = self._close_at(gate)
+			if now < close_at:
+				# Events arrived since the window was scheduled; keep it open.
+				gate.job = self._schedule(close_at - now, lambda: self._expire(gate))
+				return
+			if gate.pending and gate.rule.trailing:
+				rule = gate.rule
+				gate.pending = False
+				gate.last_fire = gate.burst_start = now
+				gate.fired += 1
+				gate.job = self._schedule(rule.min_interval, lambda: self._expire(gate)) if rule.min_interval else None
+			else:
+				gate.pending = False
+				gate.job = None
+		if rule is not None:
+			self._fire(rule)
+
+	def stats(self):
+		'''
+		Returns:
+			dict: event -> events seen, rule firings, events dropped (held back
+			      without a firing of their own) and whether a trailing firing is
+			      pending.
+		'''
+		with self._lock:
+			return {
+				event: {"events": gate.events, "fired": gate.fired, "dropped": gate.dropped, "pending": gate.pending}
+				for event, gate in self._gates.items()
+			}
@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import os
+import ssl
+import threading
+from collections import OrderedDict
+
+
+# Bundled Signify root CA that issues every Hue bridge certificate.
+SIGNIFY_CA = os.path.join(os.path.dirname(__file__), "signify-root-ca.pem")
+
+# Cached TLS sessions are keyed by bridge address; an install talks to one
+# bridge, plus whatever it was paired with before.
+_MAX_SESSIONS = 8
+
+
+class _ResumingSocket(ssl.SSLSocket):
+	'''
+	SSLSocket that hands its TLS session back to its context when it is closed.
+	With TLS 1.3 the resumption ticket only arrives after the handshake, so the
+	session is captured at close time rather than straight after connecting.
+	'''
+
+	def close(self):
+		try:
+			self.context._store_session(self)
+		except Exception:
+			pass
+		super().close()
+
+
+class ResumingSSLContext(ssl.SSLContext):
+	'''
+	Client SSLContext that reuses TLS sessions per peer address, so reconnects
+	after the bridge closes an idle socket resume the previous session instead
+	of doing a full handshake.
+
+	Counters: handshakes (all wrapped connections) and resumed (those that
+	reused a cached session).
+	'''
+
+	sslsocket_class = _ResumingSocket
+
+	def __new__(cls, protocol=ssl.PROTOCOL_TLS_CLIENT, *args, **kwargs):
+		return super().__new__(cls, protocol, *args, **kwargs)
+
+	def __init__(self, protocol=ssl.PROTOCOL_TLS_CLIENT):
+		self._session_lock = threading.Lock()
+		self._sessions: OrderedDict = OrderedDict()
+		self.handshakes = 0
+		self.resumed = 0
+
+	def wrap_socket(self, sock, server_side=False, do_handshake_on_connect=True,
+					suppress_ragged_eofs=True, server_hostname=None, session=None):
+		key = None
+		if not server_side:
+			try:
+				key = sock.getpeername()[:2]
+			except (OSError, AttributeError, TypeError):
+				key = None
+			if session is None and key is not None:
+				with self._session_lock:
+					session = self._sessions.get(key)
+		ssock = super().wrap_socket(
+			sock, server_side=server_side, do_handshake_on_connect=do_handshake_on_connect,
+			suppress_ragged_eofs=suppress_ragged_eofs, server_hostname=server_hostname, session=session,
+		)
+		if key is not None:
+			ssock._octohue_peer = key
+			if do_handshake_on_connect:
+				self._count(ssock)
+				self._store_session(ssock)
+		return ssock
+
+	def _count(self, ssock):
+		with self._session_lock:
+			self.handshakes += 1
+			if ssock.session_reused:
+				self.resumed += 1
+
+	def _store_session(self, ssock):
+		key = getattr(ssock, "_octohue_peer", None)
+		if key is None:
+			return
+		session = ssock.session
+		if session is None or not (session.has_ticket or session.id):
+			return
+		with self._session_lock:
+			self._sessions[key] = session
+			self._sessions.move_to_end(key)
+			while len(self._sessions) > _MAX_SESSIONS:
+				self._sessions.popitem(last=False)
+
+	def forget_sessions(self):
+		'''Drops every cached session (e.g. after re-pairing with another bridge).'''
+		with self._session_lock:
+			self._sessions.clear()
+
+	def stats(self):
+		'''
+		Returns:
+			dict: handshakes, resumed and the number of cached sessions.
+		'''
+		with self._session_lock:
+			return {"handshakes": self.handshakes, "resumed": self.resumed, "sessions": len(self._sessions)}
+
+
+def build_bridge_context(cafile=SIGNIFY_CA):
+	'''
+	Builds a session-resuming client context that verifies the bridge
+	certificate chain against cafile but not the hostname (the bridge
+	certificate names the bridge id, not its address).
+
+		Parameters:
+			cafile (str): PEM bundle of trusted roots.
+
+		Returns:
+			ResumingSSLContext: The new context.
+	'''
+	ctx = ResumingSSLContext(ssl.PROTOCOL_TLS_CLIENT)
+	ctx.load_verify_locations(cafile=cafile)
+	ctx.check_hostname = False
+	ctx.verify_mode = ssl.CERT_REQUIRED
+	return ctx
+
+
+_shared_context: ResumingSSLContext | None = None
+_shared_lock = threading.Lock()
+
+
+def bridge_context():
+	'''
+	Returns the process-wide bridge SSLContext, loading the Signify CA the
+	first time it is needed. Every bridge session (REST, eventstream and
+	pairing) shares it, so the PEM is parsed once and TLS sessions are reused
+	across all of them.
+	'''
+	global _shared_context
+	ctx = _shared_context
+	if ctx is None:
+		with _shared_lock:
+			if _shared_context is None:
+				_shared_context = build_bridge_context()
+			ctx = _shared_context
+	return ctx
+
+
+def bridge_context_stats():
+	'''
+	Returns:
+		dict | None: Handshake/resumption counters of the shared context, or
+		             None if no bridge connection has been made yet.
+	'''
+	ctx = _shared_context
+	return ctx.stats() if ctx is not None else None
@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+import contextvars
+import itertools
+import threading
+import time
+from collections import deque
+
+
+# Event traces kept in memory for the gettraces API command.
+TRACE_BUFFER_SIZE = 100
+
+# The trace of the event whose light commands are running on this thread.
+# CommandDispatcher runs every job in the context it was submitted from, so
+# the trace set in on_event is still current when a delayed job fires.
+_current: contextvars.ContextVar[Trace | None] = contextvars.ContextVar("octohue_trace", default=None)
+
+
+def current_trace():
+	'''Returns the trace of the event being handled, or None outside one.'''
+	return _current.get()
+
+
+def trace_in(context):
+	'''Returns the trace current in a contextvars.Context (e.g. a queued job's), or None.'''
+	return context.get(_current) if context is not None else None
+
+
+class Trace:
+	'''
+	Timeline of one OctoPrint event through the plugin: received, scheduled,
+	dequeued, sent and acked (or coalesced, suppressed, dropped, failed).
+	An event with several jobs (e.g. flash, then off) records a stage per job.
+
+	Stages are appended without a lock; list.append is atomic, and readers
+	copy the list before formatting it.
+
+		Parameters:
+			trace_id (str): Identifier shown in logs and the API.
+			event (str): OctoPrint event name.
+			device (str): Device the event's rule targets.
+			clock (callable): Monotonic time source.
+	'''
+
+	__slots__ = ("id", "event", "device", "started", "wall", "stages", "_clock")
+
+	def __init__(self, trace_id, event, device, clock=time.monotonic):
+		self.id = trace_id
+		self.event = event
+		self.device = device
+		self._clock = clock
+		self.started = clock()
+		self.wall = time.time()
+		self.stages: list[tuple] = [("received", self.started, None)]
+
+	def mark(self, stage, detail=None):
+		'''Records that the event reached stage now; detail is free-form context.'''
+		self.stages.append((stage, self._clock(), detail))
+
+	def activate(self):
+		'''Makes this the current trace; returns a token for deactivate.'''
+		return _current.set(self)
+
+	@staticmethod
+	def deactivate(token):
+		_current.reset(token)
+
+	def elapsed(self):
+		'''Seconds from receiving the event to its latest stage.'''
+		return self.stages[-1][1] - self.started
+
+	def as_dict(self):
+		'''
+		Returns:
+			dict: id, event, device, received (epoch seconds), total_ms and the
+			      stages, each with its offset from received in ms.
+		'''
+		stages = list(self.stages)
+		return {
+			"id": self.id,
+			"event": self.event,
+			"device": self.device,
+			"received": round(self.wall, 3),
+			"total_ms": round((stages[-1][1] - self.started) * 1e3, 2),
+			"stages": [
+				{"stage": stage, "ms": round((at - self.started) * 1e3, 2), "detail": detail}
+				for stage, at, detail in stages
+			],
+		}
+
+
+class TraceBuffer:
+	'''
+	Starts traces, keeps the most recent ones, and hands a trace from the
+	command that queued a PUT to the PUT that finally carries it. Coalesced
+	commands share one PUT, so several traces can wait on the same path.
+
+		Parameters:
+			size (int): Traces kept; the oldest is forgotten first.
+			clock (callable): Monotonic time source for new traces.
+	'''
+
+	def __init__(self, size=TRACE_BUFFER_SIZE, clock=time.monotonic):
+		self._clock = clock
+		self._lock = threading.Lock()
+		self._traces: deque[Trace] = deque(maxlen=size)
+		self._waiting: dict[str, list[Trace]] = {}
+		self._held: dict[str, list[Trace]] = {}
+		self._ids = itertools.count(1)
+		self.started = 0
+
+	def start(self, event, device):
+		'''Begins and buffers a trace for an event; the caller activates it.'''
+		with self._lock:
+			self.started += 1
+			trace = Trace(f"{next(self._ids):06x}", event, device, self._clock)
+			self._traces.append(trace)
+		return trace
+
+	def attach(self, path, trace):
+		'''Parks trace until the next PUT to path is sent (see take).'''
+		with self._lock:
+			self._waiting.setdefault(path, []).append(trace)
+
+	def detach(self, path, trace):
+		'''Removes trace from path again, e.g. when its command was dropped.'''
+		with self._lock:
+			waiting = self._waiting.get(path)
+			if waiting and trace in waiting:
+				waiting.remove(trace)
+				if not waiting:
+					del self._waiting[path]
+
+	def take(self, path):
+		'''Returns and clears the traces waiting on path.'''
+		with self._lock:
+			return self._waiting.pop(path, ())
+
+	def hold(self, path, traces):
+		'''Keeps the traces of a failed PUT to path until it is known whether it will be retried.'''
+		with self._lock:
+			self._held.setdefault(path, []).extend(traces)
+
+	def release(self, path):
+		'''Returns and clears the traces held for path (see hold).'''
+		with self._lock:
+			return self._held.pop(path, ())
+
+	def get(self, trace_id):
+		'''Returns the buffered trace with trace_id, or None.'''
+		with self._lock:
+			for trace in self._traces:
+				if trace.id == trace_id:
+					return trace
+		return None
+
+	def dump(self, min_ms=0.0):
+		'''
+		Returns:
+			list: Buffered traces as dicts, oldest first, keeping only those whose
+			      total time is at least min_ms.
+		'''
+		with self._lock:
+			traces = list(self._traces)
+		threshold = min_ms / 1e3
+		return [trace.as_dict() for trace in traces if trace.elapsed() >= threshold]
+
+	def stats(self):
+		'''
+		Returns:
+			dict: traces started, traces buffered and resource paths with traces
+			      waiting for a PUT.
+		'''
+		with self._lock:
+			return {"started": self.started, "buffered": len(self._traces), "waiting": len(self._waiting)}
@@ -35,6 +35,20 @@ class _TemplatePlugin:
 class _EventHandlerPlugin:
     pass
 
+class _ProgressPlugin:
+    pass
+
+class _PrinterCallback:
+    """Stand-in for octoprint.printer.PrinterCallback (all hooks are no-ops)."""
+    def on_printer_add_temperature(self, data):
+        pass
+
+class _BlueprintPlugin:
+    """Stand-in whose route decorator leaves the view function unchanged."""
+    @staticmethod
+    def route(rule, **options):
+        return lambda f: f
+
 
 # ---------------------------------------------------------------------------
 # Build the mock module objects
@@ -49,9 +63,12 @@ mock_op_plugin.SimpleApiPlugin = _SimpleApiPlugin
 mock_op_plugin.AssetPlugin = _AssetPlugin
 mock_op_plugin.TemplatePlugin = _TemplatePlugin
 mock_op_plugin.EventHandlerPlugin = _EventHandlerPlugin
+mock_op_plugin.ProgressPlugin = _ProgressPlugin
+mock_op_plugin.BlueprintPlugin = _BlueprintPlugin
 
 # octoprint.printer
 mock_op_printer = MagicMock()
+mock_op_printer.PrinterCallback = _PrinterCallback
 
 # octoprint.util – use a real module so `from octoprint.util import *` only
 # imports the names we explicitly place there (no MagicMock noise).
@@ -87,6 +104,9 @@ class _HTTPAdapter:
     """Real (empty) stand-in for requests.adapters.HTTPAdapter.
     Using a real class lets _SignifyAdapter inherit from it normally
     rather than inheriting from a MagicMock instance."""
+    def __init__(self, pool_connections=10, pool_maxsize=10, max_retries=0, pool_block=False):
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
     def init_poolmanager(self, *args, **kwargs): pass
     def proxy_manager_for(self, proxy, **kwargs): pass
 
@@ -135,6 +155,7 @@ def plugin():
     p._plugin_version = "1.0.0"
     p.pbridge = {"addr": "192.168.1.100", "key": "test-api-key"}
     p._session = MagicMock(name="_session")
+    p._dispatcher = MagicMock(name="_dispatcher")
     p.discoveryurl = "https://discovery.meethue.com/"
     return p
 
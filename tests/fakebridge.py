@@ -0,0 +1,527 @@
+"""
+Local fake Hue bridge for load and latency testing.
+
+FakeBridge serves the slice of the bridge API the plugin uses, over HTTPS
+with a certificate from the throwaway CA in tests/certs/ (see generate.sh):
+
+  GET  /clip/v2/resource[/<rtype>[/<id>]]   light, grouped_light, room, zone,
+                                            device and bridge resources
+  PUT  /clip/v2/resource/light/<id>         on, dimming, color, color_temperature
+  PUT  /clip/v2/resource/grouped_light/<id> applied to every member light
+  POST /api                                 v1 pairing (press_link_button first)
+  GET  /eventstream/clip/v2                 server-sent events for every change
+
+Knobs: device count (lights, plugs, rooms, zones), per-request latency,
+scripted failures (an HTTP status or "reset" for the next requests), random
+503s at a given rate, and token-bucket 429 rate limiting per resource type.
+Every request is counted in stats().
+
+UrllibSession is the slice of requests.Session the plugin uses, over urllib
+(conftest replaces requests with a mock) with the plugin's own bridge TLS
+context trusting the test CA, so the plugin can be pointed at a FakeBridge.
+
+Run standalone for manual testing:
+
+    python -m tests.fakebridge --lights 50 --latency 0.02 --port 8443
+"""
+import argparse
+import json
+import os
+import queue
+import random
+import socket
+import ssl
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+CERTS = os.path.join(os.path.dirname(__file__), "certs")
+TEST_CA = os.path.join(CERTS, "ca.pem")
+BRIDGE_CERT = os.path.join(CERTS, "bridge.pem")
+BRIDGE_KEY = os.path.join(CERTS, "bridge.key")
+
+BRIDGE_ID = "001788fffe000000"
+GAMUT_C = {"red": {"x": 0.6915, "y": 0.3083}, "green": {"x": 0.17, "y": 0.7}, "blue": {"x": 0.1532, "y": 0.0475}}
+_STATE_FIELDS = ("on", "dimming", "color", "color_temperature")
+
+
+def _rid(*parts):
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, "fakebridge/" + "/".join(str(p) for p in parts)))
+
+
+class _TokenBucket:
+    def __init__(self, rate):
+        self.rate = float(rate)
+        self.tokens = float(rate)
+        self.stamp = time.monotonic()
+
+    def take(self):
+        now = time.monotonic()
+        self.tokens = min(self.rate, self.tokens + (now - self.stamp) * self.rate)
+        self.stamp = now
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return True
+        return False
+
+
+class _TLSServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Many concurrent clients under load; the default backlog of 5 drops SYNs.
+    request_queue_size = 128
+
+    def __init__(self, address, handler, context):
+        self.ssl_context = context
+        super().__init__(address, handler)
+
+    def finish_request(self, request, client_address):
+        # The TLS handshake runs on the connection's own thread so a slow
+        # client cannot stall accept().
+        request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        if self.ssl_context is not None:
+            try:
+                request = self.ssl_context.wrap_socket(request, server_side=True)
+            except (OSError, ssl.SSLError):
+                return
+        super().finish_request(request, client_address)
+
+
+class FakeBridge:
+    """
+    A bridge with `lights` colour lights and `plugs` smart plugs spread over
+    `rooms` rooms, plus `zones` zones holding every light.
+
+        latency     seconds added to every request, or a (min, max) range
+        error_rate  fraction of REST requests answered with 503
+        rate_limits requests per second per rtype for PUTs, e.g.
+                    {"light": 10, "grouped_light": 1}; excess gets 429
+        app_key     the application key requests must carry
+        tls         serve HTTPS (default) or plain HTTP
+    """
+
+    def __init__(self, lights=4, plugs=1, rooms=1, zones=0, latency=0.0, error_rate=0.0,
+                 rate_limits=None, app_key="fake-app-key", tls=True, seed=0, port=0):
+        self.app_key = app_key
+        self.latency = latency
+        self.error_rate = error_rate
+        self.link_button = False
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._script = []
+        self._buckets = {rtype: _TokenBucket(rate) for rtype, rate in (rate_limits or {}).items()}
+        self._subscribers = []
+        self._event_seq = 0
+        self._counts = {}
+        self.resources = {}
+        self._build(lights, plugs, rooms, zones)
+
+        context = None
+        if tls:
+            context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+            context.load_cert_chain(BRIDGE_CERT, BRIDGE_KEY)
+        self.server = _TLSServer(("127.0.0.1", port), self._handler(), context)
+        self.addr = f"127.0.0.1:{self.server.server_address[1]}"
+        self.base_url = f"{'https' if tls else 'http'}://{self.addr}"
+        self._thread = threading.Thread(target=self.server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+        self._thread.start()
+
+    # ------------------------------------------------------------------
+    # Resource model
+    # ------------------------------------------------------------------
+
+    def _add(self, resource):
+        self.resources[resource["id"]] = resource
+        return resource
+
+    def _build(self, lights, plugs, rooms, zones):
+        self._add({"id": _rid("bridge"), "type": "bridge", "bridge_id": BRIDGE_ID})
+        light_ids = []
+        for i in range(lights + plugs):
+            plug = i >= lights
+            device_id, light_id = _rid("device", i), _rid("light", i)
+            name = f"Plug {i - lights + 1}" if plug else f"Light {i + 1}"
+            archetype = "plug" if plug else "sultan_bulb"
+            self._add({"id": device_id, "type": "device", "metadata": {"name": name, "archetype": archetype},
+                       "services": [{"rid": light_id, "rtype": "light"}]})
+            light = {"id": light_id, "type": "light", "owner": {"rid": device_id, "rtype": "device"},
+                     "metadata": {"name": name, "archetype": archetype}, "on": {"on": False}}
+            if not plug:
+                light["dimming"] = {"brightness": 100.0, "min_dim_level": 0.2}
+                light["color"] = {"xy": {"x": 0.4573, "y": 0.41}, "gamut": GAMUT_C, "gamut_type": "C"}
+                light["color_temperature"] = {"mirek": 366, "mirek_valid": True,
+                                              "mirek_schema": {"mirek_minimum": 153, "mirek_maximum": 500}}
+            self._add(light)
+            light_ids.append((device_id, light_id))
+        for kind, count in (("room", rooms), ("zone", zones)):
+            for g in range(count):
+                if kind == "room":
+                    members = light_ids[g::max(rooms, 1)]
+                    children = [{"rid": device_id, "rtype": "device"} for device_id, _ in members]
+                else:
+                    members = light_ids
+                    children = [{"rid": light_id, "rtype": "light"} for _, light_id in members]
+                group_id, grouped_id = _rid(kind, g), _rid(kind, g, "grouped_light")
+                self._add({"id": group_id, "type": kind, "metadata": {"name": f"{kind.title()} {g + 1}", "archetype": "office"},
+                           "children": children, "services": [{"rid": grouped_id, "rtype": "grouped_light"}]})
+                self._add({"id": grouped_id, "type": "grouped_light", "owner": {"rid": group_id, "rtype": kind},
+                           "on": {"on": False}, "dimming": {"brightness": 100.0},
+                           "_members": [light_id for _, light_id in members]})
+
+    def by_type(self, rtype):
+        """Returns the public view of every resource of rtype."""
+        with self._lock:
+            return [self._public(r) for r in self.resources.values() if r["type"] == rtype]
+
+    def ids(self, rtype):
+        return [r["id"] for r in self.by_type(rtype)]
+
+    def state(self, rid):
+        with self._lock:
+            return self._public(self.resources[rid])
+
+    @staticmethod
+    def _public(resource):
+        return {k: json.loads(json.dumps(v)) for k, v in resource.items() if not k.startswith("_")}
+
+    def _apply(self, resource, body):
+        # Caller holds self._lock. Returns the changed fields for the event.
+        changed = {}
+        for field in _STATE_FIELDS:
+            value = body.get(field)
+            if not isinstance(value, dict) or field not in resource:
+                continue
+            if field == "color":
+                resource["color"]["xy"] = dict(value.get("xy", resource["color"]["xy"]))
+                resource["color_temperature"].update(mirek=None, mirek_valid=False)
+                changed["color_temperature"] = {"mirek": None, "mirek_valid": False}
+            elif field == "color_temperature":
+                resource[field].update(mirek=value.get("mirek"), mirek_valid=True)
+            else:
+                resource[field].update(value)
+            changed[field] = {k: resource[field][k] for k in value if k in resource[field]}
+            if field == "color_temperature":
+                changed[field]["mirek_valid"] = True
+        return changed
+
+    def _put(self, rtype, rid, body):
+        with self._lock:
+            resource = self.resources.get(rid)
+            if resource is None or resource["type"] != rtype:
+                return 404, {"errors": [{"description": f"Not found: /{rtype}/{rid}"}], "data": []}
+            dimming = body.get("dimming", {})
+            if "brightness" in dimming and not 0 <= dimming["brightness"] <= 100:
+                return 400, {"errors": [{"description": "brightness out of range"}], "data": []}
+            updates = []
+            if rtype == "grouped_light":
+                for member in resource["_members"]:
+                    changed = self._apply(self.resources[member], body)
+                    if changed:
+                        updates.append(dict(changed, id=member, type="light"))
+                for field in ("on", "dimming"):
+                    if isinstance(body.get(field), dict):
+                        resource[field].update(body[field])
+            changed = self._apply(resource, body) if rtype == "light" else \
+                {f: dict(resource[f]) for f in ("on", "dimming") if isinstance(body.get(f), dict)}
+            if changed:
+                updates.append(dict(changed, id=rid, type=rtype))
+        if updates:
+            self.publish([{"type": "update", "data": updates}])
+        return 200, {"data": [{"rid": rid, "rtype": rtype}], "errors": []}
+
+    # ------------------------------------------------------------------
+    # Control
+    # ------------------------------------------------------------------
+
+    def fail_next(self, *answers):
+        """Scripts the next REST answers: an HTTP status code or "reset"."""
+        with self._lock:
+            self._script.extend(answers)
+
+    def press_link_button(self):
+        """Lets the next POST /api pair (as the physical button would)."""
+        self.link_button = True
+
+    def publish(self, events):
+        """Sends a list of bridge events to every eventstream subscriber."""
+        with self._lock:
+            self._event_seq += 1
+            event_id = f"{int(time.time())}:{self._event_seq}"
+            now = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+            events = [dict(e, id=str(uuid.uuid4()), creationtime=now) for e in events]
+            for subscriber in self._subscribers:
+                subscriber.put((event_id, events))
+
+    def drop_eventstreams(self):
+        """Closes every open eventstream (as a bridge reboot or Wi-Fi drop would)."""
+        with self._lock:
+            for subscriber in self._subscribers:
+                subscriber.put(None)
+
+    def stats(self):
+        """Request counts keyed like 'GET light', 'PUT grouped_light', '429', 'injected'."""
+        with self._lock:
+            return dict(self._counts)
+
+    def _count(self, key):
+        self._counts[key] = self._counts.get(key, 0) + 1
+
+    def close(self):
+        self.drop_eventstreams()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ------------------------------------------------------------------
+    # HTTP
+    # ------------------------------------------------------------------
+
+    def _delay(self):
+        latency = self.latency
+        if isinstance(latency, tuple):
+            latency = self._rng.uniform(*latency)
+        if latency:
+            time.sleep(latency)
+
+    def _injected(self, rtype):
+        # Returns a scripted/random failure, a 429, or None to answer normally.
+        with self._lock:
+            if self._script:
+                self._count("injected")
+                return self._script.pop(0)
+            if self.error_rate and self._rng.random() < self.error_rate:
+                self._count("injected")
+                return 503
+            bucket = self._buckets.get(rtype)
+            if bucket is not None and not bucket.take():
+                self._count("429")
+                return 429
+        return None
+
+    def _handler(self):
+        bridge = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, body):
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _body(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                if not length:
+                    return {}
+                try:
+                    return json.loads(self.rfile.read(length))
+                except ValueError:
+                    return None
+
+            def _route(self):
+                parts = [p for p in self.path.split("?")[0].split("/") if p]
+                if parts[:3] != ["clip", "v2", "resource"]:
+                    return None
+                return parts[3] if len(parts) > 3 else None, parts[4] if len(parts) > 4 else None
+
+            def _rest(self, method):
+                bridge._delay()
+                route = self._route()
+                if route is None:
+                    return self._send(404, {"errors": [{"description": "not found"}]})
+                rtype, rid = route
+                with bridge._lock:
+                    bridge._count(f"{method} {rtype or 'all'}")
+                if self.headers.get("hue-application-key") != bridge.app_key:
+                    return self._send(403, {"errors": [{"description": "unauthorized user"}], "data": []})
+                failure = bridge._injected(rtype if method == "PUT" else None)
+                if failure == "reset":
+                    self.close_connection = True
+                    self.connection.shutdown(socket.SHUT_RDWR)
+                    return
+                if failure is not None:
+                    return self._send(failure, {"errors": [{"description": "injected failure"}], "data": []})
+                if method == "GET":
+                    if rid is not None:
+                        with bridge._lock:
+                            resource = bridge.resources.get(rid)
+                            data = [bridge._public(resource)] if resource and resource["type"] == rtype else None
+                        if data is None:
+                            return self._send(404, {"errors": [{"description": f"Not found: /{rtype}/{rid}"}], "data": []})
+                        return self._send(200, {"errors": [], "data": data})
+                    data = [r for r in (bridge.by_type(rtype) if rtype else
+                                        [bridge._public(r) for r in list(bridge.resources.values())])]
+                    return self._send(200, {"errors": [], "data": data})
+                body = self._body()
+                if body is None or rid is None or rtype not in ("light", "grouped_light"):
+                    return self._send(400, {"errors": [{"description": "invalid request"}], "data": []})
+                self._send(*bridge._put(rtype, rid, body))
+
+            def do_GET(self):
+                if self.path.startswith("/eventstream/clip/v2"):
+                    return self._eventstream()
+                self._rest("GET")
+
+            def do_PUT(self):
+                self._rest("PUT")
+
+            def do_POST(self):
+                bridge._delay()
+                self._body()
+                with bridge._lock:
+                    bridge._count("POST api")
+                if self.path.rstrip("/") != "/api":
+                    return self._send(404, [{"error": {"type": 3, "description": "resource not available"}}])
+                if not bridge.link_button:
+                    return self._send(200, [{"error": {"type": 101, "address": "", "description": "link button not pressed"}}])
+                bridge.link_button = False
+                self._send(200, [{"success": {"username": bridge.app_key}}])
+
+            def _eventstream(self):
+                if self.headers.get("hue-application-key") != bridge.app_key:
+                    return self._send(403, {"errors": [{"description": "unauthorized user"}]})
+                subscriber = queue.Queue()
+                with bridge._lock:
+                    bridge._count("GET eventstream")
+                    bridge._subscribers.append(subscriber)
+                self.close_connection = True
+                try:
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/event-stream")
+                    self.send_header("Cache-Control", "no-cache")
+                    self.send_header("Connection", "close")
+                    self.end_headers()
+                    self.wfile.write(b": hi\n\n")
+                    self.wfile.flush()
+                    while True:
+                        item = subscriber.get()
+                        if item is None:
+                            return
+                        event_id, events = item
+                        self.wfile.write(f"id: {event_id}\ndata: {json.dumps(events)}\n\n".encode())
+                        self.wfile.flush()
+                except OSError:
+                    pass
+                finally:
+                    with bridge._lock:
+                        bridge._subscribers.remove(subscriber)
+
+        return Handler
+
+
+class UrllibSession:
+    """
+    The slice of requests.Session the plugin calls (request, get with
+    stream=True, post), over urllib with the plugin's bridge TLS context.
+    Every request opens a new connection.
+    """
+
+    def __init__(self, cafile=TEST_CA):
+        from octoprint_octohue.tls import build_bridge_context
+        self.context = build_bridge_context(cafile)
+        self.closed = False
+
+    class Response:
+        def __init__(self, status_code, raw):
+            self.status_code = status_code
+            self._raw = raw
+            self._content = None
+
+        @property
+        def content(self):
+            if self._content is None:
+                self._content = self._raw.read()
+                self._raw.close()
+            return self._content
+
+        def json(self):
+            return json.loads(self.content)
+
+        def raise_for_status(self):
+            if self.status_code >= 400:
+                raise RuntimeError(f"HTTP {self.status_code}")
+
+        def iter_lines(self):
+            for line in self._raw:
+                yield line.rstrip(b"\r\n")
+
+        def close(self):
+            # Shut the socket down so a reader blocked in iter_lines wakes up.
+            try:
+                self._raw.fp.raw._sock.shutdown(socket.SHUT_RDWR)
+            except (AttributeError, OSError):
+                pass
+            self._raw.close()
+
+    def request(self, method, url, headers=None, json=None, timeout=None, stream=False, **kwargs):
+        data = None
+        headers = dict(headers or {})
+        if json is not None:
+            data = _dumps(json)
+            headers["Content-Type"] = "application/json"
+        req = urllib.request.Request(url, data=data, headers=headers, method=method)
+        read_timeout = timeout[1] if isinstance(timeout, tuple) else (timeout or 10)
+        try:
+            raw = urllib.request.urlopen(req, timeout=read_timeout, context=self.context)
+        except urllib.error.HTTPError as e:
+            raw = e
+        response = self.Response(raw.status if hasattr(raw, "status") else raw.code, raw)
+        if not stream:
+            response.content
+        return response
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def close(self):
+        self.closed = True
+
+
+def _dumps(value):
+    return json.dumps(value).encode()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local fake Hue bridge.")
+    parser.add_argument("--port", type=int, default=8443)
+    parser.add_argument("--lights", type=int, default=4)
+    parser.add_argument("--plugs", type=int, default=1)
+    parser.add_argument("--rooms", type=int, default=1)
+    parser.add_argument("--zones", type=int, default=0)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every request")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered 503")
+    parser.add_argument("--light-rate", type=float, help="light PUTs per second before 429")
+    parser.add_argument("--group-rate", type=float, help="grouped_light PUTs per second before 429")
+    parser.add_argument("--app-key", default="fake-app-key")
+    args = parser.parse_args()
+    limits = {k: v for k, v in (("light", args.light_rate), ("grouped_light", args.group_rate)) if v}
+    bridge = FakeBridge(lights=args.lights, plugs=args.plugs, rooms=args.rooms, zones=args.zones,
+                        latency=args.latency, error_rate=args.error_rate, rate_limits=limits,
+                        app_key=args.app_key, port=args.port)
+    print(f"Fake bridge on {bridge.base_url} (key {args.app_key!r}, CA {TEST_CA}); Ctrl-C to stop")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        bridge.close()
+
+
+if __name__ == "__main__":
+    main()
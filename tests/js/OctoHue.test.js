@@ -584,6 +584,21 @@ describe("getbridgestatus", () => {
     expect(configured.classList.remove).toHaveBeenCalledWith("inactiveconfig");
   });
 
+  test("unreachable status sets badge to red and keeps configured panel", () => {
+    const vm = makeViewModel();
+    OctoPrint.simpleApiCommand.mockReturnValueOnce(
+      new SyncResult({ bridgestatus: "unreachable", circuit: "open" })
+    );
+    vm.getbridgestatus();
+
+    const badge = document.getElementById("huebridgestatus");
+    expect(badge.style.backgroundColor).toBe("red");
+    expect(badge.innerHTML).toBe("Unreachable");
+
+    const configured = document.getElementById("huebridge_configured");
+    expect(configured.classList.remove).toHaveBeenCalledWith("inactiveconfig");
+  });
+
   test("unconfigured status shows unconfigured panel", () => {
     OctoPrint.simpleApiCommand.mockReturnValueOnce(
       new SyncResult({ bridgestatus: "unconfigured" })
@@ -792,6 +807,78 @@ describe("setFlash", () => {
   });
 });
 
+// ===========================================================================
+// isCritical / setPriority
+// ===========================================================================
+
+describe("isCritical", () => {
+  const criticalEvents = () => makeObservable(["Error", "FilamentRunout", "PrintFailed"]);
+
+  test("an unset priority follows criticalEvents", () => {
+    const vm = makeViewModel({ criticalEvents: criticalEvents() });
+    expect(vm.isCritical({ event: makeObservable("PrintFailed"), priority: makeObservable("") })).toBe(true);
+    expect(vm.isCritical({ event: makeObservable("PrintDone"), priority: makeObservable("") })).toBe(false);
+  });
+
+  test("an explicit priority wins", () => {
+    const vm = makeViewModel({ criticalEvents: criticalEvents() });
+    expect(vm.isCritical({ event: makeObservable("PrintFailed"), priority: makeObservable("normal") })).toBe(false);
+    expect(vm.isCritical({ event: makeObservable("PrintDone"), priority: makeObservable("critical") })).toBe(true);
+  });
+
+  test("setPriority toggles the effective priority", () => {
+    const vm = makeViewModel({ criticalEvents: criticalEvents() });
+    const status = { event: makeObservable("PrintFailed"), priority: makeObservable("") };
+    vm.setPriority(status);
+    expect(status.priority()).toBe("normal");
+    vm.setPriority(status);
+    expect(status.priority()).toBe("critical");
+  });
+});
+
+// ===========================================================================
+// isLeading / isTrailing / setLeading / setTrailing
+// ===========================================================================
+
+describe("throttle edges", () => {
+  const status = (debounce, leading = null, trailing = null) => ({
+    debounce: makeObservable(debounce),
+    leading: makeObservable(leading),
+    trailing: makeObservable(trailing),
+  });
+
+  test("unset leading is on without a debounce and off with one", () => {
+    const vm = makeViewModel();
+    expect(vm.isLeading(status(0))).toBe(true);
+    expect(vm.isLeading(status("0.5"))).toBe(false);
+  });
+
+  test("unset trailing is on", () => {
+    const vm = makeViewModel();
+    expect(vm.isTrailing(status(0))).toBe(true);
+  });
+
+  test("setLeading and setTrailing store the toggled effective value", () => {
+    const vm = makeViewModel();
+    const s = status("0.5");
+    vm.setLeading(s);
+    vm.setTrailing(s);
+    expect(s.leading()).toBe(true);
+    expect(s.trailing()).toBe(false);
+  });
+
+  test("the last edge left on cannot be switched off", () => {
+    const vm = makeViewModel();
+    const s = status("0.5");
+    vm.setTrailing(s);
+    expect(s.trailing()).toBe(null);
+    expect(vm.isTrailing(s)).toBe(true);
+    const t = status(0, true, false);
+    vm.setLeading(t);
+    expect(t.leading()).toBe(true);
+  });
+});
+
 // ===========================================================================
 // addNewStatus — flash field
 // ===========================================================================
@@ -0,0 +1,331 @@
+"""
+Unit tests for per-resource command coalescing (octoprint_octohue/coalescer.py).
+
+The coalescer is driven with a recording send() and a schedule() stub that
+captures flush callbacks, so windows can be closed deterministically.
+"""
+from unittest.mock import MagicMock
+
+from octoprint_octohue.coalescer import CommandCoalescer, merge_payloads
+
+
+class ScheduleStub:
+    """Collects scheduled callbacks; run() closes every open window."""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, delay, callback):
+        self.calls.append((delay, callback))
+
+    def run(self):
+        calls, self.calls = self.calls, []
+        for _, callback in calls:
+            callback()
+
+
+def make(window=0.2):
+    send = MagicMock()
+    schedule = ScheduleStub()
+    return CommandCoalescer(send, schedule, window=window), send, schedule
+
+
+# ===========================================================================
+# merge_payloads
+# ===========================================================================
+
+class TestMergePayloads:
+
+    def test_newer_fields_win(self):
+        merged = merge_payloads({"dimming": {"brightness": 10}}, {"dimming": {"brightness": 90}})
+        assert merged == {"dimming": {"brightness": 90}}
+
+    def test_unrelated_fields_are_kept(self):
+        merged = merge_payloads({"dimming": {"brightness": 10}}, {"color": {"xy": {"x": 0.6, "y": 0.3}}})
+        assert merged["dimming"] == {"brightness": 10}
+        assert merged["color"] == {"xy": {"x": 0.6, "y": 0.3}}
+
+    def test_newer_off_discards_pending_fields(self):
+        older = {"on": {"on": True}, "dimming": {"brightness": 100}, "alert": {"action": "breathe"}}
+        assert merge_payloads(older, {"on": {"on": False}}) == {"on": {"on": False}}
+
+    def test_color_replaces_color_temperature(self):
+        merged = merge_payloads({"color_temperature": {"mirek": 370}}, {"color": {"xy": {"x": 0.6, "y": 0.3}}})
+        assert "color_temperature" not in merged
+
+    def test_color_temperature_replaces_color(self):
+        merged = merge_payloads({"color": {"xy": {"x": 0.6, "y": 0.3}}}, {"color_temperature": {"mirek": 370}})
+        assert "color" not in merged
+
+    def test_dynamics_not_inherited_from_older(self):
+        merged = merge_payloads({"dynamics": {"duration": 400}}, {"on": {"on": True}})
+        assert "dynamics" not in merged
+
+    def test_pending_alert_kept(self):
+        merged = merge_payloads({"alert": {"action": "breathe"}}, {"color": {"xy": {"x": 0.6, "y": 0.3}}})
+        assert merged["alert"] == {"action": "breathe"}
+
+    def test_inputs_not_mutated(self):
+        older = {"color_temperature": {"mirek": 370}}
+        newer = {"color": {"xy": {"x": 0.6, "y": 0.3}}}
+        merge_payloads(older, newer)
+        assert older == {"color_temperature": {"mirek": 370}}
+        assert newer == {"color": {"xy": {"x": 0.6, "y": 0.3}}}
+
+
+# ===========================================================================
+# CommandCoalescer
+# ===========================================================================
+
+class TestCommandCoalescer:
+
+    def test_zero_window_sends_immediately(self):
+        c, send, schedule = make(window=0)
+        assert c.submit("light/1", {"on": {"on": True}}) == "sent"
+        send.assert_called_once_with("light/1", {"on": {"on": True}})
+        assert schedule.calls == []
+
+    def test_first_command_opens_window(self):
+        c, send, schedule = make(window=0.2)
+        assert c.submit("light/1", {"on": {"on": True}}) == "pending"
+        send.assert_not_called()
+        assert schedule.calls[0][0] == 0.2
+
+    def test_burst_collapses_to_one_put_with_final_state(self):
+        c, send, schedule = make()
+        c.submit("light/1", {"on": {"on": True}, "color": {"xy": {"x": 0.3, "y": 0.3}}})
+        assert c.submit("light/1", {"on": {"on": True}, "color": {"xy": {"x": 0.4, "y": 0.5}}}) == "coalesced"
+        assert c.submit("light/1", {"on": {"on": True}, "color": {"xy": {"x": 0.6, "y": 0.3}}}) == "coalesced"
+        schedule.run()
+        send.assert_called_once_with("light/1", {"on": {"on": True}, "color": {"xy": {"x": 0.6, "y": 0.3}}})
+
+    def test_only_one_flush_scheduled_per_window(self):
+        c, _, schedule = make()
+        for _ in range(5):
+            c.submit("light/1", {"on": {"on": True}})
+        assert len(schedule.calls) == 1
+
+    def test_resources_are_coalesced_independently(self):
+        c, send, schedule = make()
+        c.submit("light/1", {"on": {"on": True}})
+        c.submit("grouped_light/2", {"on": {"on": False}})
+        schedule.run()
+        assert send.call_count == 2
+
+    def test_new_window_after_flush(self):
+        c, send, schedule = make()
+        c.submit("light/1", {"on": {"on": True}})
+        schedule.run()
+        assert c.submit("light/1", {"on": {"on": False}}) == "pending"
+        schedule.run()
+        assert send.call_count == 2
+
+    def test_flush_without_pending_is_noop(self):
+        c, send, _ = make()
+        c.flush("light/1")
+        send.assert_not_called()
+
+    def test_flush_all_sends_everything_pending(self):
+        c, send, _ = make()
+        c.submit("light/1", {"on": {"on": False}})
+        c.submit("light/2", {"on": {"on": False}})
+        c.flush_all()
+        assert send.call_count == 2
+        assert c.stats()["pending"] == 0
+
+    def test_stats_count_coalesced_and_sent(self):
+        c, _, schedule = make()
+        c.submit("light/1", {"on": {"on": True}})
+        c.submit("light/1", {"on": {"on": True}})
+        c.submit("light/1", {"on": {"on": True}})
+        assert c.stats()["pending"] == 1
+        schedule.run()
+        stats = c.stats()
+        assert stats["coalesced"] == 2
+        assert stats["sent"] == 1
+        assert stats["pending"] == 0
+        assert stats["window"] == 0.2
+
+
+# ===========================================================================
+# CommandCoalescer  –  rate limiter integration
+# ===========================================================================
+
+class TestCoalescerRateLimited:
+
+    def _limiter(self, *outcomes):
+        limiter = MagicMock()
+        limiter.admit.side_effect = list(outcomes)
+        return limiter
+
+    def test_admitted_command_sent_immediately(self):
+        c, send, schedule = make(window=0)
+        c.limiter = self._limiter(("sent", 0.0))
+        assert c.submit("light/1", {"on": {"on": True}}) == "sent"
+        c.limiter.admit.assert_called_once_with("light")
+        send.assert_called_once()
+
+    def test_limiter_keyed_by_resource_type(self):
+        c, _, _ = make(window=0)
+        c.limiter = self._limiter(("sent", 0.0))
+        c.submit("grouped_light/abc", {"on": {"on": True}})
+        c.limiter.admit.assert_called_once_with("grouped_light")
+
+    def test_queued_command_waits_for_reserved_slot(self):
+        c, send, schedule = make(window=0)
+        c.limiter = self._limiter(("queued", 0.8))
+        assert c.submit("grouped_light/1", {"on": {"on": True}}) == "queued"
+        send.assert_not_called()
+        assert schedule.calls[0][0] == 0.8
+        schedule.run()
+        send.assert_called_once_with("grouped_light/1", {"on": {"on": True}})
+        assert c.limiter.admit.call_count == 1  # slot already reserved
+
+    def test_commands_arriving_while_queued_are_merged(self):
+        c, send, schedule = make(window=0)
+        c.limiter = self._limiter(("queued", 0.8))
+        c.submit("grouped_light/1", {"on": {"on": True}, "dimming": {"brightness": 100}})
+        assert c.submit("grouped_light/1", {"on": {"on": False}}) == "coalesced"
+        schedule.run()
+        send.assert_called_once_with("grouped_light/1", {"on": {"on": False}})
+
+    def test_dropped_command_not_sent(self):
+        c, send, schedule = make(window=0)
+        c.limiter = self._limiter(("dropped", 0.0))
+        assert c.submit("light/1", {"on": {"on": True}}) == "dropped"
+        send.assert_not_called()
+        assert schedule.calls == []
+        assert c.stats()["dropped"] == 1
+        assert c.stats()["pending"] == 0
+
+    def test_window_flush_is_admitted_by_limiter(self):
+        c, send, schedule = make(window=0.2)
+        c.limiter = self._limiter(("queued", 0.5), ("sent", 0.0))
+        c.submit("light/1", {"on": {"on": True}})
+        schedule.run()  # window closes, limiter says wait
+        send.assert_not_called()
+        assert schedule.calls[0][0] == 0.5
+        schedule.run()
+        send.assert_called_once()
+
+    def test_flush_all_bypasses_limiter(self):
+        c, send, _ = make(window=0.2)
+        c.limiter = self._limiter()
+        c.submit("light/1", {"on": {"on": False}})
+        c.flush_all()
+        send.assert_called_once()
+        c.limiter.admit.assert_not_called()
+
+
+# ===========================================================================
+# Retries
+# ===========================================================================
+
+def make_retrying(window=0.0, backoff=0.5):
+    send = MagicMock(return_value=False)
+    schedule = ScheduleStub()
+    retry = MagicMock()
+    retry.backoff.return_value = backoff
+    return CommandCoalescer(send, schedule, window=window, retry=retry), send, schedule, retry
+
+
+class TestCoalescerCritical:
+
+    def test_critical_skips_the_window(self):
+        c, send, schedule = make(window=0.2)
+        assert c.submit("light/1", {"on": {"on": True}}, critical=True) == "sent"
+        send.assert_called_once_with("light/1", {"on": {"on": True}})
+        assert schedule.calls == []
+
+    def test_critical_takes_pending_payload_with_it(self):
+        c, send, schedule = make(window=0.2)
+        c.submit("light/1", {"dimming": {"brightness": 40}, "color": {"xy": {"x": 0.3, "y": 0.3}}})
+        c.submit("light/1", {"color": {"xy": {"x": 0.7, "y": 0.3}}}, critical=True)
+        send.assert_called_once_with("light/1", {"dimming": {"brightness": 40}, "color": {"xy": {"x": 0.7, "y": 0.3}}})
+        schedule.run()  # the abandoned window finds nothing to send
+        assert send.call_count == 1
+        assert (c.stats()["critical"], c.stats()["preempted"]) == (1, 1)
+
+    def test_critical_never_queued_or_dropped_by_limiter(self):
+        from octoprint_octohue.ratelimit import BridgeRateLimiter
+        c, send, schedule = make(window=0)
+        c.limiter = BridgeRateLimiter(max_wait=0.0)
+        c.submit("grouped_light/1", {"on": {"on": True}})
+        assert c.submit("grouped_light/1", {"on": {"on": True}}) == "dropped"
+        assert c.submit("grouped_light/1", {"on": {"on": False}}, critical=True) == "sent"
+        assert send.call_count == 2
+
+    def test_critical_uses_the_reserved_slot_of_a_queued_payload(self):
+        from octoprint_octohue.ratelimit import BridgeRateLimiter
+        c, send, schedule = make(window=0)
+        c.limiter = limiter = MagicMock(wraps=BridgeRateLimiter(max_wait=5.0))
+        c.submit("grouped_light/1", {"on": {"on": True}})
+        assert c.submit("grouped_light/1", {"dimming": {"brightness": 40}}) == "queued"
+        c.submit("grouped_light/1", {"on": {"on": False}}, critical=True)
+        # One admit per PUT: the critical send took over the queued payload's token.
+        assert limiter.admit.call_count == 2
+        assert send.call_count == 2
+        schedule.run()  # the queued flush finds nothing left to send
+        assert send.call_count == 2
+
+
+class TestCoalescerRetry:
+
+    def test_failed_send_is_retried_after_backoff(self):
+        c, send, schedule, retry = make_retrying()
+        c.submit("light/a", {"on": {"on": True}})
+        assert schedule.calls[0][0] == 0.5
+        retry.backoff.assert_called_once_with(0)
+        send.return_value = True
+        schedule.run()
+        assert send.call_count == 2
+        assert c.stats()["retried"] == 1
+
+    def test_attempt_count_grows_across_retries(self):
+        c, send, schedule, retry = make_retrying()
+        c.submit("light/a", {"on": {"on": True}})
+        schedule.run()
+        assert [call.args[0] for call in retry.backoff.call_args_list] == [0, 1]
+
+    def test_gives_up_when_policy_refuses(self):
+        c, send, schedule, retry = make_retrying()
+        retry.backoff.return_value = None
+        c.submit("light/a", {"on": {"on": True}})
+        assert schedule.calls == []
+        assert c.stats()["failed"] == 1
+
+    def test_failed_callback_reports_whether_retrying(self):
+        c, send, schedule, retry = make_retrying()
+        c._failed_callback = failed = MagicMock()
+        c.submit("light/a", {"on": {"on": True}})
+        failed.assert_called_once_with("light/a", True)
+        retry.backoff.return_value = None
+        schedule.run()
+        failed.assert_called_with("light/a", False)
+
+    def test_newer_send_supersedes_retry(self):
+        c, send, schedule, retry = make_retrying()
+        c.submit("light/a", {"on": {"on": True}})
+        send.return_value = True
+        c.submit("light/a", {"on": {"on": False}})
+        retry_callback = schedule.calls[0][1]
+        retry_callback()
+        assert send.call_count == 2
+        assert c.stats()["superseded"] == 1
+
+    def test_retry_merges_under_pending_newer_payload(self):
+        c, send, schedule, retry = make_retrying(window=0.2)
+        c.submit("light/a", {"on": {"on": True}, "dimming": {"brightness": 50}})
+        schedule.run()                       # window closes, send fails, retry scheduled
+        send.return_value = True
+        c.submit("light/a", {"dimming": {"brightness": 80}})   # opens a new window
+        schedule.run()                       # retry merges into the pending payload; window flushes
+        assert send.call_count == 2
+        assert send.call_args[0][1] == {"on": {"on": True}, "dimming": {"brightness": 80}}
+
+    def test_no_retry_without_policy(self):
+        send = MagicMock(return_value=False)
+        schedule = ScheduleStub()
+        c = CommandCoalescer(send, schedule)
+        c.submit("light/a", {"on": {"on": True}})
+        assert schedule.calls == []
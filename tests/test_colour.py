@@ -0,0 +1,176 @@
+"""
+Unit tests for colour conversion and gamut clamping (octoprint_octohue/colour.py).
+"""
+import pytest
+
+from octoprint_octohue import colour
+from octoprint_octohue.colour import (
+    GAMUTS,
+    SRGB_LINEAR,
+    _linearise,
+    clamp_to_gamut,
+    delta_e,
+    gamut_of,
+    hex_to_rgb,
+    mirek_to_xy,
+    mirek_to_xy_batch,
+    rgb_to_xy,
+    rgb_to_xy_batch,
+    xy_to_lab,
+)
+
+
+def reference_xy(r, g, b):
+    """The per-call formula the table-driven path replaces."""
+    rs, gs, bs = (_linearise(v / 255.0) for v in (r, g, b))
+    x = 0.4124 * rs + 0.3576 * gs + 0.1805 * bs
+    y = 0.2126 * rs + 0.7152 * gs + 0.0722 * bs
+    z = 0.0193 * rs + 0.1192 * gs + 0.9505 * bs
+    return x / (x + y + z), y / (x + y + z)
+
+
+class TestConversion:
+
+    def test_table_covers_every_channel_value(self):
+        assert len(SRGB_LINEAR) == 256
+        assert SRGB_LINEAR[0] == 0.0
+        assert SRGB_LINEAR[255] == pytest.approx(1.0)
+
+    def test_table_path_matches_formula(self):
+        for rgb in [(255, 0, 0), (1, 2, 3), (10, 11, 12), (128, 64, 200), (255, 255, 255)]:
+            assert rgb_to_xy(*rgb) == pytest.approx(reference_xy(*rgb), abs=1e-12)
+
+    def test_out_of_table_values_still_convert(self):
+        assert rgb_to_xy(127.5, 0.0, 0.0) == pytest.approx(reference_xy(255, 0, 0), abs=1e-9)
+
+    def test_black_is_none(self):
+        assert rgb_to_xy(0, 0, 0) is None
+
+    def test_results_are_memoised(self):
+        rgb_to_xy.cache_clear()
+        rgb_to_xy(12, 34, 56)
+        rgb_to_xy(12, 34, 56)
+        info = rgb_to_xy.cache_info()
+        assert (info.hits, info.misses) == (1, 1)
+
+    def test_hex_to_rgb(self):
+        assert hex_to_rgb("#10Ff00") == (16, 255, 0)
+        with pytest.raises(ValueError):
+            hex_to_rgb("nope")
+
+
+class TestGamut:
+
+    def test_reported_triangle_is_used(self):
+        resource = {"color": {"gamut_type": "C", "gamut": {
+            "red": {"x": 0.6, "y": 0.3}, "green": {"x": 0.2, "y": 0.7}, "blue": {"x": 0.15, "y": 0.05}}}}
+        assert gamut_of(resource) == ((0.6, 0.3), (0.2, 0.7), (0.15, 0.05))
+
+    def test_gamut_type_falls_back_to_table(self):
+        assert gamut_of({"color": {"gamut_type": "B"}}) == GAMUTS["B"]
+
+    def test_white_only_lamp_has_no_gamut(self):
+        assert gamut_of({"dimming": {"brightness": 100}}) is None
+        assert gamut_of(None) is None
+        assert gamut_of({"color": {"gamut_type": "other"}}) is None
+
+    def test_inside_point_is_unchanged(self):
+        assert clamp_to_gamut([0.3127, 0.329], GAMUTS["C"]) == (0.3127, 0.329)
+
+    def test_corner_maps_to_itself(self):
+        for corner in GAMUTS["A"]:
+            assert clamp_to_gamut(corner, GAMUTS["A"]) == pytest.approx(corner)
+
+    def test_outside_point_moves_to_nearest_edge(self):
+        # sRGB green lies outside gamut B; it lands on the B triangle's edge.
+        green = rgb_to_xy(0, 255, 0)
+        clamped = clamp_to_gamut(green, GAMUTS["B"])
+        assert clamped != pytest.approx(green)
+        assert clamp_to_gamut(clamped, GAMUTS["B"]) == pytest.approx(clamped)
+
+    def test_point_beyond_red_corner_clamps_to_corner(self):
+        assert clamp_to_gamut((0.8, 0.2), GAMUTS["B"]) == pytest.approx(GAMUTS["B"][0], abs=0.05)
+
+    def test_no_gamut_leaves_point_alone(self):
+        assert clamp_to_gamut([0.9, 0.9], None) == (0.9, 0.9)
+
+
+# ===========================================================================
+# Batch conversion
+# ===========================================================================
+
+GRADIENT = [(r, 255 - r, (r * 7) % 256) for r in range(256)] + [(0, 0, 0), "#FF8800"]
+
+
+@pytest.fixture(params=["python", "numpy"])
+def backend(request, monkeypatch):
+    """Runs a test once with the pure-Python loop and once vectorised."""
+    if request.param == "python":
+        monkeypatch.setattr(colour, "np", None)
+    else:
+        pytest.importorskip("numpy")
+        monkeypatch.setattr(colour, "NUMPY_MIN_BATCH", 1)
+    return request.param
+
+
+class TestBatch:
+
+    def test_matches_scalar_conversion(self, backend):
+        result = rgb_to_xy_batch(GRADIENT)
+        expected = [rgb_to_xy(*hex_to_rgb(c)) if isinstance(c, str) else rgb_to_xy(*c) for c in GRADIENT]
+        assert len(result) == len(expected)
+        for got, want in zip(result, expected):
+            if want is None:
+                assert got is None
+            else:
+                assert got == pytest.approx(want, abs=1e-12)
+
+    def test_black_is_none(self, backend):
+        assert rgb_to_xy_batch([(0, 0, 0), (255, 0, 0)])[0] is None
+
+    def test_empty_batch(self, backend):
+        assert rgb_to_xy_batch([]) == []
+
+    def test_invalid_hex_raises(self, backend):
+        with pytest.raises(ValueError):
+            rgb_to_xy_batch(["#GG0000"])
+
+    def test_mirek_batch_matches_scalar(self, backend):
+        values = list(range(153, 501, 7))
+        for got, mirek in zip(mirek_to_xy_batch(values), values):
+            assert got == pytest.approx(mirek_to_xy(mirek), abs=1e-12)
+
+    def test_numpy_array_input(self):
+        np = pytest.importorskip("numpy")
+        colours = np.array([(255, 0, 0)] * 64, dtype=np.uint8)
+        assert rgb_to_xy_batch(colours)[0] == pytest.approx(rgb_to_xy(255, 0, 0), abs=1e-12)
+
+
+class TestMirek:
+
+    def test_warm_and_cool_whites_lie_near_the_planckian_locus(self):
+        # 2000 K and 6500 K reference chromaticities.
+        assert mirek_to_xy(500) == pytest.approx((0.527, 0.413), abs=0.002)
+        assert mirek_to_xy(154) == pytest.approx((0.313, 0.324), abs=0.002)
+
+    def test_out_of_range_values_are_clamped(self):
+        assert mirek_to_xy(10000) == mirek_to_xy(599)
+
+
+class TestDeltaE:
+
+    def test_white_point_is_neutral(self):
+        x, y, z = colour.D65_WHITE
+        lab = xy_to_lab((x / (x + y + z), y / (x + y + z)))
+        assert lab == pytest.approx((100.0, 0.0, 0.0), abs=1e-6)
+
+    def test_identical_colours_do_not_differ(self):
+        lab = xy_to_lab(rgb_to_xy(255, 128, 0))
+        assert delta_e(lab, lab) == 0.0
+
+    def test_near_colours_differ_less_than_far_ones(self):
+        red = xy_to_lab(rgb_to_xy(255, 0, 0))
+        near = xy_to_lab(rgb_to_xy(250, 5, 0))
+        green = xy_to_lab(rgb_to_xy(0, 255, 0))
+        assert delta_e(red, near) < 5.0
+        assert delta_e(red, green) > 100.0
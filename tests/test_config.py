@@ -0,0 +1,58 @@
+"""
+Unit tests for the settings snapshot (octoprint_octohue/config.py).
+"""
+from datetime import time
+from unittest.mock import MagicMock
+
+import pytest
+
+from octoprint_octohue.config import ConfigSnapshot
+from tests.conftest import make_settings_getter
+
+
+def snapshot(**overrides):
+    settings = MagicMock()
+    settings.get.side_effect = make_settings_getter(overrides)
+    return ConfigSnapshot.from_settings(settings)
+
+
+class TestConfigSnapshot:
+
+    def test_reads_values(self):
+        c = snapshot(lampid="lamp", plugid="plug", lampisgroup=True)
+        assert (c.lampid, c.plugid, c.lampisgroup) == ("lamp", "plug", True)
+
+    def test_night_mode_times_pre_parsed(self):
+        c = snapshot(nightmode_start="22:00", nightmode_end="07:30")
+        assert c.nightmode_start == time(22, 0)
+        assert c.nightmode_end == time(7, 30)
+
+    def test_unparsable_night_mode_time_is_none(self):
+        c = snapshot(nightmode_start="late", nightmode_end=None)
+        assert c.nightmode_start is None
+        assert c.nightmode_end is None
+
+    def test_togglebri_falls_back_to_defaultbri(self):
+        assert snapshot(togglebri=0, defaultbri=40).togglebri == 40
+        assert snapshot(togglebri="", defaultbri=40).togglebri == 40
+        assert snapshot(togglebri=70, defaultbri=40).togglebri == 70
+
+    def test_nightmode_maxbri_defaults_to_64(self):
+        assert snapshot(nightmode_maxbri=None).nightmode_maxbri == 64
+
+    def test_empty_togglecolour_is_none(self):
+        assert snapshot(togglecolour="").togglecolour is None
+
+    def test_immutable(self):
+        c = snapshot()
+        with pytest.raises(AttributeError):
+            c.lampid = "other"
+        with pytest.raises(AttributeError):
+            c.extra = 1
+
+    def test_reads_each_setting_once(self):
+        settings = MagicMock()
+        settings.get.side_effect = make_settings_getter()
+        ConfigSnapshot.from_settings(settings)
+        keys = [c[0][0][0] for c in settings.get.call_args_list]
+        assert sorted(keys) == sorted(ConfigSnapshot.__slots__)
@@ -0,0 +1,113 @@
+"""
+Unit tests for delta-only PUTs (octoprint_octohue/delta.py).
+"""
+from octoprint_octohue.delta import DeltaFilter, diff_payload, expected_update
+from octoprint_octohue.eventstream import LightStateMirror
+
+
+WHITE_FULL = {
+    "on": {"on": True},
+    "dimming": {"brightness": 100.0},
+    "color": {"xy": {"x": 0.3227, "y": 0.329}},
+    "color_temperature": {"mirek": None, "mirek_valid": False},
+}
+
+
+class TestDiffPayload:
+
+    def test_unknown_state_sends_everything(self):
+        payload = {"on": {"on": True}}
+        assert diff_payload(None, payload) == payload
+
+    def test_identical_state_is_suppressed(self):
+        payload = {"on": {"on": True}, "dimming": {"brightness": 100.0},
+                   "color": {"xy": {"x": 0.3227, "y": 0.329}}}
+        assert diff_payload(WHITE_FULL, payload) is None
+
+    def test_dynamics_alone_is_suppressed(self):
+        payload = {"on": {"on": True}, "dynamics": {"duration": 400}}
+        assert diff_payload(WHITE_FULL, payload) is None
+
+    def test_unchanged_fields_are_trimmed(self):
+        payload = {"on": {"on": True}, "dimming": {"brightness": 40.0}, "dynamics": {"duration": 400}}
+        assert diff_payload(WHITE_FULL, payload) == {"dimming": {"brightness": 40.0}, "dynamics": {"duration": 400}}
+
+    def test_brightness_within_reporting_precision_matches(self):
+        assert diff_payload(WHITE_FULL, {"dimming": {"brightness": 99.8}}) is None
+        assert diff_payload(WHITE_FULL, {"dimming": {"brightness": 99.0}}) == {"dimming": {"brightness": 99.0}}
+
+    def test_xy_within_reporting_precision_matches(self):
+        assert diff_payload(WHITE_FULL, {"color": {"xy": {"x": 0.32274, "y": 0.32896}}}) is None
+        assert diff_payload(WHITE_FULL, {"color": {"xy": {"x": 0.6, "y": 0.3}}}) is not None
+
+    def test_colour_is_sent_while_lamp_is_in_ct_mode(self):
+        known = dict(WHITE_FULL, color_temperature={"mirek": 370, "mirek_valid": True})
+        payload = {"color": {"xy": {"x": 0.3227, "y": 0.329}}}
+        assert diff_payload(known, payload) == payload
+
+    def test_colour_temperature_matches_only_in_ct_mode(self):
+        known = dict(WHITE_FULL, color_temperature={"mirek": 370, "mirek_valid": True})
+        assert diff_payload(known, {"color_temperature": {"mirek": 370}}) is None
+        assert diff_payload(WHITE_FULL, {"color_temperature": {"mirek": 370}}) is not None
+
+    def test_alert_is_always_sent(self):
+        payload = {"on": {"on": True}, "alert": {"action": "breathe"}}
+        assert diff_payload(WHITE_FULL, payload) == {"alert": {"action": "breathe"}}
+
+    def test_off_when_already_off_is_suppressed(self):
+        known = dict(WHITE_FULL, on={"on": False})
+        assert diff_payload(known, {"on": {"on": False}}) is None
+        assert diff_payload(known, {"on": {"on": True}}) == {"on": {"on": True}}
+
+
+class TestExpectedUpdate:
+
+    def test_colour_leaves_ct_mode(self):
+        update = expected_update("a", {"color": {"xy": {"x": 0.6, "y": 0.3}}})
+        assert update["color_temperature"] == {"mirek": None, "mirek_valid": False}
+
+    def test_colour_temperature_enters_ct_mode(self):
+        update = expected_update("a", {"color_temperature": {"mirek": 300}})
+        assert update["color_temperature"] == {"mirek": 300, "mirek_valid": True}
+
+    def test_transient_fields_are_not_mirrored(self):
+        update = expected_update("a", {"on": {"on": True}, "alert": {"action": "breathe"}})
+        assert update == {"id": "a", "on": {"on": True}}
+
+
+def make_filter(live=True):
+    mirror = LightStateMirror()
+    mirror.seed([dict(WHITE_FULL, id="lamp"), dict(on={"on": True}, dimming={"brightness": 100.0}, id="group")])
+    mirror.live = live
+    return DeltaFilter(mirror), mirror
+
+
+class TestDeltaFilter:
+
+    def test_suppresses_and_counts(self):
+        delta, _ = make_filter()
+        assert delta.filter("light/lamp", {"on": {"on": True}}) is None
+        assert delta.stats() == {"suppressed": 1, "trimmed": 0}
+
+    def test_trims_and_counts(self):
+        delta, _ = make_filter()
+        assert delta.filter("light/lamp", {"on": {"on": True}, "dimming": {"brightness": 20.0}}) == \
+            {"dimming": {"brightness": 20.0}}
+        assert delta.stats() == {"suppressed": 0, "trimmed": 1}
+
+    def test_passes_through_when_mirror_not_live(self):
+        delta, _ = make_filter(live=False)
+        payload = {"on": {"on": True}}
+        assert delta.filter("light/lamp", payload) is payload
+
+    def test_grouped_lights_are_not_filtered(self):
+        delta, _ = make_filter()
+        payload = {"on": {"on": True}}
+        assert delta.filter("grouped_light/group", payload) is payload
+
+    def test_confirm_updates_mirror_before_bridge_event(self):
+        delta, mirror = make_filter()
+        delta.confirm("light/lamp", {"color": {"xy": {"x": 0.6, "y": 0.3}}})
+        # Going back to white must not be suppressed against the stale white state.
+        payload = {"color": {"xy": {"x": 0.3227, "y": 0.329}}}
+        assert delta.filter("light/lamp", payload) == payload
@@ -0,0 +1,85 @@
+"""
+Unit tests for the sampled bridge request log (octoprint_octohue/diagnostics.py).
+"""
+import logging
+from unittest.mock import MagicMock
+
+from octoprint_octohue.diagnostics import RequestLog
+
+
+def quiet_logger():
+    logger = MagicMock(name="logger")
+    logger.isEnabledFor.return_value = False
+    return logger
+
+
+class TestSampling:
+
+    def test_logs_one_success_in_n(self):
+        logger = quiet_logger()
+        log = RequestLog(logger, sample=10)
+        for _ in range(30):
+            log.record("PUT", "light/1", 200, 0.01)
+        assert logger.info.call_count == 3
+        assert log.stats() == {"seen": 30, "logged": 3, "buffered": 30}
+
+    def test_sample_zero_never_logs(self):
+        logger = quiet_logger()
+        log = RequestLog(logger, sample=0)
+        for _ in range(100):
+            log.record("GET", "light", 200, 0.01)
+        logger.info.assert_not_called()
+
+    def test_failures_are_buffered_but_not_sampled(self):
+        logger = quiet_logger()
+        log = RequestLog(logger, sample=1)
+        log.record("PUT", "light/1", 503, 0.01, error="HTTP 503")
+        log.record("GET", "light", error="circuit open")
+        logger.info.assert_not_called()
+        assert [e["error"] for e in log.dump()] == ["HTTP 503", "circuit open"]
+
+    def test_debug_logs_every_request(self):
+        logger = MagicMock(name="logger")
+        logger.isEnabledFor.return_value = True
+        log = RequestLog(logger, sample=50)
+        for _ in range(5):
+            log.record("PUT", "light/1", 200, 0.01, payload={"on": {"on": True}})
+        assert logger.debug.call_count == 5
+        logger.info.assert_not_called()
+
+    def test_nothing_formatted_when_not_logged(self):
+        class Loud:
+            formatted = 0
+
+            def __repr__(self):
+                Loud.formatted += 1
+                return "loud"
+
+        logger = logging.getLogger("octohue.test.requestlog")
+        logger.setLevel(logging.INFO)
+        log = RequestLog(logger, sample=1000)
+        for _ in range(100):
+            log.record("PUT", "light/1", 200, 0.01, payload=Loud())
+        assert Loud.formatted == 0
+
+
+class TestRingBuffer:
+
+    def test_keeps_only_the_most_recent(self):
+        log = RequestLog(quiet_logger(), size=3)
+        for i in range(5):
+            log.record("PUT", f"light/{i}", 200, 0.002)
+        assert [e["path"] for e in log.dump()] == ["light/2", "light/3", "light/4"]
+
+    def test_dump_fields(self):
+        log = RequestLog(quiet_logger(), clock=lambda: 1700000000.12345)
+        log.record("PUT", "light/1", 207, 0.0123, payload={"on": {"on": False}})
+        assert log.dump() == [{
+            "time": 1700000000.123,
+            "method": "PUT",
+            "path": "light/1",
+            "status": 207,
+            "ms": 12.3,
+            "error": None,
+            "payload": {"on": {"on": False}},
+        }]
@@ -0,0 +1,277 @@
+"""
+Unit tests for the single-threaded command dispatcher
+(octoprint_octohue/dispatcher.py).
+
+Most tests drive the dispatcher synchronously through run_due() with a fake
+clock; a small number start the real worker thread to check it wakes up for
+jobs submitted while it is idle.
+"""
+import contextvars
+import threading
+from unittest.mock import MagicMock
+
+from octoprint_octohue.dispatcher import CommandDispatcher
+
+
+class FakeClock:
+    def __init__(self, now=100.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+# ===========================================================================
+# submit / run_due
+# ===========================================================================
+
+class TestRunDue:
+
+    def test_job_not_run_before_due(self):
+        handler = MagicMock()
+        clock = FakeClock()
+        d = CommandDispatcher(handler, clock=clock)
+        d.submit(5, "lamp", {"on": True})
+        assert d.run_due() == 0
+        handler.assert_not_called()
+
+    def test_job_runs_once_due(self):
+        handler = MagicMock()
+        clock = FakeClock()
+        d = CommandDispatcher(handler, clock=clock)
+        d.submit(5, "lamp", {"on": True})
+        clock.now += 5
+        assert d.run_due() == 1
+        handler.assert_called_once_with("lamp", {"on": True})
+
+    def test_jobs_run_in_due_order_not_submission_order(self):
+        order = []
+        clock = FakeClock()
+        d = CommandDispatcher(lambda device, payload: order.append(payload["n"]), clock=clock)
+        d.submit(15, "lamp", {"n": "off"})
+        d.submit(0, "lamp", {"n": "flash"})
+        d.submit(5, "lamp", {"n": "mid"})
+        clock.now += 20
+        d.run_due()
+        assert order == ["flash", "mid", "off"]
+
+    def test_equal_due_times_keep_submission_order(self):
+        order = []
+        d = CommandDispatcher(lambda device, payload: order.append(payload["n"]), clock=FakeClock())
+        for n in range(5):
+            d.submit(0, "lamp", {"n": n})
+        d.run_due()
+        assert order == [0, 1, 2, 3, 4]
+
+    def test_callback_used_instead_of_handler(self):
+        handler = MagicMock()
+        callback = MagicMock()
+        d = CommandDispatcher(handler, clock=FakeClock())
+        d.submit(0, "plug", callback=callback)
+        d.run_due()
+        callback.assert_called_once_with()
+        handler.assert_not_called()
+
+    def test_callback_receives_payload_as_kwargs(self):
+        callback = MagicMock()
+        d = CommandDispatcher(MagicMock(), clock=FakeClock())
+        d.submit(0, "plug", {"on": False}, callback=callback)
+        d.run_due()
+        callback.assert_called_once_with(on=False)
+
+    def test_negative_delay_treated_as_immediate(self):
+        handler = MagicMock()
+        d = CommandDispatcher(handler, clock=FakeClock())
+        d.submit(-3, "lamp", {})
+        assert d.run_due() == 1
+
+    def test_failing_job_is_logged_and_does_not_stop_later_jobs(self):
+        logger = MagicMock()
+        handler = MagicMock(side_effect=[RuntimeError("boom"), None])
+        d = CommandDispatcher(handler, logger=logger, clock=FakeClock())
+        d.submit(0, "lamp", {})
+        d.submit(0, "lamp", {})
+        assert d.run_due() == 2
+        logger.error.assert_called_once()
+        assert handler.call_count == 2
+
+
+    def test_cancelled_job_never_runs(self):
+        handler = MagicMock()
+        d = CommandDispatcher(handler, clock=FakeClock())
+        job = d.submit(0, "lamp", {"n": 1})
+        d.submit(0, "lamp", {"n": 2})
+        assert d.cancel(job) is True
+        assert d.cancel(job) is False
+        d.run_due()
+        handler.assert_called_once_with("lamp", {"n": 2})
+
+    def test_supersede_cancels_only_that_slot(self):
+        order = []
+        d = CommandDispatcher(lambda device, payload: order.append(payload["n"]), clock=FakeClock())
+        d.submit(10, "lamp", {"n": "started"}, slot="lamp")
+        d.submit(15, "lamp", {"n": "flash-off"}, slot="lamp")
+        d.submit(10, "plug", {"n": "plug"}, slot="plug")
+        cancelled = d.supersede("lamp")
+        assert [job.payload["n"] for job in cancelled] == ["started", "flash-off"]
+        d.submit(0, "lamp", {"n": "failed"}, slot="lamp")
+        d._clock.now += 20
+        d.run_due()
+        assert order == ["failed", "plug"]
+        assert d.stats()["superseded"] == 2
+
+    def test_supersede_skips_jobs_that_already_ran(self):
+        d = CommandDispatcher(MagicMock(), clock=FakeClock())
+        d.submit(0, "lamp", {}, slot="lamp")
+        d.run_due()
+        assert d.supersede("lamp") == []
+
+    def test_cancel_removes_job_from_its_slot(self):
+        d = CommandDispatcher(MagicMock(), clock=FakeClock())
+        job = d.submit(5, "lamp", {}, slot="lamp")
+        d.cancel(job)
+        assert d.supersede("lamp") == []
+
+    def test_job_runs_in_submitter_context(self):
+        var = contextvars.ContextVar("var", default="unset")
+        seen = []
+        d = CommandDispatcher(lambda device, payload: seen.append(var.get()), clock=FakeClock())
+        token = var.set("event-a")
+        d.submit(0, "lamp", {})
+        var.reset(token)
+        d.submit(0, "lamp", {})
+        d.run_due()
+        assert seen == ["event-a", "unset"]
+
+
+# ===========================================================================
+# critical lane
+# ===========================================================================
+
+class TestCriticalLane:
+
+    def test_due_critical_job_runs_before_backlog(self):
+        order = []
+        clock = FakeClock()
+        d = CommandDispatcher(lambda device, payload: order.append(payload["n"]), clock=clock)
+        d.submit(0, "lamp", {"n": "white-1"})
+        d.submit(1, "lamp", {"n": "white-2"})
+        clock.now += 2
+        d.submit(0, "lamp", {"n": "red"}, critical=True)
+        d.run_due()
+        assert order == ["red", "white-1", "white-2"]
+        assert d.stats()["preempted"] == 1
+
+    def test_critical_job_waits_for_its_delay(self):
+        order = []
+        clock = FakeClock()
+        d = CommandDispatcher(lambda device, payload: order.append(payload["n"]), clock=clock)
+        d.submit(5, "lamp", {"n": "red"}, critical=True)
+        d.submit(0, "lamp", {"n": "white"})
+        d.run_due()
+        assert order == ["white"]
+        assert (d.stats()["depth"], d.stats()["critical"]) == (1, 1)
+
+    def test_supersede_and_cancel_reach_the_critical_lane(self):
+        d = CommandDispatcher(MagicMock(), clock=FakeClock())
+        d.submit(5, "lamp", {}, slot="lamp", critical=True)
+        job = d.submit(5, "plug", {}, critical=True)
+        assert len(d.supersede("lamp")) == 1
+        assert d.cancel(job)
+        assert d.stats()["depth"] == 0
+
+    def test_worker_wakes_for_critical_job(self):
+        done = threading.Event()
+        d = CommandDispatcher(lambda device, payload: done.set())
+        d.start()
+        try:
+            d.submit(60, "lamp", {})
+            d.submit(0, "lamp", {}, critical=True)
+            assert done.wait(2.0)
+        finally:
+            d.stop()
+
+
+# ===========================================================================
+# stats
+# ===========================================================================
+
+class TestStats:
+
+    def test_depth_counts_queued_jobs(self):
+        d = CommandDispatcher(MagicMock(), clock=FakeClock())
+        d.submit(1, "lamp", {})
+        d.submit(2, "lamp", {})
+        assert d.stats()["depth"] == 2
+
+    def test_lag_measures_lateness_of_last_job(self):
+        clock = FakeClock()
+        d = CommandDispatcher(MagicMock(), clock=clock)
+        d.submit(1, "lamp", {})
+        clock.now += 3.5
+        d.run_due()
+        stats = d.stats()
+        assert abs(stats["lag"] - 2.5) < 1e-9
+        assert abs(stats["max_lag"] - 2.5) < 1e-9
+        assert stats["processed"] == 1
+        assert stats["depth"] == 0
+
+    def test_not_running_until_started(self):
+        d = CommandDispatcher(MagicMock())
+        assert d.stats()["running"] is False
+
+
+# ===========================================================================
+# worker thread
+# ===========================================================================
+
+class TestWorker:
+
+    def test_worker_runs_job_submitted_while_idle(self):
+        done = threading.Event()
+        d = CommandDispatcher(lambda device, payload: done.set())
+        d.start()
+        try:
+            d.submit(0, "lamp", {})
+            assert done.wait(2.0)
+        finally:
+            d.stop()
+
+    def test_all_jobs_share_one_thread(self):
+        threads = set()
+        finished = threading.Event()
+
+        def handler(device, payload):
+            threads.add(threading.get_ident())
+            if payload["n"] == 9:
+                finished.set()
+
+        d = CommandDispatcher(handler)
+        d.start()
+        try:
+            for n in range(10):
+                d.submit(0.01 * n, "lamp", {"n": n})
+            assert finished.wait(2.0)
+        finally:
+            d.stop()
+        assert len(threads) == 1
+
+    def test_start_twice_keeps_single_worker(self):
+        d = CommandDispatcher(MagicMock())
+        d.start()
+        first = d._thread
+        d.start()
+        try:
+            assert d._thread is first
+        finally:
+            d.stop()
+
+    def test_stop_discards_pending_jobs(self):
+        handler = MagicMock()
+        d = CommandDispatcher(handler)
+        d.start()
+        d.submit(60, "lamp", {})
+        d.stop()
+        assert d.stats()["depth"] == 0
+        assert d.stats()["running"] is False
+        handler.assert_not_called()
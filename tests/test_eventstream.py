@@ -0,0 +1,245 @@
+"""
+Unit tests for the Hue eventstream client and light-state mirror
+(octoprint_octohue/eventstream.py).
+
+The client tests run against SSEStandIn, a local plain-HTTP server that plays
+a scripted event sequence per connection, so reconnect and Last-Event-ID
+resume are exercised over a real socket.  urllib (stdlib) is used as the
+transport because conftest replaces the requests package with a mock.
+"""
+import json
+import threading
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from octoprint_octohue.eventstream import EventStreamClient, LightStateMirror, parse_sse
+
+
+# ---------------------------------------------------------------------------
+# Local SSE stand-in
+# ---------------------------------------------------------------------------
+
+class SSEStandIn:
+    """
+    Serves /eventstream/clip/v2.  Each connection pops the next script (a list
+    of (event_id, events) tuples), streams it and closes.  The Last-Event-ID
+    header of every connection is recorded.
+    """
+
+    def __init__(self, scripts):
+        self.scripts = list(scripts)
+        self.last_event_ids = []
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                standin.last_event_ids.append(self.headers.get("Last-Event-ID"))
+                if not standin.scripts:
+                    self.send_response(503)
+                    self.end_headers()
+                    return
+                script = standin.scripts.pop(0)
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.end_headers()
+                self.wfile.write(b": hi\n\n")
+                for event_id, events in script:
+                    self.wfile.write(f"id: {event_id}\ndata: {json.dumps(events)}\n\n".encode())
+                    self.wfile.flush()
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/eventstream/clip/v2"
+        threading.Thread(target=self.server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+
+    def connect(self, last_event_id):
+        headers = {"Accept": "text/event-stream"}
+        if last_event_id:
+            headers["Last-Event-ID"] = last_event_id
+        return urllib.request.urlopen(urllib.request.Request(self.url, headers=headers), timeout=5)
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def update(rid, rtype="light", **fields):
+    return [{"type": "update", "data": [dict(id=rid, type=rtype, **fields)]}]
+
+
+@pytest.fixture
+def standin_factory():
+    created = []
+
+    def make(scripts):
+        s = SSEStandIn(scripts)
+        created.append(s)
+        return s
+
+    yield make
+    for s in created:
+        s.close()
+
+
+# ===========================================================================
+# parse_sse
+# ===========================================================================
+
+class TestParseSse:
+
+    def test_single_event_with_id(self):
+        lines = [b"id: 1:0\n", b"data: [1]\n", b"\n"]
+        assert list(parse_sse(lines)) == [("1:0", "[1]")]
+
+    def test_comments_ignored(self):
+        assert list(parse_sse([": hi", "", "data: x", ""])) == [(None, "x")]
+
+    def test_multiline_data_joined(self):
+        assert list(parse_sse(["data: a", "data: b", ""])) == [(None, "a\nb")]
+
+    def test_trailing_event_without_blank_line(self):
+        assert list(parse_sse(["id: 7", "data: z"])) == [("7", "z")]
+
+    def test_crlf_line_endings(self):
+        assert list(parse_sse([b"id: 2\r\n", b"data: q\r\n", b"\r\n"])) == [("2", "q")]
+
+
+# ===========================================================================
+# LightStateMirror
+# ===========================================================================
+
+class TestLightStateMirror:
+
+    def test_seed_keeps_only_mirrored_fields(self):
+        m = LightStateMirror()
+        m.seed([{"id": "a", "on": {"on": True}, "metadata": {"name": "Lamp"}, "dimming": {"brightness": 50.0}}])
+        assert m.get("a") == {"on": {"on": True}, "dimming": {"brightness": 50.0}}
+
+    def test_apply_merges_partial_update(self):
+        m = LightStateMirror()
+        m.seed([{"id": "a", "on": {"on": True}, "color": {"xy": {"x": 0.3, "y": 0.3}, "gamut_type": "C"}}])
+        m.apply({"id": "a", "color": {"xy": {"x": 0.6, "y": 0.3}}})
+        assert m.get("a")["color"] == {"xy": {"x": 0.6, "y": 0.3}, "gamut_type": "C"}
+        assert m.get("a")["on"] == {"on": True}
+
+    def test_apply_unknown_resource_creates_it(self):
+        m = LightStateMirror()
+        m.apply({"id": "b", "on": {"on": False}})
+        assert m.get("b") == {"on": {"on": False}}
+
+    def test_remove(self):
+        m = LightStateMirror()
+        m.apply({"id": "b", "on": {"on": False}})
+        m.remove("b")
+        assert m.get("b") is None
+        assert len(m) == 0
+
+    def test_is_on_requires_live(self):
+        m = LightStateMirror()
+        m.apply({"id": "a", "on": {"on": True}})
+        assert m.is_on("a") is None
+        m.live = True
+        assert m.is_on("a") is True
+
+    def test_is_on_unknown_resource_is_none(self):
+        m = LightStateMirror()
+        m.live = True
+        assert m.is_on("missing") is None
+
+    def test_get_returns_copy(self):
+        m = LightStateMirror()
+        m.apply({"id": "a", "on": {"on": True}})
+        m.get("a")["on"]["on"] = False
+        assert m.get("a")["on"] == {"on": True}
+
+
+# ===========================================================================
+# EventStreamClient  –  against the local SSE stand-in
+# ===========================================================================
+
+class TestEventStreamClient:
+
+    def _run_until(self, client, condition, timeout=5.0):
+        done = threading.Event()
+        original = client._on_events
+
+        def on_events(events):
+            original(events)
+            if condition():
+                done.set()
+
+        client._on_events = on_events
+        client.start()
+        try:
+            assert done.wait(timeout), "stand-in events were not delivered in time"
+        finally:
+            client.stop()
+
+    def test_events_delivered_to_mirror(self, standin_factory):
+        standin = standin_factory([[("1:0", update("a", on={"on": True}))]])
+        mirror = LightStateMirror()
+        client = EventStreamClient(
+            standin.connect,
+            lambda events: [mirror.apply(item) for e in events for item in e["data"]],
+        )
+        self._run_until(client, lambda: mirror.get("a") is not None)
+        assert mirror.get("a") == {"on": {"on": True}}
+        assert client.last_event_id == "1:0"
+
+    def test_on_connect_runs_before_events(self, standin_factory):
+        standin = standin_factory([[("1:0", update("a", on={"on": True}))]])
+        order = []
+        client = EventStreamClient(
+            standin.connect,
+            lambda events: order.append("event"),
+            on_connect=lambda: order.append("connect"),
+        )
+        self._run_until(client, lambda: "event" in order)
+        assert order[:2] == ["connect", "event"]
+
+    def test_reconnects_and_resumes_with_last_event_id(self, standin_factory):
+        standin = standin_factory([
+            [("1:0", update("a", on={"on": True}))],
+            [("2:0", update("a", on={"on": False}))],
+        ])
+        seen = []
+        disconnects = []
+        client = EventStreamClient(
+            standin.connect,
+            lambda events: seen.append(events[0]["data"][0]["on"]["on"]),
+            on_disconnect=lambda: disconnects.append(True),
+            backoff=(0.01, 0.05),
+        )
+        self._run_until(client, lambda: len(seen) == 2)
+        assert seen == [True, False]
+        assert standin.last_event_ids[:2] == [None, "1:0"]
+        assert client.connects == 2
+        assert disconnects
+
+    def test_connection_errors_are_retried(self, standin_factory):
+        standin = standin_factory([[("5:0", update("a", on={"on": True}))]])
+        attempts = []
+
+        def flaky_connect(last_event_id):
+            attempts.append(last_event_id)
+            if len(attempts) == 1:
+                raise OSError("connection refused")
+            return standin.connect(last_event_id)
+
+        seen = []
+        client = EventStreamClient(flaky_connect, seen.append, backoff=(0.01, 0.05))
+        self._run_until(client, lambda: bool(seen))
+        assert len(attempts) >= 2
+        assert client.stats()["events"] == 1
+
+    def test_stop_closes_stream_and_thread(self, standin_factory):
+        standin = standin_factory([[("1:0", update("a", on={"on": True}))]])
+        client = EventStreamClient(standin.connect, lambda events: None, backoff=(5, 5))
+        client.start()
+        client.stop()
+        assert client._thread is None
+        assert client.connected is False
@@ -0,0 +1,212 @@
+"""
+Tests for the local fake Hue bridge (tests/fakebridge.py), and the plugin's
+REST, pairing and eventstream paths run against it end to end over HTTPS.
+"""
+import time
+
+import pytest
+
+from tests.conftest import make_settings_getter
+from tests.fakebridge import FakeBridge, UrllibSession
+
+
+def wait_for(predicate, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return predicate()
+
+
+@pytest.fixture
+def bridge():
+    with FakeBridge(lights=3, plugs=1, rooms=2, zones=1) as b:
+        yield b
+
+
+@pytest.fixture
+def session():
+    return UrllibSession()
+
+
+def get(session, bridge, path, key=None):
+    return session.request("GET", f"{bridge.base_url}/clip/v2/resource{path}",
+                           headers={"hue-application-key": key or bridge.app_key}, timeout=(3, 5))
+
+
+def put(session, bridge, path, body):
+    return session.request("PUT", f"{bridge.base_url}/clip/v2/resource{path}",
+                           headers={"hue-application-key": bridge.app_key}, json=body, timeout=(3, 5))
+
+
+# ===========================================================================
+# The fake bridge itself
+# ===========================================================================
+
+class TestResources:
+
+    def test_device_counts(self, bridge, session):
+        body = get(session, bridge, "").json()
+        types = [r["type"] for r in body["data"]]
+        assert types.count("light") == 4
+        assert types.count("room") == 2
+        assert types.count("zone") == 1
+        assert types.count("grouped_light") == 3
+        assert types.count("bridge") == 1
+
+    def test_rtype_and_single_resource(self, bridge, session):
+        lights = get(session, bridge, "/light").json()["data"]
+        assert [l["metadata"]["archetype"] for l in lights].count("plug") == 1
+        one = get(session, bridge, f"/light/{lights[0]['id']}").json()["data"]
+        assert one[0]["id"] == lights[0]["id"]
+
+    def test_unknown_resource_is_404(self, bridge, session):
+        assert get(session, bridge, "/light/nope").status_code == 404
+
+    def test_wrong_key_is_403(self, bridge, session):
+        assert get(session, bridge, "/light", key="wrong").status_code == 403
+
+    def test_rooms_point_at_their_grouped_light(self, bridge):
+        grouped = set(bridge.ids("grouped_light"))
+        for room in bridge.by_type("room"):
+            assert room["services"][0]["rid"] in grouped
+
+
+class TestPut:
+
+    def test_put_changes_light_state(self, bridge, session):
+        rid = bridge.ids("light")[0]
+        r = put(session, bridge, f"/light/{rid}", {"on": {"on": True}, "dimming": {"brightness": 40.0}})
+        assert r.status_code == 200
+        assert r.json()["data"] == [{"rid": rid, "rtype": "light"}]
+        state = bridge.state(rid)
+        assert state["on"] == {"on": True}
+        assert state["dimming"]["brightness"] == 40.0
+
+    def test_colour_leaves_ct_mode(self, bridge, session):
+        rid = bridge.ids("light")[0]
+        put(session, bridge, f"/light/{rid}", {"color": {"xy": {"x": 0.6, "y": 0.3}}})
+        assert bridge.state(rid)["color_temperature"]["mirek_valid"] is False
+
+    def test_grouped_light_put_reaches_members(self, bridge, session):
+        zone_group = bridge.by_type("zone")[0]["services"][0]["rid"]
+        put(session, bridge, f"/grouped_light/{zone_group}", {"on": {"on": True}})
+        assert all(l["on"]["on"] for l in bridge.by_type("light"))
+
+    def test_invalid_brightness_is_400(self, bridge, session):
+        rid = bridge.ids("light")[0]
+        assert put(session, bridge, f"/light/{rid}", {"dimming": {"brightness": 400}}).status_code == 400
+
+
+class TestFaults:
+
+    def test_scripted_failures_then_recovery(self, bridge, session):
+        bridge.fail_next(503, 429)
+        assert get(session, bridge, "/light").status_code == 503
+        assert get(session, bridge, "/light").status_code == 429
+        assert get(session, bridge, "/light").status_code == 200
+        assert bridge.stats()["injected"] == 2
+
+    def test_reset_drops_the_connection(self, bridge, session):
+        bridge.fail_next("reset")
+        with pytest.raises(Exception):
+            get(session, bridge, "/light")
+
+    def test_rate_limit_answers_429(self, session):
+        with FakeBridge(lights=1, plugs=0, rate_limits={"light": 2}) as b:
+            rid = b.ids("light")[0]
+            codes = [put(session, b, f"/light/{rid}", {"on": {"on": True}}).status_code for _ in range(4)]
+            assert codes.count(429) >= 1
+            assert codes[0] == 200
+            assert b.stats()["429"] == codes.count(429)
+
+    def test_latency_is_added(self, session):
+        with FakeBridge(lights=1, plugs=0, latency=0.05) as b:
+            start = time.monotonic()
+            get(session, b, "/light")
+            assert time.monotonic() - start >= 0.05
+
+    def test_error_rate(self, session):
+        with FakeBridge(lights=1, plugs=0, error_rate=1.0) as b:
+            assert get(session, b, "/light").status_code == 503
+
+
+class TestPairing:
+
+    def test_pairing_needs_the_link_button(self, bridge, session):
+        url = f"{bridge.base_url}/api"
+        body = {"devicetype": "octoprint#octohue"}
+        assert session.post(url, json=body, timeout=(3, 5)).json()[0]["error"]["type"] == 101
+        bridge.press_link_button()
+        assert session.post(url, json=body, timeout=(3, 5)).json()[0]["success"]["username"] == bridge.app_key
+        assert "error" in session.post(url, json=body, timeout=(3, 5)).json()[0]
+
+
+class TestEventStream:
+
+    def test_put_is_published(self, bridge, session):
+        r = session.get(f"{bridge.base_url}/eventstream/clip/v2",
+                        headers={"hue-application-key": bridge.app_key}, stream=True, timeout=(3, 5))
+        lines = r.iter_lines()
+        assert next(lines) == b": hi"
+        assert wait_for(lambda: len(bridge._subscribers) == 1)
+        rid = bridge.ids("light")[0]
+        put(session, bridge, f"/light/{rid}", {"on": {"on": True}})
+        received = [next(lines) for _ in range(4)]
+        assert received[1].startswith(b"id: ")
+        assert b'"on": {"on": true}' in received[2]
+        r.close()
+
+
+# ===========================================================================
+# The plugin against the fake bridge
+# ===========================================================================
+
+@pytest.fixture
+def live_plugin(plugin, bridge):
+    from octoprint_octohue.dispatcher import CommandDispatcher
+    plugin._settings.get.side_effect = make_settings_getter({"lampisgroup": False, "eventstream": True})
+    plugin.pbridge = {"addr": bridge.addr, "key": bridge.app_key}
+    plugin._session = UrllibSession()
+    plugin._dispatcher = CommandDispatcher(plugin._run_scheduled)
+    plugin._dispatcher.start()
+    yield plugin
+    if plugin._eventstream is not None:
+        plugin._eventstream.stop()
+    plugin._dispatcher.stop()
+
+
+class TestPluginEndToEnd:
+
+    def test_set_state_reaches_the_bridge(self, live_plugin, bridge):
+        rid = bridge.ids("light")[0]
+        assert live_plugin.set_state({"on": True, "bri": 50}, rid) == "sent"
+        assert bridge.state(rid)["dimming"]["brightness"] == 50.0
+
+    def test_get_state_over_rest(self, live_plugin, bridge):
+        rid = bridge.ids("light")[0]
+        assert live_plugin.get_state(rid) is False
+
+    def test_inventory_from_bulk_fetch(self, live_plugin, bridge):
+        inventory = live_plugin._get_inventory()
+        assert len(inventory.lights()) == 4
+        assert len(inventory.groups()) == 3
+        assert bridge.stats()["GET all"] == 1
+
+    def test_eventstream_feeds_the_mirror(self, live_plugin, bridge):
+        live_plugin._restart_eventstream()
+        assert wait_for(lambda: live_plugin._mirror.live)
+        rid = bridge.ids("light")[1]
+        # A change made by someone else (the Hue app) arrives via the eventstream.
+        bridge._put("light", rid, {"on": {"on": True}})
+        assert wait_for(lambda: live_plugin._mirror.is_on(rid) is True)
+        assert live_plugin.get_state(rid) is True
+
+    def test_retries_injected_503(self, live_plugin, bridge):
+        from octoprint_octohue.resilience import RetryPolicy
+        live_plugin._retry = RetryPolicy(base=0.01, cap=0.02)
+        rid = bridge.ids("light")[0]
+        bridge.fail_next(503)
+        live_plugin.set_state({"on": True}, rid)
+        assert wait_for(lambda: bridge.state(rid)["on"]["on"] is True)
@@ -0,0 +1,186 @@
+"""
+Unit tests for the cached Hue resource inventory (octoprint_octohue/inventory.py).
+"""
+import threading
+from unittest.mock import MagicMock
+
+import pytest
+
+from octoprint_octohue.inventory import ResourceInventory
+
+
+RESOURCES = [
+    {"id": "l1", "type": "light", "metadata": {"name": "Desk Lamp", "archetype": "tableShade"}},
+    {"id": "l2", "type": "light", "metadata": {"name": "Smart Plug", "archetype": "plug"}},
+    {"id": "r1", "type": "room", "metadata": {"name": "Office"}, "services": [{"rid": "g1", "rtype": "grouped_light"}]},
+    {"id": "z1", "type": "zone", "metadata": {"name": "Printer Corner"}, "services": [{"rid": "g2", "rtype": "grouped_light"}]},
+    {"id": "r2", "type": "room", "metadata": {"name": "Empty"}, "services": [{"rid": "d1", "rtype": "device"}]},
+    {"id": "g1", "type": "grouped_light", "on": {"on": True}},
+    {"id": "b1", "type": "bridge"},
+]
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make(resources=RESOURCES, max_age=300.0):
+    fetch = MagicMock(return_value=resources)
+    clock = Clock()
+    return ResourceInventory(fetch, max_age=max_age, clock=clock), fetch, clock
+
+
+# ===========================================================================
+# Indexes
+# ===========================================================================
+
+class TestIndexes:
+
+    def test_lights(self):
+        inv, _, _ = make()
+        assert inv.lights() == [
+            {"id": "l1", "name": "Desk Lamp", "archetype": "tableShade"},
+            {"id": "l2", "name": "Smart Plug", "archetype": "plug"},
+        ]
+
+    def test_lights_by_archetype(self):
+        inv, _, _ = make()
+        assert [d["id"] for d in inv.lights("plug")] == ["l2"]
+        assert inv.lights("nonexistent") == []
+
+    def test_groups_map_rooms_and_zones_to_grouped_light(self):
+        inv, _, _ = make()
+        assert inv.groups() == [{"id": "g1", "name": "Office"}, {"id": "g2", "name": "Printer Corner"}]
+
+    def test_by_type_and_get(self):
+        inv, _, _ = make()
+        assert [r["id"] for r in inv.by_type("grouped_light")] == ["g1"]
+        assert inv.get("b1")["type"] == "bridge"
+        assert inv.get("missing") is None
+
+    def test_items_without_id_or_type_skipped(self):
+        inv, _, _ = make([{"type": "light"}, {"id": "x"}])
+        assert inv.stats()["resources"] == 0
+
+
+# ===========================================================================
+# Caching and invalidation
+# ===========================================================================
+
+class TestCaching:
+
+    def test_reads_share_one_fetch(self):
+        inv, fetch, _ = make()
+        inv.lights()
+        inv.groups()
+        inv.lights("plug")
+        assert fetch.call_count == 1
+
+    def test_peek_never_fetches(self):
+        inv, fetch, _ = make()
+        assert inv.peek("l1") is None
+        fetch.assert_not_called()
+        inv.refresh()
+        inv.invalidate()
+        assert inv.peek("l1")["metadata"]["name"] == "Desk Lamp"
+        assert fetch.call_count == 1
+
+    def test_invalidate_refetches(self):
+        inv, fetch, _ = make()
+        inv.lights()
+        inv.invalidate()
+        inv.lights()
+        assert fetch.call_count == 2
+
+    def test_expires_after_max_age(self):
+        inv, fetch, clock = make(max_age=10.0)
+        inv.lights()
+        clock.now = 9.0
+        inv.lights()
+        clock.now = 11.0
+        inv.lights()
+        assert fetch.call_count == 2
+
+    def test_failed_ensure_keeps_previous_indexes_and_retries(self):
+        inv, fetch, _ = make()
+        inv.lights()
+        inv.invalidate()
+        fetch.side_effect = OSError("bridge gone")
+        assert len(inv.lights()) == 2
+        assert inv.stats()["stale"] is True
+        fetch.side_effect = None
+        inv.lights()
+        assert fetch.call_count == 3
+
+    def test_failed_ensure_is_logged(self):
+        fetch = MagicMock(side_effect=OSError("bridge gone"))
+        logger = MagicMock()
+        inv = ResourceInventory(fetch, logger=logger)
+        assert inv.lights() == []
+        logger.warning.assert_called_once()
+
+    def test_refresh_raises(self):
+        inv, fetch, _ = make()
+        fetch.side_effect = OSError("bridge gone")
+        with pytest.raises(OSError):
+            inv.refresh()
+
+    def test_concurrent_readers_fetch_once(self):
+        started = threading.Event()
+        release = threading.Event()
+
+        def slow_fetch():
+            started.set()
+            release.wait(2)
+            return RESOURCES
+
+        fetch = MagicMock(side_effect=slow_fetch)
+        inv = ResourceInventory(fetch)
+        threads = [threading.Thread(target=inv.lights) for _ in range(5)]
+        for t in threads:
+            t.start()
+        started.wait(2)
+        release.set()
+        for t in threads:
+            t.join(2)
+        assert fetch.call_count == 1
+
+
+# ===========================================================================
+# Eventstream invalidation
+# ===========================================================================
+
+class TestApplyEvents:
+
+    @pytest.mark.parametrize("event", [
+        {"type": "add", "data": [{"id": "l3", "type": "light"}]},
+        {"type": "delete", "data": [{"id": "r1", "type": "room"}]},
+        {"type": "update", "data": [{"id": "l1", "type": "light", "metadata": {"name": "Renamed"}}]},
+        {"type": "update", "data": [{"id": "z1", "type": "zone", "services": []}]},
+    ])
+    def test_structural_events_invalidate(self, event):
+        inv, _, _ = make()
+        inv.lights()
+        inv.apply_events([event])
+        assert inv.stats()["stale"] is True
+
+    @pytest.mark.parametrize("event", [
+        {"type": "update", "data": [{"id": "l1", "type": "light", "on": {"on": False}}]},
+        {"type": "add", "data": [{"id": "m1", "type": "motion"}]},
+    ])
+    def test_state_and_unindexed_events_keep_cache(self, event):
+        inv, _, _ = make()
+        inv.lights()
+        inv.apply_events([event])
+        assert inv.stats()["stale"] is False
+
+    def test_stats(self):
+        inv, _, clock = make()
+        assert inv.stats() == {"resources": 0, "fetches": 0, "stale": True, "age": None}
+        inv.lights()
+        clock.now = 4.0
+        assert inv.stats() == {"resources": 7, "fetches": 1, "stale": False, "age": 4.0}
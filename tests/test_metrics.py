@@ -0,0 +1,93 @@
+"""
+Unit tests for the metrics registry (octoprint_octohue/metrics.py).
+"""
+import threading
+
+import pytest
+
+from octoprint_octohue.metrics import Counter, Histogram, MetricsRegistry
+
+
+class TestCounter:
+
+    def test_counts_per_label_set(self):
+        c = Counter("requests_total", "Requests.", ("method",))
+        c.inc("GET")
+        c.inc("GET")
+        c.inc("PUT", amount=3)
+        assert c.value("GET") == 2
+        assert c.value("PUT") == 3
+        assert c.value("POST") == 0
+
+    def test_snapshot_names_labels(self):
+        c = Counter("requests_total", "Requests.", ("method", "status"))
+        c.inc("GET", "200")
+        assert c.snapshot() == [{"labels": {"method": "GET", "status": "200"}, "value": 1}]
+
+    def test_concurrent_increments_are_not_lost(self):
+        c = Counter("hits_total", "Hits.")
+        threads = [threading.Thread(target=lambda: [c.inc() for _ in range(5000)]) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert c.value() == 20000
+
+
+class TestHistogram:
+
+    def test_observations_land_in_buckets(self):
+        h = Histogram("latency_seconds", "Latency.", ("method",), buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 3.0):
+            h.observe(value, "GET")
+        [series] = h.snapshot()
+        assert series["labels"] == {"method": "GET"}
+        assert series["buckets"] == {"0.1": 2, "1": 3, "+Inf": 4}
+        assert series["count"] == 4
+        assert series["sum"] == pytest.approx(3.65)
+
+    def test_series_are_independent(self):
+        h = Histogram("latency_seconds", "Latency.", ("method",), buckets=(1.0,))
+        h.observe(0.5, "GET")
+        h.observe(2.0, "PUT")
+        counts = {s["labels"]["method"]: s["count"] for s in h.snapshot()}
+        assert counts == {"GET": 1, "PUT": 1}
+
+
+class TestRegistry:
+
+    def test_duplicate_name_rejected(self):
+        registry = MetricsRegistry()
+        registry.counter("a_total", "A.")
+        with pytest.raises(ValueError):
+            registry.counter("a_total", "A again.")
+
+    def test_snapshot_reads_gauges(self):
+        registry = MetricsRegistry()
+        depth = [3]
+        registry.gauge("queue_depth", "Depth.", lambda: depth[0])
+        depth[0] = 5
+        assert registry.snapshot() == {"queue_depth": 5}
+
+    def test_failing_gauge_reports_none(self):
+        registry = MetricsRegistry()
+        registry.gauge("broken", "Broken.", lambda: 1 / 0)
+        assert registry.snapshot() == {"broken": None}
+        assert not any(line.startswith("broken ") for line in registry.prometheus().splitlines())
+
+    def test_prometheus_text_format(self):
+        registry = MetricsRegistry()
+        registry.counter("events_total", "Events.", ("event",)).inc('Print"Done')
+        registry.histogram("latency_seconds", "Latency.", ("method",), buckets=(0.5,)).observe(0.25, "GET")
+        registry.gauge("queue_depth", "Depth.", lambda: 2)
+        text = registry.prometheus()
+        assert text.endswith("\n")
+        lines = text.splitlines()
+        assert "# TYPE events_total counter" in lines
+        assert 'events_total{event="Print\\"Done"} 1' in lines
+        assert "# TYPE latency_seconds histogram" in lines
+        assert 'latency_seconds_bucket{method="GET",le="0.5"} 1' in lines
+        assert 'latency_seconds_bucket{method="GET",le="+Inf"} 1' in lines
+        assert 'latency_seconds_sum{method="GET"} 0.25' in lines
+        assert 'latency_seconds_count{method="GET"} 1' in lines
+        assert "queue_depth 2" in lines
@@ -109,6 +109,37 @@ class TestRgbToXy:
         assert plugin.rgb_to_xy("#000000") is None
 
 
+class TestGamutClamping:
+    """set_state clamps xy into the target light's gamut when the inventory knows it."""
+
+    def _setup(self, plugin, resources):
+        from octoprint_octohue.inventory import ResourceInventory
+        plugin._settings.get.side_effect = make_settings_getter({"lampisgroup": False})
+        plugin._inventory = ResourceInventory(lambda: resources)
+        plugin._inventory.refresh()
+        plugin._put = MagicMock()
+
+    def test_out_of_gamut_colour_is_clamped(self, plugin):
+        self._setup(plugin, [{"id": "uuid-1", "type": "light", "color": {"gamut_type": "B"}}])
+        plugin.set_state({"xy": [0.3, 0.6]}, "uuid-1")
+        xy = plugin._put.call_args[0][1]["color"]["xy"]
+        assert (xy["x"], xy["y"]) != (0.3, 0.6)
+
+    def test_unknown_light_is_sent_unchanged(self, plugin):
+        self._setup(plugin, [])
+        plugin.set_state({"xy": [0.3, 0.6]}, "uuid-1")
+        assert plugin._put.call_args[0][1]["color"]["xy"] == {"x": 0.3, "y": 0.6}
+
+    def test_inventory_is_not_fetched_on_command_path(self, plugin):
+        fetch = MagicMock(return_value=[])
+        from octoprint_octohue.inventory import ResourceInventory
+        plugin._settings.get.side_effect = make_settings_getter({"lampisgroup": False})
+        plugin._inventory = ResourceInventory(fetch)
+        plugin._put = MagicMock()
+        plugin.set_state({"xy": [0.3, 0.6]}, "uuid-1")
+        fetch.assert_not_called()
+
+
 # ===========================================================================
 # build_state
 # ===========================================================================
@@ -132,6 +163,13 @@ class TestBuildState:
         assert state["xy"] == [0.64, 0.33]
         plugin.rgb_to_xy.assert_called_once_with("#FF0000")
 
+    def test_no_debug_logging_when_debug_disabled(self, plugin):
+        self._setup(plugin)
+        plugin._logger.isEnabledFor.return_value = False
+        plugin._settings.get.side_effect = make_settings_getter()
+        plugin.build_state(on=True, colour="#FF0000", bri=100, deviceid="1")
+        plugin._logger.debug.assert_not_called()
+
     def test_colour_key_excluded_from_state(self, plugin):
         self._setup(plugin)
         plugin.build_state(on=True, colour="#FF0000", bri=100, deviceid="1")
@@ -237,6 +275,37 @@ class TestGetState:
         plugin.get_state()
         plugin._settings.get.assert_any_call(["lampid"])
 
+    def test_answers_from_live_mirror_without_rest_call(self, plugin):
+        from octoprint_octohue.eventstream import LightStateMirror
+        plugin._settings.get.side_effect = make_settings_getter({"lampisgroup": False})
+        plugin._mirror = LightStateMirror()
+        plugin._mirror.apply({"id": "1", "on": {"on": True}})
+        plugin._mirror.live = True
+        assert plugin.get_state("1") is True
+        plugin._session.request.assert_not_called()
+
+    def test_falls_back_to_rest_when_mirror_not_live(self, plugin):
+        from octoprint_octohue.eventstream import LightStateMirror
+        plugin._settings.get.side_effect = make_settings_getter({"lampisgroup": False})
+        plugin._mirror = LightStateMirror()
+        plugin._mirror.apply({"id": "1", "on": {"on": True}})
+        plugin._session.request.return_value.json.return_value = {
+            "data": [{"on": {"on": False}}]
+        }
+        assert plugin.get_state("1") is False
+        plugin._session.request.assert_called_once()
+
+    def test_falls_back_to_rest_for_unmirrored_device(self, plugin):
+        from octoprint_octohue.eventstream import LightStateMirror
+        plugin._settings.get.side_effect = make_settings_getter({"lampisgroup": False})
+        plugin._mirror = LightStateMirror()
+        plugin._mirror.live = True
+        plugin._session.request.return_value.json.return_value = {
+            "data": [{"on": {"on": True}}]
+        }
+        assert plugin.get_state("unknown") is True
+        plugin._session.request.assert_called_once()
+
 
 # ===========================================================================
 # set_state
@@ -330,6 +399,42 @@ class TestSetState:
         plugin.set_state({"on": False})
         plugin._settings.get.assert_any_call(["lampid"])
 
+    def test_routes_put_through_coalescer_when_running(self, plugin):
+        plugin._settings.get.side_effect = make_settings_getter({"lampisgroup": False})
+        plugin._hue_request = MagicMock()
+        plugin._coalescer = MagicMock()
+        plugin._coalescer.submit.return_value = "pending"
+        result = plugin.set_state({"on": True}, "uuid-1")
+        plugin._coalescer.submit.assert_called_once_with("light/uuid-1", {"on": {"on": True}}, critical=False)
+        plugin._hue_request.assert_not_called()
+        assert result == "pending"
+
+    def test_critical_group_put_skips_rate_limiter(self, plugin):
+        plugin._settings.get.side_effect = make_settings_getter({"lampisgroup": True, "plugid": "plug"})
+        plugin._send_put = MagicMock()
+        assert plugin.set_state({"on": True}, "group-1") == "sent"
+        assert plugin.set_state({"on": False}, "group-1", critical=True) == "sent"
+        assert plugin._send_put.call_count == 2
+        assert plugin.get_stats()["ratelimit"]["grouped_light"]["critical"] == 1
+
+    def test_first_put_creates_pipeline_and_sends_with_zero_window(self, plugin):
+        plugin._settings.get.side_effect = make_settings_getter({"lampisgroup": False})
+        plugin._send_put = MagicMock()
+        assert plugin.set_state({"on": True}, "uuid-1") == "sent"
+        plugin._send_put.assert_called_once_with("light/uuid-1", {"on": {"on": True}})
+        assert plugin._limiter is not None
+
+    def test_second_quick_group_put_is_queued_by_rate_limiter(self, plugin):
+        """grouped_light allows about one command per second."""
+        plugin._settings.get.side_effect = make_settings_getter({"lampisgroup": True, "plugid": "plug"})
+        plugin._send_put = MagicMock()
+        assert plugin.set_state({"on": True}, "group-1") == "sent"
+        assert plugin.set_state({"on": False}, "group-1") == "queued"
+        plugin._send_put.assert_called_once()
+        delay = plugin._dispatcher.submit.call_args[0][0]
+        assert 0 < delay <= 1.0
+        assert plugin.get_stats()["ratelimit"]["grouped_light"]["queued"] == 1
+
 
 # ===========================================================================
 # toggle_state
@@ -443,6 +548,536 @@ class TestEstablishBridge:
         assert plugin.pbridge is None
 
 
+# ===========================================================================
+# _send_put  –  delta-only PUTs against the eventstream mirror
+# ===========================================================================
+
+class TestDeltaPut:
+
+    @pytest.fixture
+    def live(self, plugin):
+        from octoprint_octohue.eventstream import LightStateMirror
+        plugin._settings.get.side_effect = make_settings_getter({"lampisgroup": False})
+        plugin._mirror = LightStateMirror()
+        plugin._mirror.seed([{"id": "uuid-1", "on": {"on": True}, "dimming": {"brightness": 100.0}}])
+        plugin._mirror.live = True
+        plugin._session.request.return_value.status_code = 200
+        plugin._session.request.return_value.json.return_value = {"data": [], "errors": []}
+        return plugin
+
+    def test_noop_command_is_not_sent(self, live):
+        assert live.set_state({"on": True, "bri": 100}, "uuid-1") == "sent"
+        live._session.request.assert_not_called()
+        assert live.get_stats()["delta"]["suppressed"] == 1
+
+    def test_unchanged_fields_are_stripped(self, live):
+        live.set_state({"on": True, "bri": 40}, "uuid-1")
+        assert live._session.request.call_args[1]["json"] == {"dimming": {"brightness": 40.0}}
+        assert live.get_stats()["delta"]["trimmed"] == 1
+
+    def test_repeated_command_is_suppressed_before_bridge_event(self, live):
+        live.set_state({"on": False}, "uuid-1")
+        live.set_state({"on": False}, "uuid-1")
+        assert live._session.request.call_count == 1
+
+    def test_failed_put_does_not_update_mirror(self, live):
+        live._session.request.return_value.json.return_value = {"errors": [{"description": "nope"}]}
+        live.set_state({"on": False}, "uuid-1")
+        assert live._mirror.is_on("uuid-1") is True
+
+    def test_full_payload_without_eventstream(self, plugin):
+        plugin._settings.get.side_effect = make_settings_getter({"lampisgroup": False})
+        plugin.set_state({"on": True, "bri": 100}, "uuid-1")
+        assert plugin._session.request.call_args[1]["json"] == {"on": {"on": True}, "dimming": {"brightness": 100.0}}
+
+
+# ===========================================================================
+# _hue_request  –  timeouts and circuit breaker
+# ===========================================================================
+
+class TestHueRequestCircuit:
+
+    def test_request_has_timeout(self, plugin):
+        plugin._hue_request("GET", "light")
+        assert plugin._session.request.call_args[1]["timeout"] == (3.05, 10)
+
+    def test_consecutive_failures_open_circuit_and_fail_fast(self, plugin):
+        from octoprint_octohue.resilience import RetryPolicy
+        plugin._retry = RetryPolicy(max_retries=0)
+        plugin._session.request.side_effect = OSError("no route to host")
+        breaker = plugin._get_breaker()
+        for _ in range(breaker.threshold):
+            assert plugin._hue_request("GET", "light") == {}
+        assert breaker.state == "open"
+        plugin._session.request.reset_mock()
+        assert plugin._hue_request("PUT", "light/1", {"on": {"on": True}}) == {}
+        plugin._session.request.assert_not_called()
+        assert breaker.stats()["rejected"] == 1
+
+    def test_http_error_status_counts_as_reachable(self, plugin):
+        plugin._session.request.return_value.status_code = 404
+        plugin._session.request.return_value.json.return_value = {"errors": [{"description": "not found"}]}
+        for _ in range(10):
+            plugin._hue_request("GET", "light/missing")
+        assert plugin._get_breaker().state == "closed"
+
+    def test_half_open_probe_success_closes_circuit(self, plugin):
+        from octoprint_octohue.resilience import CircuitBreaker
+        now = [0.0]
+        plugin._breaker = CircuitBreaker(threshold=1, cooldown=30.0, clock=lambda: now[0])
+        plugin._session.request.side_effect = OSError("down")
+        plugin._hue_request("GET", "light")
+        plugin._session.request.side_effect = None
+        plugin._session.request.return_value.status_code = 200
+        plugin._session.request.return_value.json.return_value = {"data": []}
+        now[0] = 31.0
+        assert plugin._hue_request("GET", "light") == {"data": []}
+        assert plugin._breaker.state == "closed"
+
+    def test_new_bridge_resets_circuit(self, plugin):
+        plugin._settings.get.side_effect = make_settings_getter()
+        breaker = plugin._get_breaker()
+        for _ in range(breaker.threshold):
+            breaker.record_failure()
+        plugin.establishBridge("10.0.0.2", "key")
+        assert breaker.state == "closed"
+
+    def test_getstats_reports_circuit(self, plugin):
+        plugin._get_breaker()
+        assert plugin.get_stats()["circuit"]["state"] == "closed"
+
+
+# ===========================================================================
+# Metrics  –  bridge request and event instrumentation
+# ===========================================================================
+
+class TestMetrics:
+
+    def test_request_latency_and_status_recorded(self, plugin):
+        plugin._session.request.return_value.status_code = 200
+        plugin._session.request.return_value.json.return_value = {"data": []}
+        plugin._hue_request("GET", "light/abc")
+        metrics = plugin._get_metrics()
+        [series] = metrics.get("octohue_bridge_request_seconds").snapshot()
+        assert series["labels"] == {"method": "GET", "rtype": "light"}
+        assert series["count"] == 1
+        assert metrics.get("octohue_bridge_responses_total").value("GET", "light", "200") == 1
+
+    def test_connection_error_counted(self, plugin):
+        from octoprint_octohue.resilience import RetryPolicy
+        plugin._retry = RetryPolicy(max_retries=0)
+        plugin._session.request.side_effect = OSError("down")
+        plugin._hue_request("GET", "")
+        errors = plugin._get_metrics().get("octohue_bridge_errors_total")
+        assert errors.value("GET", "resource", "connection") == 1
+
+    def test_open_circuit_counted(self, plugin):
+        breaker = plugin._get_breaker()
+        for _ in range(breaker.threshold):
+            breaker.record_failure()
+        plugin._hue_request("GET", "light")
+        errors = plugin._get_metrics().get("octohue_bridge_errors_total")
+        assert errors.value("GET", "light", "circuit_open") == 1
+        assert plugin._get_metrics().snapshot()["octohue_circuit_state"] == 2
+
+    def test_events_counted(self, plugin):
+        plugin._settings.get.side_effect = make_settings_getter()
+        plugin.on_event("ZChange", {})
+        plugin.on_event("ZChange", {})
+        assert plugin._get_metrics().get("octohue_events_total").value("ZChange") == 2
+
+    def test_gauges_empty_before_subsystems_start(self, plugin):
+        plugin._dispatcher = None
+        snapshot = plugin._get_metrics().snapshot()
+        assert snapshot["octohue_dispatcher_queue_depth"] is None
+        assert snapshot["octohue_coalescer_pending"] is None
+
+    def test_getmetrics_returns_snapshot(self, plugin):
+        flask = sys.modules["flask"]
+        plugin._dispatcher.stats.return_value = {"depth": 4, "lag": 0.0}
+        plugin.on_api_command("getmetrics", {})
+        assert flask.jsonify.call_args[1]["octohue_dispatcher_queue_depth"] == 4
+
+    def test_getmetrics_non_admin_returns_403(self, plugin):
+        flask = sys.modules["flask"]
+        sys.modules["octoprint.access.permissions"].Permissions.ADMIN.can.return_value = False
+        plugin.on_api_command("getmetrics", {})
+        assert flask.make_response.call_args[0][1] == 403
+
+    def test_prometheus_endpoint_off_by_default(self, plugin):
+        flask = sys.modules["flask"]
+        plugin._settings.get.side_effect = make_settings_getter()
+        plugin.prometheus_metrics()
+        assert flask.make_response.call_args[0][1] == 404
+
+    def test_prometheus_endpoint_serves_text(self, plugin):
+        flask = sys.modules["flask"]
+        plugin._settings.get.side_effect = make_settings_getter({"prometheus": True})
+        plugin.on_event("PrintStarted", {})
+        plugin.prometheus_metrics()
+        text, status, headers = flask.make_response.call_args[0][0]
+        assert status == 200
+        assert headers["Content-Type"].startswith("text/plain; version=0.0.4")
+        assert 'octohue_events_total{event="PrintStarted"} 1' in text.splitlines()
+
+    def test_requests_buffered_in_request_log(self, plugin):
+        plugin._session.request.return_value.status_code = 503
+        plugin._session.request.return_value.json.return_value = {"errors": []}
+        plugin._hue_request("PUT", "light/abc", {"on": {"on": True}})
+        [entry] = plugin._get_request_log().dump()
+        assert (entry["method"], entry["path"], entry["status"]) == ("PUT", "light/abc", 503)
+        assert entry["error"] == "HTTP 503"
+        plugin._logger.warning.assert_called()
+
+    def test_getrequestlog_returns_buffer(self, plugin):
+        flask = sys.modules["flask"]
+        plugin._session.request.return_value.status_code = 200
+        plugin._session.request.return_value.json.return_value = {"data": []}
+        plugin._hue_request("GET", "light")
+        plugin.on_api_command("getrequestlog", {})
+        kwargs = flask.jsonify.call_args[1]
+        assert [r["path"] for r in kwargs["requests"]] == ["light"]
+        assert kwargs["seen"] == 1
+
+    def test_getrequestlog_non_admin_returns_403(self, plugin):
+        flask = sys.modules["flask"]
+        sys.modules["octoprint.access.permissions"].Permissions.ADMIN.can.return_value = False
+        plugin.on_api_command("getrequestlog", {})
+        assert flask.make_response.call_args[0][1] == 403
+
+    def test_prometheus_endpoint_requires_admin(self, plugin):
+        flask = sys.modules["flask"]
+        plugin._settings.get.side_effect = make_settings_getter({"prometheus": True})
+        sys.modules["octoprint.access.permissions"].Permissions.ADMIN.can.return_value = False
+        plugin.prometheus_metrics()
+        assert flask.make_response.call_args[0][1] == 403
+
+
+# ===========================================================================
+# Event traces  –  on_event through the dispatcher and coalescer to the bridge
+# ===========================================================================
+
+class TestEventTraces:
+
+    def _setup(self, plugin, status, window=0):
+        from octoprint_octohue.dispatcher import CommandDispatcher
+        plugin._settings.get.side_effect = make_settings_getter({"statusDict": status, "coalescewindow": window})
+        plugin._dispatcher = CommandDispatcher(plugin._run_scheduled)
+        plugin._bridge_call = MagicMock(return_value=({"data": [{"rid": "1"}]}, False))
+        return plugin
+
+    def _entry(self, event, colour="#FF0000", delay=0, flash=False):
+        return {"event": event, "colour": colour, "brightness": 100, "delay": delay,
+                "turnoff": False, "flash": flash, "ct": 0}
+
+    def test_trace_follows_event_to_bridge(self, plugin):
+        self._setup(plugin, [self._entry("PrintFailed")])
+        plugin.on_event("PrintFailed", {})
+        plugin._dispatcher.run_due()
+        [trace] = plugin._get_traces().dump()
+        assert trace["event"] == "PrintFailed"
+        assert [s["stage"] for s in trace["stages"]] == ["received", "scheduled", "dequeued", "sent", "acked"]
+        assert trace["stages"][-1]["detail"] == {"path": "light/1"}
+
+    def test_coalesced_events_share_the_put(self, plugin):
+        self._setup(plugin, [self._entry("PrintStarted", "#FFFFFF"), self._entry("PrintPaused")], window=200)
+        plugin.on_event("PrintStarted", {})
+        plugin._dispatcher.run_due()
+        plugin.on_event("PrintPaused", {})
+        plugin._dispatcher.run_due()
+        plugin._get_coalescer().flush("light/1")
+        started, paused = plugin._get_traces().dump()
+        assert [s["stage"] for s in started["stages"]][-3:] == ["pending", "sent", "acked"]
+        assert [s["stage"] for s in paused["stages"]][-3:] == ["coalesced", "sent", "acked"]
+        assert plugin._bridge_call.call_count == 1
+
+    def test_critical_event_skips_the_window(self, plugin):
+        self._setup(plugin, [self._entry("PrintStarted", "#FFFFFF"), self._entry("PrintFailed")], window=200)
+        plugin.on_event("PrintStarted", {})
+        plugin._dispatcher.run_due()
+        plugin.on_event("PrintFailed", {})
+        plugin._dispatcher.run_due()
+        started, failed = plugin._get_traces().dump()
+        assert [s["stage"] for s in failed["stages"]][-3:] == ["dequeued", "sent", "acked"]
+        # The pending white went out with the red rather than after its window.
+        assert [s["stage"] for s in started["stages"]][-3:] == ["pending", "sent", "acked"]
+        plugin._bridge_call.assert_called_once()
+        assert plugin._bridge_call.call_args[0][2]["color"]["xy"]["x"] == pytest.approx(plugin.rgb_to_xy("#FF0000")[0], abs=0.05)
+
+    def test_failed_put_marked_and_kept_for_retry(self, plugin):
+        self._setup(plugin, [self._entry("PrintFailed")])
+        plugin._bridge_call.return_value = ({}, True)
+        plugin.on_event("PrintFailed", {})
+        plugin._dispatcher.run_due()
+        [trace] = plugin._get_traces().dump()
+        assert trace["stages"][-1]["stage"] == "failed"
+        assert trace["stages"][-1]["detail"] == {"path": "light/1", "retrying": True}
+        assert plugin._get_traces().stats()["waiting"] == 1
+
+    def test_failed_put_without_retry_ends_its_trace(self, plugin):
+        from octoprint_octohue.resilience import RetryPolicy
+        self._setup(plugin, [self._entry("PrintFailed"), self._entry("PrintStarted", "#FFFFFF")])
+        plugin._retry = RetryPolicy(budget=0)
+        plugin._bridge_call.return_value = ({}, True)
+        plugin.on_event("PrintFailed", {})
+        plugin._dispatcher.run_due()
+        assert plugin._get_traces().stats()["waiting"] == 0
+        # A later, unrelated PUT to the same light does not complete it.
+        plugin._bridge_call.return_value = ({"data": [{"rid": "1"}]}, False)
+        plugin.on_event("PrintStarted", {})
+        plugin._dispatcher.run_due()
+        failed, started = plugin._get_traces().dump()
+        assert [s["stage"] for s in failed["stages"]][-2:] == ["sent", "failed"]
+        assert failed["stages"][-1]["detail"] == {"path": "light/1", "retrying": False}
+        assert [s["stage"] for s in started["stages"]][-2:] == ["sent", "acked"]
+
+    def test_superseded_action_is_marked(self, plugin):
+        self._setup(plugin, [self._entry("PrintStarted", "#FFFFFF", delay=10), self._entry("PrintFailed")])
+        plugin.on_event("PrintStarted", {})
+        plugin.on_event("PrintFailed", {})
+        plugin._dispatcher.run_due()
+        started, failed = plugin._get_traces().dump()
+        assert started["stages"][-1]["stage"] == "superseded"
+        assert started["stages"][-1]["detail"] == {"by": failed["id"]}
+
+    def test_direct_commands_are_not_traced(self, plugin):
+        self._setup(plugin, [])
+        plugin.build_state(on=True, bri=100, deviceid="1")
+        assert plugin._traces is None or plugin._traces.stats()["started"] == 0
+
+    def test_gettraces_returns_buffer_and_filters(self, plugin):
+        flask = sys.modules["flask"]
+        self._setup(plugin, [self._entry("PrintFailed")])
+        plugin.on_event("PrintFailed", {})
+        plugin._dispatcher.run_due()
+        plugin.on_api_command("gettraces", {})
+        assert [t["event"] for t in flask.jsonify.call_args[1]["traces"]] == ["PrintFailed"]
+        plugin.on_api_command("gettraces", {"min_ms": 60000})
+        assert flask.jsonify.call_args[1]["traces"] == []
+
+    def test_gettraces_by_id(self, plugin):
+        flask = sys.modules["flask"]
+        self._setup(plugin, [self._entry("PrintFailed")])
+        plugin.on_event("PrintFailed", {})
+        trace_id = plugin._get_traces().dump()[0]["id"]
+        plugin.on_api_command("gettraces", {"id": trace_id})
+        assert flask.jsonify.call_args[0][0]["id"] == trace_id
+        plugin.on_api_command("gettraces", {"id": "nope"})
+        assert flask.make_response.call_args[0][1] == 404
+
+
+# ===========================================================================
+# establishBridge  –  session lifecycle and keepalive
+# ===========================================================================
+
+class TestBridgeSession:
+    """
+    The pooled session survives settings saves that do not touch the bridge;
+    a replaced session is closed after a grace period, not immediately.
+    """
+
+    def test_unchanged_credentials_keep_session(self, plugin):
+        plugin._settings.get.side_effect = make_settings_getter()
+        plugin.establishBridge("10.0.0.1", "key")
+        session = plugin._session
+        plugin.establishBridge("10.0.0.1", "key")
+        assert plugin._session is session
+
+    def test_unchanged_credentials_keep_eventstream(self, plugin):
+        plugin._settings.get.side_effect = make_settings_getter({"eventstream": True})
+        with patch("octoprint_octohue.EventStreamClient") as client_cls:
+            plugin.establishBridge("10.0.0.1", "key")
+            plugin.establishBridge("10.0.0.1", "key")
+        assert client_cls.call_count == 1
+        client_cls.return_value.stop.assert_not_called()
+
+    def test_eventstream_toggled_without_bridge_change(self, plugin):
+        plugin._settings.get.side_effect = make_settings_getter({"eventstream": True})
+        with patch("octoprint_octohue.EventStreamClient"):
+            plugin.establishBridge("10.0.0.1", "key")
+        plugin._settings.get.side_effect = make_settings_getter({"eventstream": False})
+        plugin.establishBridge("10.0.0.1", "key")
+        assert plugin._eventstream is None
+
+    def test_changed_key_rebuilds_and_defers_close(self, plugin):
+        plugin._settings.get.side_effect = make_settings_getter()
+        plugin.establishBridge("10.0.0.1", "key")
+        old = plugin._session
+        plugin._dispatcher.submit.reset_mock()
+        requests_mod = sys.modules["requests"]
+        requests_mod.Session.side_effect = lambda: MagicMock(name="new-session")
+        try:
+            plugin.establishBridge("10.0.0.1", "other-key")
+        finally:
+            requests_mod.Session.side_effect = None
+        assert plugin._session is not old
+        assert plugin.pbridge == {"addr": "10.0.0.1", "key": "other-key"}
+        old.close.assert_not_called()
+        delay, _, _ = plugin._dispatcher.submit.call_args[0]
+        assert delay == 30.0
+        assert plugin._dispatcher.submit.call_args[1]["callback"] == old.close
+
+    def test_pool_size_change_rebuilds_session(self, plugin):
+        plugin._settings.get.side_effect = make_settings_getter({"poolsize": 4})
+        plugin.establishBridge("10.0.0.1", "key")
+        plugin._settings.get.side_effect = make_settings_getter({"poolsize": 8})
+        with patch("octoprint_octohue._SignifyAdapter") as adapter:
+            plugin.establishBridge("10.0.0.1", "key")
+        adapter.assert_called_once_with(pool_maxsize=8)
+        assert plugin._pool_size == 8
+
+    def test_in_flight_request_keeps_its_session(self, plugin):
+        """_hue_request reads the session once, so a swap mid-request is harmless."""
+        old = plugin._session
+
+        def swap_during_request(*args, **kwargs):
+            plugin._session = MagicMock(name="new-session")
+            return MagicMock(status_code=200, json=MagicMock(return_value={"data": []}))
+
+        old.request.side_effect = swap_during_request
+        assert plugin._hue_request("GET", "light") == {"data": []}
+
+    def test_keepalive_disabled_by_default(self, plugin):
+        plugin._settings.get.side_effect = make_settings_getter()
+        plugin.establishBridge("10.0.0.1", "key")
+        callbacks = [c[1].get("callback") for c in plugin._dispatcher.submit.call_args_list]
+        assert plugin._keepalive not in callbacks
+
+    def test_keepalive_scheduled_when_enabled(self, plugin):
+        plugin._settings.get.side_effect = make_settings_getter({"keepalive": 60})
+        plugin.establishBridge("10.0.0.1", "key")
+        delay, _, payload = plugin._dispatcher.submit.call_args[0]
+        assert delay == 60.0
+        assert payload == {"generation": plugin._keepalive_generation}
+        assert plugin._dispatcher.submit.call_args[1]["callback"] == plugin._keepalive
+
+    def test_keepalive_probes_idle_pool(self, plugin):
+        plugin._settings.get.side_effect = make_settings_getter({"keepalive": 60})
+        plugin._last_request = 0.0
+        plugin._keepalive(plugin._keepalive_generation)
+        method, url = plugin._session.request.call_args[0]
+        assert (method, url) == ("GET", "https://192.168.1.100/clip/v2/resource/bridge")
+        assert plugin._keepalive_probes == 1
+        assert plugin._dispatcher.submit.call_args[0][0] == 60.0
+
+    def test_keepalive_skips_probe_when_pool_recently_used(self, plugin):
+        plugin._settings.get.side_effect = make_settings_getter({"keepalive": 60})
+        with patch("octoprint_octohue.time.monotonic", return_value=1000.0):
+            plugin._last_request = 990.0
+            plugin._keepalive(plugin._keepalive_generation)
+        plugin._session.request.assert_not_called()
+        assert plugin._dispatcher.submit.call_args[0][0] == 50.0
+
+    def test_stale_keepalive_generation_exits(self, plugin):
+        plugin._settings.get.side_effect = make_settings_getter({"keepalive": 60})
+        plugin._keepalive(plugin._keepalive_generation - 1)
+        plugin._session.request.assert_not_called()
+        plugin._dispatcher.submit.assert_not_called()
+
+
+# ===========================================================================
+# eventstream / light-state mirror
+# ===========================================================================
+
+class TestEventStream:
+    """
+    establishBridge (re)starts the eventstream subscriber that keeps the
+    light-state mirror current; get_state reads from the mirror while it is live.
+    """
+
+    def test_not_started_when_setting_disabled(self, plugin):
+        plugin._settings.get.side_effect = make_settings_getter({"eventstream": False})
+        plugin.establishBridge("10.0.0.1", "key")
+        assert plugin._eventstream is None
+
+    def test_started_when_enabled(self, plugin):
+        plugin._settings.get.side_effect = make_settings_getter({"eventstream": True})
+        with patch("octoprint_octohue.EventStreamClient") as client_cls:
+            plugin.establishBridge("10.0.0.1", "key")
+        client_cls.return_value.start.assert_called_once()
+        assert plugin._mirror is not None
+
+    def test_restart_stops_previous_client(self, plugin):
+        plugin._settings.get.side_effect = make_settings_getter({"eventstream": True})
+        old = MagicMock()
+        plugin._eventstream = old
+        with patch("octoprint_octohue.EventStreamClient"):
+            plugin.establishBridge("10.0.0.1", "key")
+        old.stop.assert_called_once()
+
+    def test_unconfigured_bridge_stops_client_and_distrusts_mirror(self, plugin):
+        from octoprint_octohue.eventstream import LightStateMirror
+        plugin._settings.get.side_effect = make_settings_getter({"eventstream": True})
+        old = MagicMock()
+        plugin._eventstream = old
+        plugin._mirror = LightStateMirror()
+        plugin._mirror.live = True
+        plugin.establishBridge("", "")
+        old.stop.assert_called_once()
+        assert plugin._eventstream is None
+        assert plugin._mirror.live is False
+
+    def test_open_eventstream_sends_key_and_resume_id(self, plugin):
+        plugin._open_eventstream("42:0")
+        url = plugin._session.get.call_args[0][0]
+        kwargs = plugin._session.get.call_args[1]
+        assert url == "https://192.168.1.100/eventstream/clip/v2"
+        assert kwargs["headers"]["hue-application-key"] == "test-api-key"
+        assert kwargs["headers"]["Last-Event-ID"] == "42:0"
+        assert kwargs["stream"] is True
+
+    def test_seed_mirror_loads_lights_and_groups_then_goes_live(self, plugin):
+        from octoprint_octohue.eventstream import LightStateMirror
+        plugin._mirror = LightStateMirror()
+        plugin._hue_request = MagicMock(return_value={"data": [
+            {"id": "l1", "type": "light", "on": {"on": True}},
+            {"id": "g1", "type": "grouped_light", "on": {"on": False}},
+            {"id": "r1", "type": "room", "metadata": {"name": "Office"}},
+        ]})
+        plugin._seed_mirror()
+        plugin._hue_request.assert_called_once_with("GET", "")
+        assert plugin._mirror.live is True
+        assert plugin._mirror.is_on("l1") is True
+        assert plugin._mirror.is_on("g1") is False
+
+    def test_disconnect_marks_mirror_not_live(self, plugin):
+        from octoprint_octohue.eventstream import LightStateMirror
+        plugin._mirror = LightStateMirror()
+        plugin._mirror.live = True
+        plugin._on_eventstream_down()
+        assert plugin._mirror.live is False
+
+    def test_update_and_delete_events_applied(self, plugin):
+        from octoprint_octohue.eventstream import LightStateMirror
+        plugin._mirror = LightStateMirror()
+        plugin._mirror.live = True
+        plugin._on_hue_events([
+            {"type": "update", "data": [{"id": "l1", "type": "light", "on": {"on": True}}]},
+            {"type": "update", "data": [{"id": "m1", "type": "motion", "motion": {}}]},
+        ])
+        assert plugin._mirror.is_on("l1") is True
+        assert plugin._mirror.get("m1") is None
+        plugin._on_hue_events([{"type": "delete", "data": [{"id": "l1", "type": "light"}]}])
+        assert plugin._mirror.get("l1") is None
+
+    def test_toggle_uses_mirror_state(self, plugin):
+        from octoprint_octohue.eventstream import LightStateMirror
+        plugin._settings.get.side_effect = make_settings_getter({"lampisgroup": False})
+        plugin._mirror = LightStateMirror()
+        plugin._mirror.apply({"id": "1", "on": {"on": True}})
+        plugin._mirror.live = True
+        plugin.build_state = MagicMock()
+        plugin.toggle_state("1")
+        plugin.build_state.assert_called_once_with(on=False, deviceid="1")
+        plugin._session.request.assert_not_called()
+
+    def test_shutdown_stops_eventstream(self, plugin):
+        plugin._settings.get.side_effect = make_settings_getter({"offonshutdown": False})
+        plugin._eventstream = MagicMock()
+        plugin.on_shutdown()
+        plugin._eventstream.stop.assert_called_once()
+
+
 # ===========================================================================
 # on_after_startup
 # ===========================================================================
@@ -459,11 +1094,11 @@ class TestOnAfterStartup:
 
     def test_ononstartup_matching_event_calls_build_state(self, plugin):
         """When ononstartup is True and the configured event exists in statusDict,
-        build_state must be called with the event's colour and brightness."""
+        build_state must be called with the event's precomputed colour and brightness."""
         status_entry = {
             'event': 'PrintDone',
             'colour': '#33FF36',
-            'brightness': 200,
+            'brightness': 80,
         }
         plugin._settings.get.side_effect = make_settings_getter({
             'ononstartup': True,
@@ -475,7 +1110,7 @@ class TestOnAfterStartup:
         plugin.build_state = MagicMock()
         plugin.on_after_startup()
         plugin.build_state.assert_called_once_with(
-            on=True, colour='#33FF36', bri=200, deviceid='1'
+            on=True, xy=plugin.rgb_to_xy('#33FF36'), bri=80, deviceid='1'
         )
 
     def test_ononstartup_no_matching_event_does_not_call_build_state(self, plugin):
@@ -496,7 +1131,7 @@ class TestOnAfterStartup:
         status_entry = {
             'event': 'PrintDone',
             'colour': '#33FF36',
-            'brightness': 200,
+            'brightness': 80,
             'ct': 370,
         }
         plugin._settings.get.side_effect = make_settings_getter({
@@ -509,7 +1144,7 @@ class TestOnAfterStartup:
         plugin.build_state = MagicMock()
         plugin.on_after_startup()
         plugin.build_state.assert_called_once_with(
-            on=True, ct=370, bri=200, deviceid='1'
+            on=True, ct=370, bri=80, deviceid='1'
         )
 
     def test_ononstartup_false_does_not_call_build_state(self, plugin):
@@ -518,7 +1153,7 @@ class TestOnAfterStartup:
         status_entry = {
             'event': 'PrintDone',
             'colour': '#33FF36',
-            'brightness': 200,
+            'brightness': 80,
         }
         plugin._settings.get.side_effect = make_settings_getter({
             'ononstartup': False,
@@ -541,103 +1176,98 @@ class TestOnAfterStartup:
 
 class TestPrinterStartPowerDown:
 
-    @property
-    def _timer(self):
-        return sys.modules["octoprint.util"].ResettableTimer
-
-    def test_passes_callback_not_return_value(self, plugin):
-        """ResettableTimer must receive the function object, not the result of calling it."""
-        plugin._settings.get.side_effect = make_settings_getter({"powerofftime": 0})
-        plugin.printer_check_temp_power_down = MagicMock()
-        plugin.printer_start_power_down()
-        _, callback = self._timer.call_args[0]
-        assert callback is plugin.printer_check_temp_power_down
-
-    def test_timer_uses_configured_delay(self, plugin):
+    def test_waits_configured_delay(self, plugin):
         plugin._settings.get.side_effect = make_settings_getter({"powerofftime": 120})
-        plugin.printer_check_temp_power_down = MagicMock()
         plugin.printer_start_power_down()
-        delay, _ = self._timer.call_args[0]
+        delay = plugin._dispatcher.submit.call_args[0][0]
         assert delay == 120
-
-    def test_timer_is_started(self, plugin):
-        plugin._settings.get.side_effect = make_settings_getter({"powerofftime": 0})
-        plugin.printer_check_temp_power_down = MagicMock()
-        plugin.printer_start_power_down()
-        self._timer.return_value.start.assert_called_once()
+        plugin._printer.register_callback.assert_not_called()
 
     def test_zero_delay_when_powerofftime_not_set(self, plugin):
         plugin._settings.get.side_effect = make_settings_getter({"powerofftime": None})
-        plugin.printer_check_temp_power_down = MagicMock()
         plugin.printer_start_power_down()
-        delay, _ = self._timer.call_args[0]
+        delay = plugin._dispatcher.submit.call_args[0][0]
         assert delay == 0
 
+    def test_second_request_is_ignored(self, plugin):
+        plugin._settings.get.side_effect = make_settings_getter({"powerofftime": 60})
+        plugin.printer_start_power_down()
+        plugin.printer_start_power_down()
+        plugin.printer_check_temp_power_down()
+        assert plugin._dispatcher.submit.call_count == 1
+        assert plugin._get_powerdown().stats()["duplicates"] == 2
+
 
 # ===========================================================================
-# printer_check_temp_power_down
+# printer_check_temp_power_down  –  temperature-callback driven cooldown
 # ===========================================================================
 
 class TestPrinterCheckTempPowerDown:
     """
-    The method must check temperature once and either shut down or schedule
-    a single retry — it must NOT block in a loop.
+    The plug is switched off from OctoPrint's temperature reports, never by
+    polling: one callback is registered while cooling and removed afterwards.
     """
 
-    @property
-    def _timer(self):
-        return sys.modules["octoprint.util"].ResettableTimer
-
     def _setup(self, plugin, current_temp, target_temp=50, plugid="2"):
+        from octoprint_octohue.dispatcher import CommandDispatcher
         plugin._settings.get.side_effect = make_settings_getter(
             {"plugid": plugid, "powerofftemp": target_temp}
         )
         plugin._printer.get_current_temperatures.return_value = {
             "tool0": {"actual": current_temp}
         }
+        plugin._dispatcher = CommandDispatcher(MagicMock())
         plugin.build_state = MagicMock()
 
-    def test_shuts_down_when_at_target_temp(self, plugin):
+    def _listener(self, plugin):
+        return plugin._printer.register_callback.call_args[0][0]
+
+    def _report(self, plugin, temp):
+        self._listener(plugin).on_printer_add_temperature({"tool0": {"actual": temp, "target": 0}})
+        plugin._dispatcher.run_due()
+
+    def test_shuts_down_when_reports_reach_target(self, plugin):
         self._setup(plugin, current_temp=50, target_temp=50)
         plugin.printer_check_temp_power_down()
+        plugin._dispatcher.run_due()
+        plugin.build_state.assert_not_called()
+        self._report(plugin, 49)
         plugin.build_state.assert_called_once_with(on=False, deviceid="2")
 
-    def test_shuts_down_when_below_target_temp(self, plugin):
+    def test_unregisters_after_switching_off(self, plugin):
         self._setup(plugin, current_temp=30, target_temp=50)
         plugin.printer_check_temp_power_down()
-        plugin.build_state.assert_called_once_with(on=False, deviceid="2")
-
-    def test_shuts_down_when_below_safety_floor_of_40(self, plugin):
-        """Falls back to 40°C hard floor even if target_temp is 0."""
-        self._setup(plugin, current_temp=39, target_temp=0)
-        plugin.printer_check_temp_power_down()
-        plugin.build_state.assert_called_once_with(on=False, deviceid="2")
+        plugin._dispatcher.run_due()
+        listener = self._listener(plugin)
+        self._report(plugin, 30)
+        plugin._printer.unregister_callback.assert_called_once_with(listener)
+        assert not plugin._get_powerdown().active
 
-    def test_reschedules_when_still_hot(self, plugin):
+    def test_waits_while_hot_without_polling(self, plugin):
         self._setup(plugin, current_temp=150, target_temp=50)
         plugin.printer_check_temp_power_down()
+        plugin._dispatcher.run_due()
+        for temp in (140, 120, 90):
+            self._report(plugin, temp)
         plugin.build_state.assert_not_called()
-        self._timer.assert_called_once_with(30.0, plugin.printer_check_temp_power_down)
-        self._timer.return_value.start.assert_called_once()
+        assert plugin._printer.get_current_temperatures.call_count == 1
+        # Only the safety timeout is left queued.
+        assert plugin._dispatcher.stats()["depth"] == 1
 
-    def test_does_not_block_when_still_hot(self, plugin):
-        """Function must return promptly — no loop, just one timer scheduled."""
-        self._setup(plugin, current_temp=150, target_temp=50)
-        # If the implementation loops, the mock timer's start() would be called
-        # multiple times within a single call to the method.
+    def test_shuts_down_below_safety_floor_of_40(self, plugin):
+        """Falls back to 40°C hard floor even if target_temp is 0."""
+        self._setup(plugin, current_temp=39, target_temp=0)
         plugin.printer_check_temp_power_down()
-        assert self._timer.call_count == 1
+        plugin._dispatcher.run_due()
+        self._report(plugin, 39)
+        plugin.build_state.assert_called_once_with(on=False, deviceid="2")
 
     def test_empty_string_powerofftemp_does_not_raise(self, plugin):
         """Legacy installs may have powerofftemp="" stored; int('' or 0) must not crash."""
-        plugin._settings.get.side_effect = make_settings_getter(
-            {"plugid": "2", "powerofftemp": ""}
-        )
-        plugin._printer.get_current_temperatures.return_value = {
-            "tool0": {"actual": 30}
-        }
-        plugin.build_state = MagicMock()
+        self._setup(plugin, current_temp=30, target_temp="")
         plugin.printer_check_temp_power_down()  # must not raise ValueError
+        plugin._dispatcher.run_due()
+        self._report(plugin, 30)
         plugin.build_state.assert_called_once_with(on=False, deviceid="2")
 
 
@@ -659,6 +1289,105 @@ class TestOnShutdown:
         plugin.on_shutdown()
         plugin.set_state.assert_not_called()
 
+    def test_flushes_pending_commands_before_stopping(self, plugin):
+        plugin._settings.get.side_effect = make_settings_getter(
+            {"offonshutdown": True}
+        )
+        order = []
+        plugin.set_state = MagicMock(side_effect=lambda *a: order.append("off"))
+        plugin._coalescer = MagicMock()
+        plugin._coalescer.flush_all.side_effect = lambda: order.append("flush")
+        plugin._dispatcher.stop.side_effect = lambda: order.append("stop")
+        plugin.on_shutdown()
+        assert order == ["off", "flush", "stop"]
+
+    def test_stops_dispatcher(self, plugin):
+        plugin._settings.get.side_effect = make_settings_getter(
+            {"offonshutdown": False}
+        )
+        plugin.on_shutdown()
+        plugin._dispatcher.stop.assert_called_once()
+
+
+# ===========================================================================
+# _schedule / _run_scheduled
+# ===========================================================================
+
+class TestSchedule:
+    """
+    _schedule hands jobs to the shared dispatcher; _run_scheduled is the
+    dispatcher's default handler and applies the payload via build_state.
+    """
+
+    def test_submits_to_existing_dispatcher(self, plugin):
+        plugin._schedule(5, "1", {"on": True})
+        plugin._dispatcher.submit.assert_called_once_with(5, "1", {"on": True}, callback=None, slot=None, critical=False)
+
+    def test_creates_and_starts_dispatcher_on_first_use(self, plugin):
+        plugin._dispatcher = None
+        with patch("octoprint_octohue.CommandDispatcher") as dispatcher_cls:
+            plugin._schedule(0, "1", {"on": False})
+        dispatcher_cls.assert_called_once_with(plugin._run_scheduled, logger=plugin._logger)
+        dispatcher_cls.return_value.start.assert_called_once()
+        dispatcher_cls.return_value.submit.assert_called_once()
+
+    def test_run_scheduled_applies_payload_to_device(self, plugin):
+        plugin.build_state = MagicMock()
+        plugin._run_scheduled("1", {"on": True, "bri": 50})
+        plugin.build_state.assert_called_once_with(deviceid="1", on=True, bri=50)
+
+    def test_on_after_startup_starts_dispatcher(self, plugin):
+        plugin._settings.get.side_effect = make_settings_getter({"ononstartup": False})
+        plugin.establishBridge = MagicMock()
+        plugin.on_after_startup()
+        plugin._dispatcher.start.assert_called_once()
+
+    def test_on_after_startup_creates_coalescer_with_window_in_seconds(self, plugin):
+        plugin._settings.get.side_effect = make_settings_getter(
+            {"ononstartup": False, "coalescewindow": 250}
+        )
+        plugin.establishBridge = MagicMock()
+        plugin.on_after_startup()
+        assert plugin._coalescer.window == 0.25
+
+    def test_coalescer_flush_runs_on_dispatcher(self, plugin):
+        plugin._settings.get.side_effect = make_settings_getter(
+            {"ononstartup": False, "coalescewindow": 100, "lampisgroup": False}
+        )
+        plugin.establishBridge = MagicMock()
+        plugin.on_after_startup()
+        plugin._send_put = MagicMock()
+        plugin.set_state({"on": True}, "uuid-1")
+        plugin.set_state({"on": False}, "uuid-1")
+        plugin._send_put.assert_not_called()
+        delay, deviceid, payload = plugin._dispatcher.submit.call_args[0]
+        assert delay == 0.1
+        plugin._dispatcher.submit.call_args[1]["callback"]()
+        plugin._send_put.assert_called_once_with("light/uuid-1", {"on": {"on": False}})
+
+
+# ===========================================================================
+# _coalesce_window
+# ===========================================================================
+
+class TestCoalesceWindow:
+
+    def test_converts_milliseconds_to_seconds(self, plugin):
+        plugin._settings.get.side_effect = make_settings_getter({"coalescewindow": 200})
+        assert plugin._coalesce_window() == 0.2
+
+    def test_missing_or_invalid_is_zero(self, plugin):
+        for value in (None, "", "abc", -50):
+            plugin._settings.get.side_effect = make_settings_getter({"coalescewindow": value})
+            assert plugin._coalesce_window() == 0.0
+
+    def test_settings_save_updates_window(self, plugin):
+        plugin._settings.get.side_effect = make_settings_getter({"coalescewindow": 500})
+        plugin.establishBridge = MagicMock()
+        plugin._coalescer = MagicMock()
+        plugin.on_settings_save({})
+        assert plugin._coalescer.window == 0.5
+
 
 # ===========================================================================
 # on_event
@@ -666,16 +1395,12 @@ class TestOnShutdown:
 
 class TestOnEvent:
     """
-    on_event looks up the incoming event in statusDict and schedules a delayed
-    light-state change via ResettableTimer.
+    on_event looks up the incoming event in statusDict and queues a delayed
+    light-state change on the dispatcher.  Each job is (delay, deviceid, payload).
     """
 
-    @property
-    def _timer(self):
-        return sys.modules["octoprint.util"].ResettableTimer
-
     def _status_dict_entry(self, event, turnoff=False, flash=False,
-                           colour="#FFFFFF", brightness=200, delay=0, ct=0):
+                           colour="#FFFFFF", brightness=80, delay=0, ct=0):
         return {
             "event": event,
             "colour": colour,
@@ -695,12 +1420,12 @@ class TestOnEvent:
             }
         )
         plugin.on_event("PrintStarted", {})
-        self._timer.assert_called_once()
-        _, kwargs = self._timer.call_args
-        assert kwargs["kwargs"]["on"] is True
-        assert kwargs["kwargs"]["colour"] == "#FFFFFF"
-        assert kwargs["kwargs"]["bri"] == 200
-        assert kwargs["kwargs"]["deviceid"] == "1"
+        plugin._dispatcher.submit.assert_called_once()
+        _, deviceid, payload = plugin._dispatcher.submit.call_args[0]
+        assert payload["on"] is True
+        assert payload["xy"] == plugin.rgb_to_xy("#FFFFFF")
+        assert payload["bri"] == 80
+        assert deviceid == "1"
 
     def test_known_event_turnoff_true_schedules_off(self, plugin):
         plugin._settings.get.side_effect = make_settings_getter(
@@ -713,18 +1438,18 @@ class TestOnEvent:
             }
         )
         plugin.on_event("Disconnected", {})
-        self._timer.assert_called_once()
-        _, kwargs = self._timer.call_args
-        assert kwargs["kwargs"]["on"] is False
+        plugin._dispatcher.submit.assert_called_once()
+        payload = plugin._dispatcher.submit.call_args[0][2]
+        assert payload["on"] is False
 
-    def test_unknown_event_no_timer_scheduled(self, plugin):
+    def test_unknown_event_nothing_scheduled(self, plugin):
         plugin._settings.get.side_effect = make_settings_getter(
             {"statusDict": [], "autopoweroff": False}
         )
         plugin.on_event("UnknownEvent", {})
-        self._timer.assert_not_called()
+        plugin._dispatcher.submit.assert_not_called()
 
-    def test_delayed_task_is_started(self, plugin):
+    def test_delay_passed_to_dispatcher(self, plugin):
         plugin._settings.get.side_effect = make_settings_getter(
             {
                 "lampid": "1",
@@ -733,8 +1458,7 @@ class TestOnEvent:
             }
         )
         plugin.on_event("PrintDone", {})
-        timer_instance = self._timer.return_value
-        timer_instance.start.assert_called_once()
+        assert plugin._dispatcher.submit.call_args[0][0] == 5
 
     def test_print_done_with_autopoweroff_triggers_powerdown(self, plugin):
         plugin._settings.get.side_effect = make_settings_getter(
@@ -764,6 +1488,93 @@ class TestOnEvent:
         plugin.on_event("PrintStarted", {})
         plugin.printer_start_power_down.assert_not_called()
 
+    def _real_dispatcher(self, plugin):
+        from octoprint_octohue.dispatcher import CommandDispatcher
+        now = [0.0]
+        plugin._dispatcher = CommandDispatcher(plugin._run_scheduled, clock=lambda: now[0])
+        plugin.build_state = MagicMock()
+        return now
+
+    def test_newer_event_supersedes_delayed_action(self, plugin):
+        plugin._settings.get.side_effect = make_settings_getter({"lampid": "1", "statusDict": [
+            self._status_dict_entry("PrintStarted", colour="#FFFFFF", delay=10),
+            self._status_dict_entry("PrintFailed", colour="#FF0000"),
+        ]})
+        now = self._real_dispatcher(plugin)
+        plugin.on_event("PrintStarted", {})
+        plugin.on_event("PrintFailed", {})
+        now[0] = 20.0
+        plugin._dispatcher.run_due()
+        plugin.build_state.assert_called_once()
+        assert plugin.build_state.call_args[1]["xy"] == pytest.approx(plugin.rgb_to_xy("#FF0000"))
+
+    def test_newer_event_cancels_pending_flash_off(self, plugin):
+        plugin._settings.get.side_effect = make_settings_getter({"lampid": "1", "statusDict": [
+            self._status_dict_entry("PrintFailed", flash=True, turnoff=True),
+            self._status_dict_entry("PrintStarted"),
+        ]})
+        now = self._real_dispatcher(plugin)
+        plugin.on_event("PrintFailed", {})
+        plugin._dispatcher.run_due()
+        plugin.on_event("PrintStarted", {})
+        now[0] = 30.0
+        plugin._dispatcher.run_due()
+        assert [c[1]["on"] for c in plugin.build_state.call_args_list] == [True, True]
+
+    def test_critical_event_scheduled_on_critical_lane(self, plugin):
+        plugin._settings.get.side_effect = make_settings_getter({"lampid": "1", "statusDict": [
+            self._status_dict_entry("PrintFailed", colour="#FF0000"),
+            self._status_dict_entry("PrintStarted"),
+        ]})
+        plugin.on_event("PrintFailed", {})
+        plugin.on_event("PrintStarted", {})
+        lanes = [c[1]["critical"] for c in plugin._dispatcher.submit.call_args_list]
+        assert lanes == [True, False]
+        assert plugin._dispatcher.submit.call_args_list[0][0][2]["critical"] is True
+
+    def test_gated_event_fires_through_throttle(self, plugin):
+        entry = dict(self._status_dict_entry("ZChange"), min_interval=60, trailing=False)
+        plugin._settings.get.side_effect = make_settings_getter({"lampid": "1", "statusDict": [entry]})
+        for _ in range(5):
+            plugin.on_event("ZChange", {})
+        assert plugin._dispatcher.submit.call_count == 2  # the leading firing plus the window's close
+        assert plugin.get_stats()["throttle"]["ZChange"] == {"events": 5, "fired": 1, "dropped": 4, "pending": False}
+        assert plugin._get_metrics().get("octohue_events_dropped_total").value("ZChange") == 4
+
+    def test_settings_change_resets_throttle(self, plugin):
+        entry = dict(self._status_dict_entry("ZChange"), min_interval=60)
+        plugin._settings.get.side_effect = make_settings_getter({"lampid": "1", "statusDict": [entry]})
+        plugin.on_event("ZChange", {})
+        plugin._rules = None
+        plugin._get_rules()
+        assert plugin.get_stats()["throttle"] == {}
+        plugin._dispatcher.cancel.assert_called_once()
+
+    def test_unconfigured_event_supersedes_nothing(self, plugin):
+        plugin._settings.get.side_effect = make_settings_getter({"lampid": "1", "statusDict": [
+            self._status_dict_entry("PrintStarted", delay=10),
+        ]})
+        self._real_dispatcher(plugin)
+        plugin.on_event("PrintStarted", {})
+        plugin.on_event("ZChange", {})
+        assert plugin._dispatcher.stats()["depth"] == 1
+
+    def test_print_started_cancels_pending_powerdown(self, plugin):
+        plugin._settings.get.side_effect = make_settings_getter(
+            {"statusDict": [], "autopoweroff": True, "powerofftime": 300}
+        )
+        plugin.on_event("PrintDone", {})
+        job = plugin._dispatcher.submit.return_value
+        plugin.on_event("PrintStarted", {})
+        plugin._dispatcher.cancel.assert_called_once_with(job)
+        assert plugin._get_powerdown().state == "idle"
+
+    def test_connected_cancels_pending_powerdown(self, plugin):
+        plugin._settings.get.side_effect = make_settings_getter({"statusDict": [], "powerofftime": 300})
+        plugin.printer_start_power_down()
+        plugin.on_event("Connected", {})
+        assert plugin._get_powerdown().stats()["cancelled"] == 1
+
     def test_ct_mode_schedules_ct_not_colour(self, plugin):
         """When an event has ct set, build_state should receive ct, not colour."""
         plugin._settings.get.side_effect = make_settings_getter(
@@ -774,9 +1585,9 @@ class TestOnEvent:
             }
         )
         plugin.on_event("PrintStarted", {})
-        _, kwargs = self._timer.call_args
-        assert kwargs["kwargs"]["ct"] == 370
-        assert "colour" not in kwargs["kwargs"]
+        payload = plugin._dispatcher.submit.call_args[0][2]
+        assert payload["ct"] == 370
+        assert "colour" not in payload
 
     def test_ct_mode_zero_falls_back_to_colour(self, plugin):
         """When ct is 0 (falsy), colour should be used as normal."""
@@ -788,9 +1599,9 @@ class TestOnEvent:
             }
         )
         plugin.on_event("PrintStarted", {})
-        _, kwargs = self._timer.call_args
-        assert "colour" in kwargs["kwargs"]
-        assert "ct" not in kwargs["kwargs"]
+        payload = plugin._dispatcher.submit.call_args[0][2]
+        assert "xy" in payload
+        assert "ct" not in payload
 
     def test_ct_mode_flash_and_turnoff_uses_ct(self, plugin):
         """Flash+turnoff with ct set should use ct in the flash kwargs."""
@@ -802,9 +1613,115 @@ class TestOnEvent:
             }
         )
         plugin.on_event("PrintDone", {})
-        first_call_kwargs = self._timer.call_args_list[0][1]["kwargs"]
-        assert first_call_kwargs["ct"] == 300
-        assert "colour" not in first_call_kwargs
+        first_payload = plugin._dispatcher.submit.call_args_list[0][0][2]
+        assert first_payload["ct"] == 300
+        assert "colour" not in first_payload
+
+    def test_invalid_entry_is_not_scheduled(self, plugin):
+        plugin._settings.get.side_effect = make_settings_getter(
+            {
+                "lampid": "1",
+                "statusDict": [self._status_dict_entry("PrintStarted", colour="red")],
+                "autopoweroff": False,
+            }
+        )
+        plugin.on_event("PrintStarted", {})
+        plugin._dispatcher.submit.assert_not_called()
+        plugin._logger.warning.assert_called_once()
+
+    def test_rules_compiled_once_across_events(self, plugin):
+        plugin._settings.get.side_effect = make_settings_getter(
+            {
+                "lampid": "1",
+                "statusDict": [self._status_dict_entry("PrintStarted")],
+                "autopoweroff": False,
+            }
+        )
+        plugin.rgb_to_xy = MagicMock(return_value=[0.3, 0.3])
+        for _ in range(3):
+            plugin.on_event("PrintStarted", {})
+            plugin.on_event("ZChange", {})
+        plugin.rgb_to_xy.assert_called_once_with("#FFFFFF")
+        assert plugin._dispatcher.submit.call_count == 3
+
+    def test_settings_save_recompiles_rules(self, plugin):
+        settings = {
+            "lampid": "1",
+            "statusDict": [self._status_dict_entry("PrintStarted")],
+            "autopoweroff": False,
+        }
+        plugin._settings.get.side_effect = make_settings_getter(settings)
+        plugin.establishBridge = MagicMock()
+        plugin.on_event("PrintStarted", {})
+        settings["statusDict"] = [self._status_dict_entry("PrintDone")]
+        plugin._settings.get.side_effect = make_settings_getter(settings)
+        plugin.on_settings_save({})
+        plugin.on_event("PrintStarted", {})
+        plugin.on_event("PrintDone", {})
+        assert plugin._dispatcher.submit.call_count == 2
+
+
+# ===========================================================================
+# on_print_progress
+# ===========================================================================
+
+class TestPrintProgress:
+    """
+    on_print_progress moves the lamp along the configured ramp through the
+    dispatcher, skipping ticks the eye (or the rate budget) would not notice.
+    """
+
+    def _enable(self, plugin, **overrides):
+        settings = {"progress_enabled": True, "progress_mode": "colour", "progress_from": "#FF0000",
+                    "progress_to": "#00FF00", "defaultbri": 80}
+        settings.update(overrides)
+        plugin._settings.get.side_effect = make_settings_getter(settings)
+
+    def test_off_by_default_sends_nothing(self, plugin):
+        plugin._settings.get.side_effect = make_settings_getter()
+        plugin.on_print_progress("local", "part.gcode", 10)
+        plugin._dispatcher.submit.assert_not_called()
+        assert plugin._progress is None
+
+    def test_first_tick_schedules_ramp_start(self, plugin):
+        self._enable(plugin)
+        plugin.on_print_progress("local", "part.gcode", 0)
+        delay, deviceid, payload = plugin._dispatcher.submit.call_args[0]
+        assert (delay, deviceid) == (0, "1")
+        assert payload["on"] is True and payload["bri"] == 80
+        assert payload["xy"] == pytest.approx(plugin.rgb_to_xy(255, 0, 0))
+        assert plugin._dispatcher.submit.call_args[1]["slot"] is None
+
+    def test_imperceptible_tick_sends_nothing(self, plugin):
+        self._enable(plugin)
+        plugin.on_print_progress("local", "part.gcode", 0)
+        plugin.on_print_progress("local", "part.gcode", 1)
+        assert plugin._dispatcher.submit.call_count == 1
+        assert plugin.get_stats()["progress"]["imperceptible"] == 1
+
+    def test_skipped_while_rate_limited(self, plugin):
+        self._enable(plugin)
+        plugin._limiter = MagicMock()
+        plugin._limiter.available.return_value = False
+        plugin.on_print_progress("local", "part.gcode", 0)
+        plugin._limiter.available.assert_called_once_with("light")
+        plugin._dispatcher.submit.assert_not_called()
+
+    def test_next_print_starts_afresh(self, plugin):
+        self._enable(plugin)
+        plugin.on_print_progress("local", "part.gcode", 0)
+        plugin.on_event("PrintCancelled", {})
+        plugin.on_event("PrintStarted", {})
+        # Same percent as the last tick sent, but the events have recoloured the lamp since.
+        plugin.on_print_progress("local", "part.gcode", 0)
+        assert plugin._dispatcher.submit.call_count == 2
+        assert plugin.get_stats()["progress"]["sent"] == 2
+
+    def test_invalid_mode_logs_and_sends_nothing(self, plugin):
+        self._enable(plugin, progress_mode="rainbow")
+        plugin.on_print_progress("local", "part.gcode", 0)
+        plugin._dispatcher.submit.assert_not_called()
+        plugin._logger.warning.assert_called_once()
 
 
 # ===========================================================================
@@ -852,7 +1769,18 @@ class TestOnApiCommandBridge:
             {"bridgeaddr": "192.168.1.100", "husername": "key"}
         )
         plugin.on_api_command("bridge", {"getstatus": "true"})
-        flask.jsonify.assert_called_once_with(bridgestatus="configured")
+        flask.jsonify.assert_called_once_with(bridgestatus="configured", circuit="closed")
+
+    def test_getstatus_unreachable_while_circuit_open(self, plugin):
+        flask = sys.modules["flask"]
+        plugin._settings.get.side_effect = make_settings_getter(
+            {"bridgeaddr": "192.168.1.100", "husername": "key"}
+        )
+        breaker = plugin._get_breaker()
+        for _ in range(breaker.threshold):
+            breaker.record_failure()
+        plugin.on_api_command("bridge", {"getstatus": "true"})
+        flask.jsonify.assert_called_once_with(bridgestatus="unreachable", circuit="open")
 
     def test_discover_calls_discovery_url(self, plugin):
         requests = sys.modules["requests"]
@@ -860,7 +1788,17 @@ class TestOnApiCommandBridge:
             {"internalipaddress": "192.168.1.100", "id": "abc"}
         ]
         plugin.on_api_command("bridge", {"discover": "true"})
-        requests.get.assert_called_once_with(plugin.discoveryurl)
+        requests.get.assert_called_once_with(plugin.discoveryurl, timeout=(5, 10))
+
+    def test_discover_failure_returns_504(self, plugin):
+        flask = sys.modules["flask"]
+        requests = sys.modules["requests"]
+        requests.get.side_effect = OSError("timed out")
+        try:
+            plugin.on_api_command("bridge", {"discover": "true"})
+        finally:
+            requests.get.side_effect = None
+        assert flask.make_response.call_args[0][1] == 504
 
     def test_discover_passes_parsed_list_to_jsonify(self, plugin):
         flask = sys.modules["flask"]
@@ -915,6 +1853,19 @@ class TestOnApiCommandBridge:
         args = flask.jsonify.call_args[0][0]
         assert args[0]["response"] == "error"
 
+    def test_pair_timeout_returns_error_response(self, plugin):
+        flask = sys.modules["flask"]
+        pair_session = sys.modules["requests"].Session.return_value
+        pair_session.post.side_effect = OSError("timed out")
+        try:
+            plugin.on_api_command(
+                "bridge", {"pair": "true", "bridgeaddr": "192.168.1.100"}
+            )
+        finally:
+            pair_session.post.side_effect = None
+        assert pair_session.post.call_args[1]["timeout"] == (3.05, 10)
+        assert flask.jsonify.call_args[0][0][0]["response"] == "error"
+
     def test_pair_parses_response_once(self, plugin):
         plugin._settings.get.side_effect = make_settings_getter()
         plugin.establishBridge = MagicMock()
@@ -935,9 +1886,10 @@ class TestOnApiCommandBridge:
 class TestOnApiCommandGetDevices:
 
     _V2_DEVICES = [
-        {"id": "uuid-1", "metadata": {"name": "Desk Lamp", "archetype": "tableShade"}},
-        {"id": "uuid-2", "metadata": {"name": "Smart Plug", "archetype": "plug"}},
-        {"id": "uuid-3", "metadata": {"name": "Floor Lamp", "archetype": "floorShade"}},
+        {"id": "uuid-1", "type": "light", "metadata": {"name": "Desk Lamp", "archetype": "tableShade"}},
+        {"id": "uuid-2", "type": "light", "metadata": {"name": "Smart Plug", "archetype": "plug"}},
+        {"id": "uuid-3", "type": "light", "metadata": {"name": "Floor Lamp", "archetype": "floorShade"}},
+        {"id": "room-1", "type": "room", "metadata": {"name": "Office", "archetype": "office"}},
     ]
 
     def test_non_admin_returns_403(self, plugin):
@@ -992,6 +1944,41 @@ class TestOnApiCommandGetDevices:
         devices = flask.jsonify.call_args[1]["devices"]
         assert devices == []
 
+    def test_single_bulk_fetch_of_all_resources(self, plugin):
+        plugin._session.request.return_value.json.return_value = {"data": self._V2_DEVICES}
+        plugin.on_api_command("getdevices", {})
+        plugin._session.request.assert_called_once()
+        assert plugin._session.request.call_args[0][1] == "https://192.168.1.100/clip/v2/resource"
+
+    def test_repeated_calls_served_from_cache(self, plugin):
+        plugin._session.request.return_value.json.return_value = {"data": self._V2_DEVICES}
+        plugin.on_api_command("getdevices", {})
+        plugin.on_api_command("getdevices", {"archetype": "plug"})
+        plugin.on_api_command("getgroups", {})
+        assert plugin._session.request.call_count == 1
+
+    def test_refresh_flag_refetches(self, plugin):
+        plugin._session.request.return_value.json.return_value = {"data": self._V2_DEVICES}
+        plugin.on_api_command("getdevices", {})
+        plugin.on_api_command("getdevices", {"refresh": True})
+        assert plugin._session.request.call_count == 2
+
+    def test_failed_fetch_is_not_cached(self, plugin):
+        flask = sys.modules["flask"]
+        plugin._session.request.return_value.json.return_value = {}
+        plugin.on_api_command("getdevices", {})
+        assert flask.jsonify.call_args[1]["devices"] == []
+        plugin._session.request.return_value.json.return_value = {"data": self._V2_DEVICES}
+        plugin.on_api_command("getdevices", {})
+        assert len(flask.jsonify.call_args[1]["devices"]) == 3
+
+    def test_establish_bridge_invalidates_inventory(self, plugin):
+        plugin._session.request.return_value.json.return_value = {"data": self._V2_DEVICES}
+        plugin.on_api_command("getdevices", {})
+        plugin._inventory.invalidate = MagicMock()
+        plugin.establishBridge("192.168.1.1", "key")
+        plugin._inventory.invalidate.assert_called_once()
+
 
 # ===========================================================================
 # on_api_command  –  getgroups
@@ -1014,18 +2001,10 @@ class TestOnApiCommandGetGroups:
 
     def test_returns_named_groups_from_rooms(self, plugin):
         flask = sys.modules["flask"]
-        room_data = [{"metadata": {"name": "Living Room"}, "services": [{"rid": "gl-uuid-1", "rtype": "grouped_light"}]}]
-        zone_data = []
-
-        def fake_request(method, url, **kwargs):
-            mock = MagicMock()
-            if "room" in url:
-                mock.json.return_value = {"data": room_data}
-            else:
-                mock.json.return_value = {"data": zone_data}
-            return mock
-
-        plugin._session.request.side_effect = fake_request
+        plugin._session.request.return_value.json.return_value = {"data": [
+            {"id": "r1", "type": "room", "metadata": {"name": "Living Room"}, "services": [{"rid": "gl-uuid-1", "rtype": "grouped_light"}]},
+            {"id": "gl-uuid-1", "type": "grouped_light"},
+        ]}
         plugin.on_api_command("getgroups", {})
         groups = flask.jsonify.call_args[1]["groups"]
         assert len(groups) == 1
@@ -1034,38 +2013,20 @@ class TestOnApiCommandGetGroups:
 
     def test_returns_groups_from_both_rooms_and_zones(self, plugin):
         flask = sys.modules["flask"]
-        room_data = [{"metadata": {"name": "Living Room"}, "services": [{"rid": "gl-uuid-1", "rtype": "grouped_light"}]}]
-        zone_data = [{"metadata": {"name": "Office Zone"}, "services": [{"rid": "gl-uuid-2", "rtype": "grouped_light"}]}]
-
-        def fake_request(method, url, **kwargs):
-            mock = MagicMock()
-            if url.endswith("/room"):
-                mock.json.return_value = {"data": room_data}
-            else:
-                mock.json.return_value = {"data": zone_data}
-            return mock
-
-        plugin._session.request.side_effect = fake_request
+        plugin._session.request.return_value.json.return_value = {"data": [
+            {"id": "r1", "type": "room", "metadata": {"name": "Living Room"}, "services": [{"rid": "gl-uuid-1", "rtype": "grouped_light"}]},
+            {"id": "z1", "type": "zone", "metadata": {"name": "Office Zone"}, "services": [{"rid": "gl-uuid-2", "rtype": "grouped_light"}]},
+        ]}
         plugin.on_api_command("getgroups", {})
         groups = flask.jsonify.call_args[1]["groups"]
         assert len(groups) == 2
 
     def test_skips_items_without_grouped_light_service(self, plugin):
         flask = sys.modules["flask"]
-        room_data = [
-            {"metadata": {"name": "Room A"}, "services": [{"rid": "dev-uuid", "rtype": "device"}]},
-            {"metadata": {"name": "Room B"}, "services": [{"rid": "gl-uuid-2", "rtype": "grouped_light"}]},
-        ]
-
-        def fake_request(method, url, **kwargs):
-            mock = MagicMock()
-            if url.endswith("/room"):
-                mock.json.return_value = {"data": room_data}
-            else:
-                mock.json.return_value = {"data": []}
-            return mock
-
-        plugin._session.request.side_effect = fake_request
+        plugin._session.request.return_value.json.return_value = {"data": [
+            {"id": "r1", "type": "room", "metadata": {"name": "Room A"}, "services": [{"rid": "dev-uuid", "rtype": "device"}]},
+            {"id": "r2", "type": "room", "metadata": {"name": "Room B"}, "services": [{"rid": "gl-uuid-2", "rtype": "grouped_light"}]},
+        ]}
         plugin.on_api_command("getgroups", {})
         groups = flask.jsonify.call_args[1]["groups"]
         assert len(groups) == 1
@@ -1125,6 +2086,23 @@ class TestOnApiCommandMisc:
         plugin.on_api_command("cooldown", {})
         plugin.printer_check_temp_power_down.assert_called_once()
 
+    def test_getpowerdown_reports_state(self, plugin):
+        flask = sys.modules["flask"]
+        plugin._settings.get.side_effect = make_settings_getter({"powerofftime": 60, "powerofftemp": 50})
+        plugin.printer_start_power_down()
+        plugin.on_api_command("getpowerdown", {})
+        kwargs = flask.jsonify.call_args[1]
+        assert (kwargs["state"], kwargs["threshold"]) == ("waiting", 50)
+
+    def test_cancelpowerdown(self, plugin):
+        flask = sys.modules["flask"]
+        plugin._settings.get.side_effect = make_settings_getter({"powerofftime": 60})
+        plugin.on_api_command("cancelpowerdown", {})
+        assert flask.jsonify.call_args[1] == {"cancelled": False}
+        plugin.printer_start_power_down()
+        plugin.on_api_command("cancelpowerdown", {})
+        assert flask.jsonify.call_args[1] == {"cancelled": True}
+
     def test_turnon_uses_settings_lampid_by_default(self, plugin):
         plugin._settings.get.side_effect = make_settings_getter(
             {"lampid": "1", "defaultbri": 200}
@@ -1149,6 +2127,22 @@ class TestOnApiCommandMisc:
             on=True, colour="#FF0000", bri=200, deviceid="1"
         )
 
+    def test_getstats_non_admin_returns_403(self, plugin):
+        flask = sys.modules["flask"]
+        sys.modules["octoprint.access.permissions"].Permissions.ADMIN.can.return_value = False
+        plugin.on_api_command("getstats", {})
+        assert flask.make_response.call_args[0][1] == 403
+
+    def test_getstats_returns_dispatcher_stats(self, plugin):
+        flask = sys.modules["flask"]
+        plugin._dispatcher.stats.return_value = {"depth": 3, "lag": 0.1}
+        plugin.on_api_command("getstats", {})
+        assert flask.jsonify.call_args[1]["dispatcher"] == {"depth": 3, "lag": 0.1}
+
+    def test_getstats_before_dispatcher_started(self, plugin):
+        plugin._dispatcher = None
+        assert plugin.get_stats()["dispatcher"] is None
+
 
 # ===========================================================================
 # get_settings_defaults
@@ -1182,6 +2176,7 @@ class TestGetSettingsDefaults:
         assert d["lampisgroup"] is False
         assert d["powerofftime"] == 0
         assert d["powerofftemp"] == 0
+        assert d["coalescewindow"] == 200
 
 
 # ===========================================================================
@@ -1209,7 +2204,8 @@ class TestOnSettingsMigrate:
 
     def test_up_to_date_does_not_modify_settings(self, plugin):
         """current == target → nothing should change."""
-        plugin.on_settings_migrate(target=4, current=4)
+        version = plugin.get_settings_version()
+        plugin.on_settings_migrate(target=version, current=version)
         plugin._settings.set.assert_not_called()
 
     def test_first_install_example_brightnesses_are_percentages(self, plugin):
@@ -1307,6 +2303,33 @@ class TestOnSettingsMigrate:
         plugin._settings.set.assert_any_call(['togglecolour'], '#FFFFFF')
         plugin._settings.set.assert_any_call(['togglect'], 0)
 
+    def test_v4_to_v5_adds_coalescing_window(self, plugin):
+        plugin._settings.get.side_effect = make_settings_getter()
+        plugin.on_settings_migrate(target=5, current=4)
+        plugin._settings.set.assert_any_call(['coalescewindow'], 200)
+
+    def test_v5_to_v6_enables_eventstream(self, plugin):
+        plugin._settings.get.side_effect = make_settings_getter()
+        plugin.on_settings_migrate(target=6, current=5)
+        plugin._settings.set.assert_any_call(['eventstream'], True)
+
+    def test_v6_to_v7_adds_pool_size_and_keepalive(self, plugin):
+        plugin._settings.get.side_effect = make_settings_getter()
+        plugin.on_settings_migrate(target=7, current=6)
+        plugin._settings.set.assert_any_call(['poolsize'], 4)
+        plugin._settings.set.assert_any_call(['keepalive'], 0)
+
+    def test_v7_to_v8_adds_prometheus_switch_off(self, plugin):
+        plugin._settings.get.side_effect = make_settings_getter()
+        plugin.on_settings_migrate(target=8, current=7)
+        plugin._settings.set.assert_any_call(['prometheus'], False)
+
+    def test_v8_to_v9_adds_progress_mode_off(self, plugin):
+        plugin._settings.get.side_effect = make_settings_getter()
+        plugin.on_settings_migrate(target=9, current=8)
+        plugin._settings.set.assert_any_call(['progress_enabled'], False)
+        plugin._settings.set.assert_any_call(['progress_mode'], "colour")
+
     def test_v3_to_v4_does_not_touch_brightness_conversion(self, plugin):
         """v3→v4 must not re-run the brightness conversion — values are already percentages."""
         plugin._settings.get.side_effect = make_settings_getter({"defaultbri": 75})
@@ -1331,7 +2354,7 @@ class TestOnSettingsLoad:
             "lampid", "plugid", "lampisgroup", "defaultbri", "ononstartup",
             "configuredEvents", "ononstartupevent", "offonshutdown",
             "showhuetoggle", "showpowertoggle", "autopoweroff",
-            "powerofftime", "powerofftemp",
+            "powerofftime", "powerofftemp", "progress_enabled", "progress_mode",
         ]:
             assert key in result, f"Missing key: {key!r}"
 
@@ -1379,6 +2402,64 @@ class TestOnSettingsSave:
         plugin.on_settings_save({"lampid": "uuid-1"})
         plugin.establishBridge.assert_called_once_with("10.0.0.1", "saved-key")
 
+    def test_refreshes_settings_snapshot(self, plugin):
+        plugin._settings.get.side_effect = make_settings_getter({"lampid": "old"})
+        assert plugin._get_config().lampid == "old"
+        plugin._settings.get.side_effect = make_settings_getter({"lampid": "new"})
+        plugin.establishBridge = MagicMock()
+        plugin.on_settings_save({"lampid": "new"})
+        assert plugin._get_config().lampid == "new"
+
+
+# ===========================================================================
+# Settings snapshot on the hot paths
+# ===========================================================================
+
+class TestConfigSnapshotHotPath:
+    """
+    Once the snapshot is taken, on_event -> build_state -> set_state and
+    toggle_state must not read from OctoPrint's settings tree at all.
+    """
+
+    def _primed(self, plugin, **overrides):
+        settings = {
+            "lampid": "1",
+            "statusDict": [{"event": "PrintStarted", "colour": "#FF0000", "brightness": 80,
+                            "delay": 0, "turnoff": False, "flash": False}],
+            "nightmode_enabled": True,
+            "nightmode_start": "00:00",
+            "nightmode_end": "23:59",
+            "nightmode_action": "dim",
+            "nightmode_maxbri": 25,
+        }
+        settings.update(overrides)
+        plugin._settings.get.side_effect = make_settings_getter(settings)
+        plugin._put = MagicMock(return_value="sent")
+        plugin._get_rules()
+        plugin._get_config()
+        plugin._settings.get.reset_mock()
+        return plugin
+
+    def test_event_to_put_reads_no_settings(self, plugin):
+        self._primed(plugin)
+        plugin._schedule = lambda delay, deviceid, payload=None, callback=None, slot=None, critical=False: plugin._run_scheduled(deviceid, payload)
+        plugin.on_event("PrintStarted", {})
+        plugin._put.assert_called_once()
+        plugin._settings.get.assert_not_called()
+
+    def test_toggle_reads_no_settings(self, plugin):
+        self._primed(plugin)
+        plugin.get_state = MagicMock(return_value=False)
+        plugin.toggle_state()
+        plugin._put.assert_called_once()
+        plugin._settings.get.assert_not_called()
+
+    def test_snapshot_is_atomically_replaced(self, plugin):
+        self._primed(plugin)
+        before = plugin._get_config()
+        plugin._reload_config()
+        assert plugin._get_config() is not before
+
 
 # ===========================================================================
 # on_event  –  flash behaviour
@@ -1388,15 +2469,11 @@ class TestOnEventFlash:
     """
     on_event flash flag adds alert: lselect to the build_state call.
     When flash and turnoff are both set, the light flashes first and a second
-    timer turns it off 15 seconds later.
+    dispatcher job turns it off 15 seconds later.
     """
 
-    @property
-    def _timer(self):
-        return sys.modules["octoprint.util"].ResettableTimer
-
     def _entry(self, event, turnoff=False, flash=False, colour="#FF0000",
-                brightness=200, delay=0):
+                brightness=80, delay=0):
         return {
             "event": event,
             "colour": colour,
@@ -1414,9 +2491,9 @@ class TestOnEventFlash:
             "nightmode_enabled": False,
         })
         plugin.on_event("PrintDone", {})
-        _, kwargs = self._timer.call_args
-        assert kwargs["kwargs"]["alert"] == "lselect"
-        assert kwargs["kwargs"]["on"] is True
+        payload = plugin._dispatcher.submit.call_args[0][2]
+        assert payload["alert"] == "lselect"
+        assert payload["on"] is True
 
     def test_flash_false_does_not_add_alert(self, plugin):
         plugin._settings.get.side_effect = make_settings_getter({
@@ -1426,14 +2503,14 @@ class TestOnEventFlash:
             "nightmode_enabled": False,
         })
         plugin.on_event("PrintDone", {})
-        _, kwargs = self._timer.call_args
-        assert "alert" not in kwargs["kwargs"]
+        payload = plugin._dispatcher.submit.call_args[0][2]
+        assert "alert" not in payload
 
     def test_flash_missing_key_does_not_add_alert(self, plugin):
         """Entries saved before flash feature had no flash key — must not crash."""
         entry = {
             "event": "PrintDone", "colour": "#FF0000",
-            "brightness": 200, "delay": 0, "turnoff": False,
+            "brightness": 80, "delay": 0, "turnoff": False,
             # no 'flash' key
         }
         plugin._settings.get.side_effect = make_settings_getter({
@@ -1443,10 +2520,10 @@ class TestOnEventFlash:
             "nightmode_enabled": False,
         })
         plugin.on_event("PrintDone", {})
-        _, kwargs = self._timer.call_args
-        assert "alert" not in kwargs["kwargs"]
+        payload = plugin._dispatcher.submit.call_args[0][2]
+        assert "alert" not in payload
 
-    def test_flash_and_turnoff_schedules_two_timers(self, plugin):
+    def test_flash_and_turnoff_schedules_two_jobs(self, plugin):
         plugin._settings.get.side_effect = make_settings_getter({
             "lampid": "1",
             "statusDict": [self._entry("PrintDone", turnoff=True, flash=True)],
@@ -1454,9 +2531,9 @@ class TestOnEventFlash:
             "nightmode_enabled": False,
         })
         plugin.on_event("PrintDone", {})
-        assert self._timer.call_count == 2
+        assert plugin._dispatcher.submit.call_count == 2
 
-    def test_flash_and_turnoff_first_timer_sends_alert(self, plugin):
+    def test_flash_and_turnoff_first_job_sends_alert(self, plugin):
         plugin._settings.get.side_effect = make_settings_getter({
             "lampid": "1",
             "statusDict": [self._entry("PrintDone", turnoff=True, flash=True, delay=0)],
@@ -1464,11 +2541,11 @@ class TestOnEventFlash:
             "nightmode_enabled": False,
         })
         plugin.on_event("PrintDone", {})
-        first_call = self._timer.call_args_list[0]
-        assert first_call[1]["kwargs"]["alert"] == "lselect"
-        assert first_call[1]["kwargs"]["on"] is True
+        first_payload = plugin._dispatcher.submit.call_args_list[0][0][2]
+        assert first_payload["alert"] == "lselect"
+        assert first_payload["on"] is True
 
-    def test_flash_and_turnoff_second_timer_sends_off_after_15s(self, plugin):
+    def test_flash_and_turnoff_second_job_sends_off_after_15s(self, plugin):
         plugin._settings.get.side_effect = make_settings_getter({
             "lampid": "1",
             "statusDict": [self._entry("PrintDone", turnoff=True, flash=True, delay=0)],
@@ -1476,9 +2553,9 @@ class TestOnEventFlash:
             "nightmode_enabled": False,
         })
         plugin.on_event("PrintDone", {})
-        second_call = self._timer.call_args_list[1]
-        assert second_call[0][0] == 15  # delay arg
-        assert second_call[1]["kwargs"]["on"] is False
+        delay, _, payload = plugin._dispatcher.submit.call_args_list[1][0]
+        assert delay == 15
+        assert payload["on"] is False
 
 
 # ===========================================================================
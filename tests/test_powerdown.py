@@ -0,0 +1,254 @@
+"""
+Unit tests for the temperature-driven power-down (octoprint_octohue/powerdown.py).
+"""
+from unittest.mock import MagicMock
+
+from octoprint_octohue.powerdown import (
+    COOLDOWN_FLOOR,
+    PowerDownManager,
+    max_tool_temp,
+)
+
+
+def tools(*temps):
+    data = {f"tool{i}": {"actual": t, "target": 0} for i, t in enumerate(temps)}
+    data["bed"] = {"actual": 90, "target": 0}
+    return data
+
+
+class Harness:
+    """Runs scheduled callbacks on demand and records the subscription."""
+
+    def __init__(self, current=None, timeout=600.0):
+        self.jobs = []
+        self.listener = None
+        self.unsubscribed = 0
+        self.switch_off = MagicMock()
+        self.current = current if current is not None else tools(200)
+        self.manager = PowerDownManager(self.schedule, self.cancel, self.subscribe, lambda: self.current,
+                                        self.switch_off, timeout=timeout)
+
+    def schedule(self, delay, callback):
+        job = (delay, callback)
+        self.jobs.append(job)
+        return job
+
+    def cancel(self, job):
+        if job in self.jobs:
+            self.jobs.remove(job)
+
+    def subscribe(self, listener):
+        self.listener = listener
+
+        def unsubscribe():
+            self.unsubscribed += 1
+            self.listener = None
+        return unsubscribe
+
+    def run(self, delay=None):
+        """Runs queued jobs (only those with the given delay, if set)."""
+        ran = [(d, cb) for d, cb in self.jobs if delay is None or d == delay]
+        self.jobs = [j for j in self.jobs if j not in ran]
+        for _, callback in ran:
+            callback()
+
+    def report(self, *temps):
+        self.listener(tools(*temps))
+
+
+class TestMaxToolTemp:
+
+    def test_hottest_tool_ignoring_bed(self):
+        assert max_tool_temp(tools(180, 210)) == 210
+
+    def test_no_tools(self):
+        assert max_tool_temp({"bed": {"actual": 60}}) is None
+        assert max_tool_temp(None) is None
+
+
+class TestPowerDownManager:
+
+    def test_waits_delay_before_subscribing(self):
+        h = Harness()
+        assert h.manager.start(120, 50) is True
+        assert h.jobs[0][0] == 120
+        assert h.listener is None
+        h.run(120)
+        assert h.listener is not None
+
+    def test_switches_off_after_consecutive_cool_readings(self):
+        h = Harness()
+        h.manager.start(0, 50)
+        h.run(0)
+        h.report(49)
+        h.switch_off.assert_not_called()
+        h.report(48)
+        h.run(0)
+        h.switch_off.assert_called_once_with()
+        assert h.unsubscribed == 1
+        assert not h.manager.active
+
+    def test_current_reading_counts_immediately(self):
+        h = Harness(current=tools(30))
+        h.manager.start(0, 50)
+        h.run(0)
+        h.report(30)
+        h.run(0)
+        h.switch_off.assert_called_once_with()
+
+    def test_no_tool_readings_count_as_cool(self):
+        h = Harness(current={"bed": {"actual": 60, "target": 0}})
+        h.manager.start(0, 50)
+        h.run(0)
+        h.switch_off.assert_not_called()
+        h.listener({})
+        h.run(0)
+        h.switch_off.assert_called_once_with()
+        assert h.manager.stats()["timeouts"] == 0
+
+    def test_hottest_tool_decides(self):
+        h = Harness()
+        h.manager.start(0, 50)
+        h.run(0)
+        h.report(30, 120)
+        h.report(30, 120)
+        h.switch_off.assert_not_called()
+
+    def test_single_glitch_reading_does_not_switch_off(self):
+        h = Harness()
+        h.manager.start(0, 50)
+        h.run(0)
+        h.report(0)
+        h.report(180)
+        h.report(175)
+        h.run(0)
+        h.switch_off.assert_not_called()
+
+    def test_noise_inside_hysteresis_band_does_not_reset(self):
+        h = Harness()
+        h.manager.start(0, 50)
+        h.run(0)
+        h.report(50)
+        h.report(51.5)
+        h.report(49.8)
+        h.run(0)
+        h.switch_off.assert_called_once_with()
+
+    def test_threshold_never_below_floor(self):
+        h = Harness()
+        h.manager.start(0, 0)
+        h.run(0)
+        h.report(COOLDOWN_FLOOR)
+        h.report(COOLDOWN_FLOOR)
+        h.run(0)
+        h.switch_off.assert_called_once_with()
+
+    def test_duplicate_start_is_ignored(self):
+        h = Harness()
+        assert h.manager.start(0, 50) is True
+        assert h.manager.start(0, 50) is False
+        assert len(h.jobs) == 1
+        assert h.manager.stats()["duplicates"] == 1
+
+    def test_can_start_again_after_finishing(self):
+        h = Harness(current=tools(20))
+        h.manager.start(0, 50)
+        h.run(0)
+        h.report(20)
+        h.run(0)
+        assert h.manager.start(0, 50) is True
+
+    def test_timeout_gives_up_and_leaves_plug_on(self):
+        h = Harness(timeout=600.0)
+        h.manager.start(0, 50)
+        h.run(0)
+        h.report(200)
+        h.run(600.0)
+        assert h.unsubscribed == 1
+        assert not h.manager.active
+        assert h.manager.stats()["timeouts"] == 1
+        h.run(0)
+        h.switch_off.assert_not_called()
+
+    def test_switching_off_removes_the_timeout_job(self):
+        h = Harness(current=tools(20), timeout=600.0)
+        h.manager.start(0, 50)
+        h.run(0)
+        assert [d for d, _ in h.jobs] == [600.0]
+        h.report(20)
+        assert [d for d, _ in h.jobs] == [0]  # only the switch-off itself
+
+    def test_stale_timeout_does_not_end_a_later_power_down(self):
+        h = Harness(current=tools(20), timeout=600.0)
+        h.manager.start(0, 50)
+        h.run(0)
+        [stale] = [cb for d, cb in h.jobs if d == 600.0]
+        h.report(20)
+        h.run(0)
+        h.manager.start(0, 50)
+        h.run(0)
+        stale()
+        assert h.manager.state == "cooling"
+
+
+class TestStateMachine:
+
+    def test_idle_waiting_cooling_off(self):
+        h = Harness(current=tools(20))
+        assert h.manager.state == "idle"
+        h.manager.start(30, 50)
+        assert h.manager.state == "waiting"
+        h.run(30)
+        assert h.manager.state == "cooling"
+        h.report(20)
+        assert h.manager.state == "off"
+        assert h.manager.start(0, 50) is True
+
+    def test_cancel_while_waiting_removes_the_job(self):
+        h = Harness()
+        h.manager.start(300, 50)
+        assert h.manager.cancel("PrintStarted") is True
+        assert h.jobs == []
+        assert h.manager.state == "idle"
+        assert h.manager.stats()["cancelled"] == 1
+
+    def test_cancel_while_cooling_unsubscribes(self):
+        h = Harness()
+        h.manager.start(0, 50)
+        h.run(0)
+        h.manager.cancel()
+        assert h.unsubscribed == 1
+        assert h.jobs == []
+        h.switch_off.assert_not_called()
+
+    def test_cancel_when_idle_costs_nothing(self):
+        h = Harness()
+        assert h.manager.cancel() is False
+        assert h.manager.stats()["cancelled"] == 0
+
+    def test_cancel_after_off_returns_to_idle(self):
+        h = Harness(current=tools(20))
+        h.manager.start(0, 50)
+        h.run(0)
+        h.report(20)
+        assert h.manager.cancel() is False
+        assert h.manager.state == "idle"
+
+    def test_repeated_starts_keep_one_job(self):
+        h = Harness()
+        for _ in range(10):
+            h.manager.start(60, 50)
+        assert len(h.jobs) == 1
+        assert h.manager.stats()["duplicates"] == 9
+
+    def test_stats_while_cooling(self):
+        now = [0.0]
+        h = Harness()
+        h.manager = PowerDownManager(h.schedule, h.cancel, h.subscribe, lambda: h.current,
+                                     h.switch_off, clock=lambda: now[0])
+        h.manager.start(0, 60)
+        h.run(0)
+        now[0] = 12.0
+        h.report(150)
+        stats = h.manager.stats()
+        assert (stats["state"], stats["for"], stats["threshold"], stats["temperature"]) == ("cooling", 12.0, 60, 150)
@@ -0,0 +1,119 @@
+"""
+Unit tests for the print progress light (octoprint_octohue/progress.py).
+"""
+import pytest
+
+from octoprint_octohue.colour import rgb_to_xy
+from octoprint_octohue.progress import PROGRESS_MIN_BRI, ProgressLight, build_ramp
+
+
+class Harness:
+    """A ProgressLight on a fake clock that records the steps it sends."""
+
+    def __init__(self, ramp=None, budget=None, **kwargs):
+        self.now = 0.0
+        self.sent = []
+        self.light = ProgressLight(ramp or build_ramp("colour", "#FF0000", "#00FF00", 100),
+                                   self.sent.append, budget=budget, clock=lambda: self.now, **kwargs)
+
+    def print_(self, seconds, percents=range(101)):
+        """Ticks each percent, evenly spread over seconds; returns the outcomes."""
+        outcomes = []
+        for percent in percents:
+            self.now = seconds * percent / 100
+            outcomes.append(self.light.update(percent))
+        return outcomes
+
+
+# ===========================================================================
+# build_ramp
+# ===========================================================================
+
+class TestBuildRamp:
+
+    def test_colour_ramp_runs_between_the_colours(self):
+        ramp = build_ramp("colour", "#FF0000", "#00FF00", 80)
+        assert len(ramp) == 101
+        assert ramp[0].xy == pytest.approx(rgb_to_xy(255, 0, 0))
+        assert ramp[100].xy == pytest.approx(rgb_to_xy(0, 255, 0))
+        assert {step.bri for step in ramp} == {80}
+
+    def test_brightness_ramp_keeps_the_colour(self):
+        ramp = build_ramp("brightness", "#FF0000", "#0000FF", 90)
+        assert {step.xy for step in ramp} == {ramp[0].xy}
+        assert ramp[0].bri == PROGRESS_MIN_BRI
+        assert ramp[100].bri == 90
+        assert [step.bri for step in ramp] == sorted(step.bri for step in ramp)
+
+    def test_black_has_no_colour(self):
+        ramp = build_ramp("colour", "#000000", "#FFFFFF", 100)
+        assert ramp[0].xy is None
+        assert ramp[0].lab is None
+
+    def test_unknown_mode_raises(self):
+        with pytest.raises(ValueError):
+            build_ramp("rainbow", "#FF0000", "#00FF00", 100)
+
+    def test_malformed_colour_raises(self):
+        with pytest.raises(ValueError):
+            build_ramp("colour", "red", "#00FF00", 100)
+
+
+# ===========================================================================
+# ProgressLight
+# ===========================================================================
+
+class TestProgressLight:
+
+    def test_first_tick_is_sent(self):
+        h = Harness()
+        assert h.light.update(0) == "sent"
+        assert h.sent[0].percent == 0
+
+    def test_imperceptible_ticks_are_skipped(self):
+        h = Harness(min_interval=0)
+        assert h.print_(100, [0, 1]) == ["sent", "imperceptible"]
+
+    def test_updates_are_perceptibly_apart(self):
+        h = Harness(min_interval=0)
+        h.print_(100)
+        assert 2 < len(h.sent) < 101
+        assert h.sent[-1].percent == 100
+
+    def test_min_interval_spaces_updates(self):
+        h = Harness(delta_e=0.0, bri_step=0.0, min_interval=5.0)
+        h.print_(60)
+        times = [60 * step.percent / 100 for step in h.sent]
+        assert all(b - a >= 5.0 for a, b in zip(times, times[1:-1]))
+
+    def test_completion_is_exempt_from_min_interval(self):
+        h = Harness(min_interval=3600)
+        assert h.print_(60, [0, 100]) == ["sent", "sent"]
+
+    def test_skipped_while_no_budget(self):
+        budget = [False]
+        h = Harness(budget=lambda: budget[0])
+        assert h.light.update(0) == "throttled"
+        budget[0] = True
+        assert h.light.update(0) == "sent"
+
+    def test_completion_is_sent_without_budget(self):
+        h = Harness(budget=lambda: False)
+        assert h.print_(60, [50, 100]) == ["throttled", "sent"]
+
+    def test_lower_percent_starts_over(self):
+        h = Harness(min_interval=0)
+        h.print_(100, [0, 50])
+        assert h.print_(100, [0]) == ["sent"]
+        assert h.print_(100, [1]) == ["imperceptible"]
+
+    def test_reset_sends_the_next_tick(self):
+        h = Harness()
+        h.print_(100, [0, 1])
+        h.light.reset()
+        assert h.light.update(1) == "sent"
+
+    def test_stats(self):
+        h = Harness(min_interval=0)
+        h.print_(100, [0, 1, 50])
+        assert h.light.stats() == {"percent": 50, "ticks": 3, "sent": 2, "imperceptible": 1, "throttled": 0}
@@ -0,0 +1,125 @@
+"""
+Unit tests for the bridge rate limiter (octoprint_octohue/ratelimit.py).
+"""
+from octoprint_octohue.ratelimit import BRIDGE_LIMITS, BridgeRateLimiter, TokenBucket
+
+
+class FakeClock:
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+# ===========================================================================
+# TokenBucket
+# ===========================================================================
+
+class TestTokenBucket:
+
+    def test_burst_available_immediately(self):
+        bucket = TokenBucket(10, 10, FakeClock())
+        assert all(bucket.reserve() == 0.0 for _ in range(10))
+
+    def test_reservation_beyond_burst_waits_one_interval(self):
+        bucket = TokenBucket(10, 10, FakeClock())
+        for _ in range(10):
+            bucket.reserve()
+        assert abs(bucket.reserve() - 0.1) < 1e-9
+        assert abs(bucket.reserve() - 0.2) < 1e-9
+
+    def test_refills_over_time(self):
+        clock = FakeClock()
+        bucket = TokenBucket(1, 1, clock)
+        bucket.reserve()
+        clock.now += 1.0
+        assert bucket.reserve() == 0.0
+
+    def test_refill_capped_at_burst(self):
+        clock = FakeClock()
+        bucket = TokenBucket(1, 1, clock)
+        clock.now += 60
+        assert bucket.reserve() == 0.0
+        assert bucket.reserve() > 0
+
+    def test_max_wait_refuses_without_consuming(self):
+        bucket = TokenBucket(1, 1, FakeClock())
+        bucket.reserve()
+        assert bucket.reserve(max_wait=0.5) is None
+        assert bucket.reserve(max_wait=1.0) == 1.0
+
+
+# ===========================================================================
+# BridgeRateLimiter
+# ===========================================================================
+
+class TestBridgeRateLimiter:
+
+    def test_default_limits_match_bridge_guidance(self):
+        assert BRIDGE_LIMITS["light"][0] == 10.0
+        assert BRIDGE_LIMITS["grouped_light"][0] == 1.0
+
+    def test_grouped_light_second_command_queued(self):
+        limiter = BridgeRateLimiter(clock=FakeClock())
+        assert limiter.admit("grouped_light") == ("sent", 0.0)
+        outcome, wait = limiter.admit("grouped_light")
+        assert outcome == "queued"
+        assert abs(wait - 1.0) < 1e-9
+
+    def test_light_allows_ten_back_to_back(self):
+        limiter = BridgeRateLimiter(clock=FakeClock())
+        outcomes = [limiter.admit("light")[0] for _ in range(11)]
+        assert outcomes[:10] == ["sent"] * 10
+        assert outcomes[10] == "queued"
+
+    def test_resource_types_have_independent_buckets(self):
+        limiter = BridgeRateLimiter(clock=FakeClock())
+        limiter.admit("grouped_light")
+        assert limiter.admit("light")[0] == "sent"
+
+    def test_unknown_rtype_uses_light_limit(self):
+        limiter = BridgeRateLimiter(clock=FakeClock())
+        outcomes = [limiter.admit("scene")[0] for _ in range(10)]
+        assert outcomes == ["sent"] * 10
+
+    def test_dropped_once_queue_exceeds_max_wait(self):
+        limiter = BridgeRateLimiter(max_wait=2.0, clock=FakeClock())
+        outcomes = [limiter.admit("grouped_light")[0] for _ in range(5)]
+        assert outcomes == ["sent", "queued", "queued", "dropped", "dropped"]
+
+    def test_stats_report_backpressure_per_rtype(self):
+        limiter = BridgeRateLimiter(max_wait=1.0, clock=FakeClock())
+        for _ in range(3):
+            limiter.admit("grouped_light")
+        limiter.admit("light")
+        stats = limiter.stats()
+        assert stats["grouped_light"]["sent"] == 1
+        assert stats["grouped_light"]["queued"] == 1
+        assert stats["grouped_light"]["dropped"] == 1
+        assert stats["light"] == {"sent": 1, "queued": 0, "dropped": 0, "critical": 0, "tokens": 9.0}
+
+    def test_critical_sent_when_bucket_empty(self):
+        limiter = BridgeRateLimiter(max_wait=0.5, clock=FakeClock())
+        limiter.admit("grouped_light")
+        assert limiter.admit("grouped_light", critical=True) == ("sent", 0.0)
+        assert limiter.stats()["grouped_light"]["critical"] == 1
+
+    def test_critical_debt_delays_later_commands(self):
+        limiter = BridgeRateLimiter(max_wait=5.0, clock=FakeClock())
+        limiter.admit("grouped_light")
+        limiter.admit("grouped_light", critical=True)
+        outcome, wait = limiter.admit("grouped_light")
+        assert outcome == "queued"
+        assert abs(wait - 2.0) < 1e-9
+
+    def test_available_does_not_reserve(self):
+        clock = FakeClock()
+        limiter = BridgeRateLimiter(clock=clock)
+        assert limiter.available("grouped_light")
+        assert limiter.available("grouped_light")
+        limiter.admit("grouped_light")
+        assert not limiter.available("grouped_light")
+        clock.now = 1.0
+        assert limiter.available("grouped_light")
+        assert limiter.stats()["grouped_light"]["sent"] == 1
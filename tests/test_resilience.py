@@ -0,0 +1,337 @@
+"""
+Unit tests for the bridge circuit breaker and retry policy
+(octoprint_octohue/resilience.py).
+
+TestRetryAgainstFlakyBridge drives the plugin's PUT and GET paths against
+FlakyBridgeStandIn, a local plain-HTTP server that answers each request with
+the next scripted status (or drops the connection), so retries are exercised
+over a real socket.  urllib (stdlib) carries the requests because conftest
+replaces the requests package with a mock.
+"""
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from octoprint_octohue.dispatcher import CommandDispatcher
+from octoprint_octohue.resilience import CircuitBreaker, RetryPolicy
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make(threshold=3, cooldown=10.0):
+    clock = Clock()
+    return CircuitBreaker(threshold=threshold, cooldown=cooldown, clock=clock), clock
+
+
+class TestCircuitBreaker:
+
+    def test_starts_closed(self):
+        breaker, _ = make()
+        assert breaker.state == "closed"
+        assert breaker.allow() is True
+
+    def test_opens_after_threshold_consecutive_failures(self):
+        breaker, _ = make(threshold=3)
+        breaker.record_failure()
+        breaker.record_failure()
+        assert breaker.state == "closed"
+        breaker.record_failure()
+        assert breaker.state == "open"
+        assert breaker.allow() is False
+
+    def test_success_resets_failure_count(self):
+        breaker, _ = make(threshold=3)
+        breaker.record_failure()
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+        assert breaker.state == "closed"
+
+    def test_half_open_after_cooldown_allows_single_probe(self):
+        breaker, clock = make(threshold=1, cooldown=10.0)
+        breaker.record_failure()
+        clock.now = 9.9
+        assert breaker.allow() is False
+        clock.now = 10.0
+        assert breaker.state == "half_open"
+        assert breaker.allow() is True
+        assert breaker.allow() is False
+
+    def test_probe_success_closes(self):
+        breaker, clock = make(threshold=1)
+        breaker.record_failure()
+        clock.now = 10.0
+        breaker.allow()
+        breaker.record_success()
+        assert breaker.state == "closed"
+        assert breaker.allow() is True
+
+    def test_probe_failure_reopens_for_another_cooldown(self):
+        breaker, clock = make(threshold=1, cooldown=10.0)
+        breaker.record_failure()
+        clock.now = 10.0
+        breaker.allow()
+        breaker.record_failure()
+        assert breaker.state == "open"
+        clock.now = 19.0
+        assert breaker.allow() is False
+        clock.now = 20.0
+        assert breaker.allow() is True
+
+    def test_stats(self):
+        breaker, clock = make(threshold=1, cooldown=10.0)
+        breaker.record_failure()
+        clock.now = 4.0
+        breaker.allow()
+        assert breaker.stats() == {"state": "open", "failures": 1, "retry_in": 6.0, "opens": 1, "rejected": 1}
+
+    def test_reset(self):
+        breaker, _ = make(threshold=1)
+        breaker.record_failure()
+        breaker.reset()
+        assert breaker.stats()["state"] == "closed"
+        assert breaker.stats()["failures"] == 0
+
+    def test_only_one_concurrent_probe(self):
+        breaker, clock = make(threshold=1)
+        breaker.record_failure()
+        clock.now = 10.0
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(breaker.allow())) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert results.count(True) == 1
+
+
+# ===========================================================================
+# RetryPolicy
+# ===========================================================================
+
+def make_policy(**kwargs):
+    clock = Clock()
+    kwargs.setdefault("rng", lambda: 1.0)
+    return RetryPolicy(clock=clock, **kwargs), clock
+
+
+class TestRetryPolicy:
+
+    def test_idempotent_methods_with_transient_status_are_retryable(self):
+        for status in (429, 502, 503, 504):
+            assert RetryPolicy.retryable("PUT", status=status)
+            assert RetryPolicy.retryable("GET", status=status)
+
+    def test_other_statuses_are_not_retryable(self):
+        for status in (200, 207, 400, 403, 404, 500):
+            assert not RetryPolicy.retryable("PUT", status=status)
+
+    def test_connection_errors_are_retryable(self):
+        assert RetryPolicy.retryable("PUT", error=ConnectionResetError())
+
+    def test_post_is_never_retried(self):
+        assert not RetryPolicy.retryable("POST", status=503)
+        assert not RetryPolicy.retryable("POST", error=ConnectionResetError())
+
+    def test_backoff_doubles_up_to_cap(self):
+        policy, _ = make_policy(base=0.5, cap=2.0, max_retries=5, budget=100)
+        assert [policy.backoff(n) for n in range(4)] == [0.5, 1.0, 2.0, 2.0]
+
+    def test_jitter_stays_within_upper_half(self):
+        policy, _ = make_policy(base=1.0, rng=lambda: 0.0, max_retries=2, budget=100)
+        assert policy.backoff(0) == 0.5
+        assert policy.backoff(1) == 1.0
+
+    def test_gives_up_after_max_retries(self):
+        policy, _ = make_policy(max_retries=2)
+        assert policy.backoff(1) is not None
+        assert policy.backoff(2) is None
+        assert policy.stats()["gave_up"] == 1
+
+    def test_budget_limits_retries_per_window(self):
+        policy, clock = make_policy(budget=2, budget_window=60.0)
+        assert policy.backoff(0) is not None
+        assert policy.backoff(0) is not None
+        assert policy.backoff(0) is None
+        assert policy.stats()["exhausted"] == 1
+        assert policy.stats()["budget_left"] == 0
+        clock.now = 61.0
+        assert policy.backoff(0) is not None
+        assert policy.stats()["budget_left"] == 1
+
+    def test_stats_count_retries(self):
+        policy, _ = make_policy()
+        policy.backoff(0)
+        policy.backoff(1)
+        assert policy.stats()["retries"] == 2
+
+
+# ---------------------------------------------------------------------------
+# Local flaky-bridge stand-in
+# ---------------------------------------------------------------------------
+
+class FlakyBridgeStandIn:
+    """
+    Serves /clip/v2/resource/*.  Each request pops the next scripted answer:
+    an HTTP status, or "reset" to close the socket without responding.  Once
+    the script runs out every request gets 200.  Requests are recorded as
+    (method, path, body) tuples.
+    """
+
+    def __init__(self, script=()):
+        self.script = list(script)
+        self.requests = []
+        self.lock = threading.Lock()
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _answer(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = json.loads(self.rfile.read(length)) if length else None
+                with standin.lock:
+                    standin.requests.append((self.command, self.path, body))
+                    answer = standin.script.pop(0) if standin.script else 200
+                if answer == "reset":
+                    self.close_connection = True
+                    self.connection.shutdown(2)
+                    return
+                reply = json.dumps({"errors": [], "data": []}).encode()
+                self.send_response(answer)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(reply)))
+                self.end_headers()
+                self.wfile.write(reply)
+
+            do_GET = do_PUT = _answer
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.addr = f"127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+
+    def puts(self):
+        with self.lock:
+            return [body for method, _, body in self.requests if method == "PUT"]
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class UrllibSession:
+    """The slice of requests.Session the plugin uses, over plain HTTP."""
+
+    class Response:
+        def __init__(self, status_code, body):
+            self.status_code = status_code
+            self._body = body
+
+        def json(self):
+            return json.loads(self._body)
+
+    def request(self, method, url, headers=None, timeout=None, **kwargs):
+        payload = kwargs.get("json")
+        data = None if payload is None else json.dumps(payload).encode()
+        req = urllib.request.Request(url.replace("https://", "http://", 1), data=data,
+                                     headers=dict(headers or {}, **{"Content-Type": "application/json"}),
+                                     method=method)
+        try:
+            with urllib.request.urlopen(req, timeout=5) as r:
+                return self.Response(r.status, r.read())
+        except urllib.error.HTTPError as e:
+            return self.Response(e.code, e.read())
+
+
+def wait_for(predicate, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return predicate()
+
+
+@pytest.fixture
+def flaky(plugin):
+    """Plugin wired to a FlakyBridgeStandIn with a real dispatcher and fast retries."""
+    from tests.conftest import make_settings_getter
+
+    standins = []
+
+    def make(script):
+        standin = FlakyBridgeStandIn(script)
+        standins.append(standin)
+        plugin.pbridge = {"addr": standin.addr, "key": "test-api-key"}
+        return standin
+
+    plugin._settings.get.side_effect = make_settings_getter({"lampisgroup": False})
+    plugin._session = UrllibSession()
+    plugin._dispatcher = CommandDispatcher(plugin._run_scheduled)
+    plugin._dispatcher.start()
+    plugin._retry = RetryPolicy(base=0.05, cap=0.2, budget=10)
+    yield make
+    plugin._dispatcher.stop()
+    for standin in standins:
+        standin.close()
+
+
+class TestRetryAgainstFlakyBridge:
+
+    def test_put_is_retried_after_503(self, plugin, flaky):
+        bridge = flaky([503])
+        assert plugin.set_state({"on": True}, "uuid-1") == "sent"
+        assert wait_for(lambda: len(bridge.puts()) == 2)
+        assert bridge.puts() == [{"on": {"on": True}}] * 2
+        assert plugin.get_stats()["coalescer"]["retried"] == 1
+
+    def test_put_is_retried_after_429_and_connection_reset(self, plugin, flaky):
+        bridge = flaky([429, "reset"])
+        plugin.set_state({"on": True}, "uuid-1")
+        assert wait_for(lambda: len(bridge.puts()) == 3)
+        assert plugin.get_stats()["retry"]["retries"] == 2
+
+    def test_newer_command_supersedes_pending_retry(self, plugin, flaky):
+        bridge = flaky([503])
+        plugin._retry = RetryPolicy(base=0.4, cap=0.4, budget=10)
+        plugin.set_state({"on": True, "bri": 10}, "uuid-1")
+        assert wait_for(lambda: len(bridge.puts()) == 1)
+        # A newer command goes out at once instead of waiting behind the retry...
+        plugin.set_state({"on": False}, "uuid-1")
+        assert wait_for(lambda: len(bridge.puts()) == 2)
+        assert bridge.puts()[1] == {"on": {"on": False}}
+        # ...and the stale retry is dropped when it comes due.
+        assert wait_for(lambda: plugin.get_stats()["coalescer"]["superseded"] == 1)
+        assert len(bridge.puts()) == 2
+
+    def test_put_gives_up_after_max_retries(self, plugin, flaky):
+        bridge = flaky([503] * 10)
+        plugin._retry = RetryPolicy(base=0.01, cap=0.01, max_retries=2, budget=10)
+        plugin.set_state({"on": True}, "uuid-1")
+        assert wait_for(lambda: plugin.get_stats()["coalescer"]["failed"] == 1)
+        assert len(bridge.puts()) == 3
+
+    def test_non_transient_error_is_not_retried(self, plugin, flaky):
+        bridge = flaky([404])
+        plugin.set_state({"on": True}, "uuid-1")
+        assert wait_for(lambda: len(bridge.puts()) == 1)
+        time.sleep(0.2)
+        assert len(bridge.puts()) == 1
+        assert plugin.get_stats()["coalescer"]["retried"] == 0
+
+    def test_get_is_retried_inline(self, plugin, flaky):
+        bridge = flaky([503, "reset"])
+        assert plugin._hue_request("GET", "light") == {"errors": [], "data": []}
+        assert len(bridge.requests) == 3
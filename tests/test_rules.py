@@ -0,0 +1,147 @@
+"""
+Unit tests for statusDict rule compilation (octoprint_octohue/rules.py).
+"""
+from unittest.mock import MagicMock
+
+import pytest
+
+from octoprint_octohue.rules import FLASH_OFF_DELAY, compile_rule, compile_rules
+
+
+def to_xy(colour):
+    return {"#000000": None}.get(colour, [0.3, 0.3])
+
+
+def entry(event="PrintDone", **overrides):
+    e = {"event": event, "colour": "#FF0000", "brightness": 80, "delay": 0, "turnoff": False, "flash": False, "ct": 0}
+    e.update(overrides)
+    return e
+
+
+# ===========================================================================
+# compile_rule
+# ===========================================================================
+
+class TestCompileRule:
+
+    def test_colour_converted_to_xy(self):
+        rule = compile_rule(entry(), to_xy)
+        assert rule.jobs == ((0, {"on": True, "bri": 80, "xy": [0.3, 0.3]}),)
+
+    def test_ct_used_instead_of_colour(self):
+        rule = compile_rule(entry(ct=370), to_xy)
+        assert dict(rule.jobs[0][1]) == {"on": True, "bri": 80, "ct": 370}
+
+    def test_black_keeps_brightness_only(self):
+        rule = compile_rule(entry(colour="#000000"), to_xy)
+        assert dict(rule.jobs[0][1]) == {"on": True, "bri": 80}
+
+    def test_flash_adds_alert_but_not_to_startup_light(self):
+        rule = compile_rule(entry(flash=True), to_xy)
+        assert rule.jobs[0][1]["alert"] == "lselect"
+        assert "alert" not in rule.light
+
+    def test_turnoff(self):
+        rule = compile_rule(entry(turnoff=True, delay=3), to_xy)
+        assert rule.jobs == ((3, {"on": False}),)
+
+    def test_turnoff_keeps_startup_light_when_valid(self):
+        assert compile_rule(entry(turnoff=True), to_xy).light == {"on": True, "bri": 80, "xy": [0.3, 0.3]}
+        assert compile_rule(entry(turnoff=True, brightness=None), to_xy).light is None
+
+    def test_flash_then_turnoff(self):
+        rule = compile_rule(entry(turnoff=True, flash=True, delay=2), to_xy)
+        assert [delay for delay, _ in rule.jobs] == [2, 2 + FLASH_OFF_DELAY]
+        assert rule.jobs[1][1] == {"on": False}
+
+    def test_priority_defaults_by_event(self):
+        assert compile_rule(entry("PrintFailed"), to_xy).critical is True
+        assert compile_rule(entry("PrintDone"), to_xy).critical is False
+
+    def test_explicit_priority_overrides_default(self):
+        assert compile_rule(entry("PrintFailed", priority="normal"), to_xy).critical is False
+        assert compile_rule(entry("PrintDone", priority="critical"), to_xy).critical is True
+
+    def test_critical_payloads_carry_flag_but_startup_light_does_not(self):
+        rule = compile_rule(entry("Error", flash=True, turnoff=True), to_xy)
+        assert [payload["critical"] for _, payload in rule.jobs] == [True, True]
+        assert "critical" not in rule.light
+        assert "critical" not in compile_rule(entry(), to_xy).jobs[0][1]
+
+    def test_throttle_options_default_off(self):
+        rule = compile_rule(entry(), to_xy)
+        assert (rule.debounce, rule.min_interval, rule.leading, rule.trailing) == (0, 0, True, True)
+        assert rule.gated is False
+
+    def test_debounce_defaults_to_trailing_edge_only(self):
+        rule = compile_rule(entry("ZChange", debounce="0.5"), to_xy)
+        assert (rule.debounce, rule.leading, rule.trailing) == (0.5, False, True)
+        assert rule.gated is True
+
+    def test_explicit_edges_kept(self):
+        rule = compile_rule(entry("ZChange", min_interval=2, leading=True, trailing=False), to_xy)
+        assert (rule.min_interval, rule.leading, rule.trailing) == (2, True, False)
+
+    def test_critical_rule_never_gated(self):
+        assert compile_rule(entry("PrintFailed", min_interval=5), to_xy).gated is False
+
+    def test_string_values_from_settings_accepted(self):
+        rule = compile_rule(entry(brightness="50", delay="1.5", ct=""), to_xy)
+        assert rule.jobs[0][0] == 1.5
+        assert rule.jobs[0][1]["bri"] == 50
+
+    def test_payloads_are_read_only(self):
+        rule = compile_rule(entry(), to_xy)
+        with pytest.raises(TypeError):
+            rule.jobs[0][1]["bri"] = 1
+
+    @pytest.mark.parametrize("overrides", [
+        {"colour": "red"},
+        {"colour": "#GG0000"},
+        {"colour": "#FF00000"},
+        {"brightness": 300},
+        {"brightness": 101},
+        {"brightness": "bright"},
+        {"ct": 100},
+        {"ct": "warm"},
+        {"delay": -1},
+        {"delay": "soon"},
+        {"event": ""},
+        {"priority": "urgent"},
+        {"debounce": -1},
+        {"min_interval": "often"},
+        {"min_interval": 1, "leading": False, "trailing": False},
+    ])
+    def test_invalid_entries_rejected(self, overrides):
+        with pytest.raises(ValueError):
+            compile_rule(entry(**overrides), to_xy)
+
+
+# ===========================================================================
+# compile_rules
+# ===========================================================================
+
+class TestCompileRules:
+
+    def test_lookup_by_event(self):
+        rules = compile_rules([entry("PrintStarted"), entry("PrintDone", turnoff=True)], to_xy)
+        assert set(rules) == {"PrintStarted", "PrintDone"}
+        assert rules.get("ZChange") is None
+
+    def test_first_duplicate_wins(self):
+        rules = compile_rules([entry(brightness=10), entry(brightness=90)], to_xy)
+        assert rules["PrintDone"].jobs[0][1]["bri"] == 10
+
+    def test_invalid_entry_skipped_and_logged(self):
+        logger = MagicMock()
+        rules = compile_rules([entry("PrintStarted", colour="nope"), entry("PrintDone"), "garbage"], to_xy, logger=logger)
+        assert list(rules) == ["PrintDone"]
+        assert logger.warning.call_count == 2
+
+    def test_none_status_dict(self):
+        assert dict(compile_rules(None, to_xy)) == {}
+
+    def test_table_is_read_only(self):
+        rules = compile_rules([entry()], to_xy)
+        with pytest.raises(TypeError):
+            rules["PrintStarted"] = None
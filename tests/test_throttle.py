@@ -0,0 +1,172 @@
+"""
+Unit tests for per-event debounce/min_interval gating (octoprint_octohue/throttle.py).
+
+Scheduled callbacks are kept in a list and run by advancing a fake clock, so
+windows open and close deterministically.
+"""
+from octoprint_octohue.rules import EventRule
+from octoprint_octohue.throttle import EventThrottle
+
+
+def rule(event="ZChange", debounce=0, min_interval=0, leading=None, trailing=True, critical=False):
+    if leading is None:
+        leading = not debounce
+    return EventRule(event, (), None, critical=critical, debounce=debounce, min_interval=min_interval,
+                     leading=leading, trailing=trailing)
+
+
+class Harness:
+    """Fake clock plus a job list; advance() runs whatever falls due."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.jobs = []
+        self.fired = []
+        self.throttle = EventThrottle(self.schedule, self.cancel, lambda r: self.fired.append(self.now),
+                                      clock=lambda: self.now)
+
+    def schedule(self, delay, callback):
+        job = [self.now + delay, callback]
+        self.jobs.append(job)
+        return job
+
+    def cancel(self, job):
+        if job in self.jobs:
+            self.jobs.remove(job)
+
+    def advance(self, seconds):
+        end = self.now + seconds
+        while True:
+            due = sorted((job for job in self.jobs if job[0] <= end), key=lambda job: job[0])
+            if not due:
+                break
+            job = due[0]
+            self.jobs.remove(job)
+            self.now = job[0]
+            job[1]()
+        self.now = end
+
+    def events(self, r, times):
+        """Submits r at each absolute time in times; returns the outcomes."""
+        outcomes = []
+        for t in times:
+            self.advance(t - self.now)
+            outcomes.append(self.throttle.submit(r))
+        return outcomes
+
+
+# ===========================================================================
+# min_interval (throttle)
+# ===========================================================================
+
+class TestMinInterval:
+
+    def test_leading_then_trailing(self):
+        h = Harness()
+        r = rule(min_interval=1.0)
+        outcomes = h.events(r, [0.0, 0.2, 0.4, 0.6])
+        assert outcomes == ["fired", "deferred", "dropped", "dropped"]
+        h.advance(5)
+        assert h.fired == [0.0, 1.0]
+
+    def test_firings_at_least_min_interval_apart(self):
+        h = Harness()
+        r = rule(min_interval=1.0)
+        h.events(r, [i * 0.1 for i in range(35)])
+        h.advance(5)
+        assert h.fired == [0.0, 1.0, 2.0, 3.0, 4.0]
+        assert all(b - a >= 1.0 for a, b in zip(h.fired, h.fired[1:]))
+
+    def test_leading_only_drops_window(self):
+        h = Harness()
+        r = rule(min_interval=1.0, trailing=False)
+        assert h.events(r, [0.0, 0.5, 1.5]) == ["fired", "dropped", "fired"]
+        h.advance(5)
+        assert h.fired == [0.0, 1.5]
+
+    def test_trailing_only_waits_for_window(self):
+        h = Harness()
+        r = rule(min_interval=1.0, leading=False)
+        assert h.events(r, [0.0, 0.5]) == ["deferred", "dropped"]
+        assert h.fired == []
+        h.advance(5)
+        assert h.fired == [1.0]
+
+    def test_quiet_event_fires_immediately_again(self):
+        h = Harness()
+        r = rule(min_interval=1.0)
+        h.events(r, [0.0, 3.0])
+        assert h.fired == [0.0, 3.0]
+        assert h.jobs[0][0] == 4.0
+
+
+# ===========================================================================
+# debounce
+# ===========================================================================
+
+class TestDebounce:
+
+    def test_fires_once_quiet(self):
+        h = Harness()
+        r = rule(debounce=0.5)
+        assert h.events(r, [0.0, 0.3, 0.6, 0.9]) == ["deferred", "dropped", "dropped", "dropped"]
+        h.advance(5)
+        assert h.fired == [1.4]
+
+    def test_leading_debounce(self):
+        h = Harness()
+        r = rule(debounce=0.5, leading=True, trailing=False)
+        assert h.events(r, [0.0, 0.3, 0.6, 2.0]) == ["fired", "dropped", "dropped", "fired"]
+        h.advance(5)
+        assert h.fired == [0.0, 2.0]
+
+    def test_single_leading_event_does_not_fire_twice(self):
+        h = Harness()
+        r = rule(debounce=0.5, leading=True)
+        h.events(r, [0.0])
+        h.advance(5)
+        assert h.fired == [0.0]
+
+    def test_min_interval_spaces_debounced_firings(self):
+        h = Harness()
+        r = rule(debounce=0.2, min_interval=2.0, leading=True)
+        h.events(r, [0.0, 0.1])
+        h.advance(5)
+        assert h.fired == [0.0, 2.0]
+
+
+# ===========================================================================
+# reset / stats
+# ===========================================================================
+
+class TestResetAndStats:
+
+    def test_stats_count_events_fired_and_dropped(self):
+        h = Harness()
+        r = rule(min_interval=1.0)
+        h.events(r, [0.0, 0.1, 0.2, 0.3])
+        assert h.throttle.stats() == {"ZChange": {"events": 4, "fired": 1, "dropped": 2, "pending": True}}
+
+    def test_events_are_gated_independently(self):
+        h = Harness()
+        assert h.events(rule("ZChange", min_interval=1.0), [0.0]) == ["fired"]
+        assert h.events(rule("CaptureDone", min_interval=1.0), [0.1]) == ["fired"]
+
+    def test_reset_cancels_pending_firing(self):
+        h = Harness()
+        r = rule(min_interval=1.0)
+        h.events(r, [0.0, 0.5])
+        h.throttle.reset()
+        assert h.jobs == []
+        h.advance(5)
+        assert h.fired == [0.0]
+        assert h.throttle.stats() == {}
+
+    def test_stale_expiry_after_reset_is_ignored(self):
+        h = Harness()
+        r = rule(min_interval=1.0)
+        h.events(r, [0.0, 0.5])
+        stale = h.jobs[0][1]
+        h.throttle.reset()
+        stale()
+        assert h.fired == [0.0]
@@ -0,0 +1,149 @@
+"""
+Unit tests for the shared, session-resuming bridge TLS context
+(octoprint_octohue/tls.py).
+
+Connections go to TLSStandIn, a local TLS echo server presenting a bridge
+certificate issued by the throwaway CA in tests/certs/ (see generate.sh).
+"""
+import os
+import socket
+import ssl
+import threading
+from unittest.mock import patch
+
+import pytest
+
+from octoprint_octohue import tls
+from octoprint_octohue.tls import ResumingSSLContext, build_bridge_context
+
+
+CERTS = os.path.join(os.path.dirname(__file__), "certs")
+TEST_CA = os.path.join(CERTS, "ca.pem")
+
+
+class TLSStandIn:
+    """Accepts TLS connections, echoes one message and closes."""
+
+    def __init__(self, max_version=None):
+        self.context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        self.context.load_cert_chain(os.path.join(CERTS, "bridge.pem"), os.path.join(CERTS, "bridge.key"))
+        if max_version is not None:
+            self.context.maximum_version = max_version
+        self.listener = socket.create_server(("127.0.0.1", 0))
+        self.address = self.listener.getsockname()
+        threading.Thread(target=self._serve, daemon=True).start()
+
+    def _serve(self):
+        while True:
+            try:
+                conn, _ = self.listener.accept()
+            except OSError:
+                return
+            try:
+                with self.context.wrap_socket(conn, server_side=True) as s:
+                    s.sendall(s.recv(64))
+            except (OSError, ssl.SSLError):
+                pass
+
+    def roundtrip(self, ctx):
+        """Connects with ctx, exchanges one message and closes. Returns session_reused."""
+        sock = socket.create_connection(self.address, timeout=5)
+        # urllib3 sets TCP_NODELAY on its connections; without it the resumed
+        # TLS 1.2 handshake stalls on delayed ACKs.
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        with ctx.wrap_socket(sock) as s:
+            s.sendall(b"ping")
+            assert s.recv(64) == b"ping"
+            return s.session_reused
+
+    def close(self):
+        self.listener.close()
+
+
+@pytest.fixture
+def standin():
+    s = TLSStandIn()
+    yield s
+    s.close()
+
+
+class TestBuildBridgeContext:
+
+    def test_verifies_chain_but_not_hostname(self, standin):
+        ctx = build_bridge_context(TEST_CA)
+        assert ctx.check_hostname is False
+        assert ctx.verify_mode == ssl.CERT_REQUIRED
+        standin.roundtrip(ctx)
+
+    def test_rejects_certificate_from_other_ca(self, standin):
+        ctx = build_bridge_context(tls.SIGNIFY_CA)
+        with pytest.raises(ssl.SSLCertVerificationError):
+            standin.roundtrip(ctx)
+
+    def test_reconnect_resumes_session_tls13(self, standin):
+        ctx = build_bridge_context(TEST_CA)
+        assert standin.roundtrip(ctx) is False
+        assert standin.roundtrip(ctx) is True
+        assert standin.roundtrip(ctx) is True
+        assert ctx.stats() == {"handshakes": 3, "resumed": 2, "sessions": 1}
+
+    def test_reconnect_resumes_session_tls12(self):
+        standin = TLSStandIn(max_version=ssl.TLSVersion.TLSv1_2)
+        try:
+            ctx = build_bridge_context(TEST_CA)
+            standin.roundtrip(ctx)
+            assert standin.roundtrip(ctx) is True
+        finally:
+            standin.close()
+
+    def test_forget_sessions_forces_full_handshake(self, standin):
+        ctx = build_bridge_context(TEST_CA)
+        standin.roundtrip(ctx)
+        ctx.forget_sessions()
+        assert standin.roundtrip(ctx) is False
+
+    def test_session_cache_is_bounded(self):
+        standins = [TLSStandIn() for _ in range(tls._MAX_SESSIONS + 2)]
+        try:
+            ctx = build_bridge_context(TEST_CA)
+            for s in standins:
+                s.roundtrip(ctx)
+            assert ctx.stats()["sessions"] == tls._MAX_SESSIONS
+        finally:
+            for s in standins:
+                s.close()
+
+
+class TestSharedContext:
+
+    @pytest.fixture(autouse=True)
+    def _reset(self):
+        saved = tls._shared_context
+        tls._shared_context = None
+        yield
+        tls._shared_context = saved
+
+    def test_built_once_and_shared(self):
+        with patch.object(tls, "build_bridge_context", wraps=tls.build_bridge_context) as build:
+            first = tls.bridge_context()
+            second = tls.bridge_context()
+        assert first is second
+        assert isinstance(first, ResumingSSLContext)
+        build.assert_called_once_with()
+
+    def test_stats_none_until_built(self):
+        assert tls.bridge_context_stats() is None
+        tls.bridge_context()
+        assert tls.bridge_context_stats() == {"handshakes": 0, "resumed": 0, "sessions": 0}
+
+    def test_signify_adapter_mounts_shared_context(self):
+        from octoprint_octohue import _SignifyAdapter
+        from requests.adapters import HTTPAdapter
+
+        with patch.object(HTTPAdapter, "init_poolmanager") as init_pool, \
+             patch.object(HTTPAdapter, "proxy_manager_for") as proxy_manager:
+            _SignifyAdapter().init_poolmanager(10, 10)
+            _SignifyAdapter().proxy_manager_for("http://proxy")
+        assert init_pool.call_args[1]["ssl_context"] is tls.bridge_context()
+        assert proxy_manager.call_args[1]["ssl_context"] is tls.bridge_context()
+        assert init_pool.call_args[1]["assert_hostname"] is False
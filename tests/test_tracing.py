@@ -0,0 +1,75 @@
+"""
+Unit tests for event traces (octoprint_octohue/tracing.py).
+"""
+from octoprint_octohue.tracing import TraceBuffer, current_trace
+
+
+class FakeClock:
+    def __init__(self, now=100.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class TestTrace:
+
+    def test_stages_are_offsets_from_received(self):
+        clock = FakeClock()
+        trace = TraceBuffer(clock=clock).start("PrintFailed", "lamp")
+        clock.now += 0.002
+        trace.mark("scheduled", {"delay": 0})
+        clock.now += 0.010
+        trace.mark("sent", {"path": "light/lamp"})
+        d = trace.as_dict()
+        assert [(s["stage"], s["ms"]) for s in d["stages"]] == [("received", 0.0), ("scheduled", 2.0), ("sent", 12.0)]
+        assert d["total_ms"] == 12.0
+        assert (d["event"], d["device"]) == ("PrintFailed", "lamp")
+
+    def test_activate_sets_current_trace(self):
+        trace = TraceBuffer().start("PrintDone", "lamp")
+        assert current_trace() is None
+        token = trace.activate()
+        assert current_trace() is trace
+        trace.deactivate(token)
+        assert current_trace() is None
+
+
+class TestTraceBuffer:
+
+    def test_ids_are_unique(self):
+        traces = TraceBuffer()
+        assert len({traces.start("E", "d").id for _ in range(50)}) == 50
+
+    def test_keeps_only_the_most_recent(self):
+        traces = TraceBuffer(size=2)
+        first = traces.start("A", "d")
+        traces.start("B", "d")
+        traces.start("C", "d")
+        assert [t["event"] for t in traces.dump()] == ["B", "C"]
+        assert traces.get(first.id) is None
+
+    def test_attach_and_take(self):
+        traces = TraceBuffer()
+        a, b = traces.start("A", "d"), traces.start("B", "d")
+        traces.attach("light/1", a)
+        traces.attach("light/1", b)
+        assert traces.take("light/1") == [a, b]
+        assert traces.take("light/1") == ()
+
+    def test_detach(self):
+        traces = TraceBuffer()
+        a = traces.start("A", "d")
+        traces.attach("light/1", a)
+        traces.detach("light/1", a)
+        assert traces.stats()["waiting"] == 0
+
+    def test_dump_filters_by_duration(self):
+        clock = FakeClock()
+        traces = TraceBuffer(clock=clock)
+        fast, slow = traces.start("fast", "d"), traces.start("slow", "d")
+        clock.now += 0.001
+        fast.mark("acked")
+        clock.now += 0.5
+        slow.mark("acked")
+        assert [t["event"] for t in traces.dump(min_ms=100)] == ["slow"]